@@ -588,8 +588,8 @@ class CE(Calculator):
                              "".format(backup_data["setting_kwargs"]))
 
         atoms = bc.atoms.copy()
-        for symb in backup_data["symbols"]:
-            atoms.symbol = symb
+        for atom, symb in zip(atoms, backup_data["symbols"]):
+            atom.symbol = symb
 
         return CE(atoms, bc, eci=backup_data["eci"], initial_cf=backup_data["cf"])
 
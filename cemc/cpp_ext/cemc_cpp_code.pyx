@@ -6,6 +6,9 @@ include "pycluster_tracker.pyx"
 include "pyeshelby_tensor.pyx"
 include "pypair_constraint.pyx"
 include "pywang_landau_sampler.pyx"
+include "pywang_landau_2d.pyx"
 include "hoshen_kopelman.pyx"
 include "pymat4D.pyx"
-include "khachaturyan.pyx"
\ No newline at end of file
+include "khachaturyan.pyx"
+include "pywaste_recycler.pyx"
+include "pyrng.pyx"
\ No newline at end of file
@@ -19,8 +19,16 @@ cdef extern from "cluster_tracker.hpp":
 
       bool move_creates_new_cluster(object system_changes) except+
 
+      bool move_in_size_window(object system_changes, unsigned int min_size, unsigned int max_size, bool only_one_cluster) except+
+
       void update_clusters(object system_changes) except+
 
       bool has_minimal_connectivity()
 
       int num_root_nodes()
+
+      unsigned int largest_cluster_size()
+
+      unsigned int num_multi_atom_clusters()
+
+      object get_members_of_largest_cluster_python()
@@ -30,11 +30,14 @@ cdef class PyClusterTracker:
         return self._clust_track.atomic_clusters2group_indx_python()
 
     def surface_python(self):
-        self._clust_track.surface_python()
+        return self._clust_track.surface_python()
 
     def move_creates_new_cluster(self, system_changes):
         return self._clust_track.move_creates_new_cluster(system_changes)
 
+    def move_in_size_window(self, system_changes, min_size, max_size, only_one_cluster=False):
+        return self._clust_track.move_in_size_window(system_changes, min_size, max_size, only_one_cluster)
+
     def update_clusters(self, system_changes):
         self._clust_track.update_clusters(system_changes)
 
@@ -43,3 +46,12 @@ cdef class PyClusterTracker:
 
     def num_root_nodes(self):
         return self._clust_track.num_root_nodes()
+
+    def largest_cluster_size(self):
+        return self._clust_track.largest_cluster_size()
+
+    def num_multi_atom_clusters(self):
+        return self._clust_track.num_multi_atom_clusters()
+
+    def get_members_of_largest_cluster(self):
+        return self._clust_track.get_members_of_largest_cluster_python()
@@ -0,0 +1,26 @@
+# distutils: language = c++
+
+from cemc.cpp_ext.rng cimport RandomGenerator
+cdef class PyRandomGenerator:
+    """
+    Random number stream used by the native samplers (xoshiro256**).
+    Stream k of a seed is obtained by jumping 2^128 steps k times.
+    """
+    cdef RandomGenerator *thisptr
+
+    def __cinit__(self, seed, stream=0):
+        self.thisptr = new RandomGenerator(seed)
+        for _ in range(stream):
+            self.thisptr.jump()
+
+    def __dealloc__(self):
+        del self.thisptr
+
+    def uniform(self, size=1):
+        return [self.thisptr.uniform() for _ in range(size)]
+
+    def randint(self, high, size=1):
+        return [self.thisptr.randint(high) for _ in range(size)]
+
+    def jump(self):
+        self.thisptr.jump()
@@ -0,0 +1,75 @@
+# distutils: language = c++
+
+from cemc.cpp_ext.wang_landau_2d cimport WangLandau2DSampler
+import numpy as np
+
+cdef class PyWangLandau2DSampler:
+    cdef WangLandau2DSampler *thisptr
+
+    def __cinit__(self, atoms, bc, corr_func, eci, sites, host, solute,
+                  n_energy_bins, emin, emax, seed):
+        self.thisptr = new WangLandau2DSampler(atoms, bc, corr_func, eci, sites,
+                                               host, solute, n_energy_bins,
+                                               emin, emax, seed)
+
+    def __dealloc__(self):
+        del self.thisptr
+
+    @property
+    def f(self):
+        return self.thisptr.f
+
+    @f.setter
+    def f(self, value):
+        self.thisptr.f = value
+
+    @property
+    def min_f(self):
+        return self.thisptr.min_f
+
+    @min_f.setter
+    def min_f(self, value):
+        self.thisptr.min_f = value
+
+    @property
+    def flatness_criteria(self):
+        return self.thisptr.flatness_criteria
+
+    @flatness_criteria.setter
+    def flatness_criteria(self, value):
+        self.thisptr.flatness_criteria = value
+
+    @property
+    def check_convergence_every(self):
+        return self.thisptr.check_convergence_every
+
+    @check_convergence_every.setter
+    def check_convergence_every(self, value):
+        self.thisptr.check_convergence_every = value
+
+    @property
+    def converged(self):
+        return self.thisptr.converged
+
+    def set_schedule(self, name, gain=1.0, t0=1.0):
+        self.thisptr.set_schedule(name, gain, t0)
+
+    def run(self, maxsteps):
+        self.thisptr.run(maxsteps)
+
+    def _shape(self):
+        return (self.thisptr.get_n_energy_bins(),
+                self.thisptr.get_n_composition_bins())
+
+    def get_logdos(self):
+        return np.array(self.thisptr.get_logdos()).reshape(self._shape())
+
+    def get_histogram(self):
+        return np.array(self.thisptr.get_histogram()).reshape(self._shape())
+
+    def get_known_bins(self):
+        known = np.array(self.thisptr.get_known_bins(), dtype=np.uint8)
+        return known.reshape(self._shape())
+
+    def get_mc_time(self):
+        return self.thisptr.get_mc_time()
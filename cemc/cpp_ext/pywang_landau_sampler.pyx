@@ -21,8 +21,42 @@ cdef class PyWangLandauSampler:
     def use_adaptive_windows(self, min_width):
         self.thisptr.use_adaptive_windows(min_width)
 
+    def use_replica_exchange(self, n_windows, overlap, exchange_every):
+        self.thisptr.use_replica_exchange(n_windows, overlap, exchange_every)
+
     def save_sub_bin_distribution(self, fname):
         self.thisptr.save_sub_bin_distribution(fname)
 
+    def set_schedule(self, name, gain=1.0, t0=1.0, round_trips=1):
+        self.thisptr.set_schedule(name, gain, t0, round_trips)
+
+    def set_seed(self, seed):
+        self.thisptr.set_seed(seed)
+
+    def set_convergence_log(self, fname):
+        self.thisptr.set_convergence_log(fname)
+
+    def set_reference_logdos(self, ref):
+        self.thisptr.set_reference_logdos(ref)
+
+    def save_checkpoint(self, fname):
+        self.thisptr.save_checkpoint(fname)
+
+    def load_checkpoint(self, fname):
+        self.thisptr.load_checkpoint(fname)
+
+    def set_checkpoint(self, fname, interval=3600.0):
+        self.thisptr.set_checkpoint(fname, interval)
+
     def run(self, maxsteps):
         self.thisptr.run(maxsteps)
+
+    @property
+    def num_walkers(self):
+        return self.thisptr.get_n_updaters()
+
+    def get_walker_symbols(self, walker):
+        return self.thisptr.get_walker_symbols(walker)
+
+    def get_walker_ce_energy(self, walker):
+        return self.thisptr.get_walker_ce_energy(walker)
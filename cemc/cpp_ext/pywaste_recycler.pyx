@@ -0,0 +1,46 @@
+# distutils: language = c++
+
+from cemc.cpp_ext.waste_recycler cimport WasteRecycler
+from ase.units import kB
+
+cdef class PyWasteRecycler:
+    """
+    Cython wrapper for the native waste recycling kernel
+
+    The temperatures are given in Kelvin and converted with the Boltzmann
+    constant of ase.units, the same as in the Metropolis acceptance of
+    :py:class:`cemc.mcmc.Montecarlo`
+    """
+    cdef WasteRecycler *_cpp_class
+
+    def __cinit__(self):
+        self._cpp_class = new WasteRecycler()
+
+    def __dealloc__(self):
+        del self._cpp_class
+
+    def __reduce__(self):
+        # The kernel only caches the last step, so a fresh instance is
+        # a valid copy
+        return (self.__class__, ())
+
+    def accept_prob(self, E_old, E_new, T):
+        return WasteRecycler.accept_prob(E_old, E_new, kB*T)
+
+    def accept(self, E_old, E_new, T, rand_num):
+        return self._cpp_class.accept(E_old, E_new, kB*T, rand_num)
+
+    def record(self, E_old, E_new, p_new):
+        self._cpp_class.record(E_old, E_new, p_new)
+
+    def energy(self):
+        return self._cpp_class.energy()
+
+    def energy_sq(self):
+        return self._cpp_class.energy_sq()
+
+    def singlet_averages(self, singlets_old, singlets_new):
+        return self._cpp_class.singlet_averages(singlets_old, singlets_new)
+
+    def last_accept_prob(self):
+        return self._cpp_class.last_accept_prob()
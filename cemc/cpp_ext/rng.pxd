@@ -0,0 +1,13 @@
+# distutils: language = c++
+
+from libc.stdint cimport uint64_t
+
+cdef extern from "rng.hpp":
+    cdef cppclass RandomGenerator:
+        RandomGenerator(uint64_t seed)
+
+        double uniform()
+
+        uint64_t randint(uint64_t n) except +
+
+        void jump()
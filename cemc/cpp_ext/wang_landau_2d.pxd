@@ -0,0 +1,34 @@
+# distutils: language = c++
+
+from libcpp cimport bool
+from libcpp.string cimport string
+from libcpp.vector cimport vector
+
+cdef extern from "wang_landau_2d.hpp":
+    cdef cppclass WangLandau2DSampler:
+        double f
+        double min_f
+        double flatness_criteria
+        unsigned int check_convergence_every
+        bool converged
+
+        WangLandau2DSampler(object atoms, object BC, object corrFunc, object ecis,
+                            vector[int] sites, string host, string solute,
+                            unsigned int n_energy_bins, double emin, double emax,
+                            unsigned int seed) except +
+
+        void run(unsigned int nsteps)
+
+        void set_schedule(string name, double gain, double t0) except +
+
+        vector[double] get_logdos()
+
+        vector[unsigned int] get_histogram()
+
+        vector[int] get_known_bins()
+
+        unsigned int get_n_energy_bins()
+
+        unsigned int get_n_composition_bins()
+
+        double get_mc_time()
@@ -2,6 +2,8 @@
 
 from libcpp cimport bool
 from libcpp.string cimport string
+from libcpp.vector cimport vector
+from libc.stdint cimport uint64_t
 
 cdef extern from "wang_landau_sampler.hpp":
     cdef cppclass WangLandauSampler:
@@ -11,6 +13,28 @@ cdef extern from "wang_landau_sampler.hpp":
 
         void use_adaptive_windows(unsigned int min_window_width)
 
+        void use_replica_exchange(unsigned int n_windows, double overlap, unsigned int exchange_every) except +
+
         void run(unsigned int maxsteps)
 
         void save_sub_bin_distribution(string fname)
+
+        void set_schedule(string name, double gain, double t0, unsigned int round_trips) except +
+
+        void set_seed(uint64_t seed)
+
+        void set_convergence_log(string fname) except +
+
+        void set_reference_logdos(vector[double] ref) except +
+
+        void save_checkpoint(string fname) except +
+
+        void load_checkpoint(string fname) except +
+
+        void set_checkpoint(string fname, double interval) except +
+
+        unsigned int get_n_updaters()
+
+        vector[string] get_walker_symbols(unsigned int walker) except +
+
+        double get_walker_ce_energy(unsigned int walker) except +
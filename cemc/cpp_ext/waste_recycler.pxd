@@ -0,0 +1,25 @@
+# distutils: language = c++
+
+from libcpp cimport bool
+
+cdef extern from "init_numpy.hpp":
+  pass
+
+cdef extern from "waste_recycler.hpp":
+  cdef cppclass WasteRecycler:
+    WasteRecycler()
+
+    @staticmethod
+    double accept_prob(double E_old, double E_new, double kT) except +
+
+    bool accept(double E_old, double E_new, double kT, double rand_num) except +
+
+    void record(double E_old, double E_new, double p_new) except +
+
+    double energy()
+
+    double energy_sq()
+
+    object singlet_averages(object singlets_old, object singlets_new) except +
+
+    double last_accept_prob()
@@ -3,6 +3,7 @@ from cemc.mcmc.bias_potential import BiasPotential
 from cemc.mcmc.montecarlo import Montecarlo, TooFewElementsError
 from cemc.mcmc.montecarlo import CanNotFindLegalMoveError
 from cemc.mcmc.sgc_montecarlo import SGCMonteCarlo
+from cemc.mcmc.vcsgc_montecarlo import VarianceConstrainedSGC
 from cemc.mcmc.linear_vib_correction import LinearVibCorrection
 from cemc.mcmc.mc_observers import MCObserver, CorrelationFunctionTracker, PairCorrelationObserver, \
 LowestEnergyStructure, SGCObserver, Snapshot, NetworkObserver, SiteOrderParameter
@@ -10,6 +11,7 @@ from cemc.mcmc.mc_observers import EnergyEvolution, EnergyHistogram, MCBackup
 from cemc.mcmc.mc_observers import BiasPotentialContribution
 from cemc.mcmc.mc_observers import CovarianceMatrixObserver
 from cemc.mcmc.mc_observers import PairObserver
+from cemc.mcmc.mc_observers import ReweightingHistogramObserver
 from cemc.mcmc.sa_canonical import SimulatedAnnealingCanonical
 from cemc.mcmc.multidim_comp_dos import CompositionDOS
 from cemc.mcmc.dos_sampler import SGCCompositionFreeEnergy
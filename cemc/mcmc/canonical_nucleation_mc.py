@@ -21,14 +21,20 @@ class CanonicalNucleationMC(Montecarlo):
                                        element=self.network_element)
         self.attach(self.network)
 
+    def _rejected_before_calculation(self, system_changes):
+        """Reject moves that leave the current window."""
+        return not self.nuc_sampler.move_in_window(self.network,
+                                                   system_changes)
+
     def _accept(self, system_changes):
         move_accepted = Montecarlo._accept(self, system_changes)
-        in_window = self.nuc_sampler.is_in_window(self.network)
+        in_window = self.nuc_sampler.is_in_window(
+            self.network, system_changes=system_changes)
         return move_accepted and in_window
 
     def _get_trial_move(self):
         """Perform a trial move."""
-        if not self.nuc_sampler.is_in_window(self.network):
+        if not self.nuc_sampler.is_in_window(self.network, system_changes=[]):
             self.network(None)
             msg = "System is outside the window before the trial move "
             msg += "is performed!\n"
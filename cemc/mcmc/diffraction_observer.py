@@ -8,8 +8,14 @@ class DiffractionUpdater(object):
     Utility class for all objects that require tracing of a fourier
     reflection.
 
+    The phase factors exp(ik*r)/N of all sites and k-vectors are tabulated
+    once. A move then only requires the rows of the changed sites, and the
+    amplitudes of all k-vectors are updated with one vector-matrix product.
+
     :param Atoms atoms: Atoms object
-    :param array k_vector: Fourier reflection to be traced
+    :param array k_vector: Fourier reflection to be traced. Either one
+        k-vector or an array of shape (num_k, 3) (see e.g.
+        :py:func:`cemc.mcmc.diffraction_observer.reciprocal_lattice_points`)
     :param list active_symbols: List of symbols that contributes to the
         reflection
     :param list all_symbols: List of all symbols in the simulation
@@ -18,45 +24,114 @@ class DiffractionUpdater(object):
                  all_symbols=[]):
         MCObserver.__init__(self)
         self.orig_symbols = [atom.symbol for atom in atoms]
-        self.k_vector = k_vector
+        self.single_k = np.ndim(k_vector) == 1
+        self.k_vector = np.atleast_2d(np.array(k_vector, dtype=np.float64))
         self.N = len(atoms)
-        self.k_dot_r = atoms.get_positions().dot(self.k_vector)
+        self.k_dot_r = atoms.get_positions().dot(self.k_vector.T)
+        self.phase = np.exp(1j*self.k_dot_r)/self.N
         self.indicator = {k: 0 for k in all_symbols}
         for symb in active_symbols:
             self.indicator[symb] = 1.0
 
-        self.value = self.calculate_from_scratch(self.orig_symbols)
-        self.prev_value = self.value
+        self.amplitudes = self.calculate_from_scratch(self.orig_symbols)
+        self.prev_amplitudes = self.amplitudes.copy()
+
+    @property
+    def value(self):
+        """
+        Return the amplitude of the reflection. If several k-vectors are
+        traced, an array with one amplitude per k-vector is returned
+        """
+        if self.single_k:
+            return self.amplitudes[0]
+        return self.amplitudes.copy()
+
+    @property
+    def magnitude(self):
+        """
+        Return the absolute value of the amplitude. If several k-vectors
+        are traced, the root mean square of the absolute values is
+        returned
+        """
+        return np.sqrt(np.mean(np.abs(self.amplitudes)**2))
 
     def update(self, system_changes):
         """
         Update the reflection value
+
+        :param list system_changes: Changes to the system
+
+        :return: The new value (see
+            :py:attr:`cemc.mcmc.diffraction_observer.DiffractionUpdater.value`)
         """
-        self.prev_value = self.value
-        for change in system_changes:
-            f_val = np.exp(1j*self.k_dot_r[change[0]])/self.N
-            self.value += self.indicator[change[2]]*f_val
-            self.value -= self.indicator[change[1]]*f_val
+        self.prev_amplitudes[:] = self.amplitudes
+        if system_changes:
+            indices = [change[0] for change in system_changes]
+            weights = np.array([self.indicator[change[2]] -
+                                self.indicator[change[1]]
+                                for change in system_changes])
+            self.amplitudes += weights.dot(self.phase[indices, :])
+        return self.value
 
     def undo(self):
         """
         Undo the last update
         """
-        self.value = self.prev_value
+        self.amplitudes[:] = self.prev_amplitudes
 
     def reset(self):
         """
         Reset all values
         """
-        self.value = self.calculate_from_scratch(self.orig_symbols)
-        self.prev_value = self.value
+        self.amplitudes = self.calculate_from_scratch(self.orig_symbols)
+        self.prev_amplitudes = self.amplitudes.copy()
 
     def calculate_from_scratch(self, symbols):
-        """Calculate the intensity from sctrach."""
-        value = 0.0 + 1j*0.0
-        for i, symb in enumerate(symbols):
-            value += self.indicator[symb]*np.exp(1j*self.k_dot_r[i])
-        return value / len(symbols)
+        """Calculate the amplitude of all k-vectors from sctrach."""
+        weights = np.array([self.indicator[symb] for symb in symbols])
+        return weights.dot(self.phase)*float(self.N)/len(symbols)
+
+
+def reciprocal_lattice_points(cell, k_max, k_min=0.0):
+    """
+    Return all reciprocal lattice vectors of a cell with length in
+    (k_min, k_max]. The origin is never included
+
+    :param numpy.ndarray cell: Cell vectors as rows (e.g. atoms.get_cell())
+    :param float k_max: Maximum length
+    :param float k_min: Minimum length
+
+    :return: Reciprocal lattice vectors (shape (num_k, 3))
+    :rtype: numpy.ndarray
+    """
+    cell = np.array(cell)
+    recip = 2.0*np.pi*np.linalg.inv(cell).T
+
+    # |G.a_i| = 2*pi*|n_i|, hence |n_i| <= k_max*|a_i|/(2*pi)
+    n_max = [int(np.ceil(k_max*np.linalg.norm(a)/(2.0*np.pi))) for a in cell]
+    ranges = [np.arange(-n, n+1) for n in n_max]
+    hkl = np.array(np.meshgrid(*ranges, indexing="ij")).reshape(3, -1).T
+    k_vectors = hkl.dot(recip)
+    length = np.linalg.norm(k_vectors, axis=1)
+    mask = np.logical_and(length > k_min, length <= k_max)
+    mask = np.logical_and(mask, length > 1E-10)
+    return k_vectors[mask, :]
+
+
+def reciprocal_shell(cell, k_vector, tol=1E-6):
+    """
+    Return all reciprocal lattice vectors of a cell with the same length
+    as k_vector
+
+    :param numpy.ndarray cell: Cell vectors as rows
+    :param array k_vector: One vector on the shell
+    :param float tol: Tolerance for the length
+
+    :return: Reciprocal lattice vectors (shape (num_k, 3))
+    :rtype: numpy.ndarray
+    """
+    length = np.linalg.norm(k_vector)
+    return reciprocal_lattice_points(cell, length + tol, k_min=length - tol)
 
 
 class DiffractionObserver(MCObserver):
@@ -79,9 +154,19 @@ class DiffractionObserver(MCObserver):
     def __call__(self, system_changes):
         self.updater.update(system_changes)
         self.avg += self.updater.value
+        self.num_updates += 1
 
     def get_averages(self):
-        return {self.name: np.abs(self.avg/self.num_updates)}
+        """
+        Return the average absolute value of the amplitude. If several
+        k-vectors are traced, there is one entry per k-vector named
+        <name>_<index>
+        """
+        avg = np.abs(self.avg/self.num_updates)
+        if self.updater.single_k:
+            return {self.name: avg}
+        return {"{}_{}".format(self.name, i): value
+                for i, value in enumerate(avg)}
 
     def reset(self):
         self.updater.reset()
@@ -108,7 +193,8 @@ class DiffractionRangeConstraint(ReactionCrdRangeConstraint):
         """
         Check if the constraint is violated after update.
         """
-        new_val = np.abs(self.updater.update(system_changes))
+        self.updater.update(system_changes)
+        new_val = self.updater.magnitude
         self.updater.undo()
         return new_val >= self.range[0] and new_val < self.range[1]
 
@@ -136,10 +222,11 @@ class DiffractionCrdInitializer(ReactionCrdInitializer):
         Get the value of the current reflection intensity
         """
         if system_changes:
-            value = np.abs(self.updater.update(system_changes))
+            self.updater.update(system_changes)
+            value = self.updater.magnitude
             self.updater.undo()
             return value
-        return np.abs(self.updater.value)
+        return self.updater.magnitude
 
     def update(self, system_changes):
         self.updater.update(system_changes)
@@ -155,25 +155,15 @@ class FixedNucleusMC(Montecarlo):
         return mv_ok
         #return self.network.move_creates_new_clusters()
 
-    def _accept(self, system_changes):
-        """Accept trial move.
+    def _rejected_before_calculation(self, system_changes):
+        """Reject moves that split the cluster.
 
         :param list system_changes: Proposed changes
 
-        :return: True/False, if True the move is accepted
+        :return: True if the move is rejected
         :rtype: bool
         """
-        # Note that we have to call the parent's accept first,
-        # as the _mc_step function assumes that an energy 
-        # evaluation have been performed, prior to accepting
-        # or rejecting the move
-        move_accepted = Montecarlo._accept(self, system_changes)
-        if self.network.move_creates_new_cluster(system_changes):
-            return False
-
-        # if not self.move_ok():
-        #     return False
-        return move_accepted
+        return self.network.move_creates_new_cluster(system_changes)
 
     def _check_nucleation_site_exists(self):
         """Check that at least one nucleation site exists."""
@@ -210,6 +200,31 @@ class FixedNucleusMC(Montecarlo):
         dists = self.atoms.get_distances(root, indices, mic=True)
         return [indx for indx, d in zip(indices, dists) if d < radius]
 
+    def _indices_in_voxel_shape(self, voxels, voxel_size, root):
+        """Return a list with the indices inside a voxelised shape.
+
+        The center of mass of the shape is placed at the root site.
+
+        :param np.ndarray voxels: 3D array (1 inside and 0 outside). This
+            can for instance be the result of
+            :py:class:`cemc.tools.shape_optimizer.VoxelShapeOptimizer`
+        :param float voxel_size: Side length of one voxel
+        :param int root: Root index
+        """
+        voxels = np.array(voxels)
+        com = np.mean(np.argwhere(voxels > 0), axis=0)
+        indices = list(range(len(self.atoms)))
+        del indices[root]
+        vec = self.atoms.get_distances(root, indices, mic=True, vector=True)
+        vox = np.round(vec/voxel_size + com).astype(int)
+        inside_grid = np.all(np.logical_and(vox >= 0, vox < voxels.shape),
+                             axis=1)
+        valid = []
+        for indx, v, ok in zip(indices, vox, inside_grid):
+            if ok and voxels[tuple(v)] > 0:
+                valid.append(indx)
+        return valid
+
     def init_cluster_info(self):
         """Initialize cluster info."""
         self.network.collect_statistics = True
@@ -235,17 +250,25 @@ class FixedNucleusMC(Montecarlo):
         
         self.network.collect_statistics = False
 
-    def grow_cluster(self, elements, shape="arbitrary", radius=10.0):
+    def grow_cluster(self, elements, shape="arbitrary", radius=10.0,
+                     voxels=None, voxel_size=1.0):
         """Grow a cluster of a certain size.
 
         :param dict elements: How many of each element that should be insreted
-        :param str shape: Shape to create (either arbitrary or spherical)
+        :param str shape: Shape to create (either arbitrary, sphere or voxels)
         :param float radius: Radius of the spheres
+        :param np.ndarray voxels: Shape of the cluster if shape is voxels
+            (3D array, 1 inside and 0 outside). An equilibrium shape can be
+            found with
+            :py:class:`cemc.tools.shape_optimizer.VoxelShapeOptimizer`
+        :param float voxel_size: Side length of one voxel
         """
         from random import choice, shuffle
-        valid_shapes = ["arbitrary", "sphere"]
+        valid_shapes = ["arbitrary", "sphere", "voxels"]
         if shape not in valid_shapes:
             raise ValueError("shape has to be one of {}".format(valid_shapes))
+        if shape == "voxels" and voxels is None:
+            raise ValueError("voxels has to be given when shape is voxels")
 
         self.network.collect_statistics = True
         all_elems = []
@@ -275,6 +298,10 @@ class FixedNucleusMC(Montecarlo):
             candidate_indices = self._indices_in_spherical_neighborhood(
                 radius, ref_site
             )
+        elif shape == "voxels":
+            candidate_indices = self._indices_in_voxel_shape(
+                voxels, voxel_size, ref_site
+            )
 
         if len(candidate_indices) < len(all_elems):
             raise ValueError("The allowed indices to insert things, is "
@@ -3,7 +3,6 @@ import numpy as np
 from cemc_cpp_code import PyClusterTracker
 from ase.io.trajectory import TrajectoryWriter
 from cemc.mcmc.averager import Averager
-from cemc.mcmc.util import waste_recycled_average
 from itertools import product
 highlight_elements = ["Li", "Be", "B", "C", "N", "O", "F", "Ne", "Na", "Mg",
                       "Al", "Si", "P", "S", "Cl", "Ar"]
@@ -229,32 +228,11 @@ class SGCObserver(MCObserver):
         new_singlets = self.ce_calc.get_singlets()
 
         if self.recycle_waste:
-            avg_singl = np.zeros_like(self.singlets)
-            avg_sq = np.zeros_like(self.singlets)
-            avg_corr = np.zeros_like(self.singlets)
-            for i in range(len(new_singlets)):
-                singl = np.array([self.mc.current_singlets[i],
-                                  new_singlets[i]])
-
-                avg_singl[i] = waste_recycled_average(singl,
-                                                      self.mc.last_energies,
-                                                      self.mc.T)
-                avg_sq[i] = waste_recycled_average(singl**2,
-                                                   self.mc.last_energies,
-                                                   self.mc.T)
-
-                singl_en = np.array(
-                    [self.mc.current_singlets[i] * self.mc.last_energies[0],
-                     new_singlets[i] * self.mc.last_energies[1]])
-
-                avg_corr[i] = waste_recycled_average(singl_en,
-                                                     self.mc.last_energies,
-                                                     self.mc.T)
-
-            E = waste_recycled_average(self.mc.last_energies,
-                                       self.mc.last_energies, self.mc.T)
-            E_sq = waste_recycled_average(self.mc.last_energies**2,
-                                          self.mc.last_energies, self.mc.T)
+            recycler = self.mc.waste_recycler
+            avg_singl, avg_sq, avg_corr = recycler.singlet_averages(
+                self.mc.current_singlets, new_singlets)
+            E = recycler.energy()
+            E_sq = recycler.energy_sq()
             self.quantities["energy"] += E
             self.quantities["energy_sq"] += E_sq
             self.quantities["singlets"] += avg_singl
@@ -367,7 +345,6 @@ class NetworkObserver(MCObserver):
         self.nbins = nbins
         self.size_histogram = np.zeros(self.nbins)
         self.collect_statistics = True
-        self.fixed_num_solutes = True
 
     def __reduce__(self):
         args = (self.calc, self.cluster_name, self.element, self.nbins)
@@ -386,26 +363,43 @@ class NetworkObserver(MCObserver):
         :param list system_changes: Last changes to the system
         """
         self.n_calls += 1
-        if system_changes and self.fixed_num_solutes:
-            if not self.move_involves_only_cluster_elements(system_changes):
-                self.fast_cluster_tracker.update_clusters(system_changes)
+        if system_changes:
+            self.fast_cluster_tracker.update_clusters(system_changes)
         else:
             self.fast_cluster_tracker.find_clusters()
 
         if self.collect_statistics:
-            new_res = self.fast_cluster_tracker.get_cluster_statistics_python()
-            for key in self.res.keys():
-                self.res[key] += new_res[key]
-
-            self.update_histogram(new_res["cluster_sizes"])
-            self.n_atoms_in_cluster += np.sum(new_res["cluster_sizes"])
-            if new_res["max_size"] > self.max_size:
-                self.max_size = new_res["max_size"]
-                self.atoms_max_cluster = self.calc.atoms.copy()
-                clust_indx = \
-                    self.fast_cluster_tracker.atomic_clusters2group_indx_python()
-                self.indx_max_cluster = clust_indx
-                self.num_clusters = len(new_res["cluster_sizes"])
+            self._collect_statistics()
+
+    def update(self, system_changes):
+        """
+        Update the clusters incrementally and collect statistics. The sites
+        in system_changes, and the sites changed in the previous update,
+        are synchronized with the symbols of the calculator. Hence, an empty
+        list undoes the last update if the move was rejected.
+
+        :param list system_changes: Last changes to the system
+        """
+        self.n_calls += 1
+        self.fast_cluster_tracker.update_clusters(system_changes)
+        if self.collect_statistics:
+            self._collect_statistics()
+
+    def _collect_statistics(self):
+        """Add the statistics of the current clusters."""
+        new_res = self.fast_cluster_tracker.get_cluster_statistics_python()
+        for key in self.res.keys():
+            self.res[key] += new_res[key]
+
+        self.update_histogram(new_res["cluster_sizes"])
+        self.n_atoms_in_cluster += np.sum(new_res["cluster_sizes"])
+        if new_res["max_size"] > self.max_size:
+            self.max_size = new_res["max_size"]
+            self.atoms_max_cluster = self.calc.atoms.copy()
+            clust_indx = \
+                self.fast_cluster_tracker.atomic_clusters2group_indx_python()
+            self.indx_max_cluster = clust_indx
+            self.num_clusters = len(new_res["cluster_sizes"])
 
     def has_minimal_connectivity(self):
         return self.fast_cluster_tracker.has_minimal_connectivity()
@@ -417,9 +411,31 @@ class NetworkObserver(MCObserver):
     def move_creates_new_cluster(self, system_changes):
         return self.fast_cluster_tracker.move_creates_new_cluster(system_changes)
 
+    def move_in_size_window(self, system_changes, min_size, max_size,
+                            only_one_cluster=False):
+        """
+        Check if the largest cluster has a size in [min_size, max_size)
+        after the proposed move, without applying the move. Isolated atoms
+        do not count as clusters
+
+        :param list system_changes: Proposed changes
+        :param int min_size: Minimum size of the largest cluster
+        :param int max_size: Upper limit (exclusive) for the largest cluster
+        :param bool only_one_cluster: If True, there has to be exactly one
+            cluster after the move
+
+        :rtype: bool
+        """
+        return self.fast_cluster_tracker.move_in_size_window(
+            system_changes, int(min_size), int(max_size), only_one_cluster)
+
     def num_root_nodes(self):
         return self.fast_cluster_tracker.num_root_nodes()
 
+    def largest_cluster_size(self):
+        """Return the number of atoms in the largest cluster."""
+        return self.fast_cluster_tracker.largest_cluster_size()
+
     def update_histogram(self, sizes):
         """
         Update the histogram
@@ -760,6 +776,47 @@ class EnergyHistogram(MCObserver):
         return self._histogram
 
 
+class ReweightingHistogramObserver(MCObserver):
+    """
+    Collect the energy histogram (and optionally the singlets in each
+    energy bin) needed for histogram reweighting to other temperatures.
+
+    See :py:class:`cemc.tools.histogram_reweighting.WHAM` and
+    :py:class:`cemc.tools.histogram_reweighting.FerrenbergSwendsen`
+
+    :param Montecarlo mc_obj: Monte Carlo object
+    :param float bin_width: Width of the energy bins in eV
+    :param bool track_singlets: If True the singlets are accumulated in
+        each energy bin
+    """
+
+    def __init__(self, mc_obj, bin_width=1E-3, track_singlets=False):
+        from cemc.tools.histogram_reweighting import ReweightingHistogram
+        MCObserver.__init__(self)
+        self.name = "ReweightingHistogramObserver"
+        self.mc = mc_obj
+        self.track_singlets = track_singlets
+        n_singlets = 0
+        if self.track_singlets:
+            calc = self.mc.atoms.get_calculator()
+            n_singlets = len(calc.get_singlets())
+        self.histogram = ReweightingHistogram(self.mc.T, bin_width=bin_width,
+                                              n_singlets=n_singlets)
+
+    def __call__(self, system_changes):
+        """Add the current state to the histogram."""
+        E = self.mc.current_energy_without_vib() + self.mc.energy_bias
+        singlets = None
+        if self.track_singlets:
+            singlets = self.mc.atoms.get_calculator().get_singlets()
+        self.histogram.add(E, singlets)
+
+    def reset(self):
+        """Clear the histogram and update the temperature."""
+        self.histogram.clear()
+        self.histogram.temperature = self.mc.T
+
+
 class MCBackup(MCObserver):
     """Class that makes backup of the current MC object.
 
@@ -1,21 +1,48 @@
+import os
 import h5py as h5
 from cemc.mcmc.sgc_montecarlo import SGCMonteCarlo
 import numpy as np
 
 
 class MCParameterSweep(object):
+    """
+    Run Monte Carlo calculations for a set of parameters
+
+    :param list parameters: List of dictionaries with the parameters of
+        each point
+    :param Montecarlo mc_obj: Monte Carlo object
+    :param int nsteps: Number of MC steps at each point
+    :param data_getter: Callable taking the Monte Carlo object as argument
+        and returning a dictionary with additional data. When
+        num_processes > 1 it is sent to the workers and must therefore be
+        picklable (e.g. a module level function)
+    :param str outfile: HDF5 file where the results are appended. If given
+        explicitly, points already present in the file are skipped such
+        that an interrupted sweep can be resumed. If not given, the results
+        are appended to default_output.h5 and all points are run
+    :param dict equil_params: Parameters passed to the equillibration
+    :param int num_processes: Number of worker processes. Each worker
+        reconstructs its own copy of the Monte Carlo object (and CE
+        calculator) from a serialised state
+    """
     known_parameters = {
         "MonteCarlo": ["temperature", "composition"],
         "SGCMonteCarlo": ["temperature", "chemical_potential"]
     }
 
     def __init__(self, parameters, mc_obj, nsteps=100000, data_getter=None,
-                 outfile="default_output.h5", equil_params=None):
+                 outfile=None, equil_params=None, num_processes=1):
         self.parameters = parameters
         self.mc_obj = mc_obj
         self.nsteps = nsteps
-        self.data_getter = None
+        self.data_getter = data_getter
+        self.num_processes = num_processes
         self.check_initialization()
+        # Only resume from a file the user explicitly asked for. A leftover
+        # default file from an unrelated run would otherwise skip all points
+        self.resume = outfile is not None
+        if outfile is None:
+            outfile = "default_output.h5"
         self.outfile = outfile
         self.equil_params = equil_params
 
@@ -51,31 +78,90 @@ class MCParameterSweep(object):
                     raise ValueError("Temperature has to be given as a float")
 
     def run(self):
-        n_params = len(self.parameters)
+        """Run all the parameters in the sweep.
+
+        Each result is appended to the output file as soon as it is
+        finished. If the output file was given explicitly, points that are
+        already present in it are skipped, such that an interrupted sweep
+        can be restarted with the same arguments.
+        """
         name = self.mc_obj.name
+        if name != "SGCMonteCarlo":
+            msg = "Parameter sweep for the MC object not supported yet!"
+            raise NotImplementedError(msg)
+
+        todo = self._remaining_points()
+        if len(todo) < len(self.parameters):
+            print("{} of {} points already present in {}. Skipping them."
+                  "".format(len(self.parameters) - len(todo),
+                            len(self.parameters), self.outfile))
+            for i in sorted(set(range(len(self.parameters))) - set(todo)):
+                print("Skipping point {}: T={} K, mu={}"
+                      "".format(i, self.parameters[i]["temperature"],
+                                self.parameters[i]["chemical_potential"]))
+
         all_data = []
-        for i in range(n_params):
-            self.mc_obj.reset()
-            if name == "SGCMonteCarlo":
-                self.mc_obj.T = self.parameters[i]["temperature"]
-                self.mc_obj.chemical_potential = \
-                    self.parameters[i]["chemical_potential"]
-            else:
-                msg = "Parameter sweep for the MC object not supported yet!"
-                raise NotImplementedError(msg)
-            self.mc_obj.runMC(steps=self.nsteps, equil=True,
-                              equil_params=self.equil_params)
-
-            data = self.mc_obj.get_thermodynamic()
-            if self.data_getter is not None:
-                # Default get the thermodynamic quantities
-                additional_data = self.data_getter(self.mc_obj)
-                for key, value in additional_data:
-                    data[key] = value
-            all_data.append(data)
+        if self.num_processes == 1:
+            for i in todo:
+                data = _run_point(self.mc_obj, self.parameters[i],
+                                  self.nsteps, self.equil_params,
+                                  self.data_getter)
+                self._store(data)
+                all_data.append(data)
+            return all_data
+
+        from cemc.mcmc.parallel_util import start_pool
+        args = [(i, self.parameters[i]) for i in todo]
+        shared = {"mc_obj": self.mc_obj, "nsteps": self.nsteps,
+                  "equil_params": self.equil_params,
+                  "data_getter": self.data_getter}
+        pool = start_pool(self.num_processes, shared, mc_obj=self.mc_obj)
+        try:
+            for i, data in pool.imap_unordered(_run_point_in_worker, args):
+                self._store(data)
+                all_data.append(data)
+        finally:
+            pool.close()
+            pool.join()
+        return all_data
+
+    def _remaining_points(self):
+        """Return the indices of the parameters that are not in the
+        output file."""
+        all_indices = list(range(len(self.parameters)))
+        if not self.resume or self.outfile == "" or \
+                not os.path.exists(self.outfile):
+            return all_indices
+
+        with h5.File(self.outfile, 'r') as hf:
+            if "temperature" not in hf:
+                return all_indices
+            stored = {"temperature": np.array(hf["temperature"])}
+            for params in self.parameters:
+                for key in params["chemical_potential"].keys():
+                    dset_name = "mu_{}".format(key)
+                    if dset_name in hf and dset_name not in stored:
+                        stored[dset_name] = np.array(hf[dset_name])
+
+        todo = []
+        for i, params in enumerate(self.parameters):
+            found = np.isclose(stored["temperature"],
+                               float(params["temperature"]))
+            for key, value in params["chemical_potential"].items():
+                dset_name = "mu_{}".format(key)
+                if dset_name not in stored:
+                    found[:] = False
+                    break
+                found = np.logical_and(found,
+                                       np.isclose(stored[dset_name], value))
+            if not np.any(found):
+                todo.append(i)
+        return todo
 
+    def _store(self, data):
+        """Append one result to the output file."""
         if self.outfile != "":
-            self.save(all_data)
+            self.save([data])
 
     def save(self, data):
         """Save data as arrays."""
@@ -89,15 +175,67 @@ class MCParameterSweep(object):
                 data_flattened[key].append(value)
 
         data_flattened = {key: np.array(value) for key, value in
-                          data_flattened.items()}
+                          data_flattened.items() if key not in ignore_keys}
         # Append this to the existing files
         with h5.File(self.outfile, 'a') as hf:
+            num_rows = 0
+            if "temperature" in hf:
+                num_rows = len(hf["temperature"])
+
             for key, value in data_flattened.items():
                 if key in hf:
                     dset = hf[key]
-                    current_size = len(np.array(dset))
+                    current_size = dset.shape[0]
                     dset.resize((current_size + len(value),))
                     dset[-len(value):] = value
                 else:
+                    if num_rows > 0:
+                        # Pad with NaN such that all datasets stay aligned
+                        padding = np.zeros(num_rows) + np.nan
+                        value = np.concatenate((padding, value))
                     dset = hf.create_dataset(key, data=value, maxshape=(None,))
+
+            # Keep datasets that are not in this result aligned
+            for key in hf.keys():
+                if key in data_flattened.keys():
+                    continue
+                dset = hf[key]
+                fill = np.nan if dset.dtype.kind == 'f' else 0
+                dset.resize((num_rows + len(data),))
+                dset[num_rows:] = fill
+            hf.flush()
         print("Data written to {}".format(self.outfile))
+
+
+def _run_point(mc_obj, params, nsteps, equil_params, data_getter):
+    """Run one point of the sweep.
+
+    :param SGCMonteCarlo mc_obj: Monte Carlo object
+    :param dict params: Temperature and chemical potential
+    :param int nsteps: Number of MC steps
+    :param dict equil_params: Parameters passed to the equillibration
+    :param data_getter: Callable returning additional data or None
+    """
+    mc_obj.reset()
+    mc_obj.T = params["temperature"]
+    mc_obj.chemical_potential = params["chemical_potential"]
+    if equil_params is None:
+        equil_params = {}
+    mc_obj.runMC(steps=nsteps, equil=True, equil_params=equil_params)
+
+    data = mc_obj.get_thermodynamic()
+    if data_getter is not None:
+        additional_data = data_getter(mc_obj)
+        for key, value in additional_data.items():
+            data[key] = value
+    return data
+
+
+def _run_point_in_worker(args):
+    """Run one point of the sweep in a worker process."""
+    from cemc.mcmc.parallel_util import worker_object
+    i, params = args
+    shared = worker_object()
+    data = _run_point(shared["mc_obj"], params, shared["nsteps"],
+                      shared["equil_params"], shared["data_getter"])
+    return i, data
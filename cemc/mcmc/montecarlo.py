@@ -10,8 +10,7 @@ from scipy import stats
 from ase.units import kJ, mol
 from cemc.mcmc.exponential_filter import ExponentialFilter
 from cemc.mcmc.averager import Averager
-from cemc.mcmc.util import waste_recycled_average, waste_recycled_accept_prob
-from cemc.mcmc.util import get_new_state
+from cemc_cpp_code import PyWasteRecycler
 from cemc.mcmc import BiasPotential
 from cemc.mcmc.swap_move_index_tracker import SwapMoveIndexTracker
 
@@ -97,6 +96,7 @@ class Montecarlo(object):
 
         # Keep the energy of old and trial state
         self.last_energies = np.zeros(2)
+        self.waste_recycler = PyWasteRecycler()
         self.trial_move = []  # Last trial move performed
         self.mean_energy = Averager(ref_value=E0)
         self.energy_squared = Averager(ref_value=E0)
@@ -525,6 +525,12 @@ class Montecarlo(object):
             plt.show(block=self.pyplot_block)
         return self.correlation_info
 
+    def _has_correlation_time(self):
+        """Return True if a correlation time has been estimated."""
+        if self.correlation_info is None:
+            return False
+        return self.correlation_info["correlation_time_found"]
+
     def _composition_reached_equillibrium(self, prev_composition, var_prev,
                                           confidence_level=0.05):
         """
@@ -730,7 +736,8 @@ class Montecarlo(object):
         self.log("Exponential extrapolation: {}".format(exp_extrapolate))
 
     def runMC(self, mode="fixed", steps=10, verbose=False, equil=True,
-              equil_params={}, prec=0.01, prec_confidence=0.05):
+              equil_params={}, prec=0.01, prec_confidence=0.05,
+              reuse_correlation_time=False):
         """Run Monte Carlo simulation
 
         :param int steps: Number of steps in the MC simulation
@@ -745,6 +752,10 @@ class Montecarlo(object):
         :param flaot prec_confidence: Confidence level used when determining
                           if enough
                           MC samples have been collected
+        :param bool reuse_correlation_time: If True and a correlation time
+            has been found in a previous run, it is not estimated again.
+            Useful when the run is started from an equillibriated
+            configuration at nearby conditions.
         """
         # Check the number of different elements are correct to avoid
         # infinite loops
@@ -770,12 +781,15 @@ class Montecarlo(object):
         prev = 0
         self.current_step = 0
 
+        reuse_corr_time = reuse_correlation_time and \
+            self._has_correlation_time()
         if (equil):
             reached_equil = True
-            res = self._estimate_correlation_time(restart=True)
-            if (not res["correlation_time_found"]):
-                res["correlation_time"] = 1000
-                res["correlation_time_found"] = True
+            if not reuse_corr_time:
+                res = self._estimate_correlation_time(restart=True)
+                if (not res["correlation_time_found"]):
+                    res["correlation_time"] = 1000
+                    res["correlation_time_found"] = True
 
             self._equillibriate(**equil_params)
 
@@ -783,9 +797,10 @@ class Montecarlo(object):
         next_convergence_check = len(self.atoms)
         if (mode == "prec"):
             # Estimate correlation length
-            res = self._estimate_correlation_time(restart=True)
-            while (not res["correlation_time_found"]):
-                res = self._estimate_correlation_time()
+            if not reuse_corr_time:
+                res = self._estimate_correlation_time(restart=True)
+                while (not res["correlation_time_found"]):
+                    res = self._estimate_correlation_time()
             self.reset()
             check_convergence_every = 10 * \
                 self.correlation_info["correlation_time"]
@@ -803,10 +818,8 @@ class Montecarlo(object):
             en, accept = self._mc_step(verbose=verbose)
 
             if self.recycle_waste:
-                E = waste_recycled_average(
-                    self.last_energies, self.last_energies, self.T)
-                E_sq = waste_recycled_average(
-                    self.last_energies**2, self.last_energies, self.T)
+                E = self.waste_recycler.energy()
+                E_sq = self.waste_recycler.energy_sq()
             else:
                 E = self.current_energy_without_vib()
                 E_sq = self.current_energy_without_vib()**2
@@ -907,6 +920,22 @@ class Montecarlo(object):
                           (rand_pos_b, symb_b, symb_a)]
         return system_changes
 
+    def _rejected_before_calculation(self, system_changes):
+        """
+        Return True if the trial move should be rejected without
+        calculating its energy. Unlike constraints, which make the sampler
+        draw a new trial move, the rejected move counts as a step where the
+        system stays in its current state. Subclasses that restrict the
+        sampling to a region of configuration space (e.g. a window in
+        cluster size) override this method.
+
+        :param list system_changes: Proposed changes
+
+        :return: True if the move is rejected
+        :rtype: bool
+        """
+        return False
+
     def _accept(self, system_changes):
         """
         Returns True if the trial step is accepted
@@ -932,6 +961,10 @@ class Montecarlo(object):
         if (self.is_first):
             self.log("Move accepted because accept_first_move_after_reset was activated")
             self.is_first = False
+            if self.recycle_waste:
+                # The trial state is selected with probability one
+                self.waste_recycler.record(
+                    self.current_energy, self.new_energy, 1.0)
             return True
 
         if self.recycle_waste:
@@ -942,10 +975,14 @@ class Montecarlo(object):
             "Speed-up of Monte Carlo simulations by sampling of
             rejected states."
             Proceedings of the National Academy of Sciences 101.51 (2004)
+
+            The native kernel stores the selection probability such that
+            the recycled averages can be extracted without recomputing
+            the Boltzmann weights
             """
-            p = waste_recycled_accept_prob(self.last_energies, self.T)
-            indx = get_new_state(p)
-            return indx == 1
+            return self.waste_recycler.accept(
+                self.current_energy, self.new_energy, self.T,
+                np.random.rand())
         else:
             # Standard Metropolis acceptance criteria
             if (self.new_energy < self.current_energy):
@@ -988,33 +1025,36 @@ class Montecarlo(object):
             msg += "violate any of the constraints"
             raise CanNotFindLegalMoveError(msg)
 
-        move_accepted = self._accept(system_changes)
+        if self._rejected_before_calculation(system_changes):
+            # The energy was never calculated, so there is nothing to undo
+            move_accepted = False
+            self.last_energies[1] = self.current_energy
+            if self.recycle_waste:
+                # The current state is retained with probability one
+                self.waste_recycler.record(
+                    self.current_energy, self.current_energy, 0.0)
+        else:
+            move_accepted = self._accept(system_changes)
 
-        # At this point the new energy is calculated in the _accept function
-        self.last_energies[1] = self.new_energy
+            # At this point the new energy is calculated in the _accept function
+            self.last_energies[1] = self.new_energy
 
-        if (move_accepted):
-            self.current_energy = self.new_energy
-            self.bias_energy = self.new_bias_energy
-            self.num_accepted += 1
-        else:
-            # Reset the sytem back to original
-            for change in system_changes:
-                indx = change[0]
-                old_symb = change[1]
-                assert (self.atoms[indx].symbol == change[2])
-                self.atoms[indx].symbol = old_symb
-
-        # TODO: Wrap this functionality into a cleaning object
-        if (hasattr(self.atoms.get_calculator(), "clear_history")
-                and hasattr(self.atoms.get_calculator(), "undo_changes")):
-            # The calculator is a CE calculator which support clear_history and
-            # undo_changes
-            pass
-        if (move_accepted):
-            self.atoms.get_calculator().clear_history()
-        else:
-            self.atoms.get_calculator().undo_changes()
+            if (move_accepted):
+                self.current_energy = self.new_energy
+                self.bias_energy = self.new_bias_energy
+                self.num_accepted += 1
+            else:
+                # Reset the sytem back to original
+                for change in system_changes:
+                    indx = change[0]
+                    old_symb = change[1]
+                    assert (self.atoms[indx].symbol == change[2])
+                    self.atoms[indx].symbol = old_symb
+
+            if (move_accepted):
+                self.atoms.get_calculator().clear_history()
+            else:
+                self.atoms.get_calculator().undo_changes()
 
         if (move_accepted):
             # Update the atom_indices
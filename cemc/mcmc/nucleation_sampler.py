@@ -78,15 +78,22 @@ class NucleationSampler(object):
             upper = (num + 1) * self.size_window_width
         return int(lower), int(upper)
 
-    def is_in_window(self, network, retstat=False):
+    def is_in_window(self, network, retstat=False, system_changes=None):
         """
         Check if the current network state belongs to the current window
 
         :param network: Instance of :py:class:`cemc.mcmc.NetworkObserver`
         :param retstat: If true it will also return the network statistics
+        :param list system_changes: If given, the clusters are updated
+            incrementally from these changes
+            (see :py:meth:`cemc.mcmc.NetworkObserver.update`). Otherwise,
+            the clusters are identified from scratch
         """
         network.reset()
-        network(None)  # Explicitly call the network observer
+        if system_changes is None:
+            network(None)  # Explicitly call the network observer
+        else:
+            network.update(system_changes)
         stat = network.get_statistics()
         lower, upper = self._get_window_boundaries(self.current_window)
         max_size_ok = stat["max_size"] >= lower and stat["max_size"] < upper
@@ -106,6 +113,22 @@ class NucleationSampler(object):
             return max_size_ok and n_clusters_ok, stat
         return max_size_ok and n_clusters_ok
 
+    def move_in_window(self, network, system_changes):
+        """
+        Check if the state after a proposed move belongs to the current
+        window. The check is done by the cluster tracker before the move
+        is applied, so no energy evaluation is needed for moves that leave
+        the window
+
+        :param network: Instance of :py:class:`cemc.mcmc.NetworkObserver`
+        :param list system_changes: Proposed changes
+        """
+        if self.mode == Mode.transition_path_sampling:
+            return True
+        lower, upper = self._get_window_boundaries(self.current_window)
+        return network.move_in_size_window(system_changes, lower, upper,
+                                           only_one_cluster=self.max_one_cluster)
+
     def bring_system_into_window(self, network):
         """
         Brings the system into the current window
@@ -151,6 +174,9 @@ class NucleationSampler(object):
 
         :param mc_obj: Instance of the sampler
                        (typically `cemc.mcmc.SGCNucleation`)
+
+        :return: Bin of the current state in the current window
+        :rtype: int
         """
         stat = mc_obj.network.get_statistics()
         indx = self._get_indx(stat["max_size"])
@@ -165,6 +191,50 @@ class NucleationSampler(object):
             new_singlets = np.zeros_like(mc_obj.averager.singlets)
             new_singlets = mc_obj.atoms._calc.get_singlets()
             self.singlets[self.current_window][indx, :] += new_singlets
+        return indx
+
+    def window_coverage(self):
+        """
+        Return the first and last (exclusive) cluster size covered by the
+        histogram of each window
+        """
+        coverage = []
+        for i in range(self.n_windows):
+            lower, _ = self._get_window_boundaries(i)
+            coverage.append((lower, lower + len(self.histograms[i])))
+        return coverage
+
+    def merge_window_files(self, fname="nucleation_track.h5", n_bootstrap=50):
+        """
+        Merge the window files written when the windows are run in
+        parallel (see :py:meth:`cemc.mcmc.SGCNucleation.run`) with WHAM.
+        The free energy (beta_gibbs), its uncertainty (beta_gibbs_std) and
+        the total histogram (overall_hist) are stored in fname
+
+        :param str fname: HDF5 file. The window files are named
+            <prefix>_window<i>.h5 where prefix is fname without extension
+        :param int n_bootstrap: Number of bootstrap samples used to
+            estimate the uncertainty
+
+        :return: Merged values. Keys: beta_gibbs, beta_gibbs_std,
+            overall_hist, num_samples
+        :rtype: dict
+        """
+        from cemc.mcmc.umbrella_windows import merge_window_files
+        from cemc.mcmc.umbrella_windows import write_datasets
+        prefix = os.path.splitext(fname)[0]
+        coverage = self.window_coverage()
+        num_bins = coverage[-1][1]
+        res = merge_window_files(prefix, coverage, num_bins,
+                                 n_bootstrap=n_bootstrap)
+        merged = {"beta_gibbs": res["free_energy"],
+                  "beta_gibbs_std": res["free_energy_std"],
+                  "overall_hist": res["histogram"],
+                  "num_samples": res["num_samples"]}
+        write_datasets(fname, merged)
+        self.log("Merged {} samples from the window files"
+                 "".format(np.sum(res["num_samples"])))
+        return merged
 
     def helmholtz_free_energy(self, singlets, hist):
         """
@@ -19,6 +19,10 @@ class ParallelTempering(object):
         self.Tmin = Tmin
         self._init_temperature_scheme()
 
+        # Histograms used for multiple histogram reweighting
+        self.histogram_observers = []
+        self.histograms = []
+
     def _log(self, msg):
         print(msg)
 
@@ -174,6 +178,45 @@ class ParallelTempering(object):
                     "".format(num_accept,
                             float(100*num_accept)/len(moves)))
 
+    def attach_reweighting_histograms(self, bin_width=1E-3,
+                                      track_singlets=False):
+        """Collect energy histograms in all replicas.
+
+        The histograms are accumulated over all exchange cycles and can
+        be combined with :py:meth:`reweight`.
+
+        :param float bin_width: Width of the energy bins in eV
+        :param bool track_singlets: If True, singlets are also reweighted
+        """
+        from cemc.mcmc.mc_observers import ReweightingHistogramObserver
+        from cemc.tools.histogram_reweighting import ReweightingHistogram
+        self.histogram_observers = []
+        self.histograms = []
+        for mc in self.mc_objs:
+            obs = ReweightingHistogramObserver(mc, bin_width=bin_width,
+                                               track_singlets=track_singlets)
+            mc.attach(obs)
+            self.histogram_observers.append(obs)
+            self.histograms.append(
+                ReweightingHistogram(mc.T, bin_width=bin_width,
+                                     n_singlets=obs.histogram.n_singlets))
+
+    def reweight(self, temperatures):
+        """Compute thermodynamic averages at arbitrary temperatures.
+
+        :param temperatures: Temperatures in Kelvin
+        :type temperatures: list or numpy array
+
+        :return: Thermodynamic quantities, see
+            :py:meth:`cemc.tools.histogram_reweighting.WHAM.get_thermodynamic`
+        :rtype: dict
+        """
+        from cemc.tools.histogram_reweighting import WHAM
+        if not self.histograms:
+            raise RuntimeError("No histograms collected. Call "
+                               "attach_reweighting_histograms before run.")
+        return WHAM(self.histograms).get_thermodynamic(temperatures)
+
     def run(self, mc_args={}, num_exchange_cycles=10):
         """Run Parallel Tempering
 
@@ -188,4 +231,7 @@ class ParallelTempering(object):
             for indx in range(len(self.mc_objs)):
                 self.active_replica = indx
                 self.mc_objs[indx].runMC(**mc_args)
+                if self.histogram_observers:
+                    self.histograms[indx] += \
+                        self.histogram_observers[indx].histogram
             self._perform_exchange_move(direction=choice(exchange_move_dir))
@@ -0,0 +1,75 @@
+"""
+Helpers for running work in a pool of worker processes.
+
+The object needed by the workers (typically a Monte Carlo object
+including the CE calculator) is serialised with dill in the main process.
+Each worker reconstructs its own copy once, in the Pool initializer, and
+keeps it for the lifetime of the process. The tasks retrieve it with
+:py:func:`worker_object`.
+"""
+from cemc.mcmc.montecarlo import PICKLE_PROTOCOL
+
+
+def serialize(obj, mc_obj=None):
+    """
+    Serialise an object such that a worker can reconstruct it
+
+    :param obj: Object to serialise
+    :param Montecarlo mc_obj: Monte Carlo object contained in obj (or obj
+        itself). Its loggers can not be serialised, they are removed
+        before and restored after the serialisation
+
+    :return: Serialised state
+    :rtype: bytes
+    """
+    import dill
+    if mc_obj is not None:
+        mc_obj.logger = None
+        mc_obj.flush_log = None
+    try:
+        state = dill.dumps((obj, mc_obj), protocol=PICKLE_PROTOCOL)
+    finally:
+        if mc_obj is not None:
+            mc_obj._init_loggers()
+    return state
+
+
+def start_pool(num_processes, obj, mc_obj=None, setup=None, setup_args=()):
+    """
+    Start a pool where each worker holds its own copy of obj
+
+    :param int num_processes: Number of worker processes
+    :param obj: Object passed to the workers
+    :param Montecarlo mc_obj: Monte Carlo object contained in obj (or obj
+        itself). See :py:func:`serialize`
+    :param setup: Module level callable setup(obj, *setup_args) run in each
+        worker. The returned value is stored instead of obj
+    :param tuple setup_args: Additional arguments passed to setup
+
+    :return: Pool of workers
+    :rtype: multiprocessing.Pool
+    """
+    from multiprocessing import Pool
+    state = serialize(obj, mc_obj=mc_obj)
+    return Pool(processes=num_processes, initializer=_init_worker,
+                initargs=(state, setup, setup_args))
+
+
+def worker_object():
+    """Return the object held by the current worker process."""
+    return _worker_state["obj"]
+
+
+# Each worker process holds its own copy of the object
+_worker_state = {}
+
+
+def _init_worker(state, setup, setup_args):
+    """Reconstruct the object in a worker process."""
+    import dill
+    obj, mc_obj = dill.loads(state)
+    if mc_obj is not None:
+        mc_obj._init_loggers()
+    if setup is not None:
+        obj = setup(obj, *setup_args)
+    _worker_state["obj"] = obj
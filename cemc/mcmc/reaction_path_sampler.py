@@ -78,6 +78,10 @@ class ReactionPathSampler(object):
         }
         self.supress_bin_change_warning = False
 
+        # Prefix of the window files. Only used when the windows are run
+        # in parallel
+        self.window_prefix = None
+
     def _get_window_limits(self, window):
         """
         Returns the upper and lower bound for window
@@ -160,6 +164,9 @@ class ReactionPathSampler(object):
     def _update_records(self):
         """
         Update the data arrays
+
+        :return: Bin of the current state in the current window
+        :rtype: int
         """
         reac_crd = self.initializer.get(self.mc.atoms)
         indx = self._get_window_indx(self.current_window, reac_crd)
@@ -169,6 +176,7 @@ class ReactionPathSampler(object):
         if indx >= len(self.data[self.current_window]):
             indx -= 1
         self.data[self.current_window][indx] += 1
+        return indx
 
     def _get_merged_records(self, data):
         """
@@ -282,72 +290,159 @@ class ReactionPathSampler(object):
                 not_converged.append(i)
         return not_converged
 
-    def run(self, nsteps=10000):
+    def run(self, nsteps=10000, num_processes=1, merge_every=600.0):
         """
         Run MC simulation in all windows
 
         :param int nsteps: Number of Monte Carlo step per window
+        :param int num_processes: Number of processes. If larger than one,
+            the windows are run in parallel, each window streams its
+            histogram to a separate file and the free energy is obtained
+            by merging the windows with WHAM
+            (see :py:mod:`cemc.mcmc.umbrella_windows`)
+        :param float merge_every: Number of seconds between each WHAM merge
+            when the windows are run in parallel
         """
-        from cemc.mcmc import CanNotFindLegalMoveError
-        output_every = 30
+        if num_processes > 1:
+            self._run_parallel(nsteps, num_processes, merge_every)
+            return
+
         # For all windows
         for i in range(self.n_windows):
-            self.current_window = i
-            # We are inside a new window, update to start with concentration in
-            # the middle of this window
-            min, max = self._get_window_limits(self.current_window)
-            self.constraint.update_range([min, max])
-            self.log("Bringing system into window...")
-            self._bring_system_into_window()
-
-            # Now we are in the middle of the current window, start MC
-            current_step = 0
-            now = time.time()
-            self.log("Initial chemical formula window {}: {}".format(
-                self.current_window, self.mc.atoms.get_chemical_formula()))
-
-            num_failed_attempts = 0
-            while (current_step < nsteps):
-                current_step += 1
-                if (time.time() - now > output_every):
-                    self.log(
-                        "Running MC step {} of {} in window {}".format(
-                            current_step, nsteps, self.current_window))
-                    now = time.time()
-
-                # Run MC step
-                try:
-                    self.mc._mc_step()
-                    self._update_records()
-                except CanNotFindLegalMoveError:
-                    # We don't care about this error we just count the
-                    # number of occurences and print a warning
-                    num_failed_attempts += 1
-
-            print("MC calculation finished")
+            self._run_window(i, nsteps)
+            self.save_current_window()
+        self.log("Windows not converged: {}".format(self.window_not_converged))
+        self.log("Convered all bins: {}".format(self.converged_all_bins))
+        self.save()
 
-            nproc = 1
+    def _run_window(self, window, nsteps):
+        """
+        Run MC simulation in one window. If window_prefix is set, the
+        histogram is streamed to the window file
 
-            if num_failed_attempts > 0:
-                frac_failed = float(num_failed_attempts)/(nsteps * nproc)
-                self.log("Number of failed trial moves: {} ({:.1f}%)"
-                         "".format(num_failed_attempts, 100 * frac_failed))
+        :param int window: Index of the window
+        :param int nsteps: Number of Monte Carlo steps
+        """
+        from cemc.mcmc import CanNotFindLegalMoveError
+        from cemc.mcmc.umbrella_windows import WindowRecorder
+        from cemc.mcmc.umbrella_windows import window_file_name
+        output_every = 30
+        self.current_window = window
+
+        recorder = None
+        if self.window_prefix is not None:
+            fname = window_file_name(self.window_prefix, window)
+            recorder = WindowRecorder(fname, self.n_bins+1,
+                                      window*self.n_bins)
+
+        # We are inside a new window, update to start with concentration in
+        # the middle of this window
+        min, max = self._get_window_limits(self.current_window)
+        self.constraint.update_range([min, max])
+        self.log("Bringing system into window...")
+        self._bring_system_into_window()
+
+        # Now we are in the middle of the current window, start MC
+        current_step = 0
+        now = time.time()
+        self.log("Initial chemical formula window {}: {}".format(
+            self.current_window, self.mc.atoms.get_chemical_formula()))
+
+        num_failed_attempts = 0
+        while (current_step < nsteps):
+            current_step += 1
+            if (time.time() - now > output_every):
+                self.log(
+                    "Running MC step {} of {} in window {}".format(
+                        current_step, nsteps, self.current_window))
+                now = time.time()
+
+            # Run MC step
+            try:
+                self.mc._mc_step()
+                indx = self._update_records()
+                if recorder is not None:
+                    recorder.add(indx)
+            except CanNotFindLegalMoveError:
+                # We don't care about this error we just count the
+                # number of occurences and print a warning
+                num_failed_attempts += 1
+
+        print("MC calculation finished")
+        if recorder is not None:
+            recorder.flush()
+
+        nproc = 1
+
+        if num_failed_attempts > 0:
+            frac_failed = float(num_failed_attempts)/(nsteps * nproc)
+            self.log("Number of failed trial moves: {} ({:.1f}%)"
+                     "".format(num_failed_attempts, 100 * frac_failed))
+
+        self.log_window_statistics(self.current_window)
+
+        self.log(
+            "Acceptance rate in window {}: {}".format(
+                self.current_window, float(
+                    self.mc.num_accepted) / self.mc.current_step))
+
+        self.log("Final chemical formula: {}".format(
+            self.mc.atoms.get_chemical_formula()))
+        self.mc.reset()
+
+    def _run_parallel(self, nsteps, num_processes, merge_every):
+        """
+        Run the windows in parallel processes and merge them with WHAM
 
-            self.log_window_statistics(self.current_window)
+        :param int nsteps: Number of Monte Carlo step per window
+        :param int num_processes: Number of processes
+        :param float merge_every: Number of seconds between each merge
+        """
+        from cemc.mcmc.umbrella_windows import run_windows_in_parallel
+        self.window_prefix = os.path.splitext(self.fname)[0]
+        try:
+            run_windows_in_parallel(self, list(range(self.n_windows)),
+                                    nsteps, num_processes,
+                                    self.merge_window_files,
+                                    merge_every=merge_every)
+        finally:
+            self.window_prefix = None
+        self.log("Windows not converged: {}".format(self.window_not_converged))
+        self.log("Convered all bins: {}".format(self.converged_all_bins))
 
-            self.log(
-                "Acceptance rate in window {}: {}".format(
-                    self.current_window, float(
-                        self.mc.num_accepted) / self.mc.current_step))
+    def merge_window_files(self, n_bootstrap=50):
+        """
+        Merge the window files written by parallel runs with WHAM and store
+        the free energy (in units of kT) and its uncertainty in the data
+        file
 
-            self.log("Final chemical formula: {}".format(
-                self.mc.atoms.get_chemical_formula()))
-            self.mc.reset()
+        :param int n_bootstrap: Number of bootstrap samples used to
+            estimate the uncertainty
 
-            self.save_current_window()
-        self.log("Windows not converged: {}".format(self.window_not_converged))
-        self.log("Convered all bins: {}".format(self.converged_all_bins))
-        self.save()
+        :return: Merged values. Keys: histogram, free_energy,
+            free_energy_std, num_samples, x
+        :rtype: dict
+        """
+        from cemc.mcmc.umbrella_windows import merge_window_files
+        from cemc.mcmc.umbrella_windows import write_datasets
+        prefix = os.path.splitext(self.fname)[0]
+        coverage = [(i*self.n_bins, (i+1)*self.n_bins+1)
+                    for i in range(self.n_windows)]
+        num_bins = self.n_windows*self.n_bins + 1
+        res = merge_window_files(prefix, coverage, num_bins,
+                                 n_bootstrap=n_bootstrap)
+        res.pop("window_free_energy")
+        window_hist = res.pop("window_histograms")
+        res["x"] = np.linspace(self.react_crd[0], self.react_crd[1], num_bins)
+
+        # Keep the in-memory histograms in sync (they start at one)
+        for i, (start, stop) in enumerate(coverage):
+            self.data[i] = 1.0 + window_hist[i, start:stop]
+
+        write_datasets(self.fname, res)
+        self.log("Merged {} samples from the window files"
+                 "".format(np.sum(res["num_samples"])))
+        return res
 
     @staticmethod
     def dset_name(window):
@@ -334,7 +334,8 @@ class SGCMonteCarlo(mc.Montecarlo):
         self.log("{}".format(self.composition_correlation_time))
 
     def runMC(self, mode="fixed", steps=10, verbose=False, chem_potential=None,
-              equil=True, equil_params={}, prec_confidence=0.05, prec=0.01):
+              equil=True, equil_params={}, prec_confidence=0.05, prec=0.01,
+              reuse_correlation_time=False):
         """
         Run Monte Carlo simulation.
         See :py:meth:`cemc.mcmc.Montecarlo.runMC`
@@ -343,6 +344,8 @@ class SGCMonteCarlo(mc.Montecarlo):
             The keys should correspond to one of the singlet terms.
             A typical form of this is
             {"c1_0":-1.0,c1_1_1.0}
+        :param bool reuse_correlation_time: If True, the correlation time
+            from a previous run is reused (if available)
         """
 
         if chem_potential is None and self.chemical_potential is None:
@@ -362,16 +365,18 @@ class SGCMonteCarlo(mc.Montecarlo):
         self._include_vib()
 
         if equil:
-            res = self._estimate_correlation_time(restart=True)
-            if not res["correlation_time_found"]:
-                res["correlation_time_found"] = True
-                res["correlation_time"] = 1000
+            if not (reuse_correlation_time and self._has_correlation_time()):
+                res = self._estimate_correlation_time(restart=True)
+                if not res["correlation_time_found"]:
+                    res["correlation_time_found"] = True
+                    res["correlation_time"] = 1000
             self._equillibriate(**equil_params)
 
         self.reset()
         mc.Montecarlo.runMC(self, steps=steps, verbose=verbose, equil=False,
                             mode=mode, prec_confidence=prec_confidence,
-                            prec=prec)
+                            prec=prec,
+                            reuse_correlation_time=reuse_correlation_time)
 
     def singlet2composition(self, avg_singlets):
         """Convert singlets to composition."""
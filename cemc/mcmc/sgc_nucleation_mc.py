@@ -1,6 +1,7 @@
 from cemc.mcmc.nucleation_sampler import Mode
 from cemc.mcmc import SGCMonteCarlo
 from cemc.mcmc.mc_observers import NetworkObserver
+from cemc.mcmc import transition_path_io as tpio
 from ase.calculators.singlepoint import SinglePointCalculator
 from ase.io.trajectory import TrajectoryWriter
 import time
@@ -50,14 +51,27 @@ class SGCNucleation(SGCMonteCarlo):
         self.network = NetworkObserver(
             calc=self.atoms._calc, cluster_name=self.network_name,
             element=self.network_element)
-        self.network.fixed_num_solutes = False
         self.attach(self.network)
 
+        # Prefix of the window files. Only used when the windows are run
+        # in parallel
+        self.window_prefix = None
+
         if self.allow_solutes:
             self.log("Solute atoms in cluster and outside is allowed")
         else:
             self.log("Solute atoms are only allowed in the cluster")
 
+    def _rejected_before_calculation(self, system_changes):
+        """
+        Reject moves that leave the current window before the energy is
+        calculated
+
+        :param list system_changes: Proposed changes
+        """
+        return not self.nuc_sampler.move_in_window(self.network,
+                                                   system_changes)
+
     def _accept(self, system_changes):
         """
         Accept the trial move
@@ -69,7 +83,7 @@ class SGCNucleation(SGCMonteCarlo):
         """
         move_accepted = SGCMonteCarlo._accept(self, system_changes)
         in_window, stat = self.nuc_sampler.is_in_window(
-            self.network, retstat=True)
+            self.network, retstat=True, system_changes=system_changes)
         if not self.allow_solutes:
             new_size = stat["max_size"]
             cur_size = self.nuc_sampler.current_cluster_size
@@ -83,36 +97,96 @@ class SGCNucleation(SGCMonteCarlo):
         """
         Perform a trial move
         """
-        if not self.nuc_sampler.is_in_window(self.network):
+        # The empty list re-checks the sites of the previous trial move
+        if not self.nuc_sampler.is_in_window(self.network, system_changes=[]):
             raise RuntimeError("System is outside the window before the trial "
                                "move is performed!")
         return SGCMonteCarlo._get_trial_move(self)
 
-    def run(self, nsteps=1000):
+    def run(self, nsteps=1000, num_processes=1,
+            data_file="nucleation_track.h5", merge_every=600.0):
         """
         Run samples in each window until a desired precission is found
 
         :param int nsteps: Number of MC steps in each window
-        """
+        :param int num_processes: Number of processes. If larger than one,
+            the windows are run in parallel. Each window streams its
+            histogram to a separate file, and the windows are merged with
+            WHAM (see :py:meth:`cemc.mcmc.NucleationSampler.merge_window_files`).
+            The singlets are not sampled in this case.
+        :param str data_file: HDF5 file where the merged free energy is
+            stored when the windows are run in parallel
+        :param float merge_every: Number of seconds between each WHAM merge
+            when the windows are run in parallel
+        """
+        if num_processes > 1:
+            self._run_parallel(nsteps, num_processes, data_file, merge_every)
+            return
 
         for i in range(self.nuc_sampler.n_windows):
-            self.log("Window {} of {}".format(i, self.nuc_sampler.n_windows))
-            self.nuc_sampler.current_window = i
-            self.reset()
-            self.nuc_sampler.bring_system_into_window(self.network)
-            self.current_energy = self.atoms.get_calculator().get_energy()
+            self._run_window(i, nsteps)
 
-            self.nuc_sampler.mode = Mode.equillibriate
-            self._estimate_correlation_time()
-            self._equillibriate()
-            self.nuc_sampler.mode = Mode.sample_in_window
+    def _run_window(self, window, nsteps):
+        """
+        Run samples in one window. If window_prefix is set, the histogram
+        is streamed to the window file
+
+        :param int window: Index of the window
+        :param int nsteps: Number of MC steps
+        """
+        from cemc.mcmc.umbrella_windows import WindowRecorder
+        from cemc.mcmc.umbrella_windows import window_file_name
+        self.log("Window {} of {}".format(window, self.nuc_sampler.n_windows))
+        self.nuc_sampler.current_window = window
+
+        recorder = None
+        if self.window_prefix is not None:
+            fname = window_file_name(self.window_prefix, window)
+            start, stop = self.nuc_sampler.window_coverage()[window]
+            recorder = WindowRecorder(fname, stop - start, start)
+
+        self.reset()
+        self.nuc_sampler.bring_system_into_window(self.network)
+        self.current_energy = self.atoms.get_calculator().get_energy()
+
+        self.nuc_sampler.mode = Mode.equillibriate
+        self._estimate_correlation_time()
+        self._equillibriate()
+        self.nuc_sampler.mode = Mode.sample_in_window
+
+        current_step = 0
+        while current_step < nsteps:
+            current_step += 1
+            self._mc_step()
+            indx = self.nuc_sampler.update_histogram(self)
+            if recorder is not None:
+                recorder.add(indx)
+            self.network.reset()
+
+        if recorder is not None:
+            recorder.flush()
+
+    def _run_parallel(self, nsteps, num_processes, data_file, merge_every):
+        """
+        Run the windows in parallel processes and merge them with WHAM
+
+        :param int nsteps: Number of MC steps in each window
+        :param int num_processes: Number of processes
+        :param str data_file: HDF5 file with the merged free energy
+        :param float merge_every: Number of seconds between each merge
+        """
+        from cemc.mcmc.umbrella_windows import run_windows_in_parallel
+
+        def merge():
+            self.nuc_sampler.merge_window_files(fname=data_file)
 
-            current_step = 0
-            while current_step < nsteps:
-                current_step += 1
-                self._mc_step()
-                self.nuc_sampler.update_histogram(self)
-                self.network.reset()
+        self.window_prefix = os.path.splitext(data_file)[0]
+        try:
+            run_windows_in_parallel(
+                self, list(range(self.nuc_sampler.n_windows)), nsteps,
+                num_processes, merge, merge_every=merge_every, mc_obj=self)
+        finally:
+            self.window_prefix = None
 
     def remove_snapshot_observers(self):
         """
@@ -207,11 +281,7 @@ class SGCNucleation(SGCMonteCarlo):
         :return: Numpy array with indices
         :rtype: 1D Numpy array of numpy.uint8
         """
-        import numpy as np
-        nparray = np.zeros(len(symbols), dtype=np.uint8)
-        for i, symb in enumerate(symbols):
-            nparray[i] = description.index(symb)
-        return nparray
+        return tpio.symbols2uint(symbols, description)
 
     def _uint2symbols(self, nparray, description):
         """
@@ -223,10 +293,27 @@ class SGCNucleation(SGCMonteCarlo):
         :return: nparray converted into list with symbols
         :rtype: list of str
         """
-        symbs = []
-        for i in range(len(nparray)):
-            symbs.append(description[nparray[i]])
-        return symbs
+        return tpio.uint2symbols(nparray, description)
+
+    def path_species(self):
+        """
+        Species used to encode the timeslices of transition paths
+
+        :return: Sorted list with all symbols that can occur
+        :rtype: list of str
+        """
+        unique = set(atom.symbol for atom in self.atoms)
+        unique.update(self.symbols)
+        return sorted(unique)
+
+    def current_state(self, species):
+        """
+        Return the current state encoded as indices into species
+
+        :param list species: All symbols that can occur
+        :rtype: 1D Numpy array of numpy.uint8
+        """
+        return self._symbols2uint(self.atoms.get_chemical_symbols(), species)
 
     def _merge_reference_path(self, res_reactant, res_product):
         """
@@ -246,19 +333,26 @@ class SGCNucleation(SGCMonteCarlo):
         combined_path["symbols"] = res_reactant["symbols"] + \
             res_product["symbols"]
         combined_path["sizes"] = res_reactant["sizes"]+res_product["sizes"]
+        combined_path["species"] = res_product["species"]
         return combined_path
 
     def save_path(self, fname, res):
         """
-        Stores the path result to a JSON file
+        Stores the path result. If the extension of fname is .h5 the
+        path is delta encoded (see
+        :py:mod:`cemc.mcmc.transition_path_io`), otherwise it is stored
+        as JSON
 
         :param str fname: Filename
         :param dict res: Dictionary with results from path sampling
         """
         res["min_size_product"] = self.min_size_product
         res["max_size_reactant"] = self.max_size_reactant
+        if tpio.is_hdf5(fname):
+            tpio.save_paths(fname, [res], append=False)
+            return
         with open(fname, 'w') as outfile:
-            json.dump(res, outfile)
+            json.dump(tpio.path_to_json(res), outfile)
 
     def sweep(self, nsteps=None):
         """
@@ -295,15 +389,28 @@ class SGCNucleation(SGCMonteCarlo):
         elif mode == "transition_path_sampling":
             self.nuc_sampler.mode = Mode.transition_path_sampling
 
-    def set_state(self, symbols):
+    def set_state(self, symbols, species=None):
         """
         Sets the state of the system
 
-        :param list symbols: List of symbols
+        :param list symbols: List of symbols. If species is given, an
+            array with indices into species
+        :param list species: Species corresponding to the indices
         """
+        if species is not None:
+            symbols = self._uint2symbols(symbols, species)
         self.set_symbols(symbols)
         # self.atoms._calc.set_symbols(symbols)
 
+    def set_symbols(self, symbs):
+        """
+        Set the symbols and identify the clusters from scratch
+
+        :param list symbs: New symbols
+        """
+        SGCMonteCarlo.set_symbols(self, symbs)
+        self.network.retrieve_clusters_from_scratch()
+
     def show_statistics(self, path):
         """
         Show a plot indicating if the path is long enough
@@ -392,7 +499,7 @@ class SGCNucleation(SGCMonteCarlo):
         default_trajfile = folder+"/default_trajfile.traj"
         reactant_file = folder+"/trajectory_reactant.traj"
         product_file = folder+"/trajectory_product.traj"
-        reference_path_file = folder+"/reference_path.json"
+        reference_path_file = folder+"/reference_path.h5"
 
         self.network.reset()
         print("Warning! Cluster initialization does not work at the moment!")
@@ -408,6 +515,7 @@ class SGCNucleation(SGCMonteCarlo):
         for attempt in range(max_attempts):
             self.reset()
             self.atoms._calc.set_symbols(init_symbols)
+            self.network.retrieve_clusters_from_scratch()
             res = {"type": "transition_region"}
             try:
                 res = self._find_one_transition_path(
@@ -497,11 +605,12 @@ class SGCNucleation(SGCMonteCarlo):
         for atom in self.atoms:
             if atom.symbol not in unique_symbols:
                 unique_symbols.append(atom.symbol)
+        species = self.path_species()
 
         output_every_sec = 30
         now = time.time()
         energies = []
-        result = {}
+        result = {"species": species}
         sizes = []
         for sweep in range(int(path_length)):
             self.network.reset()
@@ -513,7 +622,7 @@ class SGCNucleation(SGCMonteCarlo):
              # Explicitly enforce a construction of the network
             self.network(None)
             energies.append(self.current_energy)
-            symbs.append([atom.symbol for atom in self.atoms])
+            symbs.append(self.current_state(species))
             atoms = self.network.get_atoms_with_largest_cluster(
                 prohibited_symbols=unique_symbols)
             sizes.append(self.network.max_size)
@@ -2,11 +2,38 @@ from cemc.mcmc import BiasPotential
 from cemc.mcmc import CovarianceMatrixObserver
 from cemc.tools import StrainEnergy
 from cemc.tools import rotate_tensor, rotate_rank4_mandel
+from itertools import product
 import numpy as np
 
+
 class Strain(BiasPotential):
+    """
+    Bias potential given by the strain energy of an ellipsoid with the
+    same inertia tensor as the cluster.
+
+    The strain energy per volume only depends on the aspect ratios and the
+    orientation of the ellipsoid. It is therefore looked up in an
+    :py:class:`cemc.mcmc.strain_energy_bias.EnergyDensityCache`, and the
+    Eshelby tensor is only computed when a shape enters a cell of the
+    table where some of the corners have not been visited before.
+
+    :param FixedNucleusMC mc_sampler: MC sampler
+    :param list cluster_elements: Elements in the cluster
+    :param numpy.ndarray C_matrix: 6x6 elastic tensor of the matrix (Mandel)
+    :param numpy.ndarray C_prec: 6x6 elastic tensor of the precipitate
+    :param numpy.ndarray misfit: 3x3 misfit strain
+    :param float poisson: Poisson ratio
+    :param bool use_cache: If False, the strain energy is calculated
+        exactly in each step
+    :param float aspect_step: Spacing of the table in log(aspect ratio)
+    :param float angle_step: Spacing of the table in the rotation vector
+        (radians)
+    :param EshelbyTable eshelby_table: If given, the Eshelby tensors of
+        the exact calculations are interpolated from this table
+    """
     def __init__(self, mc_sampler=None, cluster_elements=[], C_matrix=None,
-                 C_prec=None, misfit=None, poisson=0.3):
+                 C_prec=None, misfit=None, poisson=0.3, use_cache=True,
+                 aspect_step=0.05, angle_step=0.05, eshelby_table=None):
         from cemc.mcmc import FixedNucleusMC
         if not isinstance(mc_sampler, FixedNucleusMC):
             raise TypeError("mc_sampler has to be of type FixedNuceus sampler!")
@@ -19,6 +46,11 @@ class Strain(BiasPotential):
         self.C_matrix = C_matrix
         self.C_prec = C_prec
         self.poisson = poisson
+        self.use_cache = use_cache
+        self.eshelby_table = eshelby_table
+        self.cache = EnergyDensityCache(self.exact_energy_density,
+                                        aspect_step=aspect_step,
+                                        angle_step=angle_step)
 
     def initialize(self):
         """Initialize the bias potential."""
@@ -31,6 +63,36 @@ class Strain(BiasPotential):
 
         inertia_tensor = np.trace(self.cov_obs.cov_matrix)*np.eye(3) - self.cov_obs.cov_matrix
         principal, rot_matrix = np.linalg.eigh(inertia_tensor)
+        axes = self.ellipsoid_axes(principal)
+
+        # Bias potential should not alter the observer
+        # The MC object will handle this
+        self.cov_obs.undo_last()
+
+        volume = ellipsoid_volume(axes)
+        if volume <= 0.0:
+            return 0.0
+
+        if self.use_cache:
+            return self.cache(axes, rot_matrix)*volume
+        return self.exact_energy_density(axes, rot_matrix)*volume
+
+    def exact_energy_density(self, axes, rot_matrix):
+        """
+        Calculate the strain energy per volume of an ellipsoid
+
+        :param numpy.ndarray axes: Principal axes of the ellipsoid
+        :param numpy.ndarray rot_matrix: Rotation matrix where the columns
+            are the directions of the principal axes
+
+        :return: Strain energy per volume
+        :rtype: float
+        """
+        # The Eshelby tensor requires a >= b >= c. Reorder the axes and the
+        # corresponding directions
+        order = np.argsort(axes)[::-1]
+        axes = np.array(axes)[order]
+        rot_matrix = rot_matrix[:, order]
 
         # The rotation to be applied to the material properties
         # and the misfit, is the transpose of the eigenvector
@@ -39,15 +101,10 @@ class Strain(BiasPotential):
         C_prec = rotate_rank4_mandel(self.C_prec, rot_matrix.T)
         misfit = rotate_tensor(self.misfit, rot_matrix.T)
 
-        axes = self.ellipsoid_axes(principal)
-        str_eng = StrainEnergy(aspect=axes, 
-                               misfit=misfit, poisson=self.poisson)
-        str_energy = str_eng.strain_energy(C_matrix=C_mat, C_prec=C_prec)
-
-        # Bias potential should not alter the observer
-        # The MC object will handle this
-        self.cov_obs.undo_last()
-        return str_energy*ellipsoid_volume(axes)
+        str_eng = StrainEnergy(aspect=axes, misfit=misfit,
+                               poisson=self.poisson,
+                               eshelby_table=self.eshelby_table)
+        return str_eng.strain_energy(C_matrix=C_mat, C_prec=C_prec)
 
     def calculate_from_scratch(self, atoms):
         """Calculate the strain energy from scratch."""
@@ -72,3 +129,118 @@ class Strain(BiasPotential):
 def ellipsoid_volume(principal_axes):
     """Calculate the volume of an elipsoid."""
     return 4.0*np.pi*np.prod(principal_axes)/3.0
+
+
+class EnergyDensityCache(object):
+    """
+    Table of the strain energy per volume as a function of the shape and
+    orientation of an ellipsoid.
+
+    The energy density is independent of the size of the ellipsoid, so the
+    shape is described by log(b/a) and log(c/a), and the orientation by
+    the rotation vector of the principal axes. The table is a regular grid
+    in these five coordinates. The nodes are calculated exactly the first
+    time a shape falls into one of the neighbouring cells, and the energy
+    density inside a cell is obtained by multilinear interpolation.
+
+    :param function exact: Function returning the exact energy density
+        given the principal axes and a rotation matrix
+    :param float aspect_step: Grid spacing of log(aspect ratio)
+    :param float angle_step: Grid spacing of the rotation vector (radians)
+    """
+    def __init__(self, exact, aspect_step=0.05, angle_step=0.05):
+        self.exact = exact
+        self.steps = np.array([aspect_step]*2 + [angle_step]*3)
+        self.table = {}
+        self.num_lookups = 0
+        self.num_exact = 0
+        self._corners = np.array(list(product([0, 1], repeat=5)))
+
+    def __call__(self, axes, rot_matrix):
+        """
+        Return the energy density
+
+        :param numpy.ndarray axes: Principal axes of the ellipsoid
+        :param numpy.ndarray rot_matrix: Rotation matrix where the columns
+            are the directions of the principal axes
+        """
+        self.num_lookups += 1
+        x = self.coordinates(axes, rot_matrix)/self.steps
+        cell = np.floor(x).astype(int)
+        frac = x - cell
+        weights = np.prod(np.where(self._corners == 1, frac, 1.0 - frac),
+                          axis=1)
+        value = 0.0
+        for corner, weight in zip(self._corners, weights):
+            if weight == 0.0:
+                continue
+            value += weight*self._node_value(tuple(cell + corner))
+        return value
+
+    def coordinates(self, axes, rot_matrix):
+        """
+        Return the table coordinates (log(b/a), log(c/a) and the rotation
+        vector) of an ellipsoid
+        """
+        axes = np.array(axes, dtype=np.float64)
+        log_aspect = np.log(axes[1:]/axes[0])
+        return np.concatenate((log_aspect, rotation_vector(rot_matrix)))
+
+    def _node_value(self, node):
+        """Return the energy density of a node and calculate it if needed."""
+        value = self.table.get(node, None)
+        if value is None:
+            x = np.array(node)*self.steps
+            axes = np.exp(np.array([0.0, x[0], x[1]]))
+            value = self.exact(axes, rotation_matrix(x[2:]))
+            self.table[node] = value
+            self.num_exact += 1
+        return value
+
+    def clear(self):
+        """Remove all entries in the table."""
+        self.table = {}
+
+
+def rotation_vector(rot_matrix):
+    """
+    Return the rotation vector of the principal axes given as columns of
+    rot_matrix. The energy is invariant to the sign of each axis (and to
+    inversion), so the signs are chosen such that the rotation angle is
+    as small as possible (at most 120 degrees)
+
+    :param numpy.ndarray rot_matrix: Orthogonal matrix
+    """
+    R = np.array(rot_matrix, dtype=np.float64)
+    if np.linalg.det(R) < 0.0:
+        R = -R
+
+    best = None
+    for signs in [(1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1)]:
+        cand = R*np.array(signs)
+        if best is None or np.trace(cand) > np.trace(best):
+            best = cand
+
+    cos_angle = np.clip(0.5*(np.trace(best) - 1.0), -1.0, 1.0)
+    angle = np.arccos(cos_angle)
+    axis = np.array([best[2, 1] - best[1, 2], best[0, 2] - best[2, 0],
+                     best[1, 0] - best[0, 1]])
+    if angle < 1E-12:
+        return 0.5*axis
+    return 0.5*angle*axis/np.sin(angle)
+
+
+def rotation_matrix(rot_vec):
+    """
+    Return the rotation matrix of a rotation vector (Rodrigues formula)
+
+    :param numpy.ndarray rot_vec: Rotation vector
+    """
+    angle = np.linalg.norm(rot_vec)
+    if angle < 1E-12:
+        return np.eye(3)
+    n = np.array(rot_vec)/angle
+    K = np.array([[0.0, -n[2], n[1]],
+                  [n[2], 0.0, -n[0]],
+                  [-n[1], n[0], 0.0]])
+    return np.eye(3) + np.sin(angle)*K + (1.0 - np.cos(angle))*K.dot(K)
@@ -0,0 +1,304 @@
+"""
+Compact storage of transition paths.
+
+A path is a sequence of timeslices where only a small fraction of the sites
+change between consecutive slices. In the HDF5 file each path is stored as
+a set of keyframes (the full state as uint8 species indices, every
+keyframe_every slices) and, for every slice, the list of sites that changed
+since the previous slice (uint32 site index and uint8 species index).
+Any slice can be restored by reading the closest keyframe and applying
+at most keyframe_every-1 deltas.
+
+In memory a path is a dictionary with the keys
+
+* symbols: list with one uint8 numpy array per timeslice
+* species: list with the symbols corresponding to the indices
+* energy: list with the energy of each timeslice
+* sizes: list with the cluster size of each timeslice (optional)
+
+and any number of scalar metadata (e.g. min_size_product).
+"""
+import json
+import os
+import numpy as np
+
+PATH_ARRAYS = ["energy", "sizes"]
+
+
+def symbols2uint(symbols, species):
+    """
+    Convert a list of symbols into an array of indices into species
+
+    :param list symbols: Chemical symbols
+    :param list species: All symbols that can occur
+
+    :return: Indices into species
+    :rtype: numpy.ndarray of numpy.uint8
+    """
+    lut = {symb: i for i, symb in enumerate(species)}
+    try:
+        return np.fromiter((lut[s] for s in symbols), dtype=np.uint8,
+                           count=len(symbols))
+    except KeyError as exc:
+        raise ValueError("Symbol {} is not in the species list {}"
+                         "".format(exc, species))
+
+
+def uint2symbols(nparray, species):
+    """
+    Convert an array of species indices back to a list of symbols
+
+    :param numpy.ndarray nparray: Indices into species
+    :param list species: All symbols that can occur
+
+    :return: Chemical symbols
+    :rtype: list of str
+    """
+    return np.array(species)[np.asarray(nparray)].tolist()
+
+
+def encode_path(states, keyframe_every=50):
+    """
+    Delta encode a sequence of states
+
+    :param list states: List of uint8 arrays (one per timeslice)
+    :param int keyframe_every: Number of slices between each keyframe
+
+    :return: keyframes, offsets, changed site indices and new species.
+        The changes of slice i are stored in
+        indices[offsets[i]:offsets[i+1]]
+    :rtype: tuple of numpy.ndarray
+    """
+    states = [np.asarray(s, dtype=np.uint8) for s in states]
+    if len(states) == 0:
+        raise ValueError("Cannot encode an empty path!")
+    n_sites = len(states[0])
+    keyframes = np.array(states[::keyframe_every], dtype=np.uint8)
+    keyframes = keyframes.reshape(-1, n_sites)
+
+    offsets = np.zeros(len(states)+1, dtype=np.int64)
+    indices = []
+    new_species = []
+    for i in range(1, len(states)):
+        changed = np.nonzero(states[i] != states[i-1])[0]
+        indices.append(changed.astype(np.uint32))
+        new_species.append(states[i][changed])
+        offsets[i+1] = offsets[i] + len(changed)
+
+    if indices:
+        indices = np.concatenate(indices)
+        new_species = np.concatenate(new_species)
+    else:
+        indices = np.zeros(0, dtype=np.uint32)
+        new_species = np.zeros(0, dtype=np.uint8)
+    return keyframes, offsets, indices, new_species
+
+
+def save_paths(fname, paths, keyframe_every=50, append=True):
+    """
+    Store paths in a delta encoded HDF5 file. Each path is stored in a
+    group named path<n>
+
+    :param str fname: HDF5 file
+    :param list paths: List with paths (see module documentation)
+    :param int keyframe_every: Number of slices between each keyframe
+    :param bool append: If True, the paths are added to the ones already
+        in the file. Otherwise, the file is overwritten
+    """
+    import h5py as h5
+    flag = "a" if append else "w"
+    with h5.File(fname, flag) as hfile:
+        n_existing = hfile.attrs.get("num_paths", 0)
+        for i, path in enumerate(paths):
+            grp = hfile.create_group("path{}".format(n_existing+i))
+            _write_path(grp, path, keyframe_every)
+        hfile.attrs["num_paths"] = n_existing + len(paths)
+
+
+def _write_path(grp, path, keyframe_every):
+    """Write one path to a HDF5 group."""
+    keyframes, offsets, indices, new_species = \
+        encode_path(path["symbols"], keyframe_every=keyframe_every)
+    grp.attrs["keyframe_every"] = keyframe_every
+    grp.attrs["species"] = json.dumps(list(path["species"]))
+    grp.create_dataset("keyframes", data=keyframes, compression="gzip")
+    grp.create_dataset("offsets", data=offsets)
+    grp.create_dataset("indices", data=indices)
+    grp.create_dataset("new_species", data=new_species)
+    for key in PATH_ARRAYS:
+        if key in path.keys():
+            grp.create_dataset(key, data=np.array(path[key]))
+
+    for key, value in path.items():
+        if key in PATH_ARRAYS or key in ["symbols", "species"]:
+            continue
+        if value is None:
+            continue
+        grp.attrs[key] = value
+
+
+class PathReader(object):
+    """
+    Random access to the timeslices of a path stored by
+    :py:func:`cemc.mcmc.transition_path_io.save_paths`
+
+    :param str fname: HDF5 file
+    :param int path: Index of the path in the file
+    """
+    def __init__(self, fname, path=0):
+        import h5py as h5
+        self.hfile = h5.File(fname, "r")
+        self.grp = self.hfile["path{}".format(path)]
+        self.keyframe_every = int(self.grp.attrs["keyframe_every"])
+        self.species = json.loads(self.grp.attrs["species"])
+        self.offsets = np.array(self.grp["offsets"])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, timeslice):
+        """
+        Return the state of one timeslice as an array of species indices
+
+        :param int timeslice: Timeslice
+        """
+        if timeslice < 0:
+            timeslice += len(self)
+        if timeslice < 0 or timeslice >= len(self):
+            raise IndexError("Timeslice {} is out of range".format(timeslice))
+
+        key = timeslice//self.keyframe_every
+        state = np.array(self.grp["keyframes"][key])
+        start = self.offsets[key*self.keyframe_every+1]
+        end = self.offsets[timeslice+1]
+        if end > start:
+            indices = self.grp["indices"][start:end]
+            new_species = self.grp["new_species"][start:end]
+
+            # Apply the deltas slice by slice, as a site may change several
+            # times after the keyframe
+            for i in range(key*self.keyframe_every+1, timeslice+1):
+                s = slice(self.offsets[i]-start, self.offsets[i+1]-start)
+                state[indices[s]] = new_species[s]
+        return state
+
+    def symbols(self, timeslice):
+        """Return the symbols of one timeslice."""
+        return uint2symbols(self[timeslice], self.species)
+
+    @property
+    def energy(self):
+        return np.array(self.grp["energy"])
+
+    def to_dict(self):
+        """
+        Decode the full path
+
+        :return: Path (see module documentation)
+        :rtype: dict
+        """
+        path = {key: value for key, value in self.grp.attrs.items()
+                if key not in ["keyframe_every", "species"]}
+        for key, value in path.items():
+            if isinstance(value, np.generic):
+                path[key] = value.item()
+        path["species"] = self.species
+        for key in PATH_ARRAYS:
+            if key in self.grp.keys():
+                path[key] = np.array(self.grp[key]).tolist()
+
+        keyframes = np.array(self.grp["keyframes"])
+        indices = np.array(self.grp["indices"])
+        new_species = np.array(self.grp["new_species"])
+        states = []
+        for i in range(len(self)):
+            if i % self.keyframe_every == 0:
+                state = keyframes[i//self.keyframe_every].copy()
+            else:
+                state = states[-1].copy()
+                start, end = self.offsets[i], self.offsets[i+1]
+                state[indices[start:end]] = new_species[start:end]
+            states.append(state)
+        path["symbols"] = states
+        return path
+
+    def close(self):
+        self.hfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def num_paths(fname):
+    """Return the number of paths stored in a HDF5 file."""
+    import h5py as h5
+    with h5.File(fname, "r") as hfile:
+        return int(hfile.attrs.get("num_paths", 0))
+
+
+def is_hdf5(fname):
+    """Return True if the file name has a HDF5 extension."""
+    return os.path.splitext(fname)[1] in [".h5", ".hdf5"]
+
+
+def load_path(fname, path=0, species=None):
+    """
+    Load one path. JSON files written by earlier versions (where each
+    timeslice is a list of symbols) are converted to the uint8 format
+
+    :param str fname: HDF5 or JSON file
+    :param int path: Index of the path (only relevant for files with
+        several paths)
+    :param list species: Species used for the indices when reading JSON
+        files. If None, the unique symbols sorted alphabetically are used
+
+    :return: Path (see module documentation)
+    :rtype: dict
+    """
+    if is_hdf5(fname):
+        with PathReader(fname, path=path) as reader:
+            return reader.to_dict()
+
+    with open(fname, 'r') as infile:
+        data = json.load(infile)
+    if "transition_paths" in data.keys():
+        data = data["transition_paths"][path]
+    return path_from_json(data, species=species)
+
+
+def path_from_json(data, species=None):
+    """
+    Convert a path where the timeslices are lists of symbols
+
+    :param dict data: Path as stored in the JSON files
+    :param list species: Species used for the indices
+    """
+    path = dict(data)
+    if "species" in path.keys():
+        species = path["species"]
+    if species is None:
+        unique = set()
+        for state in path["symbols"]:
+            unique.update(state)
+        species = sorted(unique)
+    path["species"] = list(species)
+    path["symbols"] = [symbols2uint(state, species)
+                       for state in path["symbols"]]
+    return path
+
+
+def path_to_json(path):
+    """
+    Convert a path to the JSON format where each timeslice is a list of
+    symbols
+
+    :param dict path: Path (see module documentation)
+    """
+    data = dict(path)
+    species = data.pop("species")
+    data["symbols"] = [uint2symbols(state, species)
+                       for state in path["symbols"]]
+    return data
@@ -1,5 +1,6 @@
 from __future__ import print_function
 from cemc.mcmc import SGCNucleation
+from cemc.mcmc import transition_path_io as tpio
 import json
 import numpy as np
 from ase.io.trajectory import TrajectoryWriter
@@ -9,7 +10,24 @@ import time
 
 
 class TransitionPathRelaxer(object):
-    def __init__( self, nuc_mc=None ):
+    """
+    Relax transition paths and generate transition state ensembles by
+    shooting moves
+
+    :param SGCNucleation nuc_mc: Monte Carlo object
+    :param int num_processes: Number of worker processes. If larger than 1,
+        num_processes shooting trials are run concurrently, each worker
+        holding its own copy of nuc_mc. The trials are launched from the
+        current path and evaluated in the order they were drawn. A rejected
+        trial leaves the path unchanged, so the trials are accepted or
+        rejected exactly as in the serial algorithm until the first accepted
+        trial. The remaining trials were launched from a path that has been
+        replaced, and are discarded. The resulting Markov chain of
+        paths is therefore identical in distribution to the serial one.
+        In generate_paths all trials start from the initial path, such
+        that all successful trials are kept.
+    """
+    def __init__( self, nuc_mc=None, num_processes=1 ):
         if ( not isinstance(nuc_mc,SGCNucleation) ):
             raise TypeError( "nuc_mc has to be an instance of SGCNucleation" )
         self.nuc_mc = nuc_mc
@@ -17,26 +35,50 @@ class TransitionPathRelaxer(object):
         self.init_path = None
         self.initial_peak_energy = None
         self.nsteps_per_sweep = None
+        self.num_processes = num_processes
+        self.pool = None
+        self.shooting_statistics = {}
 
     def load_path( self, fname ):
         """
-        Loads the initial path
+        Loads the initial path (HDF5 or JSON)
         """
-        with open(fname,'r') as infile:
-            self.init_path = json.load(infile)
+        self.init_path = tpio.load_path(fname, species=self.nuc_mc.path_species())
         self.initial_peak_energy = np.max(self.init_path["energy"])
         self.nuc_mc.min_size_product = self.init_path["min_size_product"]
         self.nuc_mc.max_size_reactant = self.init_path["max_size_reactant"]
-        self.nsteps_per_sweep = self.init_path["nsteps_per_sweep"]
+        self.nsteps_per_sweep = self.init_path.get("nsteps_per_sweep", None)
+
+    def _set_timeslice( self, path, timeslice ):
+        """
+        Sets the state of the MC object to one timeslice of the path
+        """
+        self.nuc_mc.set_state( path["symbols"][timeslice], species=path["species"] )
+
+    def _current_state( self ):
+        """
+        Returns the current state encoded with the species of the path
+        """
+        return self.nuc_mc.current_state( self.init_path["species"] )
 
     def shooting_move( self, timeslice ):
         """
         Performs one shooting move
         """
+        direction, new_path = self._shoot( timeslice )
+        return self._apply_shooting_move( timeslice, direction, new_path )
+
+    def _shoot( self, timeslice ):
+        """
+        Runs a trial trajectory from a timeslice of the current path
+
+        :return: The direction of the trial (forward, backward or
+            transition_region) and the new part of the path
+        """
         new_path = {}
         new_path["symbols"] = []
         new_path["energy"] = []
-        self.nuc_mc.set_state( self.init_path["symbols"][timeslice] )
+        self._set_timeslice( self.init_path, timeslice )
         self.nuc_mc.current_energy = self.init_path["energy"][timeslice]
         direction = "nodir"
         N = len(self.init_path["energy"])
@@ -52,7 +94,7 @@ class TransitionPathRelaxer(object):
             self.nuc_mc.sweep(nsteps=self.nsteps_per_sweep)
             self.nuc_mc.network(None)
             new_path["energy"].append(self.nuc_mc.current_energy)
-            new_path["symbols"].append( [atom.symbol for atom in self.nuc_mc.atoms] )
+            new_path["symbols"].append( self._current_state() )
             if self.nuc_mc.is_product():
                 # This is a forward path
                 if i == len(self.init_path["energy"])-timeslice-2:
@@ -74,6 +116,14 @@ class TransitionPathRelaxer(object):
 
         self.nuc_mc.network.reset()
         self.nuc_mc.network(None) # Construct the network to to check the endpoints
+        return direction, new_path
+
+    def _apply_shooting_move( self, timeslice, direction, new_path ):
+        """
+        Replace the part of the path covered by the trial if the trial
+        ended up in the correct basin
+        """
+        self._update_statistics( timeslice, direction )
 
         # Figure out if the system ended up in the correct target
         if ( direction == "forward" ):
@@ -90,6 +140,78 @@ class TransitionPathRelaxer(object):
             self.log( "New path rejected because it did not reach any of the basins")
         return False
 
+    def _update_statistics( self, timeslice, direction ):
+        """
+        Updates the acceptance statistics of the timeslice
+        """
+        stat = self.shooting_statistics.setdefault( timeslice, {"trials": 0, "accepted": 0, "discarded": 0} )
+        if ( direction == "discarded" ):
+            stat["discarded"] += 1
+            return
+        stat["trials"] += 1
+        if ( direction in ["forward","backward"] ):
+            stat["accepted"] += 1
+
+    def acceptance_statistics( self ):
+        """
+        Returns the number of trials, the number of accepted trials and
+        the acceptance rate of the shooting moves from each timeslice.
+        Discarded trials (only in parallel mode) are reported separately
+
+        :rtype: dict
+        """
+        stat = {}
+        for timeslice in sorted(self.shooting_statistics.keys()):
+            entry = dict(self.shooting_statistics[timeslice])
+            if ( entry["trials"] > 0 ):
+                entry["acceptance_rate"] = float(entry["accepted"])/entry["trials"]
+            else:
+                entry["acceptance_rate"] = 0.0
+            stat[timeslice] = entry
+        return stat
+
+    def log_acceptance_statistics( self ):
+        """
+        Writes the acceptance statistics per timeslice to the log
+        """
+        self.log( "Timeslice Trials Accepted Discarded Acceptance rate" )
+        for timeslice, entry in self.acceptance_statistics().items():
+            self.log( "{} {} {} {} {}".format(timeslice, entry["trials"], entry["accepted"],
+                                              entry["discarded"], entry["acceptance_rate"]) )
+
+    def _start_workers( self ):
+        """
+        Starts the worker processes. Each worker reconstructs its own copy
+        of the Monte Carlo object
+        """
+        if ( self.num_processes <= 1 or self.pool is not None ):
+            return
+        from cemc.mcmc.parallel_util import start_pool
+        self.pool = start_pool( self.num_processes, self.nuc_mc, mc_obj=self.nuc_mc,
+                                setup=_relaxer_in_worker, setup_args=(self.nsteps_per_sweep,) )
+
+    def _stop_workers( self ):
+        """
+        Stops the worker processes
+        """
+        if ( self.pool is None ):
+            return
+        self.pool.close()
+        self.pool.join()
+        self.pool = None
+
+    def _parallel_trials( self, timeslices ):
+        """
+        Runs one shooting trial from each timeslice of the current path
+        in the worker processes
+
+        :return: List with the direction and the new part of the path
+            of each trial
+        """
+        seeds = np.random.randint( low=0, high=2**31-1, size=len(timeslices) )
+        args = [(self.init_path, int(t), int(seed)) for t, seed in zip(timeslices, seeds)]
+        return self.pool.map( _shooting_trial_in_worker, args )
+
     def log(self, msg):
         """
         Log result to a file
@@ -111,25 +233,54 @@ class TransitionPathRelaxer(object):
         direcions = ["forward","backward"]
         min_slice = 0
         max_slice = len(self.init_path["energy"])
-        for move in range(n_shooting_moves):
-            if move%10 == 0:
-                self.center_barrier()
-                self.path2trajectory()
-
-            self.nuc_mc.reset()
-            direct = direcions[np.random.randint(low=0,high=2)]
-            self.log( "Move {} of {}".format(move,n_shooting_moves) )
-            timeslice = np.random.randint(low=min_slice,high=max_slice )
-            self.log("Starting from timeslice {} of {}".format(timeslice,max_slice))
-            self.shooting_move(timeslice)
+        self._start_workers()
+        move = 0
+        next_centering = 0
+        try:
+            while ( move < n_shooting_moves ):
+                if move >= next_centering:
+                    self.center_barrier()
+                    self.path2trajectory()
+                    next_centering = move + 10
+                    max_slice = len(self.init_path["energy"])
+
+                self.nuc_mc.reset()
+                self.log( "Move {} of {}".format(move,n_shooting_moves) )
+                if ( self.pool is None ):
+                    timeslice = np.random.randint(low=min_slice,high=max_slice )
+                    self.log("Starting from timeslice {} of {}".format(timeslice,max_slice))
+                    self.shooting_move(timeslice)
+                    move += 1
+                    continue
+
+                n_trials = min( self.num_processes, n_shooting_moves-move )
+                timeslices = np.random.randint( low=min_slice, high=max_slice, size=n_trials )
+                results = self._parallel_trials( timeslices )
+
+                # Evaluate the trials in the order they were drawn. Trials after the first
+                # accepted one were launched from the old path and are discarded
+                accepted = False
+                for timeslice, (direction, new_path) in zip(timeslices, results):
+                    if ( accepted ):
+                        self._update_statistics( timeslice, "discarded" )
+                        continue
+                    accepted = self._apply_shooting_move( timeslice, direction, new_path )
+                    move += 1
+        finally:
+            self._stop_workers()
 
         ofname = initial_path.rpartition(".")[0]
-        ofname += "_relaxed.json"
-        with open(ofname,'w') as outfile:
-            json.dump(self.init_path,outfile)
+        if tpio.is_hdf5(initial_path):
+            ofname += "_relaxed.h5"
+            tpio.save_paths(ofname, [self.init_path], append=False)
+        else:
+            ofname += "_relaxed.json"
+            with open(ofname,'w') as outfile:
+                json.dump(tpio.path_to_json(self.init_path),outfile)
         self.log( "Relaxed path written to {}".format(ofname) )
         new_peak_energy = np.max(self.init_path["energy"])
         self.log( "Maximum energy along path changed from {} eV to {} eV".format(self.initial_peak_energy,new_peak_energy) )
+        self.log_acceptance_statistics()
 
     def path2trajectory( self, fname="relaxed_path.traj" ):
         """
@@ -138,7 +289,7 @@ class TransitionPathRelaxer(object):
         traj = TrajectoryWriter(fname,'w')
         for energy,state in zip(self.init_path["energy"], self.init_path["symbols"]):
             self.nuc_mc.network.reset()
-            self.nuc_mc.set_state(state)
+            self.nuc_mc.set_state(state, species=self.init_path["species"])
             self.nuc_mc.network(None)
             atoms = self.nuc_mc.network.get_atoms_with_largest_cluster( prohibited_symbols=["Al","Mg"] )
             if atoms is None:
@@ -162,14 +313,14 @@ class TransitionPathRelaxer(object):
             # Remove the first slices from the reactant side
             self.init_path["energy"] = self.init_path["energy"][delta:]
             self.init_path["symbols"] = self.init_path["symbols"][delta:]
-            self.nuc_mc.set_state( self.init_path["symbols"][-1] )
+            self._set_timeslice( self.init_path, -1 )
             self.nuc_mc.current_energy = self.init_path["energy"][-1]
             basin = "product"
         elif ( n_prod > n_react ):
             # Remove the last slices from the product side
             self.init_path["energy"] = self.init_path["energy"][:-delta]
             self.init_path["symbols"] = self.init_path["symbols"][:-delta]
-            self.nuc_mc.set_state( self.init_path["symbols"][0] )
+            self._set_timeslice( self.init_path, 0 )
             self.nuc_mc.current_energy = self.init_path["energy"][0]
             basin = "reactant"
 
@@ -180,7 +331,7 @@ class TransitionPathRelaxer(object):
             self.nuc_mc.network(None)
             print(self.nuc_mc.network.get_statistics())
             new_path["energy"].append(self.nuc_mc.current_energy)
-            new_path["symbols"].append( [atom.symbol for atom in self.nuc_mc.atoms] )
+            new_path["symbols"].append( self._current_state() )
 
             if basin == "reactant":
                 if not self.nuc_mc.is_reactant():
@@ -205,9 +356,9 @@ class TransitionPathRelaxer(object):
         """
         min_slice_outside_reactant = None
         max_slice_outside_products = None
-        for timeslice,state in enumerate(self.init_path["symbols"]):
+        for timeslice in range(len(self.init_path["symbols"])):
             self.nuc_mc.reset()
-            self.nuc_mc.set_state( state )
+            self._set_timeslice( self.init_path, timeslice )
             self.nuc_mc.network(None)
             if ( not self.nuc_mc.is_reactant() and min_slice_outside_reactant is None ):
                 min_slice_outside_reactant = timeslice
@@ -221,9 +372,10 @@ class TransitionPathRelaxer(object):
         return min_slice_outside_reactant,max_slice_outside_products
 
 
-    def generate_paths( self, initial_path=None, n_paths=1, max_attempts=10000, outfile="tse_ensemble.json"):
+    def generate_paths( self, initial_path=None, n_paths=1, max_attempts=10000, outfile="tse_ensemble.h5"):
         """
-        Generate a given number of paths
+        Generate a given number of paths. If the extension of outfile is .h5
+        the paths are delta encoded (see :py:mod:`cemc.mcmc.transition_path_io`)
         """
         all_paths = []
         self.load_path(initial_path)
@@ -235,23 +387,52 @@ class TransitionPathRelaxer(object):
 
         n_paths_found = 0
         overall_num_paths = 0
-        while( overall_num_paths < n_paths and counter < max_attempts ):
-            self.log("Total number of paths found: {}".format(overall_num_paths))
-            counter += 1
-            self.init_path = copy.deepcopy(orig_path)
-            timeslice = np.random.randint(low=min_slice,high=max_slice)
-            if ( self.shooting_move(timeslice) ):
-                all_paths.append(self.init_path)
-                n_paths_found += 1
-
-            overall_num_paths = n_paths_found
-
+        self._start_workers()
+        try:
+            while( overall_num_paths < n_paths and counter < max_attempts ):
+                self.log("Total number of paths found: {}".format(overall_num_paths))
+                if ( self.pool is None ):
+                    counter += 1
+                    self.init_path = copy.deepcopy(orig_path)
+                    timeslice = np.random.randint(low=min_slice,high=max_slice)
+                    if ( self.shooting_move(timeslice) ):
+                        all_paths.append(self.init_path)
+                        n_paths_found += 1
+                    overall_num_paths = n_paths_found
+                    continue
+
+                # All trials start from the original path, so they are independent
+                n_trials = min( self.num_processes, max_attempts-counter )
+                counter += n_trials
+                self.init_path = orig_path
+                timeslices = np.random.randint( low=min_slice, high=max_slice, size=n_trials )
+                results = self._parallel_trials( timeslices )
+                for timeslice, (direction, new_path) in zip(timeslices, results):
+                    if ( n_paths_found >= n_paths ):
+                        self._update_statistics( timeslice, "discarded" )
+                        continue
+                    self.init_path = copy.deepcopy(orig_path)
+                    if ( self._apply_shooting_move(timeslice, direction, new_path) ):
+                        all_paths.append(self.init_path)
+                        n_paths_found += 1
+                overall_num_paths = n_paths_found
+        finally:
+            self._stop_workers()
+
+        self.log_acceptance_statistics()
         self.save_tse_ensemble( all_paths, fname=outfile )
 
-    def save_tse_ensemble(self, new_paths, fname="tse_ensemble.json" ):
+    def save_tse_ensemble(self, new_paths, fname="tse_ensemble.h5" ):
         """
-        Save the new paths to file
+        Save the new paths to file. The paths are appended to the ones
+        already in the file
         """
+        if tpio.is_hdf5(fname):
+            tpio.save_paths(fname, new_paths, append=True)
+            self.log( "TSE saved to {}".format(fname) )
+            return
+
+        new_paths = [tpio.path_to_json(path) for path in new_paths]
         data = {"transition_paths":[]}
         try:
             with open(fname,'r') as infile:
@@ -271,8 +452,8 @@ class TransitionPathRelaxer(object):
         """
         reactant_indicator = []
         product_indicator = []
-        for state in path["symbols"]:
-            self.nuc_mc.set_state(state)
+        for timeslice in range(len(path["symbols"])):
+            self._set_timeslice(path, timeslice)
             self.nuc_mc.network.reset()
             self.nuc_mc.network(None)
             if ( self.nuc_mc.is_reactant() ):
@@ -286,17 +467,22 @@ class TransitionPathRelaxer(object):
                 product_indicator.append(0)
         return reactant_indicator, product_indicator
 
-    def plot_path_statistics( self, path_file="tse_ensemble.json" ):
+    def plot_path_statistics( self, path_file="tse_ensemble.h5" ):
         """
         Create a plot to asses convergence of all the paths in the Transition Path Ensemble
         """
         from matplotlib import pyplot as plt
-        with open(path_file,'r') as infile:
-            data = json.load(infile)
-        try:
-            paths = data["transition_paths"]
-        except KeyError:
-            paths = [data]
+        species = self.nuc_mc.path_species()
+        if tpio.is_hdf5(path_file):
+            paths = [tpio.load_path(path_file, path=i) for i in range(tpio.num_paths(path_file))]
+        else:
+            with open(path_file,'r') as infile:
+                data = json.load(infile)
+            try:
+                paths = data["transition_paths"]
+            except KeyError:
+                paths = [data]
+            paths = [tpio.path_from_json(path, species=species) for path in paths]
         total_product_indicator = np.zeros(len(paths[0]["symbols"]))
         total_reactant_indicator = np.zeros(len(paths[0]["symbols"]))
         self.nuc_mc.min_size_product = paths[0]["min_size_product"]
@@ -322,3 +508,21 @@ class TransitionPathRelaxer(object):
         ax.spines["top"].set_visible(False)
         ax.legend( frameon=False, loc="best" )
         return fig
+
+
+def _relaxer_in_worker(nuc_mc, nsteps_per_sweep):
+    """Create the relaxer held by a worker process."""
+    relaxer = TransitionPathRelaxer(nuc_mc=nuc_mc)
+    relaxer.nsteps_per_sweep = nsteps_per_sweep
+    return relaxer
+
+
+def _shooting_trial_in_worker(args):
+    """Run one shooting trial in a worker process."""
+    from cemc.mcmc.parallel_util import worker_object
+    path, timeslice, seed = args
+    np.random.seed(seed)
+    relaxer = worker_object()
+    relaxer.init_path = path
+    relaxer.nuc_mc.reset()
+    return relaxer._shoot(timeslice)
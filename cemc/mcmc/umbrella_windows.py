@@ -0,0 +1,402 @@
+"""
+Tools for running umbrella windows in parallel and merging them with the
+weighted histogram analysis method (WHAM).
+
+Each window is run in a separate process holding its own copy of the
+Monte Carlo object. The histogram of a window is streamed to its own HDF5
+file, so no file is shared between the workers. The main process
+periodically reads all window files and solves the WHAM equations on a
+common grid, such that the current free energy curve (with bootstrap
+uncertainties) is available while the windows are still running.
+
+For histogrammed data with hard window boundaries, MBAR reduces to WHAM,
+hence only WHAM is implemented.
+
+Kumar, S., Rosenberg, J. M., Bouzida, D., Swendsen, R. H., & Kollman, P. A.
+(1992). The weighted histogram analysis method for free-energy calculations
+on biomolecules. I. The method. Journal of computational chemistry, 13(8),
+1011-1021.
+"""
+import os
+import time
+import numpy as np
+from scipy.special import logsumexp
+
+
+def wham(histograms, log_bias, tol=1E-10, max_iter=100000):
+    """
+    Solve the WHAM equations
+
+    :param numpy.ndarray histograms: Number of visits in each bin of the
+        common grid. Shape (num_windows, num_bins)
+    :param numpy.ndarray log_bias: Logarithm of the bias factor
+        exp(-beta*w_i(x)) of each window. Bins outside a window are -inf.
+        Shape (num_windows, num_bins)
+    :param float tol: Convergence criteria for the window free energies
+    :param int max_iter: Maximum number of iterations
+
+    :return: Free energy (in units of kT) in each bin, and the free energy
+        of each window. Bins that have not been visited are NaN. The free
+        energy is shifted such that the first visited bin is zero.
+    :rtype: numpy.ndarray, numpy.ndarray
+    """
+    histograms = np.asarray(histograms, dtype=np.float64)
+    log_bias = np.asarray(log_bias, dtype=np.float64)
+    num_samples = np.sum(histograms, axis=1)
+    used = num_samples > 0
+    hist = histograms[used, :]
+    lb = log_bias[used, :]
+    log_n = np.log(num_samples[used])
+
+    total = np.sum(hist, axis=0)
+    visited = total > 0
+    log_total = np.zeros_like(total) - np.inf
+    log_total[visited] = np.log(total[visited])
+
+    f = np.zeros(hist.shape[0])
+    log_p = np.zeros_like(total)
+    for _ in range(max_iter):
+        denum = logsumexp(log_n[:, np.newaxis] + f[:, np.newaxis] + lb, axis=0)
+        log_p = log_total - denum
+        f_new = -logsumexp(lb + log_p[np.newaxis, :], axis=1)
+        f_new -= f_new[0]
+        converged = np.max(np.abs(f_new - f)) < tol
+        f = f_new
+        if converged:
+            break
+
+    free_energy = np.zeros_like(log_p) + np.nan
+    free_energy[visited] = -log_p[visited]
+    free_energy -= free_energy[np.argmax(visited)]
+
+    window_free_energy = np.zeros(len(num_samples)) + np.nan
+    window_free_energy[used] = f
+    return free_energy, window_free_energy
+
+
+def statistical_inefficiency(series):
+    """
+    Estimate the statistical inefficiency g = 1 + 2*sum_t rho(t) of a
+    time series. The sum is truncated at the first non-positive value of
+    the autocorrelation function
+
+    :param numpy.ndarray series: Time series
+
+    :return: Statistical inefficiency (at least 1)
+    :rtype: float
+    """
+    series = np.asarray(series, dtype=np.float64)
+    N = len(series)
+    if N < 2:
+        return 1.0
+    x = series - np.mean(series)
+    var = np.mean(x**2)
+    if var <= 0.0:
+        return 1.0
+
+    # Autocorrelation via FFT (zero padded to avoid wrap around)
+    size = 2**int(np.ceil(np.log2(2*N)))
+    ft = np.fft.rfft(x, n=size)
+    acf = np.fft.irfft(ft*np.conj(ft), n=size)[:N]
+    acf /= (var*np.arange(N, 0, -1))
+
+    g = 1.0
+    for t in range(1, N):
+        if acf[t] <= 0.0:
+            break
+        g += 2.0*acf[t]*(1.0 - float(t)/N)
+    return max(g, 1.0)
+
+
+def wham_bootstrap(histograms, log_bias, stat_ineff=None, n_bootstrap=50,
+                   rng=None):
+    """
+    Solve the WHAM equations and estimate the uncertainty by bootstrapping
+    the histograms. Each histogram is resampled from a multinomial
+    distribution with the number of independent samples, N/g
+
+    :param numpy.ndarray histograms: See :py:func:`wham`
+    :param numpy.ndarray log_bias: See :py:func:`wham`
+    :param list stat_ineff: Statistical inefficiency g of each window.
+        If None, all samples are assumed to be independent
+    :param int n_bootstrap: Number of bootstrap samples
+    :param numpy.random.RandomState rng: Random number generator
+
+    :return: Free energy (in units of kT), standard deviation and free
+        energy of each window
+    :rtype: dict
+    """
+    histograms = np.asarray(histograms, dtype=np.float64)
+    if stat_ineff is None:
+        stat_ineff = np.ones(histograms.shape[0])
+    if rng is None:
+        rng = np.random.RandomState()
+
+    free_energy, window_free_energy = wham(histograms, log_bias)
+    result = {"free_energy": free_energy,
+              "window_free_energy": window_free_energy,
+              "free_energy_std": np.zeros_like(free_energy) + np.nan}
+    if n_bootstrap < 2:
+        return result
+
+    samples = []
+    for _ in range(n_bootstrap):
+        resampled = np.zeros_like(histograms)
+        for i in range(histograms.shape[0]):
+            N = np.sum(histograms[i, :])
+            n_indep = int(N/stat_ineff[i])
+            if n_indep < 1:
+                continue
+            prob = histograms[i, :]/N
+            resampled[i, :] = rng.multinomial(n_indep, prob)*stat_ineff[i]
+        fe, _ = wham(resampled, log_bias)
+        samples.append(fe)
+
+    samples = np.array(samples)
+    visited = np.isfinite(free_energy)
+    std = np.zeros_like(free_energy) + np.nan
+    for i in np.nonzero(visited)[0]:
+        finite = np.isfinite(samples[:, i])
+        if np.count_nonzero(finite) > 1:
+            std[i] = np.std(samples[finite, i])
+    result["free_energy_std"] = std
+    return result
+
+
+def window_file_name(prefix, window):
+    """Return the name of the file of one window."""
+    return "{}_window{}.h5".format(prefix, window)
+
+
+def save_window_file(fname, counts, offset, series_stat):
+    """
+    Write the histogram of a window. The file is first written to a
+    temporary file and then renamed, such that a reader never sees a
+    partially written file
+
+    :param str fname: File name
+    :param numpy.ndarray counts: Number of visits in each bin of the window
+    :param int offset: Index of the first bin of the window on the common
+        grid
+    :param dict series_stat: Number of samples and statistical
+        inefficiency of the window
+    """
+    import h5py as h5
+    tmp_name = fname + ".tmp"
+    with h5.File(tmp_name, "w") as hfile:
+        hfile.create_dataset("hist", data=counts)
+        hfile.attrs["offset"] = offset
+        hfile.attrs["num_samples"] = series_stat["num_samples"]
+        hfile.attrs["stat_ineff"] = series_stat["stat_ineff"]
+    _replace_file(tmp_name, fname)
+
+
+def _replace_file(src, dst):
+    """Rename src to dst. An existing dst is replaced."""
+    if hasattr(os, "replace"):
+        os.replace(src, dst)
+    else:
+        # Python 2. The rename is atomic on POSIX systems
+        os.rename(src, dst)
+
+
+def load_window_file(fname):
+    """
+    Read the histogram of a window
+
+    :param str fname: File name
+
+    :return: Histogram, offset, number of samples and statistical
+        inefficiency. None if the file does not exist
+    :rtype: dict
+    """
+    import h5py as h5
+    if not os.path.exists(fname):
+        return None
+    with h5.File(fname, "r") as hfile:
+        return {"hist": np.array(hfile["hist"]),
+                "offset": int(hfile.attrs["offset"]),
+                "num_samples": int(hfile.attrs["num_samples"]),
+                "stat_ineff": float(hfile.attrs["stat_ineff"])}
+
+
+def merge_window_files(prefix, coverage, num_bins, n_bootstrap=50):
+    """
+    Read the histograms of all windows and merge them with WHAM
+
+    :param str prefix: Prefix of the window files
+    :param list coverage: First and last (exclusive) bin of each window on
+        the common grid
+    :param int num_bins: Number of bins on the common grid
+    :param int n_bootstrap: Number of bootstrap samples used to estimate
+        the uncertainty
+
+    :return: Free energy, standard deviation, total histogram, histogram
+        of each window and number of samples in each window
+    :rtype: dict
+    """
+    n_windows = len(coverage)
+    histograms = np.zeros((n_windows, num_bins))
+    log_bias = np.zeros((n_windows, num_bins)) - np.inf
+    stat_ineff = np.ones(n_windows)
+    num_samples = np.zeros(n_windows, dtype=int)
+    for i, (start, stop) in enumerate(coverage):
+        log_bias[i, start:stop] = 0.0
+        data = load_window_file(window_file_name(prefix, i))
+        if data is None:
+            continue
+        hist = data["hist"]
+        offset = data["offset"]
+        histograms[i, offset:offset+len(hist)] = hist
+        stat_ineff[i] = data["stat_ineff"]
+        num_samples[i] = data["num_samples"]
+
+    result = wham_bootstrap(histograms, log_bias, stat_ineff=stat_ineff,
+                            n_bootstrap=n_bootstrap)
+    result["histogram"] = np.sum(histograms, axis=0)
+    result["window_histograms"] = histograms
+    result["num_samples"] = num_samples
+    return result
+
+
+class WindowRecorder(object):
+    """
+    Accumulates the histogram of one window and streams it to the window
+    file. Counts already present in the file are kept, such that a window
+    can be continued in a later run
+
+    :param str fname: Window file
+    :param int num_bins: Number of bins in the window
+    :param int offset: Index of the first bin on the common grid
+    :param float flush_every: Number of seconds between each write
+    :param int max_series: Maximum number of samples kept in memory for
+        the statistical inefficiency. When reached, the inefficiency of
+        the stored block is folded into the accumulated value and the
+        series is cleared. It should be much longer than the correlation
+        time of the window
+    """
+    def __init__(self, fname, num_bins, offset, flush_every=60.0,
+                 max_series=100000):
+        self.fname = fname
+        self.offset = offset
+        self.flush_every = flush_every
+        self.max_series = max_series
+        self.counts = np.zeros(num_bins)
+        self.series = []
+        self.prev_samples = 0
+        self.prev_stat_ineff = 1.0
+
+        data = load_window_file(fname)
+        if data is not None and len(data["hist"]) == num_bins:
+            self.counts += data["hist"]
+            self.prev_samples = data["num_samples"]
+            self.prev_stat_ineff = data["stat_ineff"]
+        self.last_flush = time.time()
+
+    def add(self, indx):
+        """
+        Add one sample
+
+        :param int indx: Bin of the sample (relative to the window)
+        """
+        self.counts[indx] += 1
+        self.series.append(indx)
+        if len(self.series) >= self.max_series:
+            stat = self._series_stat()
+            self.prev_samples = stat["num_samples"]
+            self.prev_stat_ineff = stat["stat_ineff"]
+            self.series = []
+        if time.time() - self.last_flush > self.flush_every:
+            self.flush()
+
+    def _series_stat(self):
+        """
+        Return the number of samples and the statistical inefficiency of
+        the stored series combined with the earlier samples
+        """
+        n_new = len(self.series)
+        g = statistical_inefficiency(self.series) if n_new > 1 else 1.0
+        n_tot = self.prev_samples + n_new
+        if n_tot > 0:
+            g = (self.prev_samples*self.prev_stat_ineff + n_new*g)/n_tot
+        return {"num_samples": n_tot, "stat_ineff": g}
+
+    def flush(self):
+        """Write the current histogram to the window file."""
+        save_window_file(self.fname, self.counts, self.offset,
+                         self._series_stat())
+        self.last_flush = time.time()
+
+
+def write_datasets(fname, data):
+    """
+    Write datasets to a HDF5 file. Existing datasets are overwritten
+
+    :param str fname: HDF5 file
+    :param dict data: Name and value of the datasets
+    """
+    import h5py as h5
+    flag = "r+" if os.path.exists(fname) else "w"
+    with h5.File(fname, flag) as hfile:
+        for key, value in data.items():
+            if key in hfile:
+                del hfile[key]
+            hfile.create_dataset(key, data=value)
+
+
+def run_windows_in_parallel(sampler, windows, nsteps, num_processes,
+                            merge, merge_every=600.0, mc_obj=None):
+    """
+    Run umbrella windows in a pool of worker processes. Each worker
+    reconstructs its own copy of the sampler (including the Monte Carlo
+    object and the CE calculator). The sampler has to implement
+    _run_window(window, nsteps), which streams the histogram of the window
+    to its window file
+
+    :param sampler: Sampler object with a mc attribute
+    :param list windows: Windows to run
+    :param int nsteps: Number of MC steps in each window
+    :param int num_processes: Number of worker processes
+    :param merge: Callable merging the window files. It is called every
+        merge_every seconds and when all windows are finished
+    :param float merge_every: Number of seconds between each merge
+    :param Montecarlo mc_obj: Monte Carlo object of the sampler. If None,
+        sampler.mc is used
+    """
+    from multiprocessing import TimeoutError
+    from cemc.mcmc.parallel_util import start_pool
+    if mc_obj is None:
+        mc_obj = sampler.mc
+    args = [(window, nsteps, np.random.randint(0, 2**31-1))
+            for window in windows]
+    pool = start_pool(num_processes, sampler, mc_obj=mc_obj)
+    try:
+        results = pool.imap_unordered(_run_window_in_worker, args)
+        num_finished = 0
+        last_merge = time.time()
+        while num_finished < len(args):
+            timeout = max(merge_every - (time.time() - last_merge), 1.0)
+            try:
+                window = results.next(timeout=timeout)
+                num_finished += 1
+                sampler.log("Window {} finished ({} of {})"
+                            "".format(window, num_finished, len(args)))
+            except TimeoutError:
+                pass
+
+            if time.time() - last_merge > merge_every:
+                merge()
+                last_merge = time.time()
+    finally:
+        pool.close()
+        pool.join()
+    merge()
+
+
+def _run_window_in_worker(args):
+    """Run one window in a worker process."""
+    from cemc.mcmc.parallel_util import worker_object
+    window, nsteps, seed = args
+    np.random.seed(seed)
+    worker_object()._run_window(window, nsteps)
+    return window
@@ -0,0 +1,182 @@
+from cemc.mcmc.sgc_montecarlo import SGCMonteCarlo
+from cemc.mcmc.bias_potential import BiasPotential
+import numpy as np
+
+
+class VarianceConstraintBias(BiasPotential):
+    """
+    Quadratic penalty on the singlets used in the variance constrained
+    semi-grand canonical ensemble
+
+    E_penalty = N*sum_i kappa_i*(singlet_i - target_i)^2
+
+    :param ce_calc: CE calculator
+    :param numpy.ndarray target: Target singlets (ordered as the singlets
+        returned by the calculator)
+    :param numpy.ndarray kappa: Stiffness of the penalty in eV/atom
+    """
+
+    def __init__(self, ce_calc, target, kappa):
+        self.ce_calc = ce_calc
+        self.target = np.array(target, dtype=np.float64)
+        self.kappa = np.array(kappa, dtype=np.float64)
+        self.natoms = len(ce_calc.atoms)
+
+    def evaluate(self, singlets):
+        """Evaluate the penalty for a set of singlets.
+
+        :param numpy.ndarray singlets: Singlets
+        """
+        diff = singlets[:len(self.target)] - self.target
+        return self.natoms*np.sum(self.kappa*diff**2)
+
+    def __call__(self, system_changes):
+        # The calculator has already been updated at this point
+        return self.evaluate(self.ce_calc.get_singlets())
+
+    def calculate_from_scratch(self, atoms):
+        return self.evaluate(atoms.get_calculator().get_singlets())
+
+
+class VarianceConstrainedSGC(SGCMonteCarlo):
+    """
+    Monte Carlo in the variance constrained semi-grand canonical (VC-SGC)
+    ensemble
+
+    The states are sampled with the weight
+
+    exp(-beta*(E - N*sum_i mu_i*s_i + N*sum_i kappa_i*(s_i - s0_i)^2))
+
+    where s_i are the singlets and s0_i the target singlets. If kappa is
+    large enough, the composition is locked close to the target also
+    inside a miscibility gap and the average chemical potential
+
+    <mu_i> = mu_i + 2*kappa_i*(s0_i - <s_i>)
+
+    is the equillibrium chemical potential at the composition <s_i>. Hence,
+    one run gives one point on the mu(composition) curve without scanning
+    the chemical potential.
+
+    Reference:
+    Sadigh, B., Erhart, P., Stukowski, A., Caro, A., Martinez, E., &
+    Zepeda-Ruiz, L. (2012). Scalable parallel Monte Carlo algorithm for
+    atomistic simulations of precipitation in alloys.
+    Physical Review B, 85(18), 184203.
+
+    See docstring of :py:class:`cemc.mcmc.SGCMonteCarlo`
+
+    :param Atoms atoms: Atoms object (with CE calculator attached!)
+    :param float temp: Temperature in kelvin
+    :param list symbols: List of possible symbols for insertion moves
+    :param float kappa: Stiffness of the concentration penalty in eV/atom.
+        For sampling inside a miscibility gap it has to be larger than the
+        (negative) curvature of the free energy divided by two
+    :param str logfile: File for logging (default is console window)
+    """
+
+    def __init__(self, atoms, temp, indeces=None, symbols=None, kappa=1.0,
+                 logfile="", plot_debug=False, min_acc_rate=0.0):
+        SGCMonteCarlo.__init__(self, atoms, temp, indeces=indeces,
+                               symbols=symbols, logfile=logfile,
+                               plot_debug=plot_debug,
+                               min_acc_rate=min_acc_rate)
+        self.name = "VarianceConstrainedSGC"
+        self.kappa = kappa
+        self.target_singlets = None
+        self.penalty = None
+
+    def _set_target(self, target_singlets):
+        """Set the target singlets and attach the penalty.
+
+        :param dict target_singlets: Target singlets
+        """
+        if sorted(target_singlets.keys()) != self.chem_pot_names:
+            raise ValueError("Target singlets has to be given for all the "
+                             "chemical potentials. Expected keys: {}"
+                             "".format(self.chem_pot_names))
+
+        self.target_singlets = target_singlets
+        target = [target_singlets[k] for k in self.chem_pot_names]
+        kappa = np.zeros(len(target)) + self.kappa
+        if self.penalty is not None:
+            self.bias_potentials.remove(self.penalty)
+        self.penalty = VarianceConstraintBias(self.atoms.get_calculator(),
+                                              target, kappa)
+        self.add_bias(self.penalty)
+        self.update_current_energy()
+
+    def current_energy_without_vib(self):
+        """Current energy without vibrations and the concentration penalty.
+
+        :return: Energy
+        :rtype: float
+        """
+        energy = SGCMonteCarlo.current_energy_without_vib(self)
+        if self.penalty is not None:
+            singlets = self.atoms.get_calculator().get_singlets()
+            energy -= self.penalty.evaluate(singlets)
+        return energy
+
+    def runMC(self, mode="fixed", steps=10, verbose=False, target_singlets=None,
+              chem_potential=None, equil=True, equil_params={},
+              prec_confidence=0.05, prec=0.01):
+        """
+        Run Monte Carlo simulation.
+        See :py:meth:`cemc.mcmc.SGCMonteCarlo.runMC`
+
+        :param dict target_singlets: Target value of the singlets.
+            The keys should correspond to one of the singlet terms.
+            (i.e. {"c1_0": 0.2})
+        :param dict chem_potential: Chemical potentials. If not given, all
+            chemical potentials are set to zero and the composition is
+            controlled by the penalty alone
+        """
+        if target_singlets is None:
+            target_singlets = self.target_singlets
+        if target_singlets is None:
+            raise ValueError("No target singlets given!")
+
+        if chem_potential is None:
+            chem_potential = self.chemical_potential
+        if chem_potential is None:
+            chem_potential = {k: 0.0 for k in target_singlets.keys()}
+
+        # The chemical potentials are removed from the ECIs when the
+        # thermodynamic quantities are extracted, so always include them
+        self.chemical_potential = chem_potential
+        self._set_target(target_singlets)
+
+        SGCMonteCarlo.runMC(self, mode=mode, steps=steps, verbose=verbose,
+                            equil=equil, equil_params=equil_params,
+                            prec_confidence=prec_confidence, prec=prec)
+
+    def get_thermodynamic(self, reset_ecis=True):
+        """
+        Compute thermodynamic quantities. In addition to the quantities
+        from :py:meth:`cemc.mcmc.SGCMonteCarlo.get_thermodynamic` the
+        average chemical potential (avg_mu_<name>), its standard deviation
+        (std_avg_mu_<name>) and the target singlets (target_singlet_<name>)
+        are returned.
+
+        :param bool reset_ecis: If True, the chemical potential will be
+            removed from the ECIs
+
+        :return: Thermodynamic quantities
+        :rtype: dict
+        """
+        N = self.averager.counter
+        singlets = self.averager.singlets/N
+        var_singlets = np.abs(self._get_var_average_singlets())
+        chem_pots = list(self.chem_pots)
+        names = list(self.chem_pot_names)
+        quantities = SGCMonteCarlo.get_thermodynamic(self, reset_ecis=reset_ecis)
+
+        for i, name in enumerate(names):
+            target = self.target_singlets[name]
+            mu = chem_pots[i] + 2.0*self.kappa*(target - singlets[i])
+            quantities["avg_mu_{}".format(name)] = mu
+            quantities["std_avg_mu_{}".format(name)] = \
+                2.0*self.kappa*np.sqrt(var_singlets[i])
+            quantities["target_singlet_{}".format(name)] = target
+        quantities["kappa"] = self.kappa
+        return quantities
@@ -12,6 +12,7 @@ from cemc.tools.util import rot_matrix_spherical_coordinates
 from cemc.tools.util import rotate_tensor, rotate_rank4_tensor
 from cemc.tools.util import to_mandel_rank4, to_full_rank4, rotate_rank4_mandel
 from cemc.tools.strain_energy import StrainEnergy
+from cemc.tools.eshelby_table import EshelbyTable
 from cemc.tools.peak_extractor import PeakExtractor
 from cemc.tools.harmonics_fit import HarmonicsFit
 from cemc.tools.wulff_construction import WulffConstruction
@@ -20,3 +21,6 @@ from cemc.tools.isotropic_strain_energy import IsotropicStrainEnergy
 from cemc.tools.landau_polynomial import TwoPhaseLandauPolynomial
 from cemc.tools.binary_coexistence import BinaryCriticalPoints
 from cemc.tools.multithread_performance import MultithreadPerformance
+from cemc.tools.histogram_reweighting import ReweightingHistogram, WHAM
+from cemc.tools.histogram_reweighting import FerrenbergSwendsen
+from cemc.tools.sgc_thermodynamic_integration import AdaptiveSGCIntegration
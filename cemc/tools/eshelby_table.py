@@ -0,0 +1,137 @@
+"""Tabulated Eshelby tensors of ellipsoidal inclusions."""
+import numpy as np
+from cemc.tools.strain_energy import StrainEnergy
+
+
+class EshelbyTable(object):
+    """Eshelby tensors tabulated over the aspect ratios of an ellipsoid.
+
+    The Eshelby tensor of an ellipsoid with half axes a >= b >= c only
+    depends on the ratios b/a and c/b (and the Poisson ratio). The tensors
+    (Mandel notation) are tabulated on a regular grid in log(b/a) and
+    log(c/b), and intermediate ellipsoids are obtained by bilinear
+    interpolation. Ellipsoids with a ratio smaller than min_ratio are
+    calculated exactly.
+
+    :param float poisson: Poisson ratio
+    :param float min_ratio: Smallest ratio b/a and c/b in the table
+    :param int num_points: Number of grid points along each ratio
+    :param numpy.ndarray table: Precomputed table of shape
+        (num_points, num_points, 6, 6). If None, the table is calculated
+    """
+
+    def __init__(self, poisson=0.3, min_ratio=1E-3, num_points=100,
+                 table=None):
+        if min_ratio <= 0.0 or min_ratio >= 1.0:
+            raise ValueError("min_ratio has to be in (0, 1)")
+        if num_points < 2:
+            raise ValueError("At least two grid points are required")
+        self.poisson = poisson
+        self.min_ratio = min_ratio
+        self.num_points = num_points
+        self.grid = np.linspace(np.log(min_ratio), 0.0, num_points)
+        self.step = self.grid[1] - self.grid[0]
+
+        if table is None:
+            table = self._build()
+        table = np.array(table)
+        if table.shape != (num_points, num_points, 6, 6):
+            raise ValueError("The table has shape {}. Expected {}"
+                             "".format(table.shape,
+                                       (num_points, num_points, 6, 6)))
+        self.table = table
+
+    def _build(self):
+        """Calculate the Eshelby tensor in all grid points."""
+        table = np.zeros((self.num_points, self.num_points, 6, 6))
+        for i, u in enumerate(self.grid):
+            for j, v in enumerate(self.grid):
+                aspect = np.exp([0.0, u, u + v])
+                table[i, j, :, :] = self.exact(aspect)
+        return table
+
+    def exact(self, aspect):
+        """Calculate the Eshelby tensor without using the table.
+
+        :param list aspect: Half axes a >= b >= c
+        """
+        eshelby = StrainEnergy.get_eshelby(np.array(aspect), self.poisson)
+        return np.array(eshelby.aslist())
+
+    def __call__(self, aspect):
+        """Return the Eshelby tensor of one ellipsoid.
+
+        :param list aspect: Half axes a >= b >= c
+
+        :return: Eshelby tensor (Mandel notation)
+        :rtype: numpy.ndarray of shape (6, 6)
+        """
+        return self.batch([aspect])[0]
+
+    def batch(self, aspects):
+        """Return the Eshelby tensors of several ellipsoids.
+
+        :param numpy.ndarray aspects: Half axes of the ellipsoids, shape
+            (num_ellipsoids, 3). Each row has to be sorted such that
+            a >= b >= c
+
+        :return: Eshelby tensors (Mandel notation)
+        :rtype: numpy.ndarray of shape (num_ellipsoids, 6, 6)
+        """
+        aspects = np.atleast_2d(np.array(aspects, dtype=np.float64))
+        if aspects.shape[1] != 3:
+            raise ValueError("Each ellipsoid needs three half axes")
+        if np.any(aspects <= 0.0):
+            raise ValueError("All half axes have to be positive")
+        if np.any(np.diff(aspects, axis=1) > 0.0):
+            raise ValueError("The half axes have to be sorted such that "
+                             "a >= b >= c")
+
+        u = np.log(aspects[:, 1]/aspects[:, 0])
+        v = np.log(aspects[:, 2]/aspects[:, 1])
+        lower = self.grid[0]
+        inside = np.logical_and(u >= lower, v >= lower)
+
+        result = np.zeros((len(aspects), 6, 6))
+        if np.any(inside):
+            x = (u[inside] - lower)/self.step
+            y = (v[inside] - lower)/self.step
+            i = np.clip(np.floor(x).astype(int), 0, self.num_points - 2)
+            j = np.clip(np.floor(y).astype(int), 0, self.num_points - 2)
+            fx = (x - i)[:, np.newaxis, np.newaxis]
+            fy = (y - j)[:, np.newaxis, np.newaxis]
+            T = self.table
+            result[inside] = (1.0 - fx)*(1.0 - fy)*T[i, j] + \
+                fx*(1.0 - fy)*T[i+1, j] + (1.0 - fx)*fy*T[i, j+1] + \
+                fx*fy*T[i+1, j+1]
+
+        for indx in np.nonzero(~inside)[0]:
+            result[indx] = self.exact(aspects[indx])
+        return result
+
+    def save(self, fname):
+        """Store the table in a HDF5 file.
+
+        :param str fname: Filename
+        """
+        import h5py as h5
+        with h5.File(fname, "w") as hfile:
+            hfile.create_dataset("eshelby", data=self.table)
+            hfile.attrs["poisson"] = self.poisson
+            hfile.attrs["min_ratio"] = self.min_ratio
+        print("Eshelby table written to {}".format(fname))
+
+    @staticmethod
+    def load(fname):
+        """Load a table stored by
+        :py:meth:`cemc.tools.eshelby_table.EshelbyTable.save`
+
+        :param str fname: Filename
+        """
+        import h5py as h5
+        with h5.File(fname, "r") as hfile:
+            table = np.array(hfile["eshelby"])
+            poisson = float(hfile.attrs["poisson"])
+            min_ratio = float(hfile.attrs["min_ratio"])
+        return EshelbyTable(poisson=poisson, min_ratio=min_ratio,
+                            num_points=table.shape[0], table=table)
@@ -0,0 +1,370 @@
+import json
+import numpy as np
+from scipy.special import logsumexp
+from ase.units import kB
+
+
+class ReweightingHistogram(object):
+    """
+    Energy histogram sampled at a fixed temperature.
+
+    All samples are binned on the global grid E_i = i*bin_width, such
+    that histograms collected in different runs can be combined.
+    In addition to the number of visits, the sum of the energy, the
+    squared energy and (optionally) the singlets are stored in each bin.
+
+    :param float temperature: Temperature (in Kelvin) used when sampling
+    :param float bin_width: Width of the energy bins in eV
+    :param int n_singlets: Number of singlet terms tracked in each bin
+    """
+
+    def __init__(self, temperature, bin_width=1E-3, n_singlets=0):
+        if bin_width <= 0.0:
+            raise ValueError("The bin width has to be positive!")
+        self.temperature = temperature
+        self.bin_width = bin_width
+        self.n_singlets = n_singlets
+
+        # Global index of the first bin in the arrays
+        self.start = 0
+        self.counts = np.zeros(0)
+        self.energy_sum = np.zeros(0)
+        self.energy_sq_sum = np.zeros(0)
+        self.singlet_sum = np.zeros((0, n_singlets))
+
+    @property
+    def num_samples(self):
+        return np.sum(self.counts)
+
+    @property
+    def end(self):
+        """Global index one past the last bin."""
+        return self.start + len(self.counts)
+
+    def bin_index(self, E):
+        """Return the global bin index of energy E."""
+        return int(np.floor(E/self.bin_width))
+
+    def _ensure_range(self, start, end):
+        """Grow the arrays such that they cover the global range [start, end).
+
+        :param int start: First global bin index
+        :param int end: Global index one past the last bin
+        """
+        if len(self.counts) == 0:
+            # Allocate some extra bins in both directions to avoid
+            # frequent resizing
+            margin = 50
+            self.start = start - margin
+            n = end - start + 2*margin
+            self.counts = np.zeros(n)
+            self.energy_sum = np.zeros(n)
+            self.energy_sq_sum = np.zeros(n)
+            self.singlet_sum = np.zeros((n, self.n_singlets))
+            return
+
+        if start >= self.start and end <= self.end:
+            return
+
+        # Double the size in the direction we need to extend
+        size = len(self.counts)
+        new_start = self.start
+        new_end = self.end
+        if start < self.start:
+            new_start = min(start, self.start - size)
+        if end > self.end:
+            new_end = max(end, self.end + size)
+
+        offset = self.start - new_start
+        n = new_end - new_start
+        self.counts = self._pad(self.counts, offset, n)
+        self.energy_sum = self._pad(self.energy_sum, offset, n)
+        self.energy_sq_sum = self._pad(self.energy_sq_sum, offset, n)
+        self.singlet_sum = self._pad(self.singlet_sum, offset, n)
+        self.start = new_start
+
+    @staticmethod
+    def _pad(array, offset, n):
+        """Embed array in a zero array of length n starting at offset."""
+        new_array = np.zeros((n,) + array.shape[1:])
+        new_array[offset:offset+len(array)] = array
+        return new_array
+
+    def add(self, E, singlets=None):
+        """Add a new sample.
+
+        :param float E: Energy of the sample
+        :param singlets: Singlets of the sample (only used if
+            n_singlets > 0)
+        :type singlets: 1D numpy array or None
+        """
+        indx = self.bin_index(E)
+        if indx < self.start or indx >= self.end:
+            self._ensure_range(indx, indx+1)
+        indx -= self.start
+        self.counts[indx] += 1
+        self.energy_sum[indx] += E
+        self.energy_sq_sum[indx] += E**2
+        if self.n_singlets > 0:
+            self.singlet_sum[indx, :] += singlets
+
+    def __iadd__(self, other):
+        """Merge the samples of another histogram.
+
+        :param ReweightingHistogram other: Histogram sampled at the same
+            temperature with the same bin width
+        """
+        if not np.isclose(self.bin_width, other.bin_width):
+            raise ValueError("Histograms with different bin widths cannot be "
+                             "merged!")
+        if not np.isclose(self.temperature, other.temperature):
+            raise ValueError("Histograms sampled at different temperatures "
+                             "cannot be merged!")
+        if self.n_singlets != other.n_singlets:
+            raise ValueError("The histograms track a different number of "
+                             "singlets!")
+        if len(other.counts) == 0:
+            return self
+
+        self._ensure_range(other.start, other.end)
+        s = other.start - self.start
+        e = s + len(other.counts)
+        self.counts[s:e] += other.counts
+        self.energy_sum[s:e] += other.energy_sum
+        self.energy_sq_sum[s:e] += other.energy_sq_sum
+        self.singlet_sum[s:e, :] += other.singlet_sum
+        return self
+
+    def clear(self):
+        """Remove all samples."""
+        self.start = 0
+        self.counts = np.zeros(0)
+        self.energy_sum = np.zeros(0)
+        self.energy_sq_sum = np.zeros(0)
+        self.singlet_sum = np.zeros((0, self.n_singlets))
+
+    def todict(self):
+        """Return a JSON serializable representation.
+
+        :return: Histogram data
+        :rtype: dict
+        """
+        return {
+            "temperature": self.temperature,
+            "bin_width": self.bin_width,
+            "n_singlets": self.n_singlets,
+            "start": self.start,
+            "counts": self.counts.tolist(),
+            "energy_sum": self.energy_sum.tolist(),
+            "energy_sq_sum": self.energy_sq_sum.tolist(),
+            "singlet_sum": self.singlet_sum.tolist()
+        }
+
+    @staticmethod
+    def fromdict(data):
+        """Initialize a histogram from a dictionary.
+
+        :param dict data: Dictionary created by `todict`
+        """
+        hist = ReweightingHistogram(data["temperature"],
+                                    bin_width=data["bin_width"],
+                                    n_singlets=data["n_singlets"])
+        hist.start = data["start"]
+        hist.counts = np.array(data["counts"], dtype=np.float64)
+        hist.energy_sum = np.array(data["energy_sum"], dtype=np.float64)
+        hist.energy_sq_sum = np.array(data["energy_sq_sum"],
+                                      dtype=np.float64)
+        singl = np.array(data["singlet_sum"], dtype=np.float64)
+        hist.singlet_sum = singl.reshape((len(hist.counts), hist.n_singlets))
+        return hist
+
+    def save(self, fname):
+        """Store the histogram in a JSON file.
+
+        :param str fname: Filename
+        """
+        with open(fname, 'w') as outfile:
+            json.dump(self.todict(), outfile)
+
+    @staticmethod
+    def load(fname):
+        """Load a histogram from a JSON file.
+
+        :param str fname: Filename
+        """
+        with open(fname, 'r') as infile:
+            data = json.load(infile)
+        return ReweightingHistogram.fromdict(data)
+
+
+class WHAM(object):
+    """
+    Multiple histogram reweighting
+
+    Combines energy histograms sampled at different temperatures into one
+    estimate of the density of states, from which averages can be
+    evaluated at any temperature covered by the histograms. See
+
+    Ferrenberg, Alan M., and Robert H. Swendsen.
+    "Optimized Monte Carlo data analysis."
+    Physical Review Letters 63.12 (1989): 1195.
+
+    :param list histograms: List of
+        :py:class:`cemc.tools.histogram_reweighting.ReweightingHistogram`
+    :param float tol: Convergence criteria for the dimensionless free
+        energies of the runs
+    :param int max_iter: Maximum number of self-consistent iterations
+    """
+
+    def __init__(self, histograms, tol=1E-8, max_iter=100000):
+        if not histograms:
+            raise ValueError("At least one histogram has to be given!")
+        histograms = [h for h in histograms if h.num_samples > 0]
+        if not histograms:
+            raise ValueError("All the histograms are empty!")
+
+        bin_width = histograms[0].bin_width
+        n_singlets = histograms[0].n_singlets
+        for h in histograms:
+            if not np.isclose(h.bin_width, bin_width):
+                raise ValueError("All histograms need the same bin width!")
+            if h.n_singlets != n_singlets:
+                raise ValueError("All histograms has to track the same number "
+                                 "of singlets!")
+        self.histograms = histograms
+        self.n_singlets = n_singlets
+        self.tol = tol
+        self.max_iter = max_iter
+
+        # Collect all histograms on a common grid
+        start = min(h.start for h in histograms)
+        end = max(h.end for h in histograms)
+        n_bins = end - start
+        self.counts = np.zeros((len(histograms), n_bins))
+        energy_sum = np.zeros(n_bins)
+        energy_sq_sum = np.zeros(n_bins)
+        singlet_sum = np.zeros((n_bins, n_singlets))
+        for k, h in enumerate(histograms):
+            s = h.start - start
+            e = s + len(h.counts)
+            self.counts[k, s:e] = h.counts
+            energy_sum[s:e] += h.energy_sum
+            energy_sq_sum[s:e] += h.energy_sq_sum
+            singlet_sum[s:e, :] += h.singlet_sum
+
+        # Only bins that have been visited enters the reweighting
+        total = np.sum(self.counts, axis=0)
+        visited = total > 0
+        self.counts = self.counts[:, visited]
+        total = total[visited]
+        self.energy = energy_sum[visited]/total
+
+        # The variance inside each bin is used to correct the heat capacity
+        # for the finite bin width
+        self.bin_variance = energy_sq_sum[visited]/total - self.energy**2
+        self.bin_variance[self.bin_variance < 0.0] = 0.0
+        self.singlets = singlet_sum[visited, :]/total[:, np.newaxis]
+
+        # Energies are measured relative to the lowest energy to keep the
+        # exponents small
+        self.E_ref = np.min(self.energy)
+        self.beta = np.array([1.0/(kB*h.temperature) for h in histograms])
+        self.num_samples = np.sum(self.counts, axis=1)
+        self.log_dos = None
+        self.dimensionless_free_energy = np.zeros(len(histograms))
+        self._solve()
+
+    def _solve(self):
+        """Solve the WHAM equations self-consistently."""
+        dE = self.energy - self.E_ref
+        log_total = np.log(np.sum(self.counts, axis=0))
+        log_N = np.log(self.num_samples)
+        f = np.zeros(len(self.histograms))
+        beta_E = np.outer(self.beta, dE)
+        for _ in range(self.max_iter):
+            log_denom = logsumexp(log_N[:, np.newaxis] + f[:, np.newaxis]
+                                  - beta_E, axis=0)
+            log_dos = log_total - log_denom
+            new_f = -logsumexp(log_dos[np.newaxis, :] - beta_E, axis=1)
+
+            # Fix the gauge
+            new_f -= new_f[0]
+            converged = np.max(np.abs(new_f - f)) < self.tol
+            f = new_f
+            if converged:
+                break
+        self.dimensionless_free_energy = f
+        self.log_dos = log_total - logsumexp(
+            log_N[:, np.newaxis] + f[:, np.newaxis] - beta_E, axis=0)
+
+    def _log_weights(self, beta):
+        """Return the normalized logarithmic weights of each bin.
+
+        :param numpy.ndarray beta: Inverse temperatures
+
+        :return: Log weights with shape (len(beta), number of bins)
+        :rtype: numpy.ndarray
+        """
+        dE = self.energy - self.E_ref
+        log_w = self.log_dos[np.newaxis, :] - np.outer(beta, dE)
+        return log_w - logsumexp(log_w, axis=1)[:, np.newaxis]
+
+    def get_thermodynamic(self, temperatures):
+        """Compute thermodynamic averages at the given temperatures.
+
+        :param temperatures: Temperatures in Kelvin
+        :type temperatures: list or numpy array
+
+        :return: Internal energy, heat capacity, singlets and the number
+            of effective samples contributing at each temperature. A
+            small number of effective samples signals that the temperature
+            is outside the range covered by the histograms.
+        :rtype: dict
+        """
+        T = np.atleast_1d(np.array(temperatures, dtype=np.float64))
+        beta = 1.0/(kB*T)
+        log_w = self._log_weights(beta)
+        w = np.exp(log_w)
+
+        energy = w.dot(self.energy)
+        dev = self.energy[np.newaxis, :] - energy[:, np.newaxis]
+        var = np.sum(w*(dev**2 + self.bin_variance[np.newaxis, :]), axis=1)
+
+        # Effective number of samples, (sum_i H_i w_i)^2/sum_i H_i w_i^2
+        # where the weights are relative to the sampled distribution
+        total = np.sum(self.counts, axis=0)
+        log_ratio = log_w - np.log(total)[np.newaxis, :]
+        num_eff = np.exp(2*logsumexp(log_ratio, b=total, axis=1)
+                         - logsumexp(2*log_ratio, b=total, axis=1))
+        res = {
+            "temperature": T,
+            "energy": energy,
+            "heat_capacity": var/(kB*T**2),
+            "num_effective_samples": num_eff
+        }
+        if self.n_singlets > 0:
+            res["singlets"] = w.dot(self.singlets)
+        return res
+
+
+class FerrenbergSwendsen(WHAM):
+    """
+    Single histogram reweighting
+
+    Extrapolates averages from one canonical run to nearby temperatures.
+    See
+
+    Ferrenberg, Alan M., and Robert H. Swendsen.
+    "New Monte Carlo technique for studying phase transitions."
+    Physical Review Letters 61.23 (1988): 2635.
+
+    :param ReweightingHistogram histogram: Histogram sampled in one run
+    """
+
+    def __init__(self, histogram):
+        WHAM.__init__(self, [histogram])
+
+    def _solve(self):
+        """With one histogram the density of states is known directly."""
+        log_total = np.log(self.counts[0, :])
+        self.log_dos = log_total + self.beta[0]*(self.energy - self.E_ref)
@@ -68,11 +68,40 @@ class Khachaturyan(object):
         energy = 0.5*np.einsum("ijkl,ij,kl", self.C, diff, diff)
         return energy - 0.5*integral/V
 
+    def green_function_batch(self, nhat):
+        """Calculate the zeroth order Green function for many directions.
+
+        :param np.ndarray nhat: Unit vectors (shape (N, 3))
+
+        :return: Green functions (shape (N, 3, 3))
+        :rtype: np.ndarray
+        """
+        Q = np.einsum("km,kn,lmnp->klp", nhat, nhat, self.C)
+        return np.linalg.inv(Q)
+
+    def b_function(self, nhat):
+        """Calculate B(n) = (sigma n) G(n) (sigma n) for many directions,
+           where sigma is the effective stress.
+
+        :param np.ndarray nhat: Unit vectors (shape (N, 3))
+        """
+        nhat = np.atleast_2d(nhat)
+        G = self.green_function_batch(nhat)
+        sigma_n = nhat.dot(self.effective_stress().T)
+        return np.einsum("ki,kij,kj->k", sigma_n, G, sigma_n)
+
     def explore_orientations(self, voxels, theta_ax="y", phi_ax="z", step=5,
                              theta_min=0, theta_max=180, phi_min=0, phi_max=360,
-                             fname=None):
+                             fname=None, num_theta=181, num_phi=360,
+                             num_processes=1):
         """Explore orientation dependency of the strain energy.
-        
+
+        Rotating the elastic tensor and the misfit by R is equivalent to
+        evaluating B at R^T k. The FFT of the voxels is therefore only
+        computed once and binned onto a grid of directions
+        (see :py:class:`cemc.tools.khachaturyan.OrientationScan`), and each
+        orientation is a weighted sum over this grid.
+
         :param np.ndarray voxels: Voxel representation of the geometry
         :param str theta_ax: Rotation axis for theta angle
         :param str phi_ax: Rotation axis for phi angle
@@ -82,34 +111,182 @@ class Khachaturyan(object):
         :param int phi_min: Start angle for phi
         :param int phi_max: End angle for phi
         :param fname str: Filename for storing the output result
+        :param int num_theta: Number of polar angles in the direction grid
+        :param int num_phi: Number of azimuthal angles in the direction grid
+        :param int num_processes: Number of processes used to evaluate
+            the orientations
+
+        :return: Theta, phi and energy of each orientation
+        :rtype: np.ndarray
         """
         th = list(range(theta_min, theta_max, step))
         ph = list(range(phi_min, phi_max, step))
 
-        misfit_orig = self.misfit_strain.copy()
-        orig_C = self.C.copy()
-        result = []
-        now = time.time()
-        status_interval = 30
-        for ang in product(th, ph):
-            if time.time() - now > status_interval:
-                print("Theta: {}, Phi: {}".format(ang[0], ang[1]))
-                now = time.time()
-            seq = [(theta_ax, -ang[0]), (phi_ax, -ang[1])]
-            matrix = rot_matrix(seq)
-
-            # Rotate the strain tensor
-            self.misfit_strain = rotate_tensor(misfit_orig, matrix)
-            self.C = rotate_rank4_tensor(orig_C.copy(), matrix)
-            energy = self.strain_energy_voxels(voxels)
-            result.append([ang[0], ang[1], energy])
+        scan = OrientationScan(self, voxels, num_theta=num_theta,
+                               num_phi=num_phi)
+        angles = list(product(th, ph))
+        matrices = [rot_matrix([(theta_ax, -ang[0]), (phi_ax, -ang[1])])
+                    for ang in angles]
+        energies = scan.strain_energies(matrices,
+                                        num_processes=num_processes)
+        result = np.array([[ang[0], ang[1], energy]
+                           for ang, energy in zip(angles, energies)])
 
         if fname is None:
-            fname = "khacaturyan_orientaions{}.csv".format(timestamp)
+            fname = "khacaturyan_orientaions{}.csv".format(timestamp())
         
-        np.savetxt(fname, np.array(result), delimiter=",", header=
+        np.savetxt(fname, result, delimiter=",", header=
                    "Theta ({}) deg, Phi ({}) deg, Energy (eV)".format(theta_ax, phi_ax))
         print("Results of orientation exploration written to {}".format(fname))
+        return result
+
+
+class OrientationScan(object):
+    """Strain energy of one voxel shape in many orientations.
+
+    The squared modulus of the FFT of the shape is computed once and
+    distributed onto a regular grid of directions (polar and azimuthal
+    angle) with bilinear weights. B(n) is tabulated on the same grid, and
+    the integral for an orientation R is the sum of the weights times
+    B(R^T n), where B(R^T n) is interpolated from the table.
+
+    :param Khachaturyan khachaturyan: Elastic tensor and misfit in the
+        reference orientation
+    :param np.ndarray voxels: Voxel representation of the geometry
+    :param int num_theta: Number of polar angles (including the poles)
+    :param int num_phi: Number of azimuthal angles
+    """
+    def __init__(self, khachaturyan, voxels, num_theta=181, num_phi=360):
+        self.khach = khachaturyan
+        self.num_theta = num_theta
+        self.num_phi = num_phi
+        self.volume = np.sum(voxels)
+
+        theta = np.linspace(0.0, np.pi, num_theta)
+        phi = np.linspace(0.0, 2.0*np.pi, num_phi, endpoint=False)
+        T, P = np.meshgrid(theta, phi, indexing="ij")
+        self.directions = np.zeros((num_theta*num_phi, 3))
+        self.directions[:, 0] = (np.sin(T)*np.cos(P)).ravel()
+        self.directions[:, 1] = (np.sin(T)*np.sin(P)).ravel()
+        self.directions[:, 2] = np.cos(T).ravel()
+        self.b_table = self.khach.b_function(self.directions)
+        self.weights = self._direction_weights(voxels)
+
+        # Only directions with weight contribute
+        self.active = np.nonzero(self.weights > 0.0)[0]
+
+    def _direction_weights(self, voxels):
+        """Distribute |FFT|^2 of the voxels onto the direction grid."""
+        ft = np.abs(np.fft.fftn(voxels))**2
+        ft /= np.prod(ft.shape)
+
+        freqs = [np.fft.fftfreq(n) for n in ft.shape]
+        K = np.array(np.meshgrid(*freqs, indexing="ij")).reshape(3, -1).T
+        values = ft.ravel()
+
+        # The k = 0 term is omitted (as in the pure Python integral)
+        length = np.sqrt(np.sum(K**2, axis=1))
+        mask = length > 0.0
+        nhat = K[mask, :]/length[mask, np.newaxis]
+        values = values[mask]
+
+        nodes, weights = _grid_indices(nhat, self.num_theta, self.num_phi)
+        num_nodes = self.num_theta*self.num_phi
+        grid_weights = np.zeros(num_nodes)
+        for n, w in zip(nodes, weights):
+            grid_weights += np.bincount(n, weights=w*values,
+                                        minlength=num_nodes)
+        return grid_weights
+
+    def integral(self, matrix):
+        """Return the integral for the orientation given by matrix.
+
+        :param np.ndarray matrix: Rotation matrix applied to the elastic
+            tensor and the misfit (see
+            :py:func:`cemc.tools.rotate_tensor`)
+        """
+        return _integral(matrix, self.directions[self.active, :],
+                         self.weights[self.active], self.b_table,
+                         self.num_theta, self.num_phi)
+
+    def strain_energy(self, matrix):
+        """Return the strain energy for the orientation given by matrix.
+
+        :param np.ndarray matrix: Rotation matrix
+        """
+        return self._homogeneous_energy(matrix) - \
+            0.5*self.integral(matrix)/self.volume
+
+    def _homogeneous_energy(self, matrix):
+        """Return the energy of the homogeneous strain."""
+        C = rotate_rank4_tensor(self.khach.C.copy(), matrix)
+        misfit = rotate_tensor(self.khach.misfit_strain, matrix)
+        diff = misfit - self.khach.uniform_strain
+        return 0.5*np.einsum("ijkl,ij,kl", C, diff, diff)
+
+    def strain_energies(self, matrices, num_processes=1):
+        """Return the strain energy of many orientations.
+
+        :param list matrices: Rotation matrices
+        :param int num_processes: Number of processes
+        """
+        if num_processes <= 1:
+            integrals = [self.integral(m) for m in matrices]
+        else:
+            from cemc.mcmc.parallel_util import start_pool
+            args = (self.directions[self.active, :],
+                    self.weights[self.active], self.b_table,
+                    self.num_theta, self.num_phi)
+            pool = start_pool(num_processes, args)
+            try:
+                integrals = pool.map(_integral_in_worker, matrices)
+            finally:
+                pool.close()
+                pool.join()
+
+        return np.array([self._homogeneous_energy(m) - 0.5*integral/self.volume
+                         for m, integral in zip(matrices, integrals)])
+
+
+def _grid_indices(nhat, num_theta, num_phi):
+    """Return the four grid nodes and bilinear weights of directions.
+
+    :param np.ndarray nhat: Unit vectors (shape (N, 3))
+    :param int num_theta: Number of polar angles (including the poles)
+    :param int num_phi: Number of azimuthal angles
+    """
+    theta = np.arccos(np.clip(nhat[:, 2], -1.0, 1.0))
+    phi = np.arctan2(nhat[:, 1], nhat[:, 0]) % (2.0*np.pi)
+    x = theta*(num_theta - 1)/np.pi
+    y = phi*num_phi/(2.0*np.pi)
+    i = np.clip(np.floor(x).astype(int), 0, num_theta - 2)
+    j = np.floor(y).astype(int) % num_phi
+    fx = x - i
+    fy = y - np.floor(y)
+    j1 = (j + 1) % num_phi
+    nodes = [i*num_phi + j, (i+1)*num_phi + j, i*num_phi + j1,
+             (i+1)*num_phi + j1]
+    weights = [(1.0 - fx)*(1.0 - fy), fx*(1.0 - fy), (1.0 - fx)*fy, fx*fy]
+    return nodes, weights
+
+
+def _integral(matrix, directions, weights, b_table, num_theta, num_phi):
+    """Sum the weights times B(R^T n) interpolated from the table."""
+    # Rows of directions.dot(R) are R^T n
+    rotated = directions.dot(matrix)
+    nodes, node_weights = _grid_indices(rotated, num_theta, num_phi)
+    b_values = np.zeros(len(directions))
+    for n, w in zip(nodes, node_weights):
+        b_values += w*b_table[n]
+    return np.sum(weights*b_values)
+
+
+def _integral_in_worker(matrix):
+    """Evaluate the integral of one orientation in a worker process. The
+    worker holds the direction grid."""
+    from cemc.mcmc.parallel_util import worker_object
+    return _integral(matrix, *worker_object())
+
 
 def timestamp():
     ts = time.time()
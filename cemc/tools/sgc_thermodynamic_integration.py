@@ -0,0 +1,354 @@
+"""
+Thermodynamic integration in the SGC ensemble with adaptive step control
+"""
+import logging
+import numpy as np
+from ase.units import kB
+
+
+def curvature(x, y, y_std=None):
+    """Estimate the second derivative from the last three points.
+
+    :param numpy.ndarray x: Abscissa of the last three points
+    :param numpy.ndarray y: Ordinates of the last three points. Shape
+        (3, N) where N is the number of quantities
+    :param numpy.ndarray y_std: Standard error of y. Same shape as y
+
+    :return: Second derivative and its standard error for each quantity
+    :rtype: numpy.ndarray, numpy.ndarray
+    """
+    x = np.array(x, dtype=np.float64)
+    y = np.array(y, dtype=np.float64).reshape((3, -1))
+    if y_std is None:
+        y_std = np.zeros_like(y)
+    y_std = np.array(y_std, dtype=np.float64).reshape((3, -1))
+
+    h1 = x[1] - x[0]
+    h2 = x[2] - x[1]
+    if h1 == 0.0 or h2 == 0.0:
+        raise ValueError("The abscissa values have to be different!")
+    width = x[2] - x[0]
+
+    # Coefficients of the second divided difference
+    coeff = 2.0*np.array([1.0/(h1*width), -1.0/(h1*h2), 1.0/(h2*width)])
+    deriv = coeff.dot(y)
+    std = np.sqrt((coeff**2).dot(y_std**2))
+    return deriv, std
+
+
+def next_step_size(x, y, y_std, tol, current_step, min_step, max_step,
+                   max_growth=2.0, order=3):
+    """Select the next step size based on the local curvature.
+
+    The step is chosen such that the local error, h^order |f''|/C, is equal
+    to the tolerance, where C = 12 for integration error (order=3) and
+    C = 8 for linear interpolation error (order=2). Only the part of the
+    curvature that is statistically significant (larger than two standard
+    errors) is taken into account, such that noise alone never refines the
+    grid.
+
+    :param list x: Abscissa of the last three points
+    :param numpy.ndarray y: Ordinates of the last three points (3 x N)
+    :param numpy.ndarray y_std: Standard error of y (3 x N)
+    :param tol: Tolerance for each quantity
+    :type tol: float or numpy.ndarray
+    :param float current_step: Current step size (absolute value)
+    :param float min_step: Smallest allowed step size
+    :param float max_step: Largest allowed step size
+    :param float max_growth: Largest allowed increase relative to
+        current_step
+    :param order: Error order (3 or 2) for each quantity
+    :type order: int or numpy.ndarray
+
+    :return: New step size
+    :rtype: float
+    """
+    deriv, std = curvature(x, y, y_std)
+    significant = np.abs(deriv) - 2.0*std
+    significant[significant < 0.0] = 0.0
+
+    tol = np.zeros_like(deriv) + tol
+    order = np.zeros_like(deriv) + order
+    const = np.where(order > 2.5, 12.0, 8.0)
+
+    step = max_growth*current_step
+    for i in range(len(deriv)):
+        if significant[i] <= 0.0:
+            continue
+        h = (const[i]*tol[i]/significant[i])**(1.0/order[i])
+        step = min(step, h)
+    return min(max(step, min_step), max_step)
+
+
+class AdaptiveSGCIntegration(object):
+    """
+    Thermodynamic integration in the SGC ensemble where the distance
+    between the sampled points adapts to the local curvature of the
+    integrand and the singlets.
+
+    Each point is started from the final configuration of the previous
+    point and reuses its correlation time estimate, so only a short
+    equillibriation is needed.
+
+    :param SGCMonteCarlo sgc_mc: Monte Carlo object
+    :param float tol: Target local error of the integrated free energy
+        in eV/atom
+    :param float singlet_tol: Target interpolation error of the singlets
+    :param float max_singlet_change: If a singlet changes more than this
+        between two points, the step is refined as the system has probably
+        changed phase
+    :param int steps: Maximum number of MC steps at each point
+    :param float prec: Precision passed to
+        :py:meth:`cemc.mcmc.SGCMonteCarlo.runMC`
+    :param int equil_steps: Number of equillibriation steps at each point
+        after the first. If None, it is set to 10 correlation times
+        (at least the number of atoms)
+    :param str logfile: Filename for logging (default is console)
+    """
+
+    def __init__(self, sgc_mc, tol=1E-4, singlet_tol=0.01,
+                 max_singlet_change=0.05, steps=100000, prec=1E-3,
+                 equil_steps=None, logfile=""):
+        self.sgc = sgc_mc
+        self.tol = tol
+        self.singlet_tol = singlet_tol
+        self.max_singlet_change = max_singlet_change
+        self.steps = steps
+        self.prec = prec
+        self.equil_steps = equil_steps
+        self.natoms = len(self.sgc.atoms)
+
+        self.logger = logging.getLogger("AdaptiveSGCIntegration")
+        self.logger.setLevel(logging.INFO)
+        if logfile == "":
+            handler = logging.StreamHandler()
+        else:
+            handler = logging.FileHandler(logfile)
+        if not self.logger.handlers:
+            self.logger.addHandler(handler)
+
+    def _log(self, msg):
+        self.logger.info(msg)
+
+    def _equil_params(self, is_first):
+        """Return the parameters used for equillibriation."""
+        if is_first:
+            return {}
+        window = self.equil_steps
+        if window is None:
+            tau = self.sgc.correlation_info["correlation_time"]
+            window = max(int(10*tau), self.natoms)
+        return {"mode": "fixed", "window_length": window}
+
+    def _sample(self, temperature, chem_pot, is_first):
+        """Run MC at one point of the integration path.
+
+        :return: Thermodynamic quantities with standard errors
+        :rtype: dict
+        """
+        self.sgc.T = temperature
+        self.sgc.runMC(mode="prec", steps=self.steps, chem_potential=chem_pot,
+                       equil=True, equil_params=self._equil_params(is_first),
+                       prec=self.prec, reuse_correlation_time=not is_first)
+
+        var_E = np.abs(self.sgc._get_var_average_energy())
+        var_singl = np.abs(self.sgc._get_var_average_singlets())
+        thermo = self.sgc.get_thermodynamic()
+        names = self.sgc.chem_pot_names
+        res = {
+            "temperature": temperature,
+            "chemical_potential": dict(chem_pot),
+            "sgc_energy": thermo["sgc_energy"]/self.natoms,
+            "sgc_energy_std": np.sqrt(var_E)/self.natoms,
+            "singlets": np.array([thermo["singlet_{}".format(n)]
+                                  for n in names]),
+            "singlets_std": np.sqrt(var_singl),
+            "symbols": [atom.symbol for atom in self.sgc.atoms],
+            "thermo": thermo
+        }
+        return res
+
+    def _phase_changed(self, prev, current):
+        """Return True if the singlets jumped between two points."""
+        change = np.abs(current["singlets"] - prev["singlets"])
+        return np.any(change > self.max_singlet_change)
+
+    def _integrate(self, points, x_start, x_end, init_step, min_step,
+                   max_step, sample, integrand):
+        """Walk along the integration path.
+
+        :param list points: List where the accepted points are appended
+        :param float x_start: Start value of the path parameter
+        :param float x_end: End value of the path parameter
+        :param float init_step: Initial step size
+        :param float min_step: Minimum step size
+        :param float max_step: Maximum step size
+        :param sample: Callable that samples the point x
+        :param integrand: Callable returning the integrand value and its
+            standard error of a sampled point
+        """
+        direction = 1.0 if x_end >= x_start else -1.0
+        step = abs(init_step)
+        x = x_start
+        xs = []
+        while True:
+            is_first = len(points) == 0
+            res = sample(x, is_first)
+
+            if not is_first and self._phase_changed(points[-1], res):
+                if step > min_step:
+                    # Refine and restart from the previous configuration
+                    step = max(step/2.0, min_step)
+                    self._log("Large change in singlets at {}. Refining "
+                              "step to {}".format(x, step))
+                    self.sgc.set_symbols(points[-1]["symbols"])
+                    x = xs[-1] + direction*step
+                    continue
+                self._log("Possible phase transition between {} and {}"
+                          "".format(xs[-1], x))
+
+            res["path_parameter"] = x
+            points.append(res)
+            xs.append(x)
+
+            if direction*(x - x_end) >= 0.0:
+                break
+
+            if len(points) >= 3:
+                y = []
+                y_std = []
+                for p in points[-3:]:
+                    f, f_std = integrand(p)
+                    y.append(np.concatenate(([f], p["singlets"])))
+                    y_std.append(np.concatenate(([f_std], p["singlets_std"])))
+                n_singl = len(points[-1]["singlets"])
+                tol = np.array([self.tol] + [self.singlet_tol]*n_singl)
+                order = np.array([3] + [2]*n_singl)
+                step = next_step_size(xs[-3:], np.array(y), np.array(y_std),
+                                      tol, step, min_step, max_step,
+                                      order=order)
+            self._log("Next step size: {}".format(step))
+            x += direction*step
+            if direction*(x - x_end) > 0.0:
+                x = x_end
+
+    def integrate_temperature(self, T_start, T_end, chem_pot, init_step=50.0,
+                              min_step=1.0, max_step=500.0,
+                              beta_phi_ref=None):
+        """Integrate the free energy along a line of constant chemical
+        potential.
+
+        Uses d(beta*phi)/dT = -<E_sgc>/(kB*T^2) where phi is the SGC free
+        energy per atom.
+
+        :param float T_start: Start temperature in Kelvin
+        :param float T_end: End temperature in Kelvin
+        :param dict chem_pot: Chemical potentials
+        :param float init_step: Initial temperature step in Kelvin
+        :param float min_step: Minimum temperature step in Kelvin
+        :param float max_step: Maximum temperature step in Kelvin
+        :param float beta_phi_ref: beta*phi at T_start. If None, the high
+            temperature limit is used if T_start > T_end and the ground
+            state approximation otherwise
+
+        :return: Sampled temperatures, SGC energies, singlets and the free
+            energy (per atom)
+        :rtype: dict
+        """
+        def sample(T, is_first):
+            return self._sample(T, chem_pot, is_first)
+
+        def integrand(point):
+            T = point["temperature"]
+            factor = 1.0/(kB*T**2)
+            return -point["sgc_energy"]*factor, point["sgc_energy_std"]*factor
+
+        points = []
+        self._integrate(points, T_start, T_end, init_step, min_step, max_step,
+                        sample, integrand)
+
+        T = np.array([p["temperature"] for p in points])
+        energy = np.array([p["sgc_energy"] for p in points])
+        beta = 1.0/(kB*T)
+        if beta_phi_ref is None:
+            if T_start > T_end:
+                nelem = len(self.sgc.symbols)
+                beta_phi_ref = -np.log(nelem) + beta[0]*energy[0]
+            else:
+                beta_phi_ref = beta[0]*energy[0]
+
+        integrand_values = np.array([integrand(p)[0] for p in points])
+        beta_phi = beta_phi_ref + cumulative_trapezoid(integrand_values, T)
+        res = self._collect(points)
+        res["free_energy"] = beta_phi/beta
+        return res
+
+    def integrate_chemical_potential(self, temperature, chem_pot, name,
+                                     mu_end, init_step=0.005, min_step=1E-4,
+                                     max_step=0.05, phi_ref=0.0):
+        """Integrate the free energy along a line of constant temperature
+        where one chemical potential varies.
+
+        Uses d(phi)/d(mu) = -<singlet> where phi is the SGC free energy per
+        atom.
+
+        :param float temperature: Temperature in Kelvin
+        :param dict chem_pot: Chemical potentials at the start point
+        :param str name: Name of the chemical potential that is varied
+        :param float mu_end: End value of the varied chemical potential
+        :param float init_step: Initial step in eV/atom
+        :param float min_step: Minimum step in eV/atom
+        :param float max_step: Maximum step in eV/atom
+        :param float phi_ref: Free energy at the start point
+
+        :return: Sampled chemical potentials, SGC energies, singlets and the
+            free energy (per atom)
+        :rtype: dict
+        """
+        if name not in chem_pot.keys():
+            raise ValueError("{} is not in the chemical potential "
+                             "dictionary!".format(name))
+        names = sorted(chem_pot.keys())
+        indx = names.index(name)
+
+        def sample(mu, is_first):
+            new_chem_pot = dict(chem_pot)
+            new_chem_pot[name] = mu
+            return self._sample(temperature, new_chem_pot, is_first)
+
+        def integrand(point):
+            return -point["singlets"][indx], point["singlets_std"][indx]
+
+        points = []
+        self._integrate(points, chem_pot[name], mu_end, init_step, min_step,
+                        max_step, sample, integrand)
+
+        mu = np.array([p["path_parameter"] for p in points])
+        integrand_values = np.array([integrand(p)[0] for p in points])
+        res = self._collect(points)
+        res["free_energy"] = phi_ref + cumulative_trapezoid(integrand_values,
+                                                            mu)
+        return res
+
+    def _collect(self, points):
+        """Collect the sampled points into arrays."""
+        return {
+            "temperature": np.array([p["temperature"] for p in points]),
+            "chemical_potential": [p["chemical_potential"] for p in points],
+            "sgc_energy": np.array([p["sgc_energy"] for p in points]),
+            "sgc_energy_std": np.array([p["sgc_energy_std"] for p in points]),
+            "singlets": np.array([p["singlets"] for p in points]),
+            "singlets_std": np.array([p["singlets_std"] for p in points]),
+            "thermo": [p["thermo"] for p in points]
+        }
+
+
+def cumulative_trapezoid(y, x):
+    """Cumulative trapezoidal integral starting at zero.
+
+    :param numpy.ndarray y: Integrand values
+    :param numpy.ndarray x: Abscissa
+    """
+    integral = np.zeros(len(y))
+    integral[1:] = np.cumsum(0.5*(y[1:] + y[:-1])*np.diff(x))
+    return integral
@@ -0,0 +1,256 @@
+"""Minimise the strain and interface energy of a voxelised precipitate."""
+import numpy as np
+
+
+class VoxelShapeOptimizer(object):
+    """Monte Carlo optimisation of the shape of a voxelised precipitate.
+
+    The energy of a shape is the elastic energy of the Khachaturyan
+    theory, plus the interface energy per exposed voxel face and minus
+    a chemical potential per voxel.
+
+        E = V e0 - 1/(2N) sum_k B(k) |F(k)|^2 + gamma A - mu V
+
+    where F is the Fourier transform of the voxels and e0 the energy of
+    the homogeneous strain. Changing voxel j by d_j (+1 or -1) changes F by
+    d_j exp(-2 pi i k r_j), so F is updated incrementally. The energy
+    change of a move is given by the potential P = IFFT(B F) in the
+    changed voxels and the kernel g = IFFT(B):
+
+        dE = sum_j [d_j (e0 - P(r_j)) - g(0)/2] - sum_{i<j} d_i d_j g(r_i - r_j)
+
+    P is updated after an accepted move by adding the shifted kernel, so no
+    FFT is needed during the optimisation. Proposals are evaluated in
+    batches from the same state, and the first accepted proposal of the
+    batch is applied. This is equivalent to proposing them one by one, as
+    a rejection does not change the state.
+
+    The grid is periodic, so it should be large enough that the
+    precipitate does not interact with its periodic images.
+
+    :param Khachaturyan khachaturyan: Elastic tensor and misfit
+        (see :py:class:`cemc.tools.khachaturyan.Khachaturyan`)
+    :param np.ndarray voxels: Initial shape (3D array, 1 inside and 0
+        outside)
+    :param float interface_energy: Energy per exposed voxel face
+    :param float kT: Temperature (in energy units). If zero, only moves
+        that lower the energy are accepted
+    :param bool conserve_volume: If True, a move transfers a surface voxel
+        to an empty site at the surface. Otherwise, a move flips one
+        surface voxel
+    :param float chemical_potential: Energy gained per voxel (only
+        relevant if conserve_volume is False)
+    :param int batch_size: Number of proposals evaluated at once
+    :param int resync_every: Number of accepted moves between each
+        recalculation of F and P from scratch (removes round-off errors)
+    """
+    def __init__(self, khachaturyan, voxels, interface_energy=0.0, kT=0.0,
+                 conserve_volume=True, chemical_potential=0.0, batch_size=64,
+                 resync_every=1000):
+        voxels = np.array(voxels)
+        if voxels.ndim != 3:
+            raise ValueError("The voxels has to be a 3D array!")
+        self.voxels = (voxels > 0).astype(np.int8)
+        self.shape = self.voxels.shape
+        self.N = self.voxels.size
+        self.interface_energy = interface_energy
+        self.kT = kT
+        self.conserve_volume = conserve_volume
+        self.chemical_potential = chemical_potential
+        self.batch_size = batch_size
+        self.resync_every = resync_every
+
+        diff = khachaturyan.misfit_strain - khachaturyan.uniform_strain
+        self.e0 = 0.5*np.einsum("ijkl,ij,kl", khachaturyan.C, diff, diff)
+
+        # B(k) on the FFT grid. The k = 0 term is omitted.
+        freqs = [np.fft.fftfreq(n) for n in self.shape]
+        K = np.array(np.meshgrid(*freqs, indexing="ij")).reshape(3, -1).T
+        length = np.sqrt(np.sum(K**2, axis=1))
+        mask = length > 0.0
+        B = np.zeros(self.N)
+        B[mask] = khachaturyan.b_function(K[mask, :]/length[mask, np.newaxis])
+        self.B = B.reshape(self.shape)
+        self.kernel = np.real(np.fft.ifftn(self.B))
+
+        # Phase factors exp(-2 pi i k x/n) along each axis
+        self.phases = []
+        for n in self.shape:
+            x = np.arange(n)
+            self.phases.append(np.exp(-2j*np.pi*np.outer(x, x)/n))
+
+        self.num_accepted = 0
+        self.num_proposed = 0
+        self.resync()
+
+    def resync(self):
+        """Calculate the Fourier transform and the potential from scratch."""
+        self.ft = np.fft.fftn(self.voxels)
+        self.potential = np.real(np.fft.ifftn(self.B*self.ft))
+        self.num_inside_neighbours = self._count_inside_neighbours()
+        self._strain_energy = self._strain_energy_from_ft()
+
+    def _count_inside_neighbours(self):
+        """Return the number of inside voxels among the six neighbours."""
+        count = np.zeros(self.shape, dtype=np.int8)
+        for axis in range(3):
+            for shift in [-1, 1]:
+                count += np.roll(self.voxels, shift, axis=axis)
+        return count
+
+    def _strain_energy_from_ft(self):
+        """Return the strain energy calculated from the Fourier transform."""
+        volume = np.sum(self.voxels)
+        integral = np.sum(self.B*np.abs(self.ft)**2)/self.N
+        return self.e0*volume - 0.5*integral
+
+    @property
+    def volume(self):
+        return int(np.sum(self.voxels))
+
+    def strain_energy(self):
+        """Return the elastic energy of the current shape."""
+        return self._strain_energy
+
+    def interface_area(self):
+        """Return the number of exposed voxel faces."""
+        inside = self.voxels == 1
+        return int(np.sum(6 - self.num_inside_neighbours[inside]))
+
+    def energy(self):
+        """Return the total energy of the current shape."""
+        return self._strain_energy + \
+            self.interface_energy*self.interface_area() - \
+            self.chemical_potential*self.volume
+
+    def _propose(self):
+        """Return a batch of proposals.
+
+        :return: Voxels changed by each proposal (shape (batch_size, n, 3)),
+            the change of each voxel and the energy change of each proposal
+        """
+        inside = self.voxels == 1
+        n_in = self.num_inside_neighbours
+        inside_surface = np.argwhere(np.logical_and(inside, n_in < 6))
+        outside_surface = np.argwhere(np.logical_and(~inside, n_in > 0))
+        M = self.batch_size
+
+        if self.conserve_volume:
+            if len(inside_surface) == 0 or len(outside_surface) == 0:
+                return None
+            a = inside_surface[np.random.randint(0, len(inside_surface), M)]
+            b = outside_surface[np.random.randint(0, len(outside_surface), M)]
+            P_a = self.potential[tuple(a.T)]
+            P_b = self.potential[tuple(b.T)]
+            sep = (a - b) % np.array(self.shape)
+            d_strain = P_a - P_b - self.kernel[0, 0, 0] + \
+                self.kernel[tuple(sep.T)]
+
+            # Nearest neighbours on the periodic grid
+            dist = np.minimum(sep, np.array(self.shape) - sep)
+            adjacent = (np.sum(dist, axis=1) == 1).astype(int)
+            d_area = 2*(n_in[tuple(a.T)] - n_in[tuple(b.T)] + adjacent)
+
+            sites = np.stack((a, b), axis=1)
+            deltas = np.tile([-1, 1], (M, 1))
+            return sites, deltas, d_strain + self.interface_energy*d_area
+
+        candidates = np.vstack((inside_surface, outside_surface))
+        if len(candidates) == 0:
+            return None
+        c = candidates[np.random.randint(0, len(candidates), M)]
+        delta = 1 - 2*self.voxels[tuple(c.T)].astype(int)
+        d_strain = delta*(self.e0 - self.potential[tuple(c.T)]) - \
+            0.5*self.kernel[0, 0, 0]
+        d_area = delta*(6 - 2*n_in[tuple(c.T)].astype(int))
+        d_energy = d_strain + self.interface_energy*d_area - \
+            self.chemical_potential*delta
+        return c[:, np.newaxis, :], delta[:, np.newaxis], d_energy
+
+    def _strain_energy_change(self, sites, deltas):
+        """Return the change in strain energy for a set of voxel changes."""
+        change = 0.0
+        for i, (site, d) in enumerate(zip(sites, deltas)):
+            change += d*(self.e0 - self.potential[tuple(site)]) - \
+                0.5*self.kernel[0, 0, 0]
+            for other, d_other in zip(sites[:i], deltas[:i]):
+                sep = tuple((site - other) % np.array(self.shape))
+                change -= d*d_other*self.kernel[sep]
+        return change
+
+    def _apply(self, sites, deltas):
+        """Change the voxels and update F and P incrementally."""
+        self._strain_energy += self._strain_energy_change(sites, deltas)
+        for site, d in zip(sites, deltas):
+            x, y, z = site
+            self.voxels[x, y, z] += d
+            self.ft += d*(self.phases[0][x][:, np.newaxis, np.newaxis] *
+                          self.phases[1][y][np.newaxis, :, np.newaxis] *
+                          self.phases[2][z][np.newaxis, np.newaxis, :])
+            self.potential += d*np.roll(self.kernel, (x, y, z),
+                                        axis=(0, 1, 2))
+            for axis in range(3):
+                for shift in [-1, 1]:
+                    nb = list(site)
+                    nb[axis] = (nb[axis] + shift) % self.shape[axis]
+                    self.num_inside_neighbours[tuple(nb)] += d
+
+    def step(self):
+        """Evaluate one batch of proposals and apply the first accepted.
+
+        :return: True if a proposal was accepted
+        :rtype: bool
+        """
+        proposals = self._propose()
+        if proposals is None:
+            return False
+        sites, deltas, d_energy = proposals
+        self.num_proposed += len(d_energy)
+
+        if self.kT > 0.0:
+            accept = np.random.rand(len(d_energy)) < \
+                np.exp(-np.maximum(d_energy, 0.0)/self.kT)
+        else:
+            accept = d_energy < 0.0
+
+        accepted = np.nonzero(accept)[0]
+        if len(accepted) == 0:
+            return False
+
+        first = accepted[0]
+
+        # Proposals after the first accepted are discarded
+        self.num_proposed -= len(d_energy) - first - 1
+        self._apply(sites[first], deltas[first])
+        self.num_accepted += 1
+        if self.num_accepted % self.resync_every == 0:
+            self.resync()
+        return True
+
+    def run(self, num_steps=1000, patience=None):
+        """Optimise the shape.
+
+        :param int num_steps: Number of batches
+        :param int patience: If given, stop when this number of successive
+            batches has been rejected (useful when kT is zero)
+
+        :return: Energy after each batch
+        :rtype: np.ndarray
+        """
+        energies = []
+        num_rejected = 0
+        for _ in range(num_steps):
+            if self.step():
+                num_rejected = 0
+            else:
+                num_rejected += 1
+            energies.append(self.energy())
+            if patience is not None and num_rejected >= patience:
+                break
+        return np.array(energies)
+
+    @property
+    def acceptance_rate(self):
+        if self.num_proposed == 0:
+            return 0.0
+        return float(self.num_accepted)/self.num_proposed
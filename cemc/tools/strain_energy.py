@@ -18,18 +18,28 @@ class StrainEnergy(object):
     :param misfit: Misfit strain of the inclusion
     :type misfit: 3x3 ndarray or list of length 6 (Mandel notation)
     :param float poisson: Poisson ratio
+    :param EshelbyTable eshelby_table: If given, the Eshelby tensor is
+        interpolated from this table
+        (see :py:class:`cemc.tools.eshelby_table.EshelbyTable`)
     """
 
     def __init__(self, aspect=[1.0, 1.0, 1.0],
-                 misfit=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], poisson=0.3):
+                 misfit=[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], poisson=0.3,
+                 eshelby_table=None):
         """Initialize Strain energy class."""
+        if eshelby_table is not None and \
+                abs(eshelby_table.poisson - poisson) > 1E-8:
+            raise ValueError("The Eshelby table is calculated for Poisson "
+                             "ratio {}. Got {}".format(eshelby_table.poisson,
+                                                       poisson))
+        self.eshelby_table = eshelby_table
+        self.poisson = poisson
         aspect = np.array(aspect)
-        self.eshelby = StrainEnergy.get_eshelby(aspect, poisson)
+        self.eshelby = self._eshelby_matrix(aspect)
         self.misfit = np.array(misfit)
 
         if len(self.misfit.shape) == 2:
             self.misfit = to_mandel(self.misfit)
-        self.poisson = poisson
 
     @staticmethod
     def get_eshelby(aspect, poisson):
@@ -45,6 +55,15 @@ class StrainEnergy(object):
                                     poisson)
         return eshelby
 
+    def _eshelby_matrix(self, aspect):
+        """Return the Eshelby tensor in Mandel notation.
+
+        :param numpy.ndarray aspect: Half axes of the ellipsoid
+        """
+        if self.eshelby_table is not None:
+            return self.eshelby_table(aspect)
+        return np.array(StrainEnergy.get_eshelby(aspect, self.poisson).aslist())
+
     def make_isotropic(self, C):
         """Convert the elastic tensor to an isotropic tensor by 
             averaging.
@@ -115,7 +134,7 @@ class StrainEnergy(object):
             raise ValueError("Elastic tensor or a scale factor for "
                              "the precipitating material must be "
                              "passed")
-        S = np.array(self.eshelby.aslist())
+        S = self.eshelby
         A = (C_prec - C_matrix).dot(S) + C_matrix
         b = C_prec.dot(self.misfit)
         return np.linalg.solve(A, b)
@@ -126,7 +145,7 @@ class StrainEnergy(object):
         :param list equiv_strain: Equivalent eigenstrain in Mandel notation
         :param C_matrix: 6x6 elastic tensor of the matrix material (Mandel)
         """
-        S = np.array(self.eshelby.aslist())
+        S = self.eshelby
         sigma = C_matrix.dot(S.dot(equiv_strain) - equiv_strain)
         return sigma
 
@@ -216,7 +235,7 @@ class StrainEnergy(object):
         C_prec = self.make_isotropic(C_prec)
 
         aspect = np.array(ellipsoid["aspect"])
-        self.eshelby = StrainEnergy.get_eshelby(aspect, self.poisson)
+        self.eshelby = self._eshelby_matrix(aspect)
         result = []
         misfit_orig = to_full_tensor(self.misfit)
         theta = np.arange(0.0, np.pi, step*np.pi / 180.0)
@@ -246,7 +265,7 @@ class StrainEnergy(object):
             # Rotate the elastic tensor of the precipitate material
             C_prec = rotate_rank4_mandel(C_prec_orig, matrix)            
             if abs(p) < 1E-3 and (abs(th-np.pi/4.0) < 1E-3 or abs(th-3.0*np.pi/4.0) < 1E-3):
-                print(self.eshelby.aslist())
+                print(self.eshelby)
 
             energy = self.strain_energy(C_matrix=C_matrix, C_prec=C_prec)
             res = {"energy": energy, "theta": th, "phi": p}
@@ -2,3 +2,4 @@
 from cemc.wanglandau.wang_landau_db_manager import WangLandauDBManager
 from cemc.wanglandau.wang_landau_initializer import WangLandauInit, AtomExistsError
 from cemc.wanglandau.wang_landau_sampler import WangLandau
+from cemc.wanglandau.wang_landau_2d import WangLandau2D
@@ -1,7 +1,5 @@
 import numpy as np
-from scipy import interpolate
-from cemc.wanglandau.wltools import convert_array, adapt_array
-import sqlite3 as sq
+from cemc.wanglandau.wltools import convert_array, adapt_array, get_connection
 import time
 
 
@@ -15,7 +13,12 @@ class Histogram( object ):
         self.Emax = Emax
         self.histogram = np.zeros(self.Nbins, dtype=np.int32)
         self.logdos = np.zeros( self.Nbins )
-        self.growth_variance = np.zeros( self.Nbins )
+
+        # The growth variance is stored as a global offset (added to all bins
+        # on every update) plus a per-bin correction, such that an update
+        # costs O(1) instead of O(Nbins)
+        self._growth_var_offset = 0.0
+        self._growth_var_correction = np.zeros( self.Nbins )
         self.logger = logger
         self.largest_energy_ever = -np.inf
         self.smallest_energy_ever = np.inf
@@ -39,6 +42,18 @@ class Histogram( object ):
         """
         return int( (energy-self.Emin)*self.Nbins/(self.Emax-self.Emin) )
 
+    @property
+    def growth_variance( self ):
+        """
+        Returns the growth variance of all bins
+        """
+        return self._growth_var_offset + self._growth_var_correction
+
+    @growth_variance.setter
+    def growth_variance( self, value ):
+        self._growth_var_correction = np.array( value, dtype=np.float64 )
+        self._growth_var_offset = 0.0
+
     def update( self, selected_bin, mod_factor ):
         """
         Updates all quantities
@@ -46,8 +61,8 @@ class Histogram( object ):
         self.known_state[selected_bin] = 1
         self.histogram[selected_bin] += 1
         self.logdos[selected_bin] += mod_factor
-        self.growth_variance += self.Nbins**(-2)
-        self.growth_variance[selected_bin] += (1.0 - 2.0/self.Nbins)
+        self._growth_var_offset += self.Nbins**(-2)
+        self._growth_var_correction[selected_bin] += (1.0 - 2.0/self.Nbins)
 
     def update_range( self ):
         """
@@ -85,12 +100,9 @@ class Histogram( object ):
         Emax += eps
         old_E = np.linspace( self.Emin, self.Emax, self.Nbins )
         new_E = np.linspace( Emin, Emax, self.Nbins )
-        interp_hist = interpolate.interp1d( old_E, self.histogram, bounds_error=False, fill_value=0 )
-        new_hist = interp_hist(new_E)
-        interp_logdos = interpolate.interp1d( old_E, self.logdos, bounds_error=False, fill_value=0 )
-        new_logdos = interp_logdos(new_E)
-        interp_var = interpolate.interp1d( old_E, self.growth_variance, bounds_error=False, fill_value="extrapolate" )
-        self.growth_variance = interp_var( new_E )
+        new_hist = np.interp( new_E, old_E, self.histogram, left=0.0, right=0.0 )
+        new_logdos = np.interp( new_E, old_E, self.logdos, left=0.0, right=0.0 )
+        self.growth_variance = interp_extrapolate( new_E, old_E, self.growth_variance )
 
         # Scale
         if ( np.sum(new_hist) > 0 ):
@@ -99,12 +111,11 @@ class Histogram( object ):
             new_logdos *= np.sum(self.logdos)/np.sum(new_logdos)
         self.histogram = np.floor(new_hist).astype(np.int32)
         self.logdos = new_logdos
-        for i in range(len(self.histogram)):
-            if ( self.histogram[i] == 0 ):
-                # Set the DOS to 1 if the histogram indicates that it has never been visited
-                # This just an artifact of the interpolation and setting it low will make
-                # sure that these parts of the space gets explored
-                self.logdos[i] = 0.0
+
+        # Set the DOS to 1 if the histogram indicates that it has never been visited
+        # This just an artifact of the interpolation and setting it low will make
+        # sure that these parts of the space gets explored
+        self.logdos[self.histogram==0] = 0.0
         self.Emin = Emin
         self.Emax = Emax
 
@@ -127,18 +138,11 @@ class Histogram( object ):
             return False
 
         growth_fluct = self.get_growth_fluctuation()
-        converged = True
-        self.tot_number = 0
-        self.number_of_converged = 0
-        for i in range(len(self.histogram)):
-            if ( self.known_state[i] == 0 ):
-                continue
-            if ( self.histogram[i] <= factor*growth_fluct[i] ):
-                converged = False
-            else:
-                self.number_of_converged += 1
-            self.tot_number += 1
-        return converged
+        known = self.known_state == 1
+        above = self.histogram[known] > factor*growth_fluct[known]
+        self.tot_number = np.count_nonzero(known)
+        self.number_of_converged = np.count_nonzero(above)
+        return self.number_of_converged == self.tot_number
 
     def is_flat( self, criteria ):
         """
@@ -166,19 +170,18 @@ class Histogram( object ):
         """
         self.histogram[:] = 0
         self.logdos[:] = 0.0
-        self.growth_variance[:] = 0.0
+        self._growth_var_offset = 0.0
+        self._growth_var_correction[:] = 0.0
         self.known_state[:] = 0
 
     def load( self, db_name, uid ):
         """
         Loads results from a previuos run from the database
         """
-        conn = sq.connect( db_name )
-        cur = conn.cursor()
+        cur = get_connection( db_name ).cursor()
         sql = "select histogram,logdos,growth_variance,Emin,Emax,known_structures from simulations where uid=?"
         cur.execute( sql, (uid,) )
         entries = cur.fetchone()
-        conn.close()
 
         try:
             self.histogram = convert_array( entries[0] )
@@ -199,18 +202,13 @@ class Histogram( object ):
         """
         Stores all arrays to the database
         """
-        print (self.known_state)
-        conn = sq.connect( db_name )
-        cur = conn.cursor()
+        conn = get_connection( db_name )
         E = np.linspace( self.Emin, self.Emax, self.Nbins )
-        cur.execute( "update simulations set energy=? WHERE uid=?", (adapt_array(E),uid)  )
-        cur.execute( "update simulations set logdos=? WHERE uid=?", (adapt_array(self.logdos),uid)  )
-        cur.execute( "update simulations set histogram=? WHERE uid=?", (adapt_array(self.histogram),uid) )
-        cur.execute( "update simulations set growth_variance=? WHERE uid=?", (adapt_array(self.growth_variance),uid))
-        cur.execute( "update simulations set known_structures=? WHERE uid=?", (adapt_array(self.known_state),uid) )
-        cur.execute( "update simulations set Emin=?, Emax=? where uid=?", (self.Emin,self.Emax,uid) )
-        conn.commit()
-        conn.close()
+        sql = "update simulations set energy=?, logdos=?, histogram=?, growth_variance=?, known_structures=?, Emin=?, Emax=? WHERE uid=?"
+        with conn:
+            conn.execute( sql, (adapt_array(E), adapt_array(self.logdos), adapt_array(self.histogram),
+                                adapt_array(self.growth_variance), adapt_array(self.known_state),
+                                self.Emin, self.Emax, uid) )
 
     def plot( self ):
         """
@@ -236,3 +234,21 @@ class Histogram( object ):
         ax_growth.set_xlabel( "Energy (eV)" )
         ax_growth.set_ylabel ( "Growth fluctuaion" )
         return fig_hist,fig_dos,ax_growth
+
+
+def interp_extrapolate( x, xp, fp ):
+    """
+    Linear interpolation that extrapolates linearly outside the range of xp
+    (same as scipy.interpolate.interp1d with fill_value="extrapolate")
+    """
+    fp = np.asarray(fp)
+    y = np.interp( x, xp, fp )
+    if ( len(xp) < 2 ):
+        return y
+    below = x < xp[0]
+    slope = (fp[1]-fp[0])/(xp[1]-xp[0])
+    y[below] = fp[0] + slope*(x[below]-xp[0])
+    above = x > xp[-1]
+    slope = (fp[-1]-fp[-2])/(xp[-1]-xp[-2])
+    y[above] = fp[-1] + slope*(x[above]-xp[-1])
+    return y
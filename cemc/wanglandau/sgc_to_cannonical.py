@@ -13,6 +13,7 @@ class SGCToCanonicalConverter(object):
         self.chemical_potentials = None
         self.free_energies = None
         self.all_chem_pots = None
+        self._sgc_potentials = {}
         self.normalize_dos()
 
     def normalize_dos( self ):
@@ -24,6 +25,25 @@ class SGCToCanonicalConverter(object):
         for wl in self.wl_analyzers:
             #factor = 1.0
             wl.dos *= factor
+        self._sgc_potentials = {}
+
+    def precompute_sgc_potentials( self, temps ):
+        """
+        Evaluates the SGC potential of all DOS for all temperatures in one
+        batch per DOS. Later calls at these temperatures use the stored values
+        """
+        temps = np.atleast_1d(temps)
+        all_pots = np.array( [wl.free_energy(temps) for wl in self.wl_analyzers] )
+        for i, T in enumerate(temps):
+            self._sgc_potentials[float(T)] = all_pots[:,i]
+
+    def sgc_potentials( self, T ):
+        """
+        Returns the SGC potential of all DOS at temperature T
+        """
+        if ( float(T) not in self._sgc_potentials.keys() ):
+            self.precompute_sgc_potentials( [T] )
+        return self._sgc_potentials[float(T)]
 
 
     def hyper_surface_in_chemical_potential_space( self, T, points ):
@@ -57,11 +77,8 @@ class SGCToCanonicalConverter(object):
         """
         Computes the compositions. DOES NOT WORK AT THE MOMENT, HAS TO USE hyper_surface_in_chemical_potential_space
         """
-        chem_pots = []
-        thermo_potentials = []
-        for wl in self.wl_analyzers:
-            chem_pots.append(wl.chem_pot[element])
-            thermo_potentials.append( wl.free_energy(T) )
+        chem_pots = [wl.chem_pot[element] for wl in self.wl_analyzers]
+        thermo_potentials = list( self.sgc_potentials(T) )
 
         # Sort the chemical potentials
         sort_arg = np.argsort(chem_pots)
@@ -132,6 +149,7 @@ class SGCToCanonicalConverter(object):
         comps = []
         free_energies = []
         all_temps = []
+        self.precompute_sgc_potentials( T )
         for temp in T:
             self.get_compositions(temp)
             comps += list(self.composition[elm1])
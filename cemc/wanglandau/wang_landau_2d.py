@@ -0,0 +1,201 @@
+import numpy as np
+from ase import units
+from scipy.special import gammaln, logsumexp
+from cemc.wanglandau.wl_analyzer import WangLandauSGCAnalyzer
+try:
+    from cemc_cpp_code import PyWangLandau2DSampler
+    has_fast_wl_sampler = True
+except Exception as exc:
+    print(str(exc))
+    has_fast_wl_sampler = False
+
+
+class WangLandau2D(object):
+    """
+    Wang-Landau sampling of the joint density of states g(E, N), where N is
+    the number of solute atoms on the active sites. The sampler flips single
+    sites between the host and the solute, so one run covers all
+    compositions. Quantities at any temperature and chemical potential are
+    then obtained by reweighting instead of running one SGC simulation per
+    chemical potential.
+
+    :param Atoms atoms: Atoms object with a CE calculator attached
+    :param str host: Host element
+    :param str solute: Solute element
+    :param float Emin: Minimum energy of the histogram (total energy in eV)
+    :param float Emax: Maximum energy of the histogram (total energy in eV)
+    :param int n_energy_bins: Number of energy bins. The composition axis has
+        one bin per number of solute atoms
+    :param list site_indices: Sites that can change symbol. If not given all
+        sites occupied by the host or the solute are used
+    :param int seed: Seed for the random number generator
+    """
+    def __init__(self, atoms, host, solute, Emin, Emax, n_energy_bins=100,
+                 site_indices=None, seed=None):
+        self.atoms = atoms
+        self.host = host
+        self.solute = solute
+        self.Emin = Emin
+        self.Emax = Emax
+        self.n_energy_bins = n_energy_bins
+        if site_indices is None:
+            site_indices = [atom.index for atom in atoms
+                            if atom.symbol in [host, solute]]
+        self.site_indices = list(site_indices)
+        self.n_sites = len(self.site_indices)
+        if seed is None:
+            seed = np.random.randint(0, 2**31)
+        self.seed = seed
+
+        shape = (self.n_energy_bins, self.n_sites+1)
+        self.logdos = np.zeros(shape)
+        self.histogram = np.zeros(shape, dtype=int)
+        self.known_bins = np.zeros(shape, dtype=np.uint8)
+        self.converged = False
+
+    @property
+    def energy(self):
+        """Energy at the center of each energy bin."""
+        dE = (self.Emax - self.Emin)/self.n_energy_bins
+        return self.Emin + dE*(np.arange(self.n_energy_bins) + 0.5)
+
+    @property
+    def num_solute(self):
+        """Number of solute atoms corresponding to each composition bin."""
+        return np.arange(self.n_sites+1)
+
+    @property
+    def concentration(self):
+        """Solute concentration on the active sites of each composition bin."""
+        return self.num_solute/float(self.n_sites)
+
+    def run(self, maxsteps=10000000, f0=1.0, fmin=1E-6, flatness_criteria=0.8,
+            check_convergence_every=1000, schedule="flat_histogram",
+            schedule_params=None):
+        """
+        Run the native 2D Wang-Landau sampler
+
+        :param int maxsteps: Maximum number of MC steps
+        :param float f0: Initial modification factor
+        :param float fmin: The simulation stops when f < fmin
+        :param float flatness_criteria: The histogram is flat if the
+            minimum is larger than flatness_criteria times the mean of the
+            visited bins
+        :param int check_convergence_every: Number of steps between each
+            convergence check
+        :param str schedule: Modification factor schedule. One of
+            flat_histogram, inverse_time and samc
+            (see :py:meth:`cemc.wanglandau.WangLandau.run_fast_sampler`)
+        :param dict schedule_params: Parameters to the schedule
+            (gain and t0 for samc)
+        """
+        if not has_fast_wl_sampler:
+            raise ImportError("The fast WL sampler was not imported!")
+
+        calc = self.atoms.get_calculator()
+        BC = calc.BC
+        corrFunc = calc.updater.get_cf()
+        ecis = calc.eci
+        sampler = PyWangLandau2DSampler(self.atoms, BC, corrFunc, ecis,
+                                        self.site_indices, self.host,
+                                        self.solute, self.n_energy_bins,
+                                        self.Emin, self.Emax, self.seed)
+        sampler.f = f0
+        sampler.min_f = fmin
+        sampler.flatness_criteria = flatness_criteria
+        sampler.check_convergence_every = check_convergence_every
+        if schedule_params is None:
+            schedule_params = {}
+        sampler.set_schedule(schedule, **schedule_params)
+        sampler.run(maxsteps)
+
+        self.known_bins = sampler.get_known_bins()
+        self.logdos = sampler.get_logdos()
+        self.histogram = sampler.get_histogram()
+        self.converged = sampler.converged
+        self.normalize()
+
+    def normalize(self):
+        """
+        Normalize ln g(E, N) such that the sum over energies equals the
+        number of configurations with N solute atoms at each visited
+        composition
+        """
+        n = self.num_solute
+        log_configs = gammaln(self.n_sites+1) - gammaln(n+1) - \
+            gammaln(self.n_sites-n+1)
+        logdos = self._masked_logdos()
+        for i in range(self.n_sites+1):
+            if not np.any(self.known_bins[:, i]):
+                continue
+            shift = log_configs[i] - logsumexp(logdos[:, i])
+            self.logdos[:, i] += shift
+
+    def _masked_logdos(self):
+        """Return ln g where unvisited bins are set to -inf."""
+        logdos = np.array(self.logdos, dtype=np.float64)
+        logdos[self.known_bins == 0] = -np.inf
+        return logdos
+
+    def _log_sgc_weights(self, T, chem_pot):
+        """Return ln(g(E, N)*exp(-(E - mu*N)/kT))."""
+        beta = 1.0/(units.kB*T)
+        E_sgc = self.energy[:, np.newaxis] - chem_pot*self.num_solute
+        return self._masked_logdos() - beta*E_sgc
+
+    def canonical_free_energy(self, T):
+        """
+        Helmholtz free energy per atom at each composition
+
+        :param float T: Temperature in kelvin
+        :return: Free energy for each number of solute atoms
+            (NaN if the composition has not been visited)
+        :rtype: numpy.ndarray
+        """
+        beta = 1.0/(units.kB*T)
+        log_w = self._masked_logdos() - beta*self.energy[:, np.newaxis]
+        visited = np.any(self.known_bins, axis=0)
+        F = np.zeros(self.n_sites+1) + np.nan
+        F[visited] = -logsumexp(log_w[:, visited], axis=0)/beta
+        return F/len(self.atoms)
+
+    def sgc_free_energy(self, T, chem_pot):
+        """
+        Semi-grand canonical potential per atom
+
+        :param float T: Temperature in kelvin
+        :param float chem_pot: Chemical potential of the solute (relative
+            to the host) in eV
+        """
+        beta = 1.0/(units.kB*T)
+        log_w = self._log_sgc_weights(T, chem_pot)
+        return -logsumexp(log_w)/(beta*len(self.atoms))
+
+    def average_concentration(self, T, chem_pot):
+        """
+        Average solute concentration on the active sites
+
+        :param float T: Temperature in kelvin
+        :param float chem_pot: Chemical potential of the solute in eV
+        """
+        log_w = self._log_sgc_weights(T, chem_pot)
+        log_w_n = logsumexp(log_w, axis=0)
+        prob = np.exp(log_w_n - logsumexp(log_w_n))
+        return prob.dot(self.concentration)
+
+    def sgc_analyzer(self, chem_pot):
+        """
+        Project the joint DOS onto the semi-grand canonical energy
+        E - mu*N and return an analyzer for this chemical potential
+
+        :param float chem_pot: Chemical potential of the solute in eV
+        :rtype: :py:class:`cemc.wanglandau.wl_analyzer.WangLandauSGCAnalyzer`
+        """
+        E_sgc = self.energy[:, np.newaxis] - chem_pot*self.num_solute
+        known = self.known_bins == 1
+        E_sgc = E_sgc[known]
+        logdos = self.logdos[known]
+        srt = np.argsort(E_sgc)
+        return WangLandauSGCAnalyzer(E_sgc[srt], None, self.atoms.numbers,
+                                     chem_pot={self.solute: chem_pot},
+                                     logdos=logdos[srt])
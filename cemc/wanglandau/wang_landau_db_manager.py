@@ -1,4 +1,3 @@
-import sqlite3 as sq
 import numpy as np
 from cemc.wanglandau.wl_analyzer import WangLandauSGCAnalyzer
 from cemc.wanglandau import wltools
@@ -10,8 +9,24 @@ import copy
 class WangLandauDBManager( object ):
     def __init__( self, db_name ):
         self.db_name = db_name
+        self._ase_db = None
         self.check_db()
 
+    def _connection( self ):
+        """
+        Returns the pooled connection to the database
+        """
+        return wltools.get_connection( self.db_name )
+
+    @property
+    def ase_db( self ):
+        """
+        ASE database holding the structures (opened once)
+        """
+        if ( self._ase_db is None ):
+            self._ase_db = connect( self.db_name )
+        return self._ase_db
+
     def check_db( self ):
         """
         Checks if the database has the correct format and updates it if not
@@ -49,7 +64,7 @@ class WangLandauDBManager( object ):
             "known_structures":"blob"
         }
 
-        conn = sq.connect( self.db_name )
+        conn = self._connection()
         cur = conn.cursor()
 
         default_values = {
@@ -59,107 +74,94 @@ class WangLandauDBManager( object ):
         for tabname in required_tables:
             sql = "create table if not exists %s (uid integer)"%(tabname)
             cur.execute(sql)
-        conn.commit()
 
         # Check if the tables has the required fields
         for tabname in required_tables:
+            cur.execute( "PRAGMA table_info(%s)"%(tabname) )
+            existing = [entry[1] for entry in cur.fetchall()]
             for col in required_fields[tabname]:
-                try:
-                    sql = "alter table %s add column %s %s"%(tabname, col, types[col] )
-                    if ( col in default_values ):
-                        sql += " DEFAULT({})".format(default_values[col])
-                    cur.execute( sql )
-                except Exception as exc:
-                    pass
+                if ( col in existing ):
+                    continue
+                sql = "alter table %s add column %s %s"%(tabname, col, types[col] )
+                if ( col in default_values ):
+                    sql += " DEFAULT({})".format(default_values[col])
+                cur.execute( sql )
+        cur.execute( "create index if not exists simulations_atomID on simulations (atomID, converged)" )
         conn.commit()
-        conn.close()
 
     def get_new_id( self ):
         """
         Get new ID in the simulations table
         """
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
-        cur.execute("SELECT uid FROM simulations")
-        ids = list(cur.fetchall())
-        ids = [item[0] for item in ids]
-        conn.close()
-        print(ids)
-        if len(ids) == 0:
+        cur = self._connection().cursor()
+        cur.execute("SELECT MAX(uid) FROM simulations")
+        max_id = cur.fetchone()[0]
+        if max_id is None:
             return 0
-        return np.max(ids)+1
+        return max_id+1
 
     def prepare_from_ground_states( self, Tmax=300.0, initial_f=2.71, fmin=1E-8, flatness=0.8, Nbins=50, n_kbT=20 ):
         """
         Create one Wang-Landau simulation from all ground state structures
         """
         # Extract all atomsIDs already in the database
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
-        cur.execute( "SELECT atomID FROM simulations" )
-        entries = cur.fetchall()
-        conn.close()
-        atIds = [entry[0] for entry in entries]
-
-        db = connect( self.db_name )
-        for row in db.select():
-            if ( row.id in atIds[0] ):
-                continue
-            self.insert(
-                row.id, Tmax, initial_f=initial_f, fmin=fmin,
-                flatness=flatness, Nbins=Nbins, n_kbT=n_kbT)
+        cur = self._connection().cursor()
+        cur.execute( "SELECT DISTINCT atomID FROM simulations" )
+        atIds = set( entry[0] for entry in cur.fetchall() )
+
+        new_ids = [row.id for row in self.ase_db.select() if row.id not in atIds]
+        self.insert_many( new_ids, initial_f=initial_f, fmin=fmin,
+                          flatness=flatness, Nbins=Nbins )
 
     def exists_in_db( self, atomID ):
         """
         Check if the object is already present in the database
         """
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
-        cur.execute( "SELECT atomID FROM simulations" )
-        entries = cur.fetchall()
-        conn.close()
-        exists = False
-        for atID in entries:
-            if ( atomID == atID[0] ):
-                return True
-        return False
+        cur = self._connection().cursor()
+        cur.execute( "SELECT 1 FROM simulations WHERE atomID=? LIMIT 1", (atomID,) )
+        return cur.fetchone() is not None
 
 
     def insert( self, atomID, initial_f=2.71, fmin=1E-8, flatness=0.8, Nbins=50, Emin=0.0, Emax=1.0, only_new=True ):
         """
         Insert a new entry into the database
         """
-        newID = self.get_new_id()
         if ( self.exists_in_db(atomID) and only_new ):
             print ("A WL simulation of the atomID already exists in the database" )
             return
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
-        cur.execute( "insert into simulations (uid,initial_f,current_f,flatness,fmin,queued,Nbins,atomID) values (?,?,?,?,?,?,?,?)",
-        (newID, initial_f,initial_f,flatness,fmin,0,Nbins,atomID) )
-        cur.execute( "update simulations set initialized=? where uid=?", (0,newID) )
-        cur.execute( "update simulations set n_iter=? where uid=?", (1,newID) )
-        conn.commit()
+        self.insert_many( [atomID], initial_f=initial_f, fmin=fmin, flatness=flatness,
+                          Nbins=Nbins, Emin=Emin, Emax=Emax, only_new=False )
 
-        cur.execute( "update simulations set Emin=?, Emax=? where uid=?",(Emin,Emax,newID))
-        E = np.linspace( Emin,Emax+1E-8,Nbins )
-        cur.execute( "update simulations set energy=? where uid=?", (wltools.adapt_array(E),newID) )
-        cur.execute( "update simulations set initialized=? where uid=?", (1,newID) )
-        conn.commit()
-        conn.close()
+    def insert_many( self, atomIDs, initial_f=2.71, fmin=1E-8, flatness=0.8, Nbins=50, Emin=0.0, Emax=1.0, only_new=True ):
+        """
+        Insert one new entry for each atomID in a single transaction
+        """
+        if ( only_new ):
+            atomIDs = [atID for atID in atomIDs if not self.exists_in_db(atID)]
+        if ( len(atomIDs) == 0 ):
+            return
+
+        newID = self.get_new_id()
+        E = wltools.adapt_array( np.linspace( Emin,Emax+1E-8,Nbins ) )
+        rows = [(newID+i,initial_f,initial_f,flatness,fmin,0,Nbins,atID,1,1,Emin,Emax,E)
+                for i, atID in enumerate(atomIDs)]
+        conn = self._connection()
+        with conn:
+            conn.executemany( "insert into simulations (uid,initial_f,current_f,flatness,fmin,queued,Nbins,atomID,"
+                              "initialized,n_iter,Emin,Emax,energy) values (?,?,?,?,?,?,?,?,?,?,?,?,?)", rows )
 
     def get_energy_range( self, atomID, Tmax, n_kbT ):
         """
         Computes the energy range based on the ground state of the atom
         """
-        db = connect( self.db_name )
+        db = self.ase_db
         try:
             row = db.get( id=atomID )
             elms = row.data.elements
             chem_pot = row.data.chemical_potentials
             Emin = row.energy
             chem_pot = wltools.key_value_lists_to_dict( elms, chem_pot )
-            at_count = wltools.element_count( db.get_atoms(id=atomID) )
+            at_count = wltools.element_count( row.toatoms() )
 
 
             for key,value in chem_pot.items():
@@ -177,33 +179,28 @@ class WangLandauDBManager( object ):
         """
         Adds a run to a group
         """
-        conn = sq.connect( self.db_name )
+        conn = self._connection()
         cur = conn.cursor()
         cur.execute( "SELECT uid,initial_f,current_f,flatness,fmin,queued,Nbins,atomID,Emin,Emax,initialized,energy,gs_energy FROM simulations WHERE atomID=?", (atomID,))
-        entries = cur.fetchone()
-        oldID = int(entries[0])
+        entries = list( cur.fetchone() )
         newID = self.get_new_id()
-        entries = list(entries)
 
-        for _ in range(n_entries):
-            entries[0] = newID
+        rows = []
+        for i in range(n_entries):
+            entries[0] = newID+i
             entries[7] = atomID
             entries[5] = 0 # Set queued flag to 0
-            entries = tuple(entries)
-            cur.execute( "INSERT INTO simulations (uid,initial_f,current_f,flatness,fmin,queued,Nbins,atomID,Emin,Emax,initialized,energy,gs_energy) values (?,?,?,?,?,?,?,?,?,?,?,?,?)", entries )
-            entries = list(entries)
-            newID += 1
-        conn.commit()
-        conn.close()
+            rows.append( tuple(entries) )
+        with conn:
+            conn.executemany( "INSERT INTO simulations (uid,initial_f,current_f,flatness,fmin,queued,Nbins,atomID,Emin,Emax,initialized,energy,gs_energy) values (?,?,?,?,?,?,?,?,?,?,?,?,?)", rows )
 
     def get_converged_wl_objects( self, atoms, calc ):
         """
         Get a list of all converged Wang-Landau simulations
         """
-        conn = sq.connect( self.db_name )
+        cur = self._connection().cursor()
         cur.execute( "SELECT UID FROM simulations WHERE converged=1" )
         uids = cur.fetchall()
-        conn.close()
         return self.get_wl_objects( atoms, calc, uids )
 
     def get_wl_objects( self, atoms, calc, uids ):
@@ -214,20 +211,31 @@ class WangLandauDBManager( object ):
         for uid in uids:
             objs.append( WangLandauSGC( atoms, calc, self.db_name, uid ) )
 
-    def get_analyzer( self, atomID, min_number_of_converged=1 ):
+    def _load_converged_runs( self, atomID=None ):
         """
-        Returns a Wang-Landau Analyzer object based on the average of all converged runs
-        within a atomID
+        Loads all converged runs (of one atomID, or of all if atomID is None)
+        in one query. Returns a dictionary where the key is the atomID.
         """
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
-        cur.execute( "SELECT energy,logdos,uid,ensemble,known_structures FROM simulations WHERE converged=1 AND atomID=?", (atomID,) )
-        entries = cur.fetchall()
-        conn.close()
+        sql = "SELECT atomID,energy,logdos,uid,ensemble,known_structures FROM simulations WHERE converged=1"
+        args = ()
+        if ( atomID is not None ):
+            sql += " AND atomID=?"
+            args = (atomID,)
+        cur = self._connection().cursor()
+        cur.execute( sql, args )
 
-        if ( len(entries) == 0 ):
-            return None
+        runs = {}
+        for entry in cur.fetchall():
+            runs.setdefault( entry[0], [] ).append( entry[1:] )
+        return runs
+
+    def _build_analyzer( self, row, entries ):
+        """
+        Averages the DOS of all runs of one atomID and returns an analyzer
+        """
         all_logdos = None
+        num_runs = 0
+        chem_pot = None
         for entry in entries:
             try:
                 uid = int( entry[2] )
@@ -240,42 +248,49 @@ class WangLandauDBManager( object ):
 
             logdos = logdos[known_states==1]
             energy = energy[known_states==1]
-            #plt.plot(logdos,ls="steps")
-            #plt.show()
             logdos -= np.max(logdos) # Avoid overflow
             logdos += 10.0
-            ref_e0 = logdos[0]
             if ( all_logdos is None ):
                 all_logdos = copy.deepcopy( logdos )
             else:
                 all_logdos += logdos
+            num_runs += 1
 
             if ( ensemble == "canonical" ):
                 chem_pot = None
             elif ( ensemble == "semi-grand-canonical" ):
-                db = connect( self.db_name )
-                row = db.get( id=atomID )
                 elms = row.data.elements
                 pots = row.data.chemical_potentials
                 chem_pot = wltools.key_value_lists_to_dict( elms, pots )
-                gs_atoms = db.get_atoms( id=atomID )
-                count = wltools.element_count(gs_atoms)
             else:
                 raise ValueError( "Unknown statistical ensemble. Got {}".format(ensemble) )
 
-        db = connect( self.db_name )
-        row = db.get(id=atomID)
-        dos = np.exp(all_logdos/len(entries))
-        return WangLandauSGCAnalyzer( energy, dos, row.numbers, chem_pot=chem_pot )
+        if ( num_runs == 0 ):
+            return None
+        return WangLandauSGCAnalyzer( energy, None, row.numbers, chem_pot=chem_pot,
+                                      logdos=all_logdos/num_runs )
+
+    def get_analyzer( self, atomID, min_number_of_converged=1 ):
+        """
+        Returns a Wang-Landau Analyzer object based on the average of all converged runs
+        within a atomID
+        """
+        runs = self._load_converged_runs( atomID=atomID )
+        if ( atomID not in runs.keys() ):
+            return None
+        row = self.ase_db.get( id=atomID )
+        return self._build_analyzer( row, runs[atomID] )
 
     def get_analyzer_all_groups( self  ):
         """
         Returns a list of analyzer objects
         """
+        runs = self._load_converged_runs()
         analyzers = []
-        db = connect( self.db_name )
-        for row in db.select():
-            new_analyzer = self.get_analyzer( row.id )
+        for row in self.ase_db.select():
+            if ( row.id not in runs.keys() ):
+                continue
+            new_analyzer = self._build_analyzer( row, runs[row.id] )
             analyzers.append( new_analyzer )
         filtered = [entry for entry in analyzers if not entry is None] # Remove non-converged entries
         return filtered
@@ -284,11 +299,9 @@ class WangLandauDBManager( object ):
         """
         Returns the UID of the next non-converged entry
         """
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
+        cur = self._connection().cursor()
         cur.execute( "SELECT uid FROM simulations WHERE atomID=? AND converged=?",(atomID,0) )
-        next_uid = cur.fetchone()[0]
-        conn.close()
-        if ( next_uid is None ):
+        entry = cur.fetchone()
+        if ( entry is None or entry[0] is None ):
             return -1
-        return next_uid
+        return entry[0]
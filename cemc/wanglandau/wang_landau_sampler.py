@@ -5,8 +5,8 @@ import ase.units as units
 from scipy import interpolate
 import copy
 import json
-import sqlite3 as sq
 import io
+import os
 from ase.db import connect
 from ase.visualize import view
 from cemc.wanglandau.mod_factor_updater import ModificationFactorUpdater
@@ -17,6 +17,7 @@ from cemc.wanglandau.settings import SimulationState
 import logging
 import time
 from cemc.wanglandau.histogram import Histogram
+from cemc.wanglandau import wltools
 from ase import units
 from cemc import CE
 try:
@@ -196,11 +197,9 @@ class WangLandau( object ):
         """
         Reads the entries from a database
         """
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
+        cur = wltools.get_connection( self.db_name ).cursor()
         cur.execute( "SELECT fmin,current_f,initial_f,queued,initialized,atomID,n_iter from simulations where uid=?", (self.db_id,) )
         entries = cur.fetchone()
-        conn.close()
 
         #self.fmin = float( entries[0] )
         self.f = float( entries[1] )
@@ -221,7 +220,6 @@ class WangLandau( object ):
 
         self.histogram.load( self.db_name, self.db_id )
         try:
-            row = db.get( id=atomID )
             elms = row.data.elements
             chem_pot = row.data.chemical_potentials
             self.chem_pot = dict(zip(elms,chem_pot))
@@ -381,16 +379,10 @@ class WangLandau( object ):
         Updates the database with the entries
         """
         self.histogram.save( self.db_name, self.db_id )
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
-
-        cur.execute( "update simulations set fmin=?, current_f=?, initial_f=?, converged=? where uid=?", (self.fmin,self.f,self.f0,self.converged,self.db_id) )
-        cur.execute( "update simulations set initialized=? where uid=?", (1,self.db_id) )
-        cur.execute( "update simulations set gs_energy=? where uid=?", (self.smallest_energy_ever,self.db_id))
-        cur.execute( "update simulations set n_iter=? where uid=?", (self.iter,self.db_id) )
-        cur.execute( "update simulations set ensemble=? where uid=?", (self.ensemble,self.db_id))
-        conn.commit()
-        conn.close()
+        conn = wltools.get_connection( self.db_name )
+        with conn:
+            conn.execute( "update simulations set fmin=?, current_f=?, initial_f=?, converged=?, initialized=?, gs_energy=?, n_iter=?, ensemble=? where uid=?",
+                          (self.fmin,self.f,self.f0,self.converged,1,self.smallest_energy_ever,self.iter,self.ensemble,self.db_id) )
         self.logger.info( "Results saved to database {} with ID {}".format(self.db_name,self.db_id) )
 
 
@@ -414,11 +406,9 @@ class WangLandau( object ):
         """
         Sets the queued flag to true in the database
         """
-        conn = sq.connect( self.db_name )
-        cur = conn.cursor()
-        cur.execute( "UPDATE simulations set queued=1 WHERE uid=?", (self.db_id,) )
-        conn.commit()
-        conn.close()
+        conn = wltools.get_connection( self.db_name )
+        with conn:
+            conn.execute( "UPDATE simulations set queued=1 WHERE uid=?", (self.db_id,) )
 
     def has_converged( self ):
         """
@@ -447,11 +437,63 @@ class WangLandau( object ):
         self.logger.info("Selected range: Emin: {}, Emax: {}".format(self.histogram.Emin,self.histogram.Emax))
         self.histogram.clear()
 
-    def run_fast_sampler( self, maxsteps=10000000, mode="regular", minimum_window_width=10, sub_bin_file="subbin.csv" ):
+    def run_fast_sampler( self, maxsteps=10000000, mode="regular", minimum_window_width=10, sub_bin_file="subbin.csv",
+                          num_windows=4, window_overlap=0.75, exchange_every=100, schedule="flat_histogram",
+                          schedule_params=None, convergence_log="", reference_logdos=None,
+                          checkpoint="", checkpoint_every=3600.0, seed=None ):
+        """
+        Run the WL sampler implemented in C++. Both the canonical and the
+        semi-grand-canonical ensemble are supported. In the semi-grand-canonical
+        ensemble single sites are flipped and the energy is E - sum_s mu_s*N_s
+
+        Parameters
+        -----------
+        maxsteps - Maximum number of MC steps
+        mode - regular: all threads update one shared histogram
+               adaptive_windows: the energy range is gradually reduced as the low energy part converges
+               replica_exchange: replica exchange Wang-Landau (Vogel et al. PRL 110, 210603 (2013)).
+                                 The energy range is divided into num_windows overlapping windows, each having its own
+                                 walkers and DOS. Neighbouring windows exchange configurations and the DOS of the windows
+                                 are joined at the end
+        minimum_window_width - Minimum number of bins in a window (only relevant if mode is adaptive_windows)
+        sub_bin_file - File where the sub bin distribution is stored
+        num_windows - Number of energy windows (only relevant if mode is replica_exchange)
+        window_overlap - Fraction of a window that overlaps with its neighbour (only relevant if mode is replica_exchange)
+        exchange_every - Number of MC steps per walker between each configuration exchange
+                         (only relevant if mode is replica_exchange)
+        schedule - How the modification factor is updated
+                   flat_histogram - divide f by 2 when the histogram is flat
+                   inverse_time - flat histogram stages until f < 1/t, then f = 1/t (Belardinelli and Pereyra)
+                   samc - f = gain*t0/max(t0,t) (stochastic approximation Monte Carlo)
+                   tunnelling - divide f by 2 when the walkers have made a given number of round trips
+                                between the lowest and highest energies (no flatness check)
+        schedule_params - Dictionary with parameters to the schedule. gain and t0 for samc and
+                          round_trips (per walker) for tunnelling. In replica_exchange mode each
+                          window has its own copy of the schedule
+        convergence_log - If given, the MC time, f, the flatness of the histogram and the
+                          change in log g since the previous check are written to this file
+                          at each convergence check
+        reference_logdos - Reference (i.e. exact) log g on the same energy grid. If given, the
+                           error in log g is also written to the convergence log
+        checkpoint - If given, the complete state of the sampler (configuration of all walkers,
+                     random number generator states, histogram, logdos, f and the window state)
+                     is written to this binary file. If the file already exists the sampler is
+                     restarted from it. Restart with the same number of OpenMP threads.
+                     Not supported for replica_exchange
+        checkpoint_every - Wall clock time in seconds between each checkpoint
+        seed - Seed for the random number generators. Each thread (walker) draws from an
+               independent stream derived from the seed, such that runs with the same seed and
+               the same number of threads are reproducible. If not given, a random seed is used
+
+        Returns
+        --------
+        The native sampler. The state of each walker can be inspected with
+        get_walker_symbols and get_walker_ce_energy
+        """
         if ( not has_fast_wl_sampler ):
             raise ImportError( "The fast WL sampler was not imported!" )
 
-        allowed_modes = ["regular","adaptive_windows"]
+        allowed_modes = ["regular","adaptive_windows","replica_exchange"]
         if ( not mode in allowed_modes ):
             raise ValueError( "Unknown mode. Has to one of {}".format(allowed_modes) )
         BC = self.atoms._calc.BC
@@ -460,13 +502,32 @@ class WangLandau( object ):
 
         fast_wl_sampler = PyWangLandauSampler(self.atoms, BC, corrFunc, ecis, self)
 
+        # Seed before the mode is set up, as the walkers are moved into
+        # their windows when replica exchange is activated
+        if ( seed is not None ):
+            fast_wl_sampler.set_seed( seed )
         if ( mode == "adaptive_windows" ):
             fast_wl_sampler.use_adaptive_windows( minimum_window_width )
+        elif ( mode == "replica_exchange" ):
+            fast_wl_sampler.use_replica_exchange( num_windows, window_overlap, exchange_every )
         fast_wl_sampler.use_inverse_time_algorithm = False
+        if ( schedule_params is None ):
+            schedule_params = {}
+        fast_wl_sampler.set_schedule( schedule, **schedule_params )
+        if ( convergence_log != "" ):
+            fast_wl_sampler.set_convergence_log( convergence_log )
+        if ( reference_logdos is not None ):
+            fast_wl_sampler.set_reference_logdos( np.array(reference_logdos,dtype=np.float64).tolist() )
+        if ( checkpoint != "" ):
+            if ( os.path.exists(checkpoint) ):
+                self.logger.info( "Restarting from checkpoint {}".format(checkpoint) )
+                fast_wl_sampler.load_checkpoint( checkpoint )
+            fast_wl_sampler.set_checkpoint( checkpoint, checkpoint_every )
         fast_wl_sampler.run( maxsteps )
         fast_wl_sampler.save_sub_bin_distribution( sub_bin_file )
         self.logger.info( "Fast WL sampler finished" )
         np.savetxt( "data/histogram%d.txt"%(int(10000*self.f)), self.histogram.histogram )
+        return fast_wl_sampler
 
     def run( self, maxsteps=10000000 ):
         if ( self.initialized == 0 ):
@@ -1,16 +1,25 @@
 from ase import units
 import numpy as np
 from scipy.stats import linregress
+from scipy.special import logsumexp
 from cemc.wanglandau.wltools import get_formula
-from scipy.stats import linregress
 
 class WangLandauSGCAnalyzer( object ):
-    def __init__( self, energy, dos, atomic_numbers, chem_pot=None ):
+    def __init__( self, energy, dos, atomic_numbers, chem_pot=None, logdos=None ):
         """
         Object for analyzing thermodynamics from the Density of States in the
         Semi Grand Cannonical Ensemble
+
+        If logdos is given, dos is ignored. The DOS is then stored as
+        exp(logdos - max(logdos)) together with the shift, such that a
+        large ln g does not overflow
         """
-        self.E = energy
+        self.E = np.array(energy, dtype=np.float64)
+        self.log_dos_shift = 0.0
+        if ( logdos is not None ):
+            logdos = np.array(logdos, dtype=np.float64)
+            self.log_dos_shift = np.max(logdos)
+            dos = np.exp(logdos - self.log_dos_shift)
         self.dos = dos
         self.E0 = np.min(self.E)
         self.chem_pot = chem_pot
@@ -35,8 +44,18 @@ class WangLandauSGCAnalyzer( object ):
         log_configs = N*np.log(N)-N
         for key,value in elm_count.items():
             log_configs -= (value*np.log(value)-value)
-        factor = np.exp( log_configs - np.log(sumDos) )
-        self.dos *= factor
+
+        # The normalization is stored in the shift such that a large
+        # number of configurations does not overflow
+        self.log_dos_shift = log_configs - np.log(sumDos)
+
+    @property
+    def logdos( self ):
+        """
+        Returns ln g(E)
+        """
+        with np.errstate(divide="ignore"):
+            return np.log(self.dos) + self.log_dos_shift
 
     def get_chemical_formula( self ):
         """
@@ -59,11 +78,57 @@ class WangLandauSGCAnalyzer( object ):
         self.E = np.append(low_energies,self.E)
         self.dos = np.append(low_energy_dos,self.dos)
 
+    def _log_weights( self, temps ):
+        """
+        Returns the (nT x nE) matrix ln g(E) - (E-E0)/kT
+        """
+        beta = 1.0/(units.kB*np.atleast_1d(temps))
+        return self.logdos[np.newaxis,:] - np.outer(beta, self.E-self.E0)
+
+    def thermodynamic_quantities( self, temps ):
+        """
+        Evaluates all thermodynamic quantities for an array of temperatures
+        in one pass. The sums are evaluated with log-sum-exp, such that the
+        results are stable at low temperatures and for large ln g
+
+        Returns a dictionary with the arrays temperature,
+        log_partition_function (ln Z with the energy measured from E0),
+        internal_energy, heat_capacity, free_energy and entropy (all per atom)
+        """
+        temps = np.atleast_1d(np.array(temps, dtype=np.float64))
+        log_w = self._log_weights(temps)
+        log_z = logsumexp(log_w, axis=1)
+        prob = np.exp(log_w - log_z[:,np.newaxis])
+        mean = prob.dot(self.E)
+        dE = self.E[np.newaxis,:] - mean[:,np.newaxis]
+        var = np.sum(prob*dE**2, axis=1)
+
+        U = mean/self.n_atoms
+        F = (-units.kB*temps*log_z + self.E0)/self.n_atoms
+        quantities = {
+            "temperature": temps,
+            "log_partition_function": log_z,
+            "internal_energy": U,
+            "heat_capacity": var/(self.n_atoms*units.kB*temps**2),
+            "free_energy": F,
+            "entropy": (U-F)/temps
+        }
+        return quantities
+
+    def _quantity( self, name, T ):
+        """
+        Returns one quantity as a scalar if T is a scalar, otherwise as an array
+        """
+        value = self.thermodynamic_quantities(T)[name]
+        if ( np.isscalar(T) ):
+            return value[0]
+        return value
+
     def partition_function( self, T ):
         """
         Computes the partition function in the SGC ensemble
         """
-        return np.sum( self.dos*self._boltzmann_factor(T) )
+        return np.exp( self._quantity("log_partition_function", T) )
 
     def _boltzmann_factor( self, T ):
         """
@@ -75,30 +140,25 @@ class WangLandauSGCAnalyzer( object ):
         """
         Computes the average energy in the SGC ensemble
         """
-        return np.sum( self.E*self.dos*self._boltzmann_factor(T) )/(self.partition_function(T)*self.n_atoms)
+        return self._quantity( "internal_energy", T )
 
     def heat_capacity( self, T ):
         """
         Computes the heat capacity in the SGC ensemble
         """
-        e_mean = np.sum(self.E *self.dos*self._boltzmann_factor(T) )/(self.partition_function(T))
-        esq = np.sum(self.E**2 *self.dos*self._boltzmann_factor(T) )/(self.partition_function(T))
-        return (esq-e_mean**2)/(self.n_atoms*units.kB*T**2)
+        return self._quantity( "heat_capacity", T )
 
     def free_energy( self, T ):
         """
         The thermodynamic potential in the SGC ensemble
         """
-        return (-units.kB*T*np.log(self.partition_function(T)) + self.E0)/self.n_atoms
+        return self._quantity( "free_energy", T )
 
     def entropy( self, T ):
         """
         Computes the entropy of the system
         """
-        F = self.free_energy(T)
-        U = self.internal_energy(T)
-        S = (U-F)/T
-        return S
+        return self._quantity( "entropy", T )
 
     def plot_dos( self, fit="none", fig=None ):
         """
@@ -113,9 +173,9 @@ class WangLandauSGCAnalyzer( object ):
             ax = fig.axes[0]
 
         if ( np.sum(self.poly_tail) == 0 ):
-            ax.plot( x, np.log(self.dos), ls="steps" )
+            ax.plot( x, self.logdos, ls="steps" )
         else:
-            logdos = np.log(self.dos)
+            logdos = self.logdos
             data_c = logdos[self.poly_tail==0].tolist()
             x_c = x[self.poly_tail==0].tolist()
             ax.plot( x_c, data_c, ls="steps" )
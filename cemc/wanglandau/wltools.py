@@ -1,19 +1,69 @@
 import io
+import os
+import threading
 import numpy as np
 import sqlite3 as sq
 from ase.data import chemical_symbols
 
+# Arrays are stored as a typed binary column: a magic string, the dtype
+# (padded to 8 bytes) and the raw little endian data of the flattened array
+ARRAY_MAGIC = b"WLARR1"
+DTYPE_WIDTH = 8
+
 def adapt_array(arr):
-    out = io.BytesIO()
-    np.save(out,arr)
-    out.seek(0)
-    return sq.Binary(out.read())
+    arr = np.ascontiguousarray(arr)
+    dtype = arr.dtype.newbyteorder("<")
+    dtype_str = dtype.str.encode("ascii").ljust(DTYPE_WIDTH)
+    data = arr.astype(dtype, copy=False).tobytes()
+    return sq.Binary(ARRAY_MAGIC + dtype_str + data)
 
 def convert_array(text):
+    text = bytes(text)
+    if ( text.startswith(ARRAY_MAGIC) ):
+        start = len(ARRAY_MAGIC)
+        dtype = np.dtype(text[start:start+DTYPE_WIDTH].strip().decode("ascii"))
+        return np.frombuffer(text, dtype=dtype, offset=start+DTYPE_WIDTH).copy()
+
+    # Arrays stored with np.save by earlier versions
     out = io.BytesIO(text)
     out.seek(0)
     return np.load(out)
 
+_connection_pool = {}
+
+def get_connection(db_name):
+    """
+    Returns a pooled connection to the database (one per process and thread).
+    The database is put in WAL mode, such that readers do not block
+    the writers.
+    """
+    key = (os.path.abspath(db_name), os.getpid(), threading.current_thread().ident)
+    inode = os.stat(db_name).st_ino if os.path.exists(db_name) else None
+    if ( key in _connection_pool ):
+        conn, pooled_inode = _connection_pool[key]
+        if ( inode is not None and inode == pooled_inode ):
+            return conn
+
+        # The file has been removed or replaced
+        conn.close()
+        del _connection_pool[key]
+
+    conn = sq.connect(db_name)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _connection_pool[key] = (conn, os.stat(db_name).st_ino)
+    return conn
+
+def close_connections(db_name=None):
+    """
+    Closes the pooled connections (to db_name only, if given)
+    """
+    for key in list(_connection_pool.keys()):
+        if ( db_name is not None and key[0] != os.path.abspath(db_name) ):
+            continue
+        _connection_pool[key][0].close()
+        del _connection_pool[key]
+
 def key_value_lists_to_dict( keys, values ):
     dictionary = {}
     for i in range(len(keys)):
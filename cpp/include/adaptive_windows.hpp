@@ -35,6 +35,9 @@ public:
   /** Updates the historam */
   virtual void update( unsigned int bin, double modfactor ) override;
 
+  /** Stores a copy of the state the first time a bin is visited */
+  virtual void register_visit( unsigned int bin ) override;
+
   /** Shifts the DOS to be continous at the window edges. TODO: Is not completely correct implemented */
   void make_dos_continous();
 
@@ -55,6 +58,12 @@ public:
 
   /** Update the number of bins that should be ignored when checking for convergence */
   virtual void set_overlap( unsigned int new_buffer ) override { n_overlap=new_buffer; };
+
+  /** Writes the histogram and the window state to a binary stream */
+  virtual void write_state( std::ostream &out ) const override;
+
+  /** Reads a state written by write_state */
+  virtual void read_state( std::istream &in ) override;
 private:
   /** Stores a copy of the updater states of the Wang Landau Sampler */
   void get_updater_states();
@@ -0,0 +1,119 @@
+#ifndef BINARY_IO_H
+#define BINARY_IO_H
+#include <iostream>
+#include <vector>
+#include <string>
+#include <map>
+#include <stdexcept>
+
+/**
+Helpers for writing and reading the native checkpoint files.
+Plain old data is written in the native byte order, containers are
+prefixed with their size.
+*/
+namespace binary_io
+{
+  template<class T>
+  void write( std::ostream &out, const T &value )
+  {
+    out.write( reinterpret_cast<const char*>(&value), sizeof(T) );
+  }
+
+  template<class T>
+  void read( std::istream &in, T &value )
+  {
+    in.read( reinterpret_cast<char*>(&value), sizeof(T) );
+    if ( !in.good() )
+    {
+      throw std::runtime_error( "Unexpected end of checkpoint file!" );
+    }
+  }
+
+  inline void write( std::ostream &out, const std::string &value )
+  {
+    write( out, static_cast<unsigned int>(value.size()) );
+    out.write( value.data(), value.size() );
+  }
+
+  inline void read( std::istream &in, std::string &value )
+  {
+    unsigned int size;
+    read( in, size );
+    value.resize( size );
+    if ( size > 0 ) in.read( &value[0], size );
+    if ( !in.good() )
+    {
+      throw std::runtime_error( "Unexpected end of checkpoint file!" );
+    }
+  }
+
+  inline void write( std::ostream &out, const std::vector<bool> &vec )
+  {
+    write( out, static_cast<unsigned int>(vec.size()) );
+    for ( bool value : vec )
+    {
+      write( out, static_cast<char>(value) );
+    }
+  }
+
+  inline void read( std::istream &in, std::vector<bool> &vec )
+  {
+    unsigned int size;
+    read( in, size );
+    vec.resize( size );
+    for ( unsigned int i=0;i<size;i++ )
+    {
+      char value;
+      read( in, value );
+      vec[i] = value;
+    }
+  }
+
+  template<class T>
+  void write( std::ostream &out, const std::vector<T> &vec )
+  {
+    write( out, static_cast<unsigned int>(vec.size()) );
+    for ( const T &value : vec )
+    {
+      write( out, value );
+    }
+  }
+
+  template<class T>
+  void read( std::istream &in, std::vector<T> &vec )
+  {
+    unsigned int size;
+    read( in, size );
+    vec.resize( size );
+    for ( unsigned int i=0;i<size;i++ )
+    {
+      read( in, vec[i] );
+    }
+  }
+
+  template<class T>
+  void write( std::ostream &out, const std::map<std::string,T> &map )
+  {
+    write( out, static_cast<unsigned int>(map.size()) );
+    for ( auto iter=map.begin();iter != map.end();++iter )
+    {
+      write( out, iter->first );
+      write( out, iter->second );
+    }
+  }
+
+  template<class T>
+  void read( std::istream &in, std::map<std::string,T> &map )
+  {
+    unsigned int size;
+    read( in, size );
+    map.clear();
+    for ( unsigned int i=0;i<size;i++ )
+    {
+      std::string key;
+      read( in, key );
+      read( in, map[key] );
+    }
+  }
+};
+#endif
@@ -95,6 +95,9 @@ public:
   /** Resets all changes */
   void undo_changes();
 
+  /** Undo the last single site change (the atom position tracker is not touched) */
+  void undo_last_change();
+
   /** Clears the history */
   void clear_history();
 
@@ -4,19 +4,43 @@
 #include <set>
 #include <string>
 #include <map>
+#include <utility>
 #include <Python.h>
 #include "ce_updater.hpp"
 
 typedef std::vector<std::string> vecstr;
+
+/**
+Tracks clusters of solute atoms connected by one of the pair interactions.
+
+Every solute site carries the ID of its cluster and every cluster knows its
+members. Inserting a solute site merges the neighbouring clusters by
+relabelling the members of the smaller ones. Removing a site may split its
+cluster. A breadth first search is started from each neighbour of the
+removed site, and the searches are advanced one site at a time in turn.
+Searches that meet are merged. A search that runs out of sites has
+explored a component that has split off, and only that component is
+relabelled. The work of an update is therefore bounded by the size of the
+smaller fragments, and not by the system size.
+
+The size of every cluster is kept in an ordered set, so the largest
+cluster is known at any time. Together with the local updates, this makes
+it cheap to check a proposed move against a cluster size window before
+the energy of the move is calculated.
+*/
 class ClusterTracker
 {
 public:
   ClusterTracker(CEUpdater &updater, const vecstr &cnames, const vecstr &elements);
 
-  /** Search through the symbol list of CEupdater and identifies atomic clusters */
+  /**
+  Identifies all atomic clusters from scratch. If only_selected is True,
+  the symbols from the last update are used. Otherwise, the symbols are
+  synchronized with the symbols of the CE updater
+  */
   void find_clusters(bool only_selected);
 
-  /** Return the number of root nodes among the solute atoms */
+  /** Return the number of clusters (including isolated solute atoms) */
   unsigned int num_root_nodes() const;
 
   /** Collect the cluster statistics */
@@ -32,10 +56,17 @@ public:
 
   /** Get all the members of the largest cluster */
   void get_members_of_largest_cluster( std::vector<int> &members );
+  PyObject* get_members_of_largest_cluster_python();
 
-  /** Returns a map with all the cluster sizes. Key is the root index */
+  /** Returns a map with the size of all clusters with more than one atom. Key is the root index */
   void get_cluster_size( std::map<int,int> &cluster_sizes ) const;
 
+  /** Return the number of atoms in the largest cluster */
+  unsigned int largest_cluster_size() const;
+
+  /** Return the number of clusters with more than one atom */
+  unsigned int num_multi_atom_clusters() const { return num_multi_atom; };
+
   /** Get the root index of the largest cluster */
   unsigned int root_indx_largest_cluster() const;
 
@@ -45,21 +76,33 @@ public:
   /** Computes the surface of the clusters */
   void surface( std::map<int,int> &surf ) const;
 
-  /** Check if the proposed move creates a new cluster */
+  /** Check if the proposed move leaves more than one cluster */
   bool move_creates_new_cluster(PyObject *system_changes);
-  bool move_creates_new_cluster(const swap_move &system_changes);
-
-  /** Update the clusters */
+  bool move_creates_new_cluster(const std::vector<SymbolChange> &system_changes);
+
+  /**
+  Check if the size of the largest cluster is in [min_size, max_size) after
+  the proposed move. Only clusters with more than one atom are counted
+  (the size is 0 if there are none). If only_one_cluster is True, there has
+  to be exactly one such cluster. The clusters are left unchanged.
+  */
+  bool move_in_size_window(PyObject *system_changes, unsigned int min_size, unsigned int max_size, bool only_one_cluster);
+  bool move_in_size_window(const std::vector<SymbolChange> &system_changes, unsigned int min_size, \
+                           unsigned int max_size, bool only_one_cluster);
+
+  /**
+  Update the clusters after the sites in system_changes have changed.
+  The new symbols are read from the CE updater. The sites changed in the
+  previous update are checked as well, such that a rejected move is undone
+  by the next update.
+  */
   void update_clusters(PyObject *system_changes);
-  void update_clusters(const swap_move &system_changes);
-
-  /** Raise error if circular connected clusters are present */
-  void check_circular_connected_clusters();
+  void update_clusters(const std::vector<SymbolChange> &system_changes);
 
   /** Return True if indx1 is connected to indx2 */
   bool is_connected(unsigned int indx1, unsigned int indx2) const;
 
-  /** Return true if all atoms have a direct connection to one of its neighbours */
+  /** Return true if all atoms in a cluster has a direct connection to one of the other members */
   bool has_minimal_connectivity() const;
 
   /** Compute the surface of the clusters and return the result in a Python dict */
@@ -68,24 +111,61 @@ private:
   CEUpdater *updater; // Do not own this
   vecstr cnames;
   vecstr elements;
-  std::vector<int> atomic_clusters;
   std::set<int> indices_in_cluster;
-  std::set<int> solute_atoms_indices;
   std::vector<std::string> symbols_cpy;
 
+  std::vector<int> cluster_id;
+  std::vector< std::vector<int> > members;
+  std::vector<int> pos_in_cluster;
+  std::vector<int> free_ids;
+  std::set< std::pair<int,int> > size_order;
+  unsigned int num_clusters{0};
+  unsigned int num_multi_atom{0};
+  std::vector<unsigned int> last_changed;
+
+  // Work arrays for the search after a removal
+  std::vector<int> visited_by;
+
   /** Check if the curent element is one of the cluster elements */
   bool is_cluster_element(const std::string &elm) const;
 
-  /** Detach neighbours from ref_indx. Return True on success. */
-  bool detach_neighbours(int ref_indx, bool can_create_new_clusters, const std::vector<int> &indx_in_change);
-
   /** Initialize indices in cluster */
   void init_cluster_indices();
 
-  /** Rebuild cluster and connect all nodes to one of their neighbours */
-  void rebuild_cluster();
+  /** Collect the solute neighbours of a site */
+  void solute_neighbours(unsigned int indx, std::vector<int> &neighbours) const;
+
+  /** Change the symbol of a site and update the clusters */
+  void set_site(unsigned int indx, const std::string &new_symb);
+
+  /** Insert a solute atom */
+  void insert_site(unsigned int indx);
+
+  /** Remove a solute atom */
+  void remove_site(unsigned int indx);
+
+  /** Create an empty cluster and return its ID */
+  int new_cluster();
+
+  /** Add a site to a cluster */
+  void add_member(int id, int indx);
+
+  /** Remove a site from its cluster */
+  void remove_member(int indx);
+
+  /** Release the ID of an empty cluster */
+  void release_cluster(int id);
+
+  /** Apply changes without updating last_changed. Returns the original symbols */
+  void apply_trial_move(const std::vector<SymbolChange> &changes, std::vector<std::string> &orig_symbs);
+
+  /** Undo the changes applied by apply_trial_move */
+  void undo_trial_move(const std::vector<SymbolChange> &changes, const std::vector<std::string> &orig_symbs);
+
+  /** Remove the entry of a cluster from the size order */
+  void unregister_size(int id);
 
-  /** Attach one index to the cluster */
-  void attach2cluster(unsigned int indx);
+  /** Insert the entry of a cluster in the size order */
+  void register_size(int id);
 };
 #endif
@@ -2,10 +2,20 @@
 #define HISTOGRAM_H
 #include <vector>
 #include <string>
+#include <iostream>
 #include <Python.h>
 #include <array>
 #define DEBUG_LOSS_OF_PRECISION
 
+/** Histogram updates accumulated privately by one thread. They are added to the shared histogram with Histogram::merge */
+struct HistogramUpdateBuffer
+{
+  std::vector<unsigned int> visits;
+  std::vector<double> logdos_increment;
+  std::vector<unsigned int> sub_bin_visits;
+  std::vector<unsigned int> bin_transfer;
+};
+
 class Histogram
 {
 public:
@@ -40,15 +50,36 @@ public:
   /** Updates the histogram and the logdos */
   virtual void update( unsigned int bin, double mod_factor );
 
+  /** Accumulates the update in a thread private buffer */
+  void update( HistogramUpdateBuffer &buffer, unsigned int bin, double mod_factor );
+
+  /** Called when a bin is visited. Allows histogram types to store information about the current state */
+  virtual void register_visit( unsigned int bin ){};
+
   /** Updates the sub bin histograms */
   void update_sub_bin( unsigned int bin, double energy );
 
+  /** Accumulates the sub bin update in a thread private buffer */
+  void update_sub_bin( HistogramUpdateBuffer &buffer, unsigned int bin, double energy ) const;
+
+  /** Allocates a thread private buffer matching this histogram */
+  void init_buffer( HistogramUpdateBuffer &buffer ) const;
+
+  /** Adds the content of the buffer to the histogram and clears the buffer */
+  void merge( HistogramUpdateBuffer &buffer );
+
   /** Checks if the histogram is flat */
   virtual bool is_flat( double criteria );
 
+  /** Returns the ratio between the minimum and the mean of the known bins */
+  double flatness() const;
+
   /** Returns the ratio of the DOS at the old_bin and at new_bin */
   double get_dos_ratio_old_divided_by_new( unsigned int old_bin, unsigned int new_bin ) const;
 
+  /** Returns the ratio of the DOS including the updates in the thread private buffer */
+  double get_dos_ratio_old_divided_by_new( const HistogramUpdateBuffer &buffer, unsigned int old_bin, unsigned int new_bin ) const;
+
   /** Returns true if the bin is in the histogram range */
   virtual bool bin_in_range( int bin ) const;
 
@@ -64,6 +95,12 @@ public:
   /** Read histogram data from Python histogram */
   void init_from_pyhist( PyObject *pyhist );
 
+  /** Writes the histogram, the logdos and the known states to a binary stream (see binary_io.hpp) */
+  virtual void write_state( std::ostream &out ) const;
+
+  /** Reads a state written by write_state */
+  virtual void read_state( std::istream &in );
+
   /** Stores the sub-bin distribution into a text file */
   void save_sub_bin_distribution( const std::string &fname ) const;
 
@@ -76,6 +113,9 @@ public:
   /** Updates the from bin transfer */
   void update_bin_transfer( int from, int to );
 
+  /** Accumulates the bin transfer in a thread private buffer */
+  void update_bin_transfer( HistogramUpdateBuffer &buffer, int from, int to ) const;
+
   /** Stores bin transfer array to file */
   void save_bin_transfer( const std::string &fname ) const;
 
@@ -85,6 +125,15 @@ public:
   /** Returns true if the probability of data conflict is too large */
   virtual bool update_synchronized( unsigned int num_threads, double conflict_prob ) const;
 
+  /** Returns a new histogram covering the bins [lower, upper) of this histogram */
+  Histogram* extract_window( unsigned int lower, unsigned int upper ) const;
+
+  /** Copies the bins [start, window.get_nbins()) of a window whose first bin is first_bin in this histogram. The logdos is shifted by shift */
+  void insert_window( const Histogram &window, unsigned int first_bin, unsigned int start, double shift );
+
+  /** Returns true if a structure has been found in the bin */
+  bool is_known( unsigned int bin ) const { return known_structures[bin]; };
+
   const std::vector<unsigned int>& get_histogram() const { return hist; };
   const std::vector<double>& get_logdos() const { return logdos; };
   friend void swap( Histogram &first, const Histogram &other );
@@ -102,5 +151,8 @@ protected:
   std::vector<Histogram*> sub_bin_distribution;
   std::vector< std::array<unsigned int,21> > bin_transfer;
   double avg_acc_rate{0.0};
+
+  /** Returns the flattened index into the bin transfer array */
+  unsigned int bin_transfer_index( int from, int to ) const;
 };
 #endif
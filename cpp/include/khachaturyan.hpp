@@ -6,11 +6,14 @@
 #include "mat4D.hpp"
 
 typedef std::array< std::array<double, 3>, 3> mat3x3;
-typedef std::vector< std::vector< std::vector<double> > > shp_t;
-
 class Khachaturyan{
 public:
     Khachaturyan(PyObject *ft_shape_func, PyObject *elastic_tensor, PyObject *misfit_strain);
+    ~Khachaturyan();
+
+    /** The class holds a reference to the NumPy array, so copying is not allowed */
+    Khachaturyan(const Khachaturyan &other) = delete;
+    Khachaturyan& operator=(const Khachaturyan &other) = delete;
 
     /** Calculate the green function (omitting normalization factor 1/k^2)*/
     void green_function(mat3x3 &G, double direction[3]) const;
@@ -27,7 +30,13 @@ public:
 private:
     mat3x3 misfit;
     Mat4D elastic;
-    shp_t ft_shape_func;
+
+    /** The Fourier transformed shape function is read directly from the
+    NumPy array (no copy is made if it is already a C-contiguous array of
+    doubles) */
+    PyObject *ft_shape_func{nullptr};
+    const double *ft_data{nullptr};
+    unsigned int dims[3];
 
     void convertMisfit(PyObject *pymisfit);
     void convertShapeFunc(PyObject *ft_shp);
@@ -0,0 +1,70 @@
+#ifndef CEMC_RNG_H
+#define CEMC_RNG_H
+#include <cstdint>
+#include <array>
+#include <limits>
+
+/**
+xoshiro256** pseudo random number generator. It has a period of 2^256-1,
+passes the common statistical test suites and supports jumping 2^128 steps
+ahead, which is used to create non-overlapping streams for the threads and
+the walkers of the native samplers.
+
+Blackman, D., & Vigna, S. (2018).
+Scrambled linear pseudorandom number generators.
+arXiv preprint arXiv:1805.01407.
+
+The class satisfies the UniformRandomBitGenerator requirements, such that it
+can be used together with the distributions in <random>.
+*/
+class RandomGenerator
+{
+public:
+  typedef std::uint64_t result_type;
+
+  RandomGenerator(){ seed(0); };
+  explicit RandomGenerator( std::uint64_t seed_value ){ seed(seed_value); };
+
+  /** Initialize the state from a single 64 bit seed (expanded with splitmix64) */
+  void seed( std::uint64_t seed_value );
+
+  /** Returns the next 64 bit random number */
+  result_type operator()();
+
+  /** Returns a uniform random number in [0, 1) */
+  double uniform();
+
+  /** Returns a uniform random integer in [0, n) */
+  std::uint64_t randint( std::uint64_t n );
+
+  /** Advances the generator 2^128 steps */
+  void jump();
+
+  static constexpr result_type min(){ return 0; };
+  static constexpr result_type max(){ return std::numeric_limits<result_type>::max(); };
+
+  const std::array<std::uint64_t,4>& get_state() const { return state; };
+  void set_state( const std::array<std::uint64_t,4> &new_state ){ state = new_state; };
+private:
+  std::array<std::uint64_t,4> state;
+};
+
+/**
+Hands out independent random number streams from one seed. Stream k starts
+k*2^128 steps into the sequence of the seed, such that streams never overlap
+in practice. Create one stream per thread or walker.
+*/
+class RandomStreams
+{
+public:
+  explicit RandomStreams( std::uint64_t seed ): next(seed){};
+
+  /** Returns the next independent stream */
+  RandomGenerator next_stream();
+private:
+  RandomGenerator next;
+};
+
+/** Returns a seed from std::random_device. Used when no seed is given */
+std::uint64_t random_seed();
+#endif
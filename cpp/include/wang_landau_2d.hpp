@@ -0,0 +1,91 @@
+#ifndef WANG_LANDAU_2D_H
+#define WANG_LANDAU_2D_H
+#include <vector>
+#include <string>
+#include <Python.h>
+#include "ce_updater.hpp"
+#include "wl_schedules.hpp"
+#include "rng.hpp"
+
+/**
+Wang-Landau sampler of the joint density of states g(E, N) where N is the
+number of solute atoms on a set of sites. The composition is changed by
+flipping single sites between the host and the solute, such that one run
+gives ln g(E, N) for all compositions. Thermodynamic quantities at any
+temperature and chemical potential are then obtained by reweighting.
+
+The composition axis has one bin per number of solute atoms (0, 1, ..., n_sites)
+*/
+class WangLandau2DSampler
+{
+public:
+  WangLandau2DSampler( PyObject *atoms, PyObject *BC, PyObject *corrFunc, PyObject *ecis, \
+                       const std::vector<int> &sites, const std::string &host, const std::string &solute, \
+                       unsigned int n_energy_bins, double emin, double emax, unsigned int seed );
+  ~WangLandau2DSampler();
+
+  /** Run the WL sampler */
+  void run( unsigned int nsteps );
+
+  /** Select the modification factor schedule (flat_histogram, inverse_time or samc) */
+  void set_schedule( const std::string &name, double gain, double t0 );
+
+  /** Returns the flattened logdos (energy is the slowest index) */
+  const std::vector<double>& get_logdos() const { return logdos; };
+
+  /** Returns the flattened histogram of the current stage */
+  const std::vector<unsigned int>& get_histogram() const { return hist; };
+
+  /** Returns 1 for bins where a structure has been found */
+  std::vector<int> get_known_bins() const;
+
+  unsigned int get_n_energy_bins() const { return n_energy_bins; };
+  unsigned int get_n_composition_bins() const { return n_comp_bins; };
+
+  /** Returns the energy bin corresponding to the energy (may be outside the range) */
+  int get_energy_bin( double energy ) const;
+
+  /** Ratio between the minimum and the mean of the known bins */
+  double flatness() const;
+
+  /** Get Monte Carlo time (n_iter/n_known_bins) */
+  double get_mc_time() const;
+
+  double f{1.0};
+  double min_f{1E-6};
+  double flatness_criteria{0.8};
+  unsigned int check_convergence_every{1000};
+  bool converged{false};
+private:
+  /** Performs one WL step */
+  void step();
+
+  /** Resets the histogram */
+  void reset_histogram();
+
+  /** Flattened index of a bin */
+  unsigned int index( int ebin, unsigned int n_solute ) const { return ebin*n_comp_bins + n_solute; };
+
+  CEUpdater *updater{nullptr};
+  std::vector<int> sites;
+  std::string host;
+  std::string solute;
+  unsigned int n_energy_bins{1};
+  unsigned int n_comp_bins{1};
+  double emin{0.0};
+  double emax{1.0};
+  RandomGenerator rng;
+
+  std::vector<double> logdos;
+  std::vector<unsigned int> hist;
+  std::vector<bool> known;
+  unsigned int num_known{0};
+
+  unsigned int n_solute{0};
+  int current_ebin{-1};
+  double current_energy{0.0};
+  double iter{0.0};
+  double n_outside_range{0.0};
+  ModificationFactorSchedule *schedule{nullptr};
+};
+#endif
@@ -4,15 +4,28 @@
 #include "ce_updater.hpp"
 #include "cf_history_tracker.hpp"
 #include "histogram.hpp"
+#include "wl_schedules.hpp"
+#include "rng.hpp"
 #include <Python.h>
 #include <map>
 #include <string>
 #include <array>
+#include <chrono>
 #define WANG_LANDAU_DEBUG
 
 typedef std::vector< std::map< std::string,std::vector<int> >* > list_dictptr;
 typedef std::vector< std::map< std::string,std::vector<int> > > listdict;
 
+/** Step statistics accumulated privately by one thread */
+struct WalkerStatistics
+{
+  double n_outside_range{0.0};
+  double n_self_proposals{0.0};
+  double avg_acc_rate{0.0};
+  double avg_bin_change{0.0};
+  unsigned int half_round_trips{0};
+};
+
 class WangLandauSampler
 {
 public:
@@ -23,6 +36,9 @@ public:
   void get_canonical_trial_move( std::array<SymbolChange,2> &changes, unsigned int &select1, unsigned int &select2 );
   void get_canonical_trial_move( unsigned int thread_num, std::array<SymbolChange,2> &changes, unsigned int &select1, unsigned int &select2 );
 
+  /** Returns a single site flip consistent with the semi-grand canonical ensemble */
+  void get_sgc_trial_move( unsigned int thread_num, SymbolChange &change );
+
   /** Perform random steps until the position is inside the energy range */
   void run_until_valid_energy( double emin, double emax );
 
@@ -38,9 +54,18 @@ public:
   /** Use a histogram with adaptive windows */
   void use_adaptive_windows( unsigned int minimum_window_width );
 
+  /** Use replica exchange Wang-Landau (REWL) with overlapping energy windows */
+  void use_replica_exchange( unsigned int n_windows, double overlap, unsigned int exchange_every );
+
   /** Return the number of CE updaters */
   unsigned int get_n_updaters() const { return updaters.size(); };
 
+  /** Return the symbols of a walker */
+  const std::vector<std::string>& get_walker_symbols( unsigned int walker ) const { return updaters.at(walker)->get_symbols(); };
+
+  /** Return the CE energy of a walker (without the chemical potential term) */
+  double get_walker_ce_energy( unsigned int walker ) { return updaters.at(walker)->get_energy(); };
+
   /** Get a pointer to a CE updater */
   CEUpdater* get_updater( unsigned int indx ){ return updaters[indx]; };
 
@@ -71,13 +96,108 @@ public:
 
   /** Save convergence time */
   void save_convergence_time( const std::string &fname ) const;
+
+  /** Select the modification factor schedule (flat_histogram, inverse_time, samc or tunnelling) */
+  void set_schedule( const std::string &name, double gain, double t0, unsigned int round_trips );
+
+  /** Seed the random number generators. Each walker gets an independent stream derived from the seed */
+  void set_seed( std::uint64_t seed );
+
+  /** Log flatness and the error in log g at each convergence check to this file */
+  void set_convergence_log( const std::string &fname );
+
+  /** Set a reference logdos (i.e. exact) used to compute the error in log g */
+  void set_reference_logdos( const std::vector<double> &ref );
+
+  /**
+  Writes the complete state of the sampler (walkers, RNG states, histogram and schedule)
+  to a binary file. The file is written to a temporary file that is renamed, such
+  that an existing checkpoint is never left half written
+  */
+  void save_checkpoint( const std::string &fname ) const;
+
+  /** Restores the state written by save_checkpoint */
+  void load_checkpoint( const std::string &fname );
+
+  /** Write a checkpoint to fname during run every interval seconds (wall clock) */
+  void set_checkpoint( const std::string &fname, double interval );
 private:
+  /** Reads the chemical potentials and the allowed flips from the Python object */
+  void read_sgc_parameters();
+
+  /** Returns the chemical potential of a symbol (zero if not given) */
+  double get_chem_pot( const std::string &symb ) const;
+
+  /** Sum of the chemical potentials of all atoms of a walker */
+  double chem_pot_contribution( unsigned int walker ) const;
+
+  /** Energy of a walker (including the chemical potential term in the SGC ensemble) */
+  double walker_energy( unsigned int walker );
+
+  /** Performs a trial move on the walker and returns the new energy */
+  double trial_move( unsigned int walker );
+
+  /** Accepts the last trial move of the walker */
+  void accept_trial_move( unsigned int walker );
+
+  /**
+  Rejects the last trial move of the walker. A single site flip (SGC) is
+  undone without touching the atom position tracker, as the tracker undo
+  assumes swaps of two sites
+  */
+  void reject_trial_move( unsigned int walker );
+
   /** Upates all bins above the current bin */
   void update_all_above();
 
   /** Updates the current bin */
   void update_current();
 
+  /** Allocates the thread private histogram buffers */
+  void init_thread_buffers();
+
+  /** Merges the thread private buffers into the shared histogram */
+  void merge_thread_buffers();
+
+  /** Updates the bins defining the low and high energy edges used to count round trips */
+  void update_edge_bins();
+
+  /** Root mean square deviation between the current logdos and ref over the known bins */
+  double logdos_deviation( const std::vector<double> &ref ) const;
+
+  /** Writes one line to the convergence log */
+  void log_convergence( const ConvergenceInfo &info );
+
+  /** Writes a checkpoint if more than checkpoint_interval seconds has passed since the last one */
+  void checkpoint_if_due();
+
+  /** Sets the symbols of a walker and updates the correlation functions */
+  void set_walker_symbols( unsigned int walker, const std::vector<std::string> &new_symbs );
+
+  /** Run replica exchange Wang-Landau */
+  void run_replica_exchange( unsigned int nsteps );
+
+  /**
+  Performs one WL step for a walker restricted to the energy range of a window.
+  The histogram updates are accumulated in the buffer of the walker
+  */
+  void step_in_window( unsigned int walker, Histogram &window, double mod_factor, HistogramUpdateBuffer &buffer );
+
+  /** Performs random steps until the walker is inside the energy range of the window */
+  void move_walker_into_window( unsigned int walker, const Histogram &window );
+
+  /** Attempts to exchange configurations between neighbouring windows */
+  void exchange_configurations( unsigned int first_window );
+
+  /** Joins the DOS of all windows and stores the result in the global histogram */
+  void stitch_windows();
+
+  /** Adds a new walker that is a copy of an existing one */
+  void add_walker( unsigned int copy_from );
+
+  /** Deletes the window histograms */
+  void clear_windows();
+
   std::vector<CEUpdater*> updaters; // Keep one updater for each thread
   list_dictptr atom_positions_track;
   bool ready{true};
@@ -92,18 +212,57 @@ private:
   std::vector<int> current_bin;
   PyObject *py_wl{nullptr};
   bool converged{false};
-  std::vector<unsigned int> seeds;
+  RandomStreams streams{0};
+  std::vector<RandomGenerator> rngs; // One random number stream per walker
   double iter{0}; // Store as double to avoid overflow
-  bool inverse_time_activated{false};
   double iter_since_last{0};
   double n_outside_range{0};
   double n_self_proposals{0.0};
   std::vector<double> time_to_converge;
-  double inv_time_factor{1.0};
   unsigned int update_hist_every{5};
   std::vector<bool> is_first;
   std::vector<double> current_energy;
   double avg_bin_change{0.0};
   double avg_acc_rate{0.0};
+  std::vector<HistogramUpdateBuffer> hist_buffers;
+  std::vector<WalkerStatistics> walker_stats;
+
+  // Semi-grand canonical ensemble. The energy is E - sum_s mu_s*N_s
+  bool sgc{false};
+  std::map<std::string,double> chem_pot;
+  std::vector< std::map< std::string,std::vector<std::string> > > possible_swaps;
+  std::vector<double> chem_pot_term;
+  std::vector<double> pending_chem_pot_change;
+
+  // Modification factor schedule and convergence monitoring
+  ModificationFactorSchedule *schedule{nullptr};
+  std::vector<int> last_edge;
+  int low_edge_bin{0};
+  int high_edge_bin{0};
+  unsigned int half_round_trips{0};
+  std::string convergence_log{""};
+  std::vector<double> reference_logdos;
+  std::vector<double> prev_logdos;
+
+  // Checkpointing
+  std::string checkpoint_file{""};
+  double checkpoint_interval{3600.0};
+  std::chrono::steady_clock::time_point last_checkpoint;
+
+  // Replica exchange Wang-Landau
+  bool use_rewl{false};
+  std::vector<Histogram*> windows;
+  std::vector<unsigned int> window_lower_bin;
+  std::vector< std::vector<unsigned int> > window_walkers;
+  std::vector<double> window_f;
+  std::vector<ModificationFactorSchedule*> window_schedules; // Copies of schedule, one per window
+  std::vector<double> window_iter;
+  std::vector<double> window_stage_time; // Duration of the previous stage (negative if there is none)
+  std::vector<HistogramUpdateBuffer> walker_buffers;
+  std::vector<int> window_last_edge; // Per walker
+  std::vector<unsigned int> window_half_round_trips; // Per walker
+  unsigned int exchange_every{100};
+  double n_exchange_trials{0.0};
+  double n_exchange_accepted{0.0};
 };
 #endif
@@ -0,0 +1,61 @@
+#ifndef WASTE_RECYCLER_H
+#define WASTE_RECYCLER_H
+#include <Python.h>
+
+/**
+Native kernel for the waste-recycled Monte Carlo estimators of
+
+Frenkel, Daan.
+"Speed-up of Monte Carlo simulations by sampling of rejected states."
+Proceedings of the National Academy of Sciences 101.51 (2004)
+
+The acceptance probability of the trial state is computed once per step
+and reused for all the observables averaged over the old and trial state.
+*/
+class WasteRecycler
+{
+public:
+  WasteRecycler(){};
+
+  /**
+  Return the probability of selecting the trial state. kT is the thermal
+  energy in the same units as the energies, such that the caller decides
+  the value of the Boltzmann constant
+  */
+  static double accept_prob(double E_old, double E_new, double kT);
+
+  /**
+  Select the next state given a uniform random number in [0, 1).
+  The selection probability is stored and used by the averaging
+  functions until the next call.
+  */
+  bool accept(double E_old, double E_new, double kT, double rand_num);
+
+  /**
+  Store a step where the selection probability is known in advance.
+  A move that is always accepted has p_new = 1, and a move that is
+  rejected without calculating its energy has p_new = 0
+  */
+  void record(double E_old, double E_new, double p_new);
+
+  /** Waste recycled average of the energy of the last step */
+  double energy() const;
+
+  /** Waste recycled average of the squared energy of the last step */
+  double energy_sq() const;
+
+  /**
+  Waste recycled average of the singlets, the squared singlets and
+  the product between singlets and energy of the last step.
+  Returns a tuple of three numpy arrays
+  */
+  PyObject* singlet_averages(PyObject *singlets_old, PyObject *singlets_new) const;
+
+  /** Probability of selecting the trial state in the last step */
+  double last_accept_prob() const {return p_new;};
+private:
+  double p_new{0.0};
+  double E_old{0.0};
+  double E_new{0.0};
+};
+#endif
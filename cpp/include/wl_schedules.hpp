@@ -0,0 +1,119 @@
+#ifndef WL_SCHEDULES_H
+#define WL_SCHEDULES_H
+#include <string>
+#include <vector>
+
+/** Information passed to the modification factor schedules at each convergence check */
+struct ConvergenceInfo
+{
+  double mc_time{0.0};          // Number of MC steps divided by the number of bins
+  bool flat{false};             // True if the histogram is flat
+  double stage_time{0.0};       // Wall clock time in seconds since f was last reduced
+  double previous_stage_time{-1.0}; // Wall clock time of the previous stage (negative if there is none)
+  unsigned int round_trips{0};  // Number of round trips between the energy edges since f was last reduced
+  unsigned int num_walkers{1};
+};
+
+/** Base class for the modification factor schedules of the native Wang-Landau sampler */
+class ModificationFactorSchedule
+{
+public:
+  ModificationFactorSchedule(){};
+  virtual ~ModificationFactorSchedule(){};
+
+  /**
+  Updates the modification factor. Returns true if the current stage is finished
+  (the histogram is reset and the results are sent to Python)
+  */
+  virtual bool update( double &f, const ConvergenceInfo &info ) = 0;
+
+  /** Name of the schedule */
+  virtual std::string name() const = 0;
+
+  /** Returns a copy of the schedule (used to give each replica exchange window its own schedule) */
+  virtual ModificationFactorSchedule* clone() const = 0;
+
+  /** Internal state of the schedule (stored in checkpoints) */
+  virtual std::vector<double> get_state() const { return std::vector<double>(); };
+
+  /** Restores the internal state from a checkpoint */
+  virtual void set_state( const std::vector<double> &state ){};
+};
+
+/** Standard Wang-Landau. Divide f by 2 when the histogram is flat */
+class FlatHistogramSchedule: public ModificationFactorSchedule
+{
+public:
+  FlatHistogramSchedule( bool use_inverse_time ): use_inverse_time(use_inverse_time){};
+
+  virtual bool update( double &f, const ConvergenceInfo &info ) override;
+  virtual std::string name() const override { return "flat_histogram"; };
+  virtual ModificationFactorSchedule* clone() const override { return new FlatHistogramSchedule(*this); };
+  virtual std::vector<double> get_state() const override;
+  virtual void set_state( const std::vector<double> &state ) override;
+private:
+  bool use_inverse_time{false};
+  bool inverse_time_activated{false};
+  double inv_time_factor{1.0};
+};
+
+/**
+Inverse time algorithm. Ordinary flat histogram stages until f < 1/t,
+and then f = 1/t where t is the MC time.
+
+Belardinelli, R. E., & Pereyra, V. D. (2007).
+Wang-Landau algorithm: A theoretical analysis of the saturation of the error.
+The Journal of chemical physics, 127(18), 184105.
+*/
+class InverseTimeSchedule: public ModificationFactorSchedule
+{
+public:
+  InverseTimeSchedule(){};
+
+  virtual bool update( double &f, const ConvergenceInfo &info ) override;
+  virtual std::string name() const override { return "inverse_time"; };
+  virtual ModificationFactorSchedule* clone() const override { return new InverseTimeSchedule(*this); };
+  virtual std::vector<double> get_state() const override;
+  virtual void set_state( const std::vector<double> &state ) override;
+private:
+  bool inverse_time_activated{false};
+};
+
+/**
+Stochastic approximation Monte Carlo (SAMC). The gain sequence is given by
+f = gain*t0/max(t0, t) where t is the MC time
+
+Liang, F., Liu, C., & Carroll, R. J. (2007).
+Stochastic approximation in Monte Carlo computation.
+Journal of the American Statistical Association, 102(477), 305-320.
+*/
+class SAMCSchedule: public ModificationFactorSchedule
+{
+public:
+  SAMCSchedule( double gain, double t0 );
+
+  virtual bool update( double &f, const ConvergenceInfo &info ) override;
+  virtual std::string name() const override { return "samc"; };
+  virtual ModificationFactorSchedule* clone() const override { return new SAMCSchedule(*this); };
+private:
+  double gain{1.0};
+  double t0{1.0};
+};
+
+/**
+Flatness free criterion. The stage is finished when the walkers have
+completed a given number of round trips between the lowest and the highest
+energy bins.
+*/
+class TunnellingSchedule: public ModificationFactorSchedule
+{
+public:
+  TunnellingSchedule( unsigned int round_trips_per_walker ): round_trips_per_walker(round_trips_per_walker){};
+
+  virtual bool update( double &f, const ConvergenceInfo &info ) override;
+  virtual std::string name() const override { return "tunnelling"; };
+  virtual ModificationFactorSchedule* clone() const override { return new TunnellingSchedule(*this); };
+private:
+  unsigned int round_trips_per_walker{1};
+};
+#endif
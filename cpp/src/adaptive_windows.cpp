@@ -1,6 +1,7 @@
 #include "adaptive_windows.hpp"
 #include "wang_landau_sampler.hpp"
 #include "additional_tools.hpp"
+#include "binary_io.hpp"
 #include <iostream>
 #include <cassert>
 #include <omp.h>
@@ -244,6 +245,12 @@ bool AdaptiveWindowHistogram::is_valid_window( unsigned int upper_bin ) const
 }
 
 void AdaptiveWindowHistogram::update( unsigned int bin, double modfactor )
+{
+  register_visit(bin);
+  Histogram::update(bin,modfactor);
+}
+
+void AdaptiveWindowHistogram::register_visit( unsigned int bin )
 {
   if ( states[bin].updater == nullptr )
   {
@@ -260,8 +267,6 @@ void AdaptiveWindowHistogram::update( unsigned int bin, double modfactor )
       }
     }
   }
-
-  Histogram::update(bin,modfactor);
 }
 
 void AdaptiveWindowHistogram::distribute_random_walkers_evenly()
@@ -353,3 +358,24 @@ bool AdaptiveWindowHistogram::update_synchronized( unsigned int num_threads, dou
 {
   return static_cast<double>(num_threads)/current_upper_bin > conflict_prob;
 }
+
+void AdaptiveWindowHistogram::write_state( ostream &out ) const
+{
+  Histogram::write_state( out );
+  binary_io::write( out, current_upper_bin );
+  binary_io::write( out, n_overlap );
+  binary_io::write( out, window_edges );
+  binary_io::write( out, logdos_on_edges );
+}
+
+void AdaptiveWindowHistogram::read_state( istream &in )
+{
+  Histogram::read_state( in );
+  binary_io::read( in, current_upper_bin );
+  binary_io::read( in, n_overlap );
+  binary_io::read( in, window_edges );
+  binary_io::read( in, logdos_on_edges );
+
+  // The stored walker states belong to the old window
+  clear_updater_states();
+}
@@ -447,6 +447,30 @@ void CEUpdater::undo_changes(int num_steps)
   }
 }
 
+void CEUpdater::undo_last_change()
+{
+  if ( history->history_size() < 2 )
+  {
+    throw invalid_argument("There are no changes to undo!");
+  }
+
+  SymbolChange *last_change;
+  history->pop( &last_change );
+  symbols_with_id->set_symbol(last_change->indx, last_change->old_symb);
+
+  if ( atoms != nullptr )
+  {
+    PyObject *old_symb_str = string2py(last_change->old_symb.c_str());
+    PyObject *pyindx = int2py(last_change->indx);
+    PyObject *pysymb = PyObject_GetItem(atoms, pyindx);
+    PyObject_SetAttrString( pysymb, "symbol", old_symb_str );
+
+    Py_DECREF(old_symb_str);
+    Py_DECREF(pyindx);
+    Py_DECREF(pysymb);
+  }
+}
+
 void CEUpdater::undo_changes_tracker(int num_steps)
 {
   //cout << "Undoing changes, keep track\n";
@@ -4,6 +4,8 @@
 #include "additional_tools.hpp"
 #include <stdexcept>
 #include <sstream>
+#include <deque>
+#include <algorithm>
 #define CLUSTER_TRACK_DEBUG
 
 using namespace std;
@@ -15,95 +17,283 @@ updater(&updater),cnames(cname),elements(elements)
   init_cluster_indices();
   find_clusters(false);
 
-  // Restructure the clusters into minimal nested connections
-  // i.e. all atoms have a direct link to one their neighbours
-  rebuild_cluster();
-
   #ifdef CLUSTER_TRACK_DEBUG
     cout << "Cluster tracker initialized\n";
   #endif
 }
 
-void ClusterTracker::attach2cluster(unsigned int indx){
-  const auto& trans_mat = updater->get_trans_matrix();
-
-  // If the element does not match, do not do anything
-  if ( !is_cluster_element(symbols_cpy[indx]) )
-  {
-    return;
+void ClusterTracker::find_clusters(bool only_selected)
+{
+  if (!only_selected){
+    // Sync the clusters
+    symbols_cpy = updater->get_symbols();
   }
 
-  int current_root_indx = root_indx(indx);
-
-  if (atomic_clusters[current_root_indx] != -1)
+  unsigned int num_sites = symbols_cpy.size();
+  cluster_id.assign(num_sites, -1);
+  pos_in_cluster.assign(num_sites, -1);
+  visited_by.assign(num_sites, -1);
+  members.clear();
+  free_ids.clear();
+  size_order.clear();
+  last_changed.clear();
+  num_clusters = 0;
+  num_multi_atom = 0;
+
+  vector<int> neighbours;
+  vector<int> stack;
+  for ( unsigned int i=0;i<num_sites;i++ )
   {
-    throw runtime_error("Something strange happend. ID of root index is not -1!");
+    if ( !is_cluster_element(symbols_cpy[i]) || (cluster_id[i] != -1) )
+    {
+      continue;
+    }
+
+    // Label all sites connected to this site
+    int id = new_cluster();
+    add_member(id, i);
+    stack.push_back(i);
+    while (!stack.empty()){
+      int indx = stack.back();
+      stack.pop_back();
+      for (int c_indx : indices_in_cluster){
+        int indx2 = updater->get_trans_matrix()(indx, c_indx);
+        if (is_cluster_element(symbols_cpy[indx2]) && (cluster_id[indx2] == -1)){
+          add_member(id, indx2);
+          stack.push_back(indx2);
+        }
+      }
+    }
+    register_size(id);
   }
+}
 
-  // Loop over all symmetries
+void ClusterTracker::solute_neighbours(unsigned int indx, vector<int> &neighbours) const
+{
+  const auto& trans_mat = updater->get_trans_matrix();
+  neighbours.clear();
   for (int c_indx : indices_in_cluster){
     int indx2 = trans_mat(indx, c_indx);
-    if (is_cluster_element(symbols_cpy[indx2]))
-    {
-      int root = root_indx(indx2);
-      if ( root != current_root_indx )
-      {
-        atomic_clusters[root] = current_root_indx;
-      }
+    if ((cluster_id[indx2] != -1) && !is_in_vector(indx2, neighbours)){
+      neighbours.push_back(indx2);
     }
   }
 }
 
-void ClusterTracker::find_clusters(bool only_selected)
+int ClusterTracker::new_cluster()
 {
-  const vector<string> &symbs = updater->get_symbols();
+  num_clusters += 1;
+  if (!free_ids.empty()){
+    int id = free_ids.back();
+    free_ids.pop_back();
+    return id;
+  }
+  members.push_back(vector<int>());
+  return members.size() - 1;
+}
 
-  if (!only_selected){
-    // Sync the clusters
-    symbols_cpy = symbs;
+void ClusterTracker::release_cluster(int id)
+{
+  members[id].clear();
+  free_ids.push_back(id);
+  num_clusters -= 1;
+}
 
-    solute_atoms_indices.clear();
-    atomic_clusters.resize(symbs.size());
-    for ( unsigned int i=0;i<atomic_clusters.size();i++ )
-    {
-      atomic_clusters[i] = -1; // All atoms are initially a root site
+void ClusterTracker::add_member(int id, int indx)
+{
+  cluster_id[indx] = id;
+  pos_in_cluster[indx] = members[id].size();
+  members[id].push_back(indx);
+}
+
+void ClusterTracker::remove_member(int indx)
+{
+  // Move the last member into the position of the removed site
+  vector<int> &clst = members[cluster_id[indx]];
+  int last = clst.back();
+  clst[pos_in_cluster[indx]] = last;
+  pos_in_cluster[last] = pos_in_cluster[indx];
+  clst.pop_back();
+  cluster_id[indx] = -1;
+  pos_in_cluster[indx] = -1;
+}
+
+void ClusterTracker::register_size(int id)
+{
+  size_order.insert(make_pair(members[id].size(), id));
+  if (members[id].size() >= 2) num_multi_atom += 1;
+}
+
+void ClusterTracker::unregister_size(int id)
+{
+  size_order.erase(make_pair(members[id].size(), id));
+  if (members[id].size() >= 2) num_multi_atom -= 1;
+}
+
+void ClusterTracker::insert_site(unsigned int indx)
+{
+  vector<int> neighbours;
+  solute_neighbours(indx, neighbours);
+
+  // Collect the clusters that become connected by this site
+  vector<int> ids;
+  int largest = -1;
+  for (int n : neighbours){
+    int id = cluster_id[n];
+    if (is_in_vector(id, ids)) continue;
+    ids.push_back(id);
+    if ((largest == -1) || (members[id].size() > members[largest].size())){
+      largest = id;
     }
-    for ( unsigned int i=0;i<symbs.size();i++ )
-    {
-      if (is_cluster_element(symbs[i])){
-        solute_atoms_indices.insert(i);
+  }
+
+  if (largest == -1){
+    // Isolated site
+    int id = new_cluster();
+    add_member(id, indx);
+    register_size(id);
+    return;
+  }
+
+  // Relabel the smaller clusters
+  unregister_size(largest);
+  add_member(largest, indx);
+  for (int id : ids){
+    if (id == largest) continue;
+    unregister_size(id);
+    for (int member : members[id]){
+      add_member(largest, member);
+    }
+    release_cluster(id);
+  }
+  register_size(largest);
+}
+
+void ClusterTracker::remove_site(unsigned int indx)
+{
+  int id = cluster_id[indx];
+  unregister_size(id);
+  remove_member(indx);
+
+  if (members[id].empty()){
+    release_cluster(id);
+    return;
+  }
+
+  vector<int> start;
+  solute_neighbours(indx, start);
+  if (start.size() <= 1){
+    register_size(id);
+    return;
+  }
+
+  // Start one search from each neighbour. group is a union-find
+  // structure over the searches, merged searches share the root
+  unsigned int num_searches = start.size();
+  vector<int> group(num_searches);
+  vector< deque<int> > queues(num_searches);
+  vector< vector<int> > found(num_searches);
+  vector<bool> finished(num_searches, false);
+  for (unsigned int k=0;k<num_searches;k++){
+    group[k] = k;
+    visited_by[start[k]] = k;
+    queues[k].push_back(start[k]);
+    found[k].push_back(start[k]);
+  }
+
+  auto find_group = [&group](int k){
+    while (group[k] != k){
+      group[k] = group[group[k]];
+      k = group[k];
+    }
+    return k;
+  };
+
+  unsigned int num_active = num_searches;
+  vector<int> neighbours;
+  while (num_active > 1){
+    for (unsigned int k=0;k<num_searches;k++){
+      if ((group[k] != static_cast<int>(k)) || finished[k]) continue;
+
+      if (queues[k].empty()){
+        // The search has explored a full component that is
+        // disconnected from the other searches
+        finished[k] = true;
+        num_active -= 1;
+        if (num_active <= 1) break;
+        continue;
+      }
+
+      int site = queues[k].front();
+      queues[k].pop_front();
+      solute_neighbours(site, neighbours);
+      for (int n : neighbours){
+        if (visited_by[n] == -1){
+          visited_by[n] = k;
+          queues[k].push_back(n);
+          found[k].push_back(n);
+          continue;
+        }
+
+        int other = find_group(visited_by[n]);
+        if (other == static_cast<int>(k)) continue;
+
+        // The searches met. Merge the smaller lists into the larger
+        if (found[other].size() > found[k].size()){
+          swap(found[other], found[k]);
+          swap(queues[other], queues[k]);
+        }
+        found[k].insert(found[k].end(), found[other].begin(), found[other].end());
+        queues[k].insert(queues[k].end(), queues[other].begin(), queues[other].end());
+        found[other].clear();
+        queues[other].clear();
+        group[other] = k;
+        num_active -= 1;
       }
-      attach2cluster(i);
+
+      if (num_active <= 1) break;
     }
   }
-  else{
-    // Reset sites where we now there is solute atoms
-    for (int indx : solute_atoms_indices){
-      atomic_clusters[indx] = -1;
+
+  // Components that were fully explored have split off
+  for (unsigned int k=0;k<num_searches;k++){
+    if (!finished[k]) continue;
+
+    int new_id = new_cluster();
+    for (int site : found[k]){
+      remove_member(site);
+      add_member(new_id, site);
     }
+    register_size(new_id);
+  }
+  register_size(id);
 
-    for (int indx : solute_atoms_indices){
-      attach2cluster(indx);
+  // Reset the work array
+  for (unsigned int k=0;k<num_searches;k++){
+    for (int site : found[k]){
+      visited_by[site] = -1;
     }
   }
 }
 
-void ClusterTracker::get_cluster_size( map<int,int> &num_members_in_cluster ) const
+void ClusterTracker::set_site(unsigned int indx, const string &new_symb)
 {
-  for ( unsigned int i=0;i<atomic_clusters.size();i++ )
-  {
-    unsigned int r_indx = root_indx(i);
+  bool was_solute = (cluster_id[indx] != -1);
+  bool is_solute = is_cluster_element(new_symb);
+  symbols_cpy[indx] = new_symb;
+  if (was_solute && !is_solute){
+    remove_site(indx);
+  }
+  else if (!was_solute && is_solute){
+    insert_site(indx);
+  }
+}
 
-    if ( r_indx != i )
-    {
-      if ( num_members_in_cluster.find(r_indx) != num_members_in_cluster.end() )
-      {
-        num_members_in_cluster[r_indx] += 1;
-      }
-      else
-      {
-        num_members_in_cluster[r_indx] = 1;
-      }
+void ClusterTracker::get_cluster_size( map<int,int> &num_members_in_cluster ) const
+{
+  for (const auto &entry : size_order){
+    if (entry.first >= 2){
+      num_members_in_cluster[members[entry.second][0]] = entry.first;
     }
   }
 }
@@ -113,19 +303,17 @@ void ClusterTracker::get_cluster_statistics( map<string,double> &res, vector<int
   double average_size = 0.0;
   double max_size = 0.0;
   double avg_size_sq = 0.0;
-  map<int,int> num_members_in_cluster;
   cluster_sizes.clear();
-  get_cluster_size( num_members_in_cluster );
-
 
-  for ( auto iter=num_members_in_cluster.begin(); iter != num_members_in_cluster.end(); ++iter )
+  // Largest clusters first
+  for ( auto iter=size_order.rbegin(); iter != size_order.rend(); ++iter )
   {
-    int size = 0;
-    if ( iter->second >= 1 )
+    int size = iter->first;
+    if ( size < 2 )
     {
-      size = iter->second+1;
-      cluster_sizes.push_back(size);
+      break;
     }
+    cluster_sizes.push_back(size);
     average_size += size;
     avg_size_sq += size*size;
     if ( size > max_size )
@@ -167,23 +355,10 @@ PyObject* ClusterTracker::get_cluster_statistics_python() const
 
 void ClusterTracker::atomic_clusters2group_indx( vector<int> &group_indx ) const
 {
-  group_indx.resize( atomic_clusters.size() );
-  for ( unsigned i=0;i<atomic_clusters.size();i++ )
+  group_indx.resize( cluster_id.size() );
+  for ( unsigned i=0;i<cluster_id.size();i++ )
   {
-    int root_indx = i;
-    unsigned int max_cluster_size = atomic_clusters.size();
-    unsigned int counter = 0;
-  
-    while ((atomic_clusters[root_indx] != -1) && (counter < max_cluster_size))
-    {
-      counter += 1;
-      root_indx = atomic_clusters[root_indx];
-    }
-    group_indx[i] = root_indx;
-
-    if (counter >= max_cluster_size){
-      throw runtime_error("Circular connected clusters seems to be present!");
-    }
+    group_indx[i] = root_indx(i);
   }
 }
 
@@ -226,70 +401,59 @@ void ClusterTracker::verify_cluster_name_exists() const
   }
 }
 
-unsigned int ClusterTracker::root_indx_largest_cluster() const
+unsigned int ClusterTracker::largest_cluster_size() const
 {
-  map<int,int> clust_size;
-  get_cluster_size(clust_size);
-  int largest_root_indx = 0;
-  int largest_size = 0;
-  for ( auto iter=clust_size.begin();iter != clust_size.end(); ++iter )
+  if ( size_order.empty() )
   {
-    if ( iter->second > largest_size )
-    {
-      largest_root_indx = iter->first;
-      largest_size = iter->second;
-    }
+    return 0;
   }
-  return largest_root_indx;
+  return size_order.rbegin()->first;
 }
 
-void ClusterTracker::get_members_of_largest_cluster( vector<int> &members )
+unsigned int ClusterTracker::root_indx_largest_cluster() const
 {
-  unsigned int root_indx_largest = root_indx_largest_cluster();
-  members.clear();
-  for (unsigned int id=0;id<atomic_clusters.size();id++ )
+  if ( largest_cluster_size() < 2 )
   {
-    if ( root_indx(id) == root_indx_largest )
-    {
-      members.push_back(id);
-    }
+    return 0;
   }
+  return members[size_order.rbegin()->second][0];
 }
 
-unsigned int ClusterTracker::root_indx( unsigned int indx ) const
+void ClusterTracker::get_members_of_largest_cluster( vector<int> &members_largest )
 {
-  int root = indx;
-  unsigned int counter = 0;
-  unsigned int max_cluster_size = atomic_clusters.size();
-  while((atomic_clusters[root] != -1) && (counter<max_cluster_size))
+  members_largest.clear();
+  if ( size_order.empty() )
   {
-    counter += 1;
-    root = atomic_clusters[root];
+    return;
   }
+  members_largest = members[size_order.rbegin()->second];
+}
 
-  if (counter >= max_cluster_size){
-    throw runtime_error("Circular connected clusters appears to be present!");
+PyObject* ClusterTracker::get_members_of_largest_cluster_python()
+{
+  vector<int> members_largest;
+  get_members_of_largest_cluster(members_largest);
+  PyObject *list = PyList_New(0);
+  for ( int indx : members_largest )
+  {
+    PyObject *pyint = int2py(indx);
+    PyList_Append(list, pyint);
+    Py_DECREF(pyint);
   }
-  return root;
+  return list;
 }
 
-bool ClusterTracker::is_connected(unsigned int indx1, unsigned int indx2) const{
-  unsigned int counter = 0;
-  unsigned int max_cluster_size = atomic_clusters.size();
-  unsigned int root = indx1;
-  while((atomic_clusters[root] != -1) && (counter<max_cluster_size))
+unsigned int ClusterTracker::root_indx( unsigned int indx ) const
+{
+  if ( cluster_id[indx] == -1 )
   {
-    counter += 1;
-    root = atomic_clusters[root];
-    if (root == indx2){
-      return true;
-    }
+    return indx;
   }
+  return members[cluster_id[indx]][0];
+}
 
-  if (counter >= max_cluster_size){
-    throw runtime_error("Circular connected clusters appears to be present!");
-  }
-  return false;
+bool ClusterTracker::is_connected(unsigned int indx1, unsigned int indx2) const{
+  return (cluster_id[indx1] != -1) && (cluster_id[indx1] == cluster_id[indx2]);
 }
 
 void ClusterTracker::surface( map<int,int> &surf ) const
@@ -298,17 +462,18 @@ void ClusterTracker::surface( map<int,int> &surf ) const
   const vector< cluster_dict>& clusters = updater->get_clusters();
   const auto& trans_mat = updater->get_trans_matrix();
 
-  for ( unsigned int i=0;i<atomic_clusters.size();i++ )
+  for ( const auto &entry : size_order )
   {
-    if ( atomic_clusters[i] != -1 )
+    if ( entry.first < 2 )
     {
-      // This site is part of a cluster
-      unsigned int root = root_indx(i);
-      if ( surf.find(root) == surf.end() )
-      {
-        surf[root] = 0;
-      }
+      continue;
+    }
 
+    const vector<int> &clst = members[entry.second];
+    unsigned int root = clst[0];
+    surf[root] = 0;
+    for ( int i : clst )
+    {
       for ( unsigned int symm_group=0;symm_group<clusters.size();symm_group++ )
       {
 
@@ -319,10 +484,10 @@ void ClusterTracker::surface( map<int,int> &surf ) const
             // Cluster does not exist in this translattional symmetry group
             continue;
           }
-          const vector< vector<int> >& members = clusters[symm_group].at(cname).get();
-          for (unsigned int subgroup=0;subgroup<members.size();subgroup++)
+          const vector< vector<int> >& cluster_members = clusters[symm_group].at(cname).get();
+          for (unsigned int subgroup=0;subgroup<cluster_members.size();subgroup++)
           {
-            int indx = trans_mat( i,members[subgroup][0] );
+            int indx = trans_mat( i,cluster_members[subgroup][0] );
             if (!is_cluster_element(symbs[indx]))
             {
               surf[root] += 1;
@@ -360,172 +525,76 @@ bool ClusterTracker::is_cluster_element(const string &element) const
 }
 
 void ClusterTracker::update_clusters(PyObject *py_changes){
-  swap_move changes;
-  py_change2swap_move(py_changes, changes);
+  vector<SymbolChange> changes;
+  py_changes2symb_changes(py_changes, changes);
   update_clusters(changes);
 }
 
-void ClusterTracker::update_clusters(const swap_move &changes){
-  if (is_cluster_element(changes[0].old_symb) && (is_cluster_element(changes[0].new_symb))){
-    return;
-  }
-  else if(!is_cluster_element(changes[0].old_symb) && !is_cluster_element(changes[0].new_symb)){
-    return;
-  }
+void ClusterTracker::update_clusters(const vector<SymbolChange> &changes){
+  const vector<string> &symbs = updater->get_symbols();
 
-  unsigned int old_solute_indx = 0;
-  unsigned int new_solute_indx = 0;
+  // Sites changed in the previous update may have been reverted
+  vector<unsigned int> changed = last_changed;
+  last_changed.clear();
   for (const SymbolChange &change : changes){
-    if (is_cluster_element(change.old_symb)){
-      old_solute_indx = change.indx;
-      atomic_clusters[change.indx] = -1;
-    }
-    else{
-      new_solute_indx = change.indx;
-    }
-
-    // Update the symbols array
-    symbols_cpy[change.indx] = change.new_symb;
+    changed.push_back(change.indx);
+    last_changed.push_back(change.indx);
   }
 
-  solute_atoms_indices.erase(old_solute_indx);
-  solute_atoms_indices.insert(new_solute_indx);
-  find_clusters(true);
+  for (unsigned int indx : changed){
+    set_site(indx, symbs[indx]);
+  }
 }
 
 bool ClusterTracker::move_creates_new_cluster(PyObject *py_changes){
-  swap_move changes;
-  py_change2swap_move(py_changes, changes);
+  vector<SymbolChange> changes;
+  py_changes2symb_changes(py_changes, changes);
   return move_creates_new_cluster(changes);
 }
 
-bool ClusterTracker::move_creates_new_cluster(const swap_move &changes){
-  if (is_cluster_element(changes[0].old_symb) && (is_cluster_element(changes[0].new_symb))){
-    return false;
-  }
-  else if(!is_cluster_element(changes[0].old_symb) && !is_cluster_element(changes[0].new_symb)){
-    return false;
-  }
-
-  unsigned int old_solute_indx = 0;
-  unsigned int new_solute_indx = 0;
-
-  vector<int> atomic_cluster_cpy;
-  for (int s_indx : solute_atoms_indices){
-    atomic_cluster_cpy.push_back(atomic_clusters[s_indx]);
-  }
-
-  for (const SymbolChange &change : changes){
-    if (is_cluster_element(change.old_symb)){
-      old_solute_indx = change.indx;
-      atomic_clusters[change.indx] = -1;
-    }
-    else{
-      new_solute_indx = change.indx;
-    }
-    symbols_cpy[change.indx] = change.new_symb;
-  }
-
-  solute_atoms_indices.erase(old_solute_indx);
-  solute_atoms_indices.insert(new_solute_indx);
-  find_clusters(true);
+bool ClusterTracker::move_creates_new_cluster(const vector<SymbolChange> &changes){
+  vector<string> orig_symbs;
+  apply_trial_move(changes, orig_symbs);
+  unsigned int num_roots = num_root_nodes();
+  undo_trial_move(changes, orig_symbs);
+  return num_roots > 1;
+}
 
-  int num_roots = num_root_nodes();
+bool ClusterTracker::move_in_size_window(PyObject *py_changes, unsigned int min_size, unsigned int max_size, bool only_one_cluster){
+  vector<SymbolChange> changes;
+  py_changes2symb_changes(py_changes, changes);
+  return move_in_size_window(changes, min_size, max_size, only_one_cluster);
+}
 
-  // Reset the solute atoms indices
-  solute_atoms_indices.erase(new_solute_indx);
-  solute_atoms_indices.insert(old_solute_indx);
+bool ClusterTracker::move_in_size_window(const vector<SymbolChange> &changes, unsigned int min_size, \
+                                         unsigned int max_size, bool only_one_cluster){
+  vector<string> orig_symbs;
+  apply_trial_move(changes, orig_symbs);
 
-  if (solute_atoms_indices.size() != atomic_cluster_cpy.size()){
-    stringstream ss;
-    ss << "Number of solute atoms tracker changes.\n";
-    ss << "New value " << solute_atoms_indices.size() << " ";
-    ss << "Old value " << atomic_cluster_cpy.size() << "\n";
-    throw runtime_error(ss.str());
+  // Isolated atoms are not counted as clusters
+  unsigned int size = largest_cluster_size();
+  if (size < 2) size = 0;
+  bool ok = (size >= min_size) && (size < max_size);
+  if (only_one_cluster){
+    ok = ok && (num_multi_atom == 1);
   }
 
-  int counter = 0;
-  // Reset the atomic clusters
-  for (int s_indx : solute_atoms_indices){
-    atomic_clusters[s_indx] = atomic_cluster_cpy[counter];
-    counter += 1;
-  }
+  undo_trial_move(changes, orig_symbs);
+  return ok;
+}
 
-  // Reset the symbols_cpy
+void ClusterTracker::apply_trial_move(const vector<SymbolChange> &changes, vector<string> &orig_symbs){
+  orig_symbs.clear();
   for (const SymbolChange &change : changes){
-    symbols_cpy[change.indx] = change.old_symb;
+    orig_symbs.push_back(symbols_cpy[change.indx]);
+    set_site(change.indx, change.new_symb);
   }
-  return num_roots > 1;
 }
 
-bool ClusterTracker::detach_neighbours(int ref_indx, bool can_create_new_clusters, const vector<int> &indx_in_change){
-  const auto& trans_mat = updater->get_trans_matrix();
-
-  // Make sure that the site that we shoud detach actually is going to be changed
-  if (!is_in_vector(ref_indx, indx_in_change)){
-    throw invalid_argument("Ref_indx not in the change vector!");
+void ClusterTracker::undo_trial_move(const vector<SymbolChange> &changes, const vector<string> &orig_symbs){
+  for (int i=changes.size()-1;i>=0;i--){
+    set_site(changes[i].indx, orig_symbs[i]);
   }
-
-  #ifdef CLUSTER_TRACK_DEBUG
-    if (!has_minimal_connectivity()){
-      throw runtime_error("The cluster no longer has minimal connectivity!");
-    }
-  #endif
-
-  bool new_ref_indx_assigned = false;
-  bool is_ref_indx = (atomic_clusters[ref_indx] == -1);
-
-  // Loop accross neighbour indices
-  for (auto iter=indices_in_cluster.begin(); iter != indices_in_cluster.end();++iter){
-    int indx = trans_mat(ref_indx, *iter);
-
-    if (!is_cluster_element(symbols_cpy[indx])){
-      // This symbol is not part of the cluster
-      continue;
-    }
-
-    if (atomic_clusters[indx] != ref_indx){
-      // Not directly connected to the ref_index
-      continue;
-    }
-
-    if (is_ref_indx && !new_ref_indx_assigned){
-      // Move the reference index to this site
-      atomic_clusters[indx] = -1;
-
-      // Make the current index point to the new ref_indx
-      atomic_clusters[ref_indx] = indx;
-      new_ref_indx_assigned = true;
-      continue;
-    }
-
-    // The current index is connected to ref_indx
-    bool managed_to_detach = false;
-    for (auto iter2=indices_in_cluster.begin();iter2 != indices_in_cluster.end(); ++iter2){
-      int indx2 = trans_mat(indx, *iter2);
-      if (is_in_vector(indx2, indx_in_change)) continue;
-
-      // indx is in the cluster, and indx2 is not connected to indx, 
-      // we can connect indx to indx2
-      if (is_cluster_element(symbols_cpy[indx2]) && !is_connected(indx2, indx)){
-        atomic_clusters[indx] = indx2;
-        managed_to_detach = true;
-        break;
-      }
-    }
-
-    if (!managed_to_detach && can_create_new_clusters){
-        // This site becomes a new reference site
-        atomic_clusters[indx] = -1;
-    }
-    else if (!managed_to_detach){
-      // We could not detach this site from the cluster
-      // without forming a new cluster.
-      // This move should not be performed
-      return false;
-    }
-  }
-  return true;
 }
 
 void ClusterTracker::init_cluster_indices(){
@@ -545,66 +614,21 @@ void ClusterTracker::init_cluster_indices(){
   }
 }
 
-void ClusterTracker::check_circular_connected_clusters(){
-  for (unsigned int ref_indx=0;ref_indx<atomic_clusters.size();ref_indx++){
-    root_indx(ref_indx);
-  }
-}
-
-void ClusterTracker::rebuild_cluster(){
-  vector<int> grp_indx;
-  atomic_clusters2group_indx(grp_indx);
-  vector<int> used_group_indx;
-  const auto& trans_mat = updater->get_trans_matrix();
-
-  for (int grp : grp_indx){
-    if (is_in_vector(grp, used_group_indx)) continue;
-
-    used_group_indx.push_back(grp);
-
-    // Find all sites belonging to this cluster
-    vector<int> indx_in_group;
-    for (unsigned int i=0;i<grp_indx.size();i++){
-      if (grp_indx[i] == grp){
-        indx_in_group.push_back(i);
-      }
-    }
-
-    if (indx_in_group.size() <= 1) continue;
-
-    // We need to restructure the cluster (i.e.)
-    // construct the cluster without altering the root index
-    vector<bool> already_inserted(atomic_clusters.size());
-    fill(already_inserted.begin(), already_inserted.end(), false);
-
-    atomic_clusters[indx_in_group[0]] = -1;
-    already_inserted[indx_in_group[0]] = true;
-    for (unsigned int i=0;i<indx_in_group.size();i++){
-      // Attach all neighbours to the current site
-      for (auto iter=indices_in_cluster.begin(); iter != indices_in_cluster.end(); ++iter){
-        int indx = trans_mat(indx_in_group[i], *iter);
-        if (is_in_vector(indx, indx_in_group) && !already_inserted[indx]){
-          atomic_clusters[indx] = indx_in_group[i];
-          already_inserted[indx] = true;
-        }
-      }
-    }
-  }
-}
-
 bool ClusterTracker::has_minimal_connectivity() const{
-  const auto& trans_mat = updater->get_trans_matrix();
-  for (unsigned int i=0;i<atomic_clusters.size();i++){
-    if (atomic_clusters[i] != -1){
+  vector<int> neighbours;
+  for (const auto &entry : size_order){
+    if (entry.first < 2) continue;
+
+    int id = entry.second;
+    for (int indx : members[id]){
+      solute_neighbours(indx, neighbours);
       bool found_neighbor = false;
-      for (auto iter=indices_in_cluster.begin(); iter != indices_in_cluster.end(); ++iter){
-        int candidate = trans_mat(i, *iter);
-        if (atomic_clusters[i] == candidate){
+      for (int n : neighbours){
+        if (cluster_id[n] == id){
           found_neighbor = true;
           break;
         }
       }
-
       if (!found_neighbor) return false;
     }
   }
@@ -612,11 +636,5 @@ bool ClusterTracker::has_minimal_connectivity() const{
 }
 
 unsigned int ClusterTracker::num_root_nodes() const{
-  unsigned int num_roots = 0;
-  for (int s_indx : solute_atoms_indices){
-    if (atomic_clusters[s_indx] == -1){
-      num_roots += 1;
-    }
-  }
-  return num_roots;
-}
\ No newline at end of file
+  return num_clusters;
+}
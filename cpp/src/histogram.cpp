@@ -2,7 +2,9 @@
 #include "use_numpy.hpp"
 #include <iostream>
 #include "additional_tools.hpp"
+#include "binary_io.hpp"
 #include <fstream>
+#include <stdexcept>
 
 using namespace std;
 
@@ -84,6 +86,82 @@ void Histogram::update( unsigned int bin, double mod_factor )
   logdos[bin] += mod_factor;
 }
 
+void Histogram::update( HistogramUpdateBuffer &buffer, unsigned int bin, double mod_factor )
+{
+  register_visit(bin);
+  buffer.visits[bin] += 1;
+  buffer.logdos_increment[bin] += mod_factor;
+}
+
+void Histogram::init_buffer( HistogramUpdateBuffer &buffer ) const
+{
+  unsigned int n_sub = 0;
+  if ( sub_bin_distribution.size() > 0 )
+  {
+    n_sub = sub_bin_distribution[0]->get_nbins();
+  }
+  buffer.visits.assign( Nbins, 0 );
+  buffer.logdos_increment.assign( Nbins, 0.0 );
+  buffer.sub_bin_visits.assign( sub_bin_distribution.size()*n_sub, 0 );
+  buffer.bin_transfer.assign( bin_transfer.size()*bin_transfer[0].size(), 0 );
+}
+
+void Histogram::merge( HistogramUpdateBuffer &buffer )
+{
+  for ( unsigned int i=0;i<buffer.visits.size();i++ )
+  {
+    if ( buffer.visits[i] == 0 ) continue;
+    known_structures[i] = true;
+    hist[i] += buffer.visits[i];
+    #ifdef DEBUG_LOSS_OF_PRECISION
+      if ( logdos[i] + buffer.logdos_increment[i] <= logdos[i] )
+      {
+        cerr << "Warning! Loss of presicion. Some parts of the DOS can no longer be updated\n";
+      }
+    #endif
+    logdos[i] += buffer.logdos_increment[i];
+    buffer.visits[i] = 0;
+    buffer.logdos_increment[i] = 0.0;
+  }
+
+  if ( sub_bin_distribution.size() > 0 )
+  {
+    unsigned int n_sub = sub_bin_distribution[0]->get_nbins();
+    for ( unsigned int i=0;i<buffer.sub_bin_visits.size();i++ )
+    {
+      unsigned int n = buffer.sub_bin_visits[i];
+      if ( n == 0 ) continue;
+      Histogram *sub = sub_bin_distribution[i/n_sub];
+      sub->hist[i%n_sub] += n;
+      sub->logdos[i%n_sub] += 0.1*n;
+      sub->known_structures[i%n_sub] = true;
+      buffer.sub_bin_visits[i] = 0;
+    }
+  }
+
+  unsigned int n_transfer = bin_transfer.size() > 0 ? bin_transfer[0].size() : 0;
+  for ( unsigned int i=0;i<buffer.bin_transfer.size();i++ )
+  {
+    bin_transfer[i/n_transfer][i%n_transfer] += buffer.bin_transfer[i];
+    buffer.bin_transfer[i] = 0;
+  }
+}
+
+void Histogram::update_sub_bin( HistogramUpdateBuffer &buffer, unsigned int bin, double energy ) const
+{
+  if ( bin >= sub_bin_distribution.size() )
+  {
+    return;
+  }
+  int sub_bin = sub_bin_distribution[bin]->get_bin(energy);
+
+  if ( !sub_bin_distribution[bin]->bin_in_range(sub_bin) )
+  {
+    return;
+  }
+  buffer.sub_bin_visits[bin*sub_bin_distribution[bin]->get_nbins()+sub_bin] += 1;
+}
+
 void Histogram::update_sub_bin( unsigned int bin, double energy )
 {
   if ( bin >= sub_bin_distribution.size() )
@@ -127,6 +205,23 @@ bool Histogram::is_flat( double criteria )
   return minimum > criteria*mean_dbl;
 }
 
+double Histogram::flatness() const
+{
+  double mean = 0.0;
+  double minimum = 0.0;
+  unsigned int count = 0;
+  for ( unsigned int i=0;i<hist.size();i++ )
+  {
+    if ( !known_structures[i] ) continue;
+    if ( (count == 0) || (hist[i] < minimum) ) minimum = hist[i];
+    mean += hist[i];
+    count += 1;
+  }
+  if ( (count == 0) || (mean == 0.0) ) return 0.0;
+  mean /= count;
+  return minimum/mean;
+}
+
 double Histogram::get_dos_ratio_old_divided_by_new( unsigned int old_bin, unsigned int new_bin ) const
 {
   double diff = logdos[old_bin] - logdos[new_bin];
@@ -134,6 +229,14 @@ double Histogram::get_dos_ratio_old_divided_by_new( unsigned int old_bin, unsign
   return exp(diff);
 }
 
+double Histogram::get_dos_ratio_old_divided_by_new( const HistogramUpdateBuffer &buffer, unsigned int old_bin, unsigned int new_bin ) const
+{
+  double diff = logdos[old_bin] + buffer.logdos_increment[old_bin] - \
+                logdos[new_bin] - buffer.logdos_increment[new_bin];
+  if ( diff > 0.0 ) return 1.0;
+  return exp(diff);
+}
+
 bool Histogram::bin_in_range(int bin) const
 {
   return (bin >= 0) && (bin < static_cast<int>(hist.size()));
@@ -190,6 +293,44 @@ void Histogram::init_from_pyhist( PyObject *py_hist )
   Py_DECREF( py_known_struct );
 }
 
+void Histogram::write_state( ostream &out ) const
+{
+  binary_io::write( out, Nbins );
+  binary_io::write( out, Emin );
+  binary_io::write( out, Emax );
+  binary_io::write( out, current_max_bin );
+  binary_io::write( out, current_min_bin );
+  binary_io::write( out, hist );
+  binary_io::write( out, logdos );
+  binary_io::write( out, known_structures );
+}
+
+void Histogram::read_state( istream &in )
+{
+  unsigned int stored_nbins;
+  binary_io::read( in, stored_nbins );
+  if ( stored_nbins != Nbins )
+  {
+    throw invalid_argument( "The number of bins in the checkpoint does not match the histogram!" );
+  }
+
+  double stored_emin, stored_emax;
+  binary_io::read( in, stored_emin );
+  binary_io::read( in, stored_emax );
+  binary_io::read( in, current_max_bin );
+  binary_io::read( in, current_min_bin );
+  binary_io::read( in, hist );
+  binary_io::read( in, logdos );
+  binary_io::read( in, known_structures );
+
+  if ( (stored_emin != Emin) || (stored_emax != Emax) )
+  {
+    Emin = stored_emin;
+    Emax = stored_emax;
+    init_sub_bins();
+  }
+}
+
 void Histogram::save_sub_bin_distribution( const string &fname ) const
 {
   ofstream out;
@@ -243,20 +384,57 @@ bool Histogram::update_synchronized( unsigned int num_threads, double conflict_p
 }
 
 void Histogram::update_bin_transfer( int from, int to )
+{
+  unsigned int indx = bin_transfer_index(from, to);
+  unsigned int N = bin_transfer[from].size();
+  bin_transfer[indx/N][indx%N] += 1;
+}
+
+void Histogram::update_bin_transfer( HistogramUpdateBuffer &buffer, int from, int to ) const
+{
+  buffer.bin_transfer[bin_transfer_index(from, to)] += 1;
+}
+
+unsigned int Histogram::bin_transfer_index( int from, int to ) const
 {
   int N = bin_transfer[from].size();
   int diff = to-from;
-  if ( diff > N-2 )
+  if ( diff >= N/2 )
   {
-    bin_transfer[from][N-1] += 1;
+    return from*N + N-1;
   }
-  else if ( diff < 1 )
+  else if ( diff <= -N/2 )
   {
-    bin_transfer[from][0] += 1;
+    return from*N;
   }
-  else
+  return from*N + N/2+diff;
+}
+
+Histogram* Histogram::extract_window( unsigned int lower, unsigned int upper ) const
+{
+  if ( (upper <= lower) || (upper > Nbins) )
+  {
+    throw invalid_argument( "Invalid window. Upper bin has to be larger than lower bin and not exceed the number of bins!" );
+  }
+
+  Histogram *window = new Histogram( upper-lower, get_energy(lower), get_energy(upper) );
+  for ( unsigned int i=lower;i<upper;i++ )
+  {
+    window->logdos[i-lower] = logdos[i];
+    window->known_structures[i-lower] = known_structures[i];
+  }
+  return window;
+}
+
+void Histogram::insert_window( const Histogram &window, unsigned int first_bin, unsigned int start, double shift )
+{
+  for ( unsigned int i=start;i<window.Nbins;i++ )
   {
-    bin_transfer[from][N/2+diff] += 1;
+    unsigned int bin = first_bin+i;
+    if ( bin >= Nbins ) break;
+    logdos[bin] = window.logdos[i] + shift;
+    hist[bin] = window.hist[i];
+    known_structures[bin] = window.known_structures[i];
   }
 }
 
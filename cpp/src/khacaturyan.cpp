@@ -2,6 +2,7 @@
 #include "use_numpy.hpp"
 #include "additional_tools.hpp"
 #include <omp.h>
+#include <stdexcept>
 
 using namespace std;
 Khachaturyan::Khachaturyan(PyObject *ft_shape_func, PyObject *elastic_tensor, PyObject *misfit_strain){
@@ -10,6 +11,10 @@ Khachaturyan::Khachaturyan(PyObject *ft_shape_func, PyObject *elastic_tensor, Py
     convertShapeFunc(ft_shape_func);
 }
 
+Khachaturyan::~Khachaturyan(){
+    Py_XDECREF(ft_shape_func);
+}
+
 void Khachaturyan::convertMisfit(PyObject *pymisfit){
     PyObject *npy = PyArray_FROM_OTF(pymisfit, NPY_DOUBLE, NPY_IN_ARRAY);
 
@@ -22,24 +27,24 @@ void Khachaturyan::convertMisfit(PyObject *pymisfit){
 }
 
 void Khachaturyan::convertShapeFunc(PyObject *ft_shp){
+    // Keeps a reference to the array. If ft_shp already is a C-contiguous
+    // array of doubles, this is the array itself
     PyObject *npy = PyArray_FROM_OTF(ft_shp, NPY_DOUBLE, NPY_IN_ARRAY);
+    if (npy == nullptr){
+        throw invalid_argument("Could not convert the shape function to a NumPy array!");
+    }
 
-    npy_intp* dims = PyArray_DIMS(npy);
+    if (PyArray_NDIM(reinterpret_cast<PyArrayObject*>(npy)) != 3){
+        Py_DECREF(npy);
+        throw invalid_argument("The shape function has to be a 3D array!");
+    }
 
-    for (unsigned int i=0;i<dims[0];i++)
-    {
-        vector< vector<double> > vec_outer;
-        for (unsigned int j=0;j<dims[1];j++){
-            vector<double> vec_inner;
-            for (unsigned int k=0;k<dims[2];k++){
-                double *val = static_cast<double*>(PyArray_GETPTR3(npy, i, j, k));
-                vec_inner.push_back(*val);
-            }
-            vec_outer.push_back(vec_inner);
-        }
-        ft_shape_func.push_back(vec_outer);
-    } 
-    Py_DECREF(npy);
+    npy_intp* shape = PyArray_DIMS(reinterpret_cast<PyArrayObject*>(npy));
+    for (unsigned int i=0;i<3;i++){
+        dims[i] = shape[i];
+    }
+    ft_shape_func = npy;
+    ft_data = static_cast<const double*>(PyArray_DATA(reinterpret_cast<PyArrayObject*>(npy)));
 }
 
 void Khachaturyan::green_function(mat3x3 &G, double direction[3]) const{
@@ -86,11 +91,8 @@ void Khachaturyan::effective_stress(mat3x3 &eff_stress) const{
 
 void Khachaturyan::wave_vector(unsigned int indx[3], double vec[3]) const{
     // Return the frequency follow Numpy conventions
-    int sizes[3];
-    sizes[0] = ft_shape_func.size();
-    sizes[1] = ft_shape_func[0].size();
-    sizes[2] = ft_shape_func[0][0].size();
-
+    int sizes[3] = {static_cast<int>(dims[0]), static_cast<int>(dims[1]), \
+                    static_cast<int>(dims[2])};
     for(int i=0;i<3;i++){
         if (indx[i] < sizes[i]/2){
             vec[i] = static_cast<double>(indx[i])/sizes[i];
@@ -106,9 +108,9 @@ double Khachaturyan::zeroth_order_integral(){
     effective_stress(eff_stress);
     
     double integral = 0.0;
-    unsigned int nx = ft_shape_func.size();
-    unsigned int ny = ft_shape_func[0].size();
-    unsigned int nz = ft_shape_func[0][0].size();
+    unsigned int nx = dims[0];
+    unsigned int ny = dims[1];
+    unsigned int nz = dims[2];
 
     #ifdef PARALLEL_KHACHATURYAN_INTEGRAL
     #pragma omp parallel for collapse(3) reduction(+:integral)
@@ -122,7 +124,7 @@ double Khachaturyan::zeroth_order_integral(){
             // G is not continuos
             // Average over 8 directions
             double weight = 1.0/8.0;
-            double shape_val = ft_shape_func[0][0][0];
+            double shape_val = ft_data[0];
             for (int x=-1;x<=1;x+=2)
             for (int y=-1;y<=1;y+=2)
             for (int z=-1;z<=1;z+=2){
@@ -144,7 +146,7 @@ double Khachaturyan::zeroth_order_integral(){
             green_function(G, kvec);
 
             double res = contract_green_function(G, eff_stress, kvec);
-            integral += res*ft_shape_func[i][j][k];
+            integral += res*ft_data[(i*ny + j)*nz + k];
         }
     }
     return integral;
@@ -0,0 +1,97 @@
+#include "rng.hpp"
+#include <random>
+#include <stdexcept>
+
+using namespace std;
+
+static inline uint64_t rotl( uint64_t x, int k )
+{
+  return (x << k) | (x >> (64 - k));
+}
+
+void RandomGenerator::seed( uint64_t seed_value )
+{
+  // Expand the seed with splitmix64 as recommended by the authors of xoshiro
+  uint64_t x = seed_value;
+  for ( unsigned int i=0;i<state.size();i++ )
+  {
+    x += 0x9e3779b97f4a7c15ULL;
+    uint64_t z = x;
+    z = (z ^ (z >> 30))*0xbf58476d1ce4e5b9ULL;
+    z = (z ^ (z >> 27))*0x94d049bb133111ebULL;
+    state[i] = z ^ (z >> 31);
+  }
+}
+
+RandomGenerator::result_type RandomGenerator::operator()()
+{
+  const uint64_t result = rotl( state[1]*5, 7 )*9;
+  const uint64_t t = state[1] << 17;
+
+  state[2] ^= state[0];
+  state[3] ^= state[1];
+  state[1] ^= state[2];
+  state[0] ^= state[3];
+  state[2] ^= t;
+  state[3] = rotl( state[3], 45 );
+  return result;
+}
+
+double RandomGenerator::uniform()
+{
+  // Use the upper 53 bits
+  return ((*this)() >> 11)*(1.0/9007199254740992.0);
+}
+
+uint64_t RandomGenerator::randint( uint64_t n )
+{
+  if ( n == 0 )
+  {
+    throw invalid_argument( "The upper limit of randint has to be positive!" );
+  }
+
+  // Reject the numbers above the largest multiple of n to avoid modulo bias
+  const uint64_t limit = max() - max()%n;
+  uint64_t value = (*this)();
+  while ( value >= limit )
+  {
+    value = (*this)();
+  }
+  return value%n;
+}
+
+void RandomGenerator::jump()
+{
+  static const uint64_t JUMP[] = {0x180ec6d33cfd0abaULL, 0xd5a61266f0c9392cULL, \
+                                  0xa9582618e03fc9aaULL, 0x39abdc4529b1661cULL};
+
+  array<uint64_t,4> new_state = {{0, 0, 0, 0}};
+  for ( unsigned int i=0;i<4;i++ )
+  {
+    for ( unsigned int b=0;b<64;b++ )
+    {
+      if ( JUMP[i] & (static_cast<uint64_t>(1) << b) )
+      {
+        for ( unsigned int j=0;j<4;j++ )
+        {
+          new_state[j] ^= state[j];
+        }
+      }
+      (*this)();
+    }
+  }
+  state = new_state;
+}
+
+RandomGenerator RandomStreams::next_stream()
+{
+  RandomGenerator stream = next;
+  next.jump();
+  return stream;
+}
+
+uint64_t random_seed()
+{
+  random_device rd;
+  return (static_cast<uint64_t>(rd()) << 32) ^ rd();
+}
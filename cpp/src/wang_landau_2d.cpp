@@ -0,0 +1,252 @@
+#include "wang_landau_2d.hpp"
+#include <stdexcept>
+#include <iostream>
+#include <ctime>
+#include <cmath>
+#include <sstream>
+
+using namespace std;
+
+WangLandau2DSampler::WangLandau2DSampler( PyObject *atoms, PyObject *BC, PyObject *corrFunc, PyObject *ecis, \
+  const vector<int> &sites, const string &host, const string &solute, \
+  unsigned int n_energy_bins, double emin, double emax, unsigned int seed ): \
+  sites(sites), host(host), solute(solute), n_energy_bins(n_energy_bins), emin(emin), emax(emax), rng(seed)
+{
+  if ( host == solute )
+  {
+    throw invalid_argument( "The host and the solute has to be different!" );
+  }
+  if ( sites.size() == 0 )
+  {
+    throw invalid_argument( "At least one site has to be given!" );
+  }
+  if ( (n_energy_bins == 0) || (emax <= emin) )
+  {
+    throw invalid_argument( "The energy range has to be positive and contain at least one bin!" );
+  }
+
+  CEUpdater init_updater;
+  init_updater.init( atoms, BC, corrFunc, ecis );
+  updater = init_updater.copy();
+
+  const vector<string> &symbs = updater->get_symbols();
+  for ( int site : sites )
+  {
+    if ( (site < 0) || (static_cast<unsigned int>(site) >= symbs.size()) )
+    {
+      throw invalid_argument( "Site index out of range!" );
+    }
+
+    if ( symbs[site] == solute )
+    {
+      n_solute += 1;
+    }
+    else if ( symbs[site] != host )
+    {
+      stringstream msg;
+      msg << "Site " << site << " is occupied by " << symbs[site] << ". Expected ";
+      msg << host << " or " << solute;
+      throw invalid_argument( msg.str() );
+    }
+  }
+
+  n_comp_bins = sites.size() + 1;
+  logdos.resize( n_energy_bins*n_comp_bins, 0.0 );
+  hist.resize( n_energy_bins*n_comp_bins, 0 );
+  known.resize( n_energy_bins*n_comp_bins, false );
+  current_energy = updater->get_energy();
+  current_ebin = get_energy_bin( current_energy );
+  if ( (current_ebin < 0) || (current_ebin >= static_cast<int>(n_energy_bins)) )
+  {
+    current_ebin = -1;
+  }
+}
+
+WangLandau2DSampler::~WangLandau2DSampler()
+{
+  delete updater;
+  delete schedule;
+}
+
+int WangLandau2DSampler::get_energy_bin( double energy ) const
+{
+  return floor( (energy-emin)*n_energy_bins/(emax-emin) );
+}
+
+void WangLandau2DSampler::set_schedule( const string &name, double gain, double t0 )
+{
+  ModificationFactorSchedule *new_schedule = nullptr;
+  if ( name == "flat_histogram" )
+  {
+    new_schedule = new FlatHistogramSchedule( false );
+  }
+  else if ( name == "inverse_time" )
+  {
+    new_schedule = new InverseTimeSchedule();
+  }
+  else if ( name == "samc" )
+  {
+    new_schedule = new SAMCSchedule( gain, t0 );
+  }
+  else
+  {
+    throw invalid_argument( "Unknown schedule " + name + ". Has to be one of flat_histogram, inverse_time, samc" );
+  }
+  delete schedule;
+  schedule = new_schedule;
+}
+
+vector<int> WangLandau2DSampler::get_known_bins() const
+{
+  vector<int> known_int( known.size(), 0 );
+  for ( unsigned int i=0;i<known.size();i++ )
+  {
+    known_int[i] = known[i];
+  }
+  return known_int;
+}
+
+double WangLandau2DSampler::flatness() const
+{
+  if ( num_known == 0 ) return 0.0;
+
+  double mean = 0.0;
+  unsigned int minimum = 0;
+  bool first = true;
+  for ( unsigned int i=0;i<hist.size();i++ )
+  {
+    if ( !known[i] ) continue;
+    mean += hist[i];
+    if ( first || (hist[i] < minimum) ) minimum = hist[i];
+    first = false;
+  }
+  mean /= num_known;
+  if ( mean <= 0.0 ) return 0.0;
+  return minimum/mean;
+}
+
+double WangLandau2DSampler::get_mc_time() const
+{
+  if ( num_known == 0 ) return iter;
+  return iter/num_known;
+}
+
+void WangLandau2DSampler::reset_histogram()
+{
+  for ( unsigned int i=0;i<hist.size();i++ )
+  {
+    hist[i] = 0;
+  }
+}
+
+void WangLandau2DSampler::step()
+{
+  unsigned int site = sites[rng.randint(sites.size())];
+  SymbolChange change;
+  change.indx = site;
+  change.old_symb = updater->get_symbols()[site];
+  int dn = 1;
+  if ( change.old_symb == solute )
+  {
+    change.new_symb = host;
+    dn = -1;
+  }
+  else
+  {
+    change.new_symb = solute;
+  }
+
+  updater->update_cf( change );
+  double energy = updater->get_energy();
+  int ebin = get_energy_bin( energy );
+  unsigned int new_n = n_solute + dn;
+  bool in_range = (ebin >= 0) && (ebin < static_cast<int>(n_energy_bins));
+
+  bool accept = false;
+  if ( current_ebin < 0 )
+  {
+    // The walker has not entered the energy range yet. Walk greedily towards it
+    double distance = (current_energy < emin) ? emin - current_energy : current_energy - emax;
+    double new_distance = (energy < emin) ? emin - energy : energy - emax;
+    accept = in_range || (new_distance < distance);
+  }
+  else if ( in_range )
+  {
+    double log_ratio = logdos[index(current_ebin, n_solute)] - logdos[index(ebin, new_n)];
+    accept = (log_ratio >= 0.0) || (rng.uniform() < exp(log_ratio));
+  }
+  else
+  {
+    n_outside_range += 1.0;
+  }
+
+  if ( accept )
+  {
+    updater->clear_history();
+    current_energy = energy;
+    n_solute = new_n;
+    current_ebin = in_range ? ebin : -1;
+  }
+  else
+  {
+    updater->undo_changes();
+    updater->clear_history();
+  }
+
+  if ( current_ebin < 0 ) return;
+
+  unsigned int indx = index( current_ebin, n_solute );
+  if ( !known[indx] )
+  {
+    known[indx] = true;
+    num_known += 1;
+  }
+  hist[indx] += 1;
+  logdos[indx] += f;
+  iter += 1.0;
+}
+
+void WangLandau2DSampler::run( unsigned int nsteps )
+{
+  if ( schedule == nullptr )
+  {
+    schedule = new FlatHistogramSchedule( false );
+  }
+  cout << "Modification factor schedule: " << schedule->name() << endl;
+
+  unsigned int n_outer = nsteps/check_convergence_every;
+  clock_t start = clock();
+  double previous_stage_time = -1.0;
+  for ( unsigned int i=0;i<n_outer;i++ )
+  {
+    for ( unsigned int j=0;j<check_convergence_every;j++ )
+    {
+      step();
+    }
+
+    ConvergenceInfo info;
+    info.mc_time = get_mc_time();
+    info.flat = flatness() > flatness_criteria;
+    info.stage_time = static_cast<double>(clock()-start)/CLOCKS_PER_SEC;
+    info.previous_stage_time = previous_stage_time;
+
+    double new_f = f;
+    bool stage_finished = schedule->update( new_f, info );
+    f = new_f;
+    if ( stage_finished )
+    {
+      cout << "Histogram is flat (" << num_known << " known bins). New f: " << f << endl;
+      previous_stage_time = info.stage_time;
+      reset_histogram();
+      start = clock();
+    }
+
+    if ( f < min_f )
+    {
+      cout << "Simulation converged!\n";
+      converged = true;
+      break;
+    }
+  }
+  cout << n_outside_range/(iter+n_outside_range) << " of the trial moves was outside the energy range\n";
+}
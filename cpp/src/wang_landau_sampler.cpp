@@ -1,28 +1,30 @@
 #include "wang_landau_sampler.hpp"
 #include "additional_tools.hpp"
 #include "adaptive_windows.hpp"
+#include "wl_schedules.hpp"
 #include "use_numpy.hpp"
+#include "binary_io.hpp"
+#include "rng.hpp"
 #include <omp.h>
 #include <cstdlib>
+#include <cstdio>
 #include <ctime>
 #include <iostream>
 #include <stdexcept>
 #include <chrono>
 #include <fstream>
 #include <sstream>
+#include <cmath>
 using namespace std;
 
 const unsigned int WangLandauSampler::num_threads = omp_get_max_threads(); // Use the maximum number of threads
+const string checkpoint_magic = "CEMC_WL_CHECKPOINT_V2";
 
 WangLandauSampler::WangLandauSampler(PyObject *atoms, PyObject *BC, PyObject *corrFunc, PyObject *ecis, PyObject *py_wl_in )
 {
 
-  // Initialize the seeds for the different threads
-  srand(time(NULL));
-  for ( unsigned int i=0;i<num_threads;i++ )
-  {
-    seeds.push_back( rand() );
-  }
+  // One independent random number stream per thread. Use set_seed for reproducible runs
+  set_seed( random_seed() );
 
   CEUpdater updater;
   updater.init(atoms, BC, corrFunc, ecis);
@@ -126,6 +128,19 @@ WangLandauSampler::WangLandauSampler(PyObject *atoms, PyObject *BC, PyObject *co
   }
   Py_DECREF(py_symbols);
 
+  PyObject *py_ensemble = PyObject_GetAttrString( py_wl, "ensemble" );
+  sgc = ( py2string(py_ensemble) == "semi-grand-canonical" );
+  Py_DECREF( py_ensemble );
+  if ( sgc )
+  {
+    read_sgc_parameters();
+  }
+  for ( unsigned int i=0;i<num_threads;i++ )
+  {
+    chem_pot_term.push_back( chem_pot_contribution(i) );
+    pending_chem_pot_change.push_back( 0.0 );
+  }
+
   #ifdef WANG_LANDAU_DEBUG
     cout << "Reading histogram data\n";
   #endif
@@ -171,6 +186,8 @@ WangLandauSampler::~WangLandauSampler()
     delete atom_positions_track[i];
   }
   delete histogram;
+  delete schedule;
+  clear_windows();
 }
 
 void WangLandauSampler::get_canonical_trial_move( array<SymbolChange,2> &changes, unsigned int &select1, unsigned int &select2 )
@@ -181,12 +198,12 @@ void WangLandauSampler::get_canonical_trial_move( array<SymbolChange,2> &changes
 void WangLandauSampler::get_canonical_trial_move( unsigned int thread_num, array<SymbolChange,2> &changes, unsigned int &select1, unsigned int &select2 )
 {
   // Select a random symbol
-  unsigned int first_indx = rand_r(&seeds[thread_num])%symbols.size();
+  unsigned int first_indx = rngs[thread_num].randint(symbols.size());
   string symb1 = symbols[first_indx];
 
   // Select a random atom among the ones having the selected symbol
   unsigned int N = (*atom_positions_track[thread_num])[symb1].size();
-  select1 = rand_r(&seeds[thread_num])%N;
+  select1 = rngs[thread_num].randint(N);
 
   // Extract the atom index and the site type
   unsigned int indx1 = (*atom_positions_track[thread_num])[symb1][select1];
@@ -199,9 +216,9 @@ void WangLandauSampler::get_canonical_trial_move( unsigned int thread_num, array
   // In a similar manner select a random atom with the same site type, but different symbol
   while ( (symb2 == symb1) || (site_type2 != site_type1) )
   {
-    symb2 = symbols[rand_r( &seeds[thread_num] )%symbols.size()];
+    symb2 = symbols[rngs[thread_num].randint(symbols.size())];
     N = (*atom_positions_track[thread_num])[symb2].size();
-    select2 = rand_r( &seeds[thread_num] )%N;
+    select2 = rngs[thread_num].randint(N);
     indx2 = (*atom_positions_track[thread_num])[symb2][select2];
     site_type2 = site_types[indx2];
   }
@@ -210,12 +227,12 @@ void WangLandauSampler::get_canonical_trial_move( unsigned int thread_num, array
   select1 = 0;
   select2 = 0;
   const vector<string>& symbs = updaters[thread_num]->get_symbols();
-  indx1 = rand_r(&seeds[thread_num])%symbs.size();
+  indx1 = rngs[thread_num].randint(symbs.size());
   symb1 = symbs[indx1];
   symb2 = symb1;
   while( symb2==symb1 )
   {
-    indx2 =rand_r(&seeds[thread_num])%symbs.size();
+    indx2 = rngs[thread_num].randint(symbs.size());
     symb2 = symbs[indx2];
   }*/
 
@@ -229,29 +246,163 @@ void WangLandauSampler::get_canonical_trial_move( unsigned int thread_num, array
   changes[1].track_indx = select2;
 }
 
-void WangLandauSampler::step()
+void WangLandauSampler::read_sgc_parameters()
 {
-  iter+=1;
-  iter_since_last+=1.0;
-  int uid = omp_get_thread_num();
+  #ifdef WANG_LANDAU_DEBUG
+    cout << "Reading chemical potentials\n";
+  #endif
+  PyObject *py_chem_pot = PyObject_GetAttrString( py_wl, "chem_pot" );
+  if ( !PyDict_Check(py_chem_pot) )
+  {
+    throw invalid_argument("Expected dict when parsing chem_pot!");
+  }
+  Py_ssize_t pos = 0;
+  PyObject *key;
+  PyObject *value;
+  while ( PyDict_Next(py_chem_pot, &pos, &key, &value) )
+  {
+    chem_pot[py2string(key)] = PyFloat_AsDouble(value);
+  }
+  Py_DECREF( py_chem_pot );
+
+  PyObject *py_swaps = PyObject_GetAttrString( py_wl, "possible_swaps" );
+  if ( !PyList_Check(py_swaps) )
+  {
+    throw invalid_argument("Expected list when parsing possible_swaps!");
+  }
+  int n_site_types = list_size( py_swaps );
+  for ( int i=0;i<n_site_types;i++ )
+  {
+    map< string,vector<string> > swaps;
+    pos = 0;
+    while ( PyDict_Next(PyList_GetItem(py_swaps,i), &pos, &key, &value) )
+    {
+      vector<string> new_symbs;
+      for ( int j=0;j<list_size(value);j++ )
+      {
+        new_symbs.push_back( py2string(PyList_GetItem(value,j)) );
+      }
+      swaps[py2string(key)] = new_symbs;
+    }
+    possible_swaps.push_back(swaps);
+  }
+  Py_DECREF( py_swaps );
+
+  // get_sgc_trial_move draws sites until it finds one with an allowed swap,
+  // so make sure that at least one exists
+  const vector<string> &symbs = updaters[0]->get_symbols();
+  bool can_flip = false;
+  for ( unsigned int i=0;i<symbs.size();i++ )
+  {
+    if ( (site_types[i] < 0) || (static_cast<unsigned int>(site_types[i]) >= possible_swaps.size()) ) continue;
+    auto iter = possible_swaps[site_types[i]].find( symbs[i] );
+    if ( (iter != possible_swaps[site_types[i]].end()) && (iter->second.size() > 0) )
+    {
+      can_flip = true;
+      break;
+    }
+  }
+
+  if ( !can_flip )
+  {
+    throw runtime_error("No site can change symbol in the semi-grand canonical ensemble!");
+  }
+}
+
+double WangLandauSampler::get_chem_pot( const string &symb ) const
+{
+  auto iter = chem_pot.find(symb);
+  if ( iter == chem_pot.end() ) return 0.0;
+  return iter->second;
+}
+
+double WangLandauSampler::chem_pot_contribution( unsigned int walker ) const
+{
+  if ( !sgc ) return 0.0;
+  double term = 0.0;
+  for ( const string &symb : updaters[walker]->get_symbols() )
+  {
+    term += get_chem_pot(symb);
+  }
+  return term;
+}
+
+double WangLandauSampler::walker_energy( unsigned int walker )
+{
+  return updaters[walker]->get_energy() - chem_pot_term[walker];
+}
+
+void WangLandauSampler::get_sgc_trial_move( unsigned int thread_num, SymbolChange &change )
+{
+  const vector<string> &symbs = updaters[thread_num]->get_symbols();
+  while ( true )
+  {
+    unsigned int indx = rngs[thread_num].randint(symbs.size());
+    const map< string,vector<string> > &swaps = possible_swaps[site_types[indx]];
+    auto iter = swaps.find( symbs[indx] );
+    if ( (iter == swaps.end()) || (iter->second.size() == 0) ) continue;
+
+    change.indx = indx;
+    change.old_symb = symbs[indx];
+    change.new_symb = iter->second[rngs[thread_num].randint(iter->second.size())];
+    change.track_indx = 0;
+    return;
+  }
+}
+
+double WangLandauSampler::trial_move( unsigned int walker )
+{
+  if ( sgc )
+  {
+    SymbolChange change;
+    get_sgc_trial_move( walker, change );
+    pending_chem_pot_change[walker] = get_chem_pot(change.new_symb) - get_chem_pot(change.old_symb);
+    updaters[walker]->update_cf( change );
+    return walker_energy(walker) - pending_chem_pot_change[walker];
+  }
 
   array<SymbolChange,2> change;
   unsigned int select1, select2;
-  get_canonical_trial_move( uid, change, select1, select2 );
-  //cout << updaters.size() << endl;
-  double energy = updaters[uid]->calculate( change );
+  get_canonical_trial_move( walker, change, select1, select2 );
+  return updaters[walker]->calculate( change );
+}
+
+void WangLandauSampler::accept_trial_move( unsigned int walker )
+{
+  if ( sgc )
+  {
+    chem_pot_term[walker] += pending_chem_pot_change[walker];
+  }
+}
 
-  //if ( static_cast<int>(iter_since_last)%update_hist_every != 0 ) return;
+void WangLandauSampler::reject_trial_move( unsigned int walker )
+{
+  if ( sgc )
+  {
+    updaters[walker]->undo_last_change();
+    return;
+  }
+  updaters[walker]->undo_changes();
+}
+
+void WangLandauSampler::step()
+{
+  // All updates of shared data are accumulated in thread private buffers
+  // that are merged in merge_thread_buffers
+  int uid = omp_get_thread_num();
+  HistogramUpdateBuffer &buffer = hist_buffers[uid];
+  WalkerStatistics &stat = walker_stats[uid];
+
+  double energy = trial_move( uid );
 
   int bin = histogram->get_bin( energy );
-  avg_bin_change += abs(bin-current_bin[uid]);
-  //cout << bin << " " << current_bin[uid] << endl;
+  stat.avg_bin_change += abs(bin-current_bin[uid]);
 
   // Check if the proposed bin is in the sampling range. If not undo changes and return.
   if ( !histogram->bin_in_range(bin) )
   {
-    n_outside_range += 1.0;
-    updaters[uid]->undo_changes();
+    stat.n_outside_range += 1.0;
+    reject_trial_move( uid );
     if ( is_first[uid] ) return;
 
     int num_active = histogram->get_number_of_active_bins();
@@ -260,64 +411,427 @@ void WangLandauSampler::step()
   }
   else if ( bin == current_bin[uid] )
   {
-    //updaters[uid]->clear_history();
-    n_self_proposals += 1;
-    //return;
+    stat.n_self_proposals += 1;
   }
 
-  //cout << bin << " " << current_bin[uid] << endl;
-  double dosratio = histogram->get_dos_ratio_old_divided_by_new( current_bin[uid], bin );
-  avg_acc_rate += dosratio;
-  double uniform_random = static_cast<double>(rand_r( &seeds[uid] ))/RAND_MAX;
+  double dosratio = histogram->get_dos_ratio_old_divided_by_new( buffer, current_bin[uid], bin );
+  stat.avg_acc_rate += dosratio;
+  double uniform_random = rngs[uid].uniform();
   bool accept = (uniform_random < dosratio) || is_first[uid];
   int old_current_bin = current_bin[uid];
   if ( accept )
   {
     // Accept
+    accept_trial_move( uid );
     current_bin[uid] = bin;
     is_first[uid] = false;
     current_energy[uid] = energy;
   }
   else
   {
-    updaters[uid]->undo_changes();
+    reject_trial_move( uid );
   }
   updaters[uid]->clear_history();
 
+  histogram->update( buffer, current_bin[uid], f );
+  histogram->update_sub_bin( buffer, current_bin[uid], current_energy[uid] );
+  histogram->update_bin_transfer( buffer, old_current_bin, bin );
 
-  if ( histogram->update_synchronized(num_threads,0.2) )
+  // Track tunnelling between the lowest and highest energy region
+  if ( (current_bin[uid] <= low_edge_bin) && (last_edge[uid] != 0) )
   {
-    #pragma omp critical(updateHist)
-    {
-      histogram->update( current_bin[uid], f );
-      histogram->update_sub_bin(current_bin[uid],current_energy[uid]);
-    }
+    if ( last_edge[uid] == 1 ) stat.half_round_trips += 1;
+    last_edge[uid] = 0;
+  }
+  else if ( (current_bin[uid] >= high_edge_bin) && (last_edge[uid] != 1) )
+  {
+    if ( last_edge[uid] == 0 ) stat.half_round_trips += 1;
+    last_edge[uid] = 1;
+  }
+}
+
+void WangLandauSampler::init_thread_buffers()
+{
+  hist_buffers.resize( num_threads );
+  walker_stats.resize( num_threads );
+  if ( last_edge.size() != num_threads )
+  {
+    // Not restored from a checkpoint
+    last_edge.assign( num_threads, -1 );
+  }
+  update_edge_bins();
+  for ( unsigned int i=0;i<num_threads;i++ )
+  {
+    histogram->init_buffer( hist_buffers[i] );
+    walker_stats[i] = WalkerStatistics();
+  }
+}
+
+void WangLandauSampler::merge_thread_buffers()
+{
+  // Merge in the order of the thread number such that the result does
+  // not depend on the order in which the threads finished
+  for ( unsigned int i=0;i<hist_buffers.size();i++ )
+  {
+    histogram->merge( hist_buffers[i] );
+    n_outside_range += walker_stats[i].n_outside_range;
+    n_self_proposals += walker_stats[i].n_self_proposals;
+    avg_acc_rate += walker_stats[i].avg_acc_rate;
+    avg_bin_change += walker_stats[i].avg_bin_change;
+    half_round_trips += walker_stats[i].half_round_trips;
+    walker_stats[i] = WalkerStatistics();
+  }
+  update_edge_bins();
+}
+
+void WangLandauSampler::update_edge_bins()
+{
+  // The edges are the lowest and highest 5 percent of the known part of the
+  // active energy range
+  int first_known = -1;
+  int last_known = -1;
+  int num_active = histogram->get_number_of_active_bins();
+  for ( int i=0;i<num_active;i++ )
+  {
+    if ( !histogram->is_known(i) ) continue;
+    if ( first_known == -1 ) first_known = i;
+    last_known = i;
+  }
+
+  if ( first_known == -1 )
+  {
+    low_edge_bin = 0;
+    high_edge_bin = num_active-1;
+    return;
+  }
+  int width = (last_known-first_known)/20;
+  low_edge_bin = first_known + width;
+  high_edge_bin = last_known - width;
+}
+
+void WangLandauSampler::set_schedule( const string &name, double gain, double t0, unsigned int round_trips )
+{
+  ModificationFactorSchedule *new_schedule = nullptr;
+  if ( name == "flat_histogram" )
+  {
+    new_schedule = new FlatHistogramSchedule( use_inverse_time_algorithm );
+  }
+  else if ( name == "inverse_time" )
+  {
+    new_schedule = new InverseTimeSchedule();
+  }
+  else if ( name == "samc" )
+  {
+    new_schedule = new SAMCSchedule( gain, t0 );
+  }
+  else if ( name == "tunnelling" )
+  {
+    new_schedule = new TunnellingSchedule( round_trips );
   }
   else
   {
-    histogram->update( current_bin[uid], f );
-    histogram->update_sub_bin(current_bin[uid],current_energy[uid]);
+    throw invalid_argument( "Unknown schedule " + name + ". Has to be one of flat_histogram, inverse_time, samc, tunnelling" );
   }
+  delete schedule;
+  schedule = new_schedule;
 
-  histogram->update_bin_transfer(old_current_bin,bin);
+  // The windows get copies of the new schedule at the next run
+  for ( unsigned int i=0;i<window_schedules.size();i++ )
+  {
+    delete window_schedules[i];
+  }
+  window_schedules.clear();
+}
 
-  /*
-  if ( (n_outside_range/iter_since_last > 0.1) && (iter_since_last>histogram->get_nbins()) )
+void WangLandauSampler::set_seed( uint64_t seed )
+{
+  streams = RandomStreams( seed );
+  rngs.clear();
+  unsigned int n_walkers = updaters.size() > num_threads ? updaters.size() : num_threads;
+  for ( unsigned int i=0;i<n_walkers;i++ )
   {
-    #pragma omp barrier
-    {
-      if ( uid == 0 )
-      {
-        histogram->redistribute_samplers();
-        n_outside_range = 0;
-        iter_since_last = 1;
-      }
-    }
-  }*/
+    rngs.push_back( streams.next_stream() );
+  }
+}
+
+void WangLandauSampler::set_convergence_log( const string &fname )
+{
+  convergence_log = fname;
+  ofstream out( fname.c_str() );
+  if ( !out.good() )
+  {
+    throw invalid_argument( "Could not open " + fname + " for writing!" );
+  }
+  out << "# MC time, f, flatness, RMS change in log g, error in log g\n";
+  out.close();
+}
+
+void WangLandauSampler::set_reference_logdos( const vector<double> &ref )
+{
+  if ( ref.size() != histogram->get_nbins() )
+  {
+    throw invalid_argument( "The reference logdos has to have the same number of bins as the histogram!" );
+  }
+  reference_logdos = ref;
+}
+
+double WangLandauSampler::logdos_deviation( const vector<double> &ref ) const
+{
+  // The DOS is only known up to a constant, so both are shifted such that
+  // the mean over the known bins is zero
+  const vector<double> &logdos = histogram->get_logdos();
+  double mean = 0.0;
+  double mean_ref = 0.0;
+  unsigned int count = 0;
+  for ( unsigned int i=0;i<logdos.size();i++ )
+  {
+    if ( !histogram->is_known(i) ) continue;
+    mean += logdos[i];
+    mean_ref += ref[i];
+    count += 1;
+  }
+  if ( count == 0 ) return 0.0;
+  mean /= count;
+  mean_ref /= count;
+
+  double dev = 0.0;
+  for ( unsigned int i=0;i<logdos.size();i++ )
+  {
+    if ( !histogram->is_known(i) ) continue;
+    double diff = (logdos[i] - mean) - (ref[i] - mean_ref);
+    dev += diff*diff;
+  }
+  return sqrt(dev/count);
+}
+
+void WangLandauSampler::log_convergence( const ConvergenceInfo &info )
+{
+  if ( convergence_log == "" ) return;
+
+  double change = 0.0;
+  if ( prev_logdos.size() == histogram->get_nbins() )
+  {
+    change = logdos_deviation( prev_logdos );
+  }
+  prev_logdos = histogram->get_logdos();
+
+  double error = -1.0;
+  if ( reference_logdos.size() > 0 )
+  {
+    error = logdos_deviation( reference_logdos );
+  }
+
+  ofstream out( convergence_log.c_str(), ios::app );
+  out << info.mc_time << "," << f << "," << histogram->flatness() << ",";
+  out << change << "," << error << "\n";
+  out.close();
+}
+
+void WangLandauSampler::set_checkpoint( const string &fname, double interval )
+{
+  if ( use_rewl )
+  {
+    throw invalid_argument( "Checkpoints are not supported for replica exchange Wang-Landau!" );
+  }
+  if ( interval <= 0.0 )
+  {
+    throw invalid_argument( "The checkpoint interval has to be positive!" );
+  }
+  checkpoint_file = fname;
+  checkpoint_interval = interval;
+  last_checkpoint = chrono::steady_clock::now();
+}
+
+void WangLandauSampler::checkpoint_if_due()
+{
+  if ( checkpoint_file == "" ) return;
+
+  chrono::duration<double> elapsed = chrono::steady_clock::now() - last_checkpoint;
+  if ( elapsed.count() < checkpoint_interval ) return;
+
+  save_checkpoint( checkpoint_file );
+  last_checkpoint = chrono::steady_clock::now();
+}
+
+void WangLandauSampler::save_checkpoint( const string &fname ) const
+{
+  if ( use_rewl )
+  {
+    throw invalid_argument( "Checkpoints are not supported for replica exchange Wang-Landau!" );
+  }
+
+  string tmp_fname = fname + ".tmp";
+  ofstream out( tmp_fname.c_str(), ios::binary );
+  if ( !out.good() )
+  {
+    throw runtime_error( "Could not open " + tmp_fname + " for writing!" );
+  }
+
+  binary_io::write( out, checkpoint_magic );
+  binary_io::write( out, static_cast<unsigned int>(updaters.size()) );
+  binary_io::write( out, sgc );
+
+  // Global state
+  binary_io::write( out, f );
+  binary_io::write( out, iter );
+  binary_io::write( out, iter_since_last );
+  binary_io::write( out, n_outside_range );
+  binary_io::write( out, n_self_proposals );
+  binary_io::write( out, avg_bin_change );
+  binary_io::write( out, avg_acc_rate );
+  binary_io::write( out, half_round_trips );
+  binary_io::write( out, converged );
+  binary_io::write( out, time_to_converge );
+
+  // Walkers
+  binary_io::write( out, rngs );
+  binary_io::write( out, current_bin );
+  binary_io::write( out, current_energy );
+  binary_io::write( out, is_first );
+  binary_io::write( out, chem_pot_term );
+  binary_io::write( out, last_edge );
+  for ( unsigned int i=0;i<updaters.size();i++ )
+  {
+    binary_io::write( out, updaters[i]->get_symbols() );
+    binary_io::write( out, *atom_positions_track[i] );
+  }
+
+  // Schedule
+  if ( schedule == nullptr )
+  {
+    binary_io::write( out, string("") );
+    binary_io::write( out, vector<double>() );
+  }
+  else
+  {
+    binary_io::write( out, schedule->name() );
+    binary_io::write( out, schedule->get_state() );
+  }
+
+  histogram->write_state( out );
+  out.close();
+  if ( out.fail() )
+  {
+    throw runtime_error( "An error occured when writing the checkpoint " + tmp_fname );
+  }
+
+  // Rename is atomic, so a job killed while writing leaves the previous checkpoint intact
+  if ( rename( tmp_fname.c_str(), fname.c_str() ) != 0 )
+  {
+    throw runtime_error( "Could not move " + tmp_fname + " to " + fname );
+  }
+  cout << "Checkpoint written to " << fname << endl;
+}
+
+void WangLandauSampler::load_checkpoint( const string &fname )
+{
+  if ( use_rewl )
+  {
+    throw invalid_argument( "Checkpoints are not supported for replica exchange Wang-Landau!" );
+  }
+
+  ifstream in( fname.c_str(), ios::binary );
+  if ( !in.good() )
+  {
+    throw invalid_argument( "Could not open checkpoint " + fname );
+  }
+
+  string magic;
+  binary_io::read( in, magic );
+  if ( magic != checkpoint_magic )
+  {
+    throw invalid_argument( fname + " is not a Wang-Landau checkpoint!" );
+  }
+
+  unsigned int n_walkers;
+  binary_io::read( in, n_walkers );
+  if ( n_walkers != updaters.size() )
+  {
+    stringstream msg;
+    msg << "The checkpoint has " << n_walkers << " walkers, but the sampler has ";
+    msg << updaters.size() << ". Use the same number of OpenMP threads when restarting";
+    throw invalid_argument( msg.str() );
+  }
+
+  bool stored_sgc;
+  binary_io::read( in, stored_sgc );
+  if ( stored_sgc != sgc )
+  {
+    throw invalid_argument( "The checkpoint was written for a different statistical ensemble!" );
+  }
+
+  binary_io::read( in, f );
+  binary_io::read( in, iter );
+  binary_io::read( in, iter_since_last );
+  binary_io::read( in, n_outside_range );
+  binary_io::read( in, n_self_proposals );
+  binary_io::read( in, avg_bin_change );
+  binary_io::read( in, avg_acc_rate );
+  binary_io::read( in, half_round_trips );
+  binary_io::read( in, converged );
+  binary_io::read( in, time_to_converge );
+
+  binary_io::read( in, rngs );
+  binary_io::read( in, current_bin );
+  binary_io::read( in, current_energy );
+  binary_io::read( in, is_first );
+  binary_io::read( in, chem_pot_term );
+  binary_io::read( in, last_edge );
+  for ( unsigned int i=0;i<updaters.size();i++ )
+  {
+    vector<string> symbs;
+    binary_io::read( in, symbs );
+    set_walker_symbols( i, symbs );
+    binary_io::read( in, *atom_positions_track[i] );
+  }
+
+  string schedule_name;
+  vector<double> schedule_state;
+  binary_io::read( in, schedule_name );
+  binary_io::read( in, schedule_state );
+  if ( (schedule != nullptr) && (schedule->name() == schedule_name) )
+  {
+    schedule->set_state( schedule_state );
+  }
+  else if ( schedule_name != "" )
+  {
+    cout << "Warning! The checkpoint was written with the " << schedule_name << " schedule. ";
+    cout << "The state of the schedule is not restored\n";
+  }
+
+  histogram->read_state( in );
+  cout << "Restarted from checkpoint " << fname << " (f=" << f << ", iter=" << iter << ")\n";
+}
+
+void WangLandauSampler::set_walker_symbols( unsigned int walker, const vector<string> &new_symbs )
+{
+  CEUpdater *updater = updaters[walker];
+  vector<string> symbs = updater->get_symbols();
+  if ( symbs.size() != new_symbs.size() )
+  {
+    throw invalid_argument( "The number of atoms in the checkpoint does not match the atoms object!" );
+  }
+
+  for ( unsigned int i=0;i<symbs.size();i++ )
+  {
+    if ( symbs[i] == new_symbs[i] ) continue;
+    SymbolChange change;
+    change.indx = i;
+    change.old_symb = symbs[i];
+    change.new_symb = new_symbs[i];
+    updater->update_cf( change );
+    updater->clear_history();
+  }
 }
 
 void WangLandauSampler::run( unsigned int nsteps )
 {
+  if ( use_rewl )
+  {
+    run_replica_exchange( nsteps );
+    return;
+  }
+
   if ( check_convergence_every%num_threads != 0 )
   {
     check_convergence_every = (check_convergence_every/num_threads+1)*num_threads;
@@ -325,49 +839,44 @@ void WangLandauSampler::run( unsigned int nsteps )
 
   unsigned int n_outer = nsteps/check_convergence_every;
   clock_t start = clock();
-  //omp_set_dynamic(0);
-  //omp_set_num_threads(2);
+  init_thread_buffers();
+  if ( schedule == nullptr )
+  {
+    schedule = new FlatHistogramSchedule( use_inverse_time_algorithm );
+  }
+  cout << "Modification factor schedule: " << schedule->name() << endl;
   for ( unsigned int i=0;i<n_outer;i++ )
   {
-    #pragma omp parallel for
+    // Static schedule: each thread performs the same number of steps in
+    // every block, which makes the runs reproducible for fixed seeds
+    #pragma omp parallel for schedule(static)
     for ( unsigned int j=0;j<check_convergence_every;j++ )
     {
         step();
     }
-
-    if ( histogram->is_flat( flatness_criteria) )
+    merge_thread_buffers();
+    iter += check_convergence_every;
+    iter_since_last += check_convergence_every;
+
+    ConvergenceInfo info;
+    info.mc_time = get_mc_time();
+    info.flat = histogram->is_flat( flatness_criteria );
+    info.stage_time = static_cast<double>(clock()-start)/CLOCKS_PER_SEC;
+    if ( time_to_converge.size() > 0 ) info.previous_stage_time = time_to_converge.back();
+    info.round_trips = half_round_trips/2;
+    info.num_walkers = num_threads;
+
+    double new_f = f;
+    bool stage_finished = schedule->update( new_f, info );
+    log_convergence( info );
+
+    if ( stage_finished )
     {
       cout << histogram->get_histogram() << endl;
-      clock_t finish = clock();
-      double diff = (finish-start)/CLOCKS_PER_SEC;
-      cout << "Used " <<  diff << " to converge\n";
-      if ( (time_to_converge.size() > 0) && (diff > time_to_converge.back()) && use_inverse_time_algorithm )
-      {
-        if ( !inverse_time_activated )
-        {
-          cout << "Convergence time increased. Activating inverse time scheme\n";
-          inv_time_factor = get_mc_time()*f;
-        }
-        inverse_time_activated=true;
-      }
-      time_to_converge.push_back(diff);
+      cout << "Used " <<  info.stage_time << " to converge\n";
+      time_to_converge.push_back(info.stage_time);
       send_results_to_python(); // Send converged results to Python
-
-      /*
-      if ( use_inverse_time_algorithm && (f<1.0/get_mc_time()) )
-      {
-        cout << "Activating inverse time scheme\n";
-        inverse_time_activated = true;
-      }*/
-
-      if ( inverse_time_activated )
-      {
-        f = inv_time_factor/get_mc_time();
-      }
-      else
-      {
-        f /= 2.0;
-      }
+      f = new_f;
       histogram->reset();
       cout << "Converged! New f: " << f << endl;
       cout << n_outside_range/iter_since_last << " of the states was outside the range\n";
@@ -381,8 +890,12 @@ void WangLandauSampler::run( unsigned int nsteps )
       iter_since_last=0;
       n_outside_range=0;
       n_self_proposals=0;
+      half_round_trips=0;
       start = clock();
-      //cout << histogram->get_logdos() << endl;
+    }
+    else
+    {
+      f = new_f;
     }
 
     if ( f < min_f )
@@ -393,13 +906,18 @@ void WangLandauSampler::run( unsigned int nsteps )
       send_results_to_python();
       break;
     }
+    checkpoint_if_due();
   }
   send_results_to_python();
+  if ( checkpoint_file != "" )
+  {
+    save_checkpoint( checkpoint_file );
+  }
   cout << "Time to converge:\n";
   cout << time_to_converge << endl;
 
   stringstream ss;
-  ss << "data/timeconv" << rand() << ".txt";
+  ss << "data/timeconv" << time(NULL) << ".txt";
   save_convergence_time(ss.str());
 }
 
@@ -485,6 +1003,7 @@ void WangLandauSampler::run_until_valid_energy( double emin, double emax )
         delete updaters[i];
         updaters[i] = updaters[proc_in_valid_state]->copy();
         current_bin[i] = current_bin[proc_in_valid_state];
+        chem_pot_term[i] = chem_pot_term[proc_in_valid_state];
         delete atom_positions_track[i];
         atom_positions_track[i] = new map<string,vector<int> >( *atom_positions_track[proc_in_valid_state] );
       }
@@ -504,11 +1023,7 @@ void WangLandauSampler::run_until_valid_energy( double emin, double emax )
   bool found_state_in_range = false;
   for ( unsigned int i=0;i<max_steps;i++ )
   {
-    array<SymbolChange,2> change;
-    unsigned int select1, select2;
-    get_canonical_trial_move( 0, change, select1, select2 );
-
-    double energy = updaters[0]->calculate( change );
+    double energy = trial_move( 0 );
 
     int bin = histogram->get_bin( energy );
     //cout << energy << " " << bin << " " << current_bin[0] << endl;
@@ -521,12 +1036,13 @@ void WangLandauSampler::run_until_valid_energy( double emin, double emax )
       // If the proposed energy is lower than current_energy, accept the new state
       if ( (energy < current_energy) && energy > emin )
       {
+        accept_trial_move( 0 );
         updaters[0]->clear_history();
         current_bin[0] = bin;
       }
       else
       {
-        updaters[0]->undo_changes();
+        reject_trial_move( 0 );
       }
     }
     else
@@ -535,12 +1051,13 @@ void WangLandauSampler::run_until_valid_energy( double emin, double emax )
       // If the propsed energy is higher than current_energy accept the new energy
       if ( (energy > current_energy) && (energy < emax) )
       {
+        accept_trial_move( 0 );
         updaters[0]->clear_history();
         current_bin[0] = bin;
       }
       else
       {
-        updaters[0]->undo_changes();
+        reject_trial_move( 0 );
       }
     }
     updaters[0]->clear_history();
@@ -560,6 +1077,7 @@ void WangLandauSampler::run_until_valid_energy( double emin, double emax )
     delete updaters[i];
     updaters[i] = updaters[0]->copy();
     current_bin[i] = current_bin[0];
+    chem_pot_term[i] = chem_pot_term[0];
     atom_positions_track[i] = atom_positions_track[0];
   }
 
@@ -601,6 +1119,10 @@ void WangLandauSampler::set_updaters( const vector<CEUpdater*> &new_updaters, li
     *atom_positions_track[i] = new_pos_track[i];
     updaters[i]->set_atom_position_tracker(atom_positions_track[i]); // This line should not be nessecary, just in case
   }
+  for ( unsigned int i=0;i<updaters.size();i++ )
+  {
+    chem_pot_term[i] = chem_pot_contribution(i);
+  }
   current_bin = new_current_bin;
 }
 
@@ -614,14 +1136,14 @@ void WangLandauSampler::update_all_above()
   int uid = omp_get_thread_num();
   for ( unsigned int i=current_bin[uid];i<histogram->get_number_of_active_bins();i++ )
   {
-    histogram->update(i,f);
+    histogram->update( hist_buffers[uid], i, f );
   }
 }
 
 void WangLandauSampler::update_current()
 {
   int uid = omp_get_thread_num();
-  histogram->update(current_bin[uid],f);
+  histogram->update( hist_buffers[uid], current_bin[uid], f );
 }
 
 void WangLandauSampler::save_convergence_time( const string &fname ) const
@@ -637,3 +1159,429 @@ void WangLandauSampler::save_convergence_time( const string &fname ) const
   out.close();
   cout << "Convergence time saved to " << fname << endl;
 }
+
+void WangLandauSampler::clear_windows()
+{
+  for ( unsigned int i=0;i<windows.size();i++ )
+  {
+    delete windows[i];
+  }
+  windows.clear();
+  window_lower_bin.clear();
+  window_walkers.clear();
+  window_f.clear();
+  for ( unsigned int i=0;i<window_schedules.size();i++ )
+  {
+    delete window_schedules[i];
+  }
+  window_schedules.clear();
+  window_iter.clear();
+  window_stage_time.clear();
+  walker_buffers.clear();
+  window_last_edge.clear();
+  window_half_round_trips.clear();
+}
+
+void WangLandauSampler::add_walker( unsigned int copy_from )
+{
+  updaters.push_back( updaters[copy_from]->copy() );
+  atom_positions_track.push_back( new map<string,vector<int> >( *atom_positions_track[copy_from] ) );
+  updaters.back()->set_atom_position_tracker( atom_positions_track.back() );
+  current_bin.push_back( current_bin[copy_from] );
+  current_energy.push_back( current_energy[copy_from] );
+  chem_pot_term.push_back( chem_pot_term[copy_from] );
+  pending_chem_pot_change.push_back( 0.0 );
+  is_first.push_back( is_first[copy_from] );
+  rngs.push_back( streams.next_stream() );
+}
+
+void WangLandauSampler::use_replica_exchange( unsigned int n_windows, double overlap, unsigned int exchange_every_in )
+{
+  if ( n_windows == 0 )
+  {
+    throw invalid_argument( "The number of windows has to be at least one!" );
+  }
+
+  if ( (overlap < 0.0) || (overlap >= 1.0) )
+  {
+    throw invalid_argument( "The overlap has to be in the range [0, 1)!" );
+  }
+
+  unsigned int nbins = histogram->get_nbins();
+  double width = nbins/(n_windows - (n_windows-1)*overlap);
+  if ( width < 2.0 )
+  {
+    throw invalid_argument( "The windows are too narrow. Reduce the number of windows or increase the number of bins!" );
+  }
+
+  clear_windows();
+  use_rewl = true;
+  exchange_every = exchange_every_in;
+
+  // Distribute the walkers among the windows. Each window gets at least one
+  unsigned int walkers_per_window = num_threads/n_windows;
+  if ( walkers_per_window == 0 ) walkers_per_window = 1;
+  while ( updaters.size() < n_windows*walkers_per_window )
+  {
+    add_walker(0);
+  }
+
+  for ( unsigned int i=0;i<updaters.size();i++ )
+  {
+    current_energy[i] = walker_energy(i);
+  }
+
+  unsigned int walker = 0;
+  for ( unsigned int w=0;w<n_windows;w++ )
+  {
+    unsigned int lower = (w*(1.0-overlap)*width);
+    unsigned int upper = lower + width;
+    if ( (w == n_windows-1) || (upper > nbins) ) upper = nbins;
+    window_lower_bin.push_back( lower );
+    windows.push_back( histogram->extract_window(lower, upper) );
+    window_f.push_back(f);
+    window_iter.push_back(0.0);
+    window_stage_time.push_back(-1.0);
+
+    vector<unsigned int> walkers;
+    for ( unsigned int j=0;j<walkers_per_window;j++ )
+    {
+      walkers.push_back(walker++);
+    }
+    window_walkers.push_back(walkers);
+  }
+  window_last_edge.assign( updaters.size(), -1 );
+  window_half_round_trips.assign( updaters.size(), 0 );
+
+  cout << "Replica exchange Wang-Landau with " << n_windows << " windows and ";
+  cout << walkers_per_window << " walker(s) per window\n";
+
+  #pragma omp parallel for schedule(dynamic)
+  for ( unsigned int w=0;w<n_windows;w++ )
+  {
+    for ( unsigned int j=0;j<window_walkers[w].size();j++ )
+    {
+      move_walker_into_window( window_walkers[w][j], *windows[w] );
+    }
+  }
+}
+
+void WangLandauSampler::move_walker_into_window( unsigned int walker, const Histogram &window )
+{
+  double emin = window.get_emin();
+  double emax = window.get_emax();
+  double distance = 0.0;
+  if ( current_energy[walker] < emin ) distance = emin - current_energy[walker];
+  else if ( current_energy[walker] >= emax ) distance = current_energy[walker] - emax;
+
+  unsigned int max_steps = 10000000;
+  for ( unsigned int i=0;i<max_steps;i++ )
+  {
+    if ( (current_energy[walker] >= emin) && (current_energy[walker] < emax) )
+    {
+      is_first[walker] = false;
+      return;
+    }
+
+    double energy = trial_move( walker );
+
+    double new_distance = 0.0;
+    if ( energy < emin ) new_distance = emin - energy;
+    else if ( energy >= emax ) new_distance = energy - emax;
+
+    // Greedy walk towards the window
+    if ( new_distance <= distance )
+    {
+      accept_trial_move( walker );
+      distance = new_distance;
+      current_energy[walker] = energy;
+    }
+    else
+    {
+      reject_trial_move( walker );
+    }
+    updaters[walker]->clear_history();
+  }
+  throw runtime_error( "Could not find any energy state inside the window!" );
+}
+
+void WangLandauSampler::step_in_window( unsigned int walker, Histogram &window, double mod_factor, HistogramUpdateBuffer &buffer )
+{
+  double energy = trial_move( walker );
+
+  int cur_bin = window.get_bin( current_energy[walker] );
+  int bin = window.get_bin( energy );
+
+  if ( (energy < window.get_emin()) || !window.bin_in_range(bin) )
+  {
+    // Moves leaving the window are rejected
+    reject_trial_move( walker );
+    updaters[walker]->clear_history();
+  }
+  else
+  {
+    double dosratio = window.get_dos_ratio_old_divided_by_new( buffer, cur_bin, bin );
+    double uniform_random = rngs[walker].uniform();
+    if ( uniform_random < dosratio )
+    {
+      accept_trial_move( walker );
+      current_energy[walker] = energy;
+      cur_bin = bin;
+    }
+    else
+    {
+      reject_trial_move( walker );
+    }
+    updaters[walker]->clear_history();
+  }
+  window.update( buffer, cur_bin, mod_factor );
+
+  // Track round trips between the lowest and highest 5 percent of the window
+  int nbins = window.get_nbins();
+  int width = nbins/20 > 0 ? nbins/20 : 1;
+  if ( (cur_bin < width) && (window_last_edge[walker] != 0) )
+  {
+    if ( window_last_edge[walker] == 1 ) window_half_round_trips[walker] += 1;
+    window_last_edge[walker] = 0;
+  }
+  else if ( (cur_bin >= nbins-width) && (window_last_edge[walker] != 1) )
+  {
+    if ( window_last_edge[walker] == 0 ) window_half_round_trips[walker] += 1;
+    window_last_edge[walker] = 1;
+  }
+}
+
+void WangLandauSampler::exchange_configurations( unsigned int first_window )
+{
+  for ( unsigned int w=first_window;w+1<windows.size();w+=2 )
+  {
+    Histogram &win1 = *windows[w];
+    Histogram &win2 = *windows[w+1];
+    unsigned int n1 = window_walkers[w].size();
+    unsigned int n2 = window_walkers[w+1].size();
+    unsigned int walker1 = window_walkers[w][rngs[0].randint(n1)];
+    unsigned int walker2 = window_walkers[w+1][rngs[0].randint(n2)];
+    double E1 = current_energy[walker1];
+    double E2 = current_energy[walker2];
+
+    n_exchange_trials += 1.0;
+    // Both configurations has to be in the overlap region
+    int bin1_in_2 = win2.get_bin(E1);
+    int bin2_in_1 = win1.get_bin(E2);
+    if ( (E1 < win2.get_emin()) || !win2.bin_in_range(bin1_in_2) ) continue;
+    if ( (E2 < win1.get_emin()) || !win1.bin_in_range(bin2_in_1) ) continue;
+
+    const vector<double> &logdos1 = win1.get_logdos();
+    const vector<double> &logdos2 = win2.get_logdos();
+    double log_acc = logdos1[win1.get_bin(E1)] + logdos2[win2.get_bin(E2)] - \
+                     logdos1[bin2_in_1] - logdos2[bin1_in_2];
+
+    double uniform_random = rngs[0].uniform();
+    if ( (log_acc >= 0.0) || (uniform_random < exp(log_acc)) )
+    {
+      // Swap the configurations. The walkers stay in their window
+      std::swap( updaters[walker1], updaters[walker2] );
+      std::swap( atom_positions_track[walker1], atom_positions_track[walker2] );
+      std::swap( current_energy[walker1], current_energy[walker2] );
+      std::swap( chem_pot_term[walker1], chem_pot_term[walker2] );
+      n_exchange_accepted += 1.0;
+    }
+  }
+}
+
+void WangLandauSampler::run_replica_exchange( unsigned int nsteps )
+{
+  unsigned int n_windows = windows.size();
+
+  // Flat list of all walkers, such that the walkers (and not the windows)
+  // are distributed among the threads
+  vector<unsigned int> walkers;
+  vector<unsigned int> walker_window;
+  for ( unsigned int w=0;w<n_windows;w++ )
+  {
+    for ( unsigned int k=0;k<window_walkers[w].size();k++ )
+    {
+      walkers.push_back( window_walkers[w][k] );
+      walker_window.push_back( w );
+    }
+  }
+  unsigned int n_walkers = walkers.size();
+
+  // Each walker accumulates its histogram updates in a private buffer that
+  // is merged into its window after each block
+  walker_buffers.resize( n_walkers );
+  for ( unsigned int i=0;i<n_walkers;i++ )
+  {
+    windows[walker_window[i]]->init_buffer( walker_buffers[i] );
+  }
+
+  // Each window has its own copy of the modification factor schedule
+  if ( schedule == nullptr )
+  {
+    schedule = new FlatHistogramSchedule( use_inverse_time_algorithm );
+  }
+  cout << "Modification factor schedule: " << schedule->name() << endl;
+  if ( window_schedules.size() != n_windows )
+  {
+    for ( unsigned int w=0;w<window_schedules.size();w++ )
+    {
+      delete window_schedules[w];
+    }
+    window_schedules.clear();
+    for ( unsigned int w=0;w<n_windows;w++ )
+    {
+      window_schedules.push_back( schedule->clone() );
+    }
+  }
+
+  unsigned int steps_per_outer = exchange_every*n_walkers;
+  unsigned int n_outer = nsteps/steps_per_outer;
+  unsigned int steps_since_check = 0;
+  vector<bool> window_converged(n_windows, false);
+  clock_t start = clock();
+  vector<clock_t> window_start(n_windows, start);
+
+  for ( unsigned int i=0;i<n_outer;i++ )
+  {
+    // Every walker only touches its own configuration, random number stream
+    // and buffer. The window histograms are only read until the buffers
+    // are merged
+    #pragma omp parallel for schedule(static)
+    for ( unsigned int k=0;k<n_walkers;k++ )
+    {
+      unsigned int w = walker_window[k];
+      for ( unsigned int j=0;j<exchange_every;j++ )
+      {
+        step_in_window( walkers[k], *windows[w], window_f[w], walker_buffers[k] );
+      }
+    }
+
+    // Merge in the order of the walkers such that the result does not
+    // depend on the number of threads
+    for ( unsigned int k=0;k<n_walkers;k++ )
+    {
+      windows[walker_window[k]]->merge( walker_buffers[k] );
+    }
+    for ( unsigned int w=0;w<n_windows;w++ )
+    {
+      window_iter[w] += exchange_every*window_walkers[w].size();
+    }
+    iter += steps_per_outer;
+    iter_since_last += steps_per_outer;
+    steps_since_check += exchange_every;
+
+    exchange_configurations( i%2 );
+
+    if ( steps_since_check < check_convergence_every ) continue;
+    steps_since_check = 0;
+
+    bool all_converged = true;
+    for ( unsigned int w=0;w<n_windows;w++ )
+    {
+      if ( window_converged[w] ) continue;
+
+      ConvergenceInfo info;
+      info.mc_time = window_iter[w]/windows[w]->get_nbins();
+      info.flat = windows[w]->is_flat( flatness_criteria );
+      info.stage_time = static_cast<double>(clock()-window_start[w])/CLOCKS_PER_SEC;
+      info.previous_stage_time = window_stage_time[w];
+      info.num_walkers = window_walkers[w].size();
+      unsigned int half_trips = 0;
+      for ( unsigned int walker : window_walkers[w] )
+      {
+        half_trips += window_half_round_trips[walker];
+      }
+      info.round_trips = half_trips/2;
+
+      double new_f = window_f[w];
+      bool stage_finished = window_schedules[w]->update( new_f, info );
+      window_f[w] = new_f;
+      if ( stage_finished )
+      {
+        windows[w]->reset();
+        window_stage_time[w] = info.stage_time;
+        window_start[w] = clock();
+        for ( unsigned int walker : window_walkers[w] )
+        {
+          window_half_round_trips[walker] = 0;
+        }
+        cout << "Window " << w << " finished a stage. New f: " << window_f[w] << endl;
+      }
+      if ( window_f[w] < min_f ) window_converged[w] = true;
+      all_converged = all_converged && window_converged[w];
+    }
+
+    if ( all_converged )
+    {
+      cout << "Simulation converged!\n";
+      converged = true;
+      break;
+    }
+  }
+
+  f = 0.0;
+  for ( unsigned int w=0;w<n_windows;w++ )
+  {
+    if ( window_f[w] > f ) f = window_f[w];
+  }
+  double diff = static_cast<double>(clock()-start)/CLOCKS_PER_SEC;
+  time_to_converge.push_back(diff);
+  if ( n_exchange_trials > 0.0 )
+  {
+    cout << "Exchange acceptance rate: " << n_exchange_accepted/n_exchange_trials << endl;
+  }
+  stitch_windows();
+  send_results_to_python();
+}
+
+void WangLandauSampler::stitch_windows()
+{
+  // The DOS of neighbouring windows are joined at the bin in the overlap
+  // region where the derivative of the logdos of the two pieces agree best
+  // See Vogel, T. et al., Phys. Rev. Lett. 110, 210603 (2013)
+  if ( windows.size() == 0 ) return;
+
+  histogram->insert_window( *windows[0], window_lower_bin[0], 0, 0.0 );
+  double shift = 0.0;
+  for ( unsigned int w=1;w<windows.size();w++ )
+  {
+    const Histogram &prev = *windows[w-1];
+    const Histogram &cur = *windows[w];
+    unsigned int prev_lower = window_lower_bin[w-1];
+    unsigned int lower = window_lower_bin[w];
+    unsigned int prev_upper = prev_lower + prev.get_nbins();
+    const vector<double> &prev_dos = prev.get_logdos();
+    const vector<double> &cur_dos = cur.get_logdos();
+
+    int join_bin = -1;
+    double best_diff = 0.0;
+    for ( unsigned int bin=lower;bin+1<prev_upper;bin++ )
+    {
+      unsigned int i_prev = bin-prev_lower;
+      unsigned int i_cur = bin-lower;
+      if ( !prev.is_known(i_prev) || !prev.is_known(i_prev+1) ) continue;
+      if ( !cur.is_known(i_cur) || !cur.is_known(i_cur+1) ) continue;
+      double deriv_prev = prev_dos[i_prev+1] - prev_dos[i_prev];
+      double deriv_cur = cur_dos[i_cur+1] - cur_dos[i_cur];
+      double diff = abs(deriv_prev - deriv_cur);
+      if ( (join_bin == -1) || (diff < best_diff) )
+      {
+        best_diff = diff;
+        join_bin = bin;
+      }
+    }
+
+    if ( join_bin == -1 )
+    {
+      cout << "Warning! No common known states in the overlap between window ";
+      cout << w-1 << " and " << w << ". Joining at the lower edge of window " << w << endl;
+      histogram->insert_window( cur, lower, 0, shift );
+      continue;
+    }
+
+    // The shift of the previous window has already been applied to the global histogram
+    const vector<double> &global_dos = histogram->get_logdos();
+    shift = global_dos[join_bin] - cur_dos[join_bin-lower];
+    histogram->insert_window( cur, lower, join_bin-lower, shift );
+  }
+}
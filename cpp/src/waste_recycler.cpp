@@ -0,0 +1,90 @@
+#include "waste_recycler.hpp"
+#include "use_numpy.hpp"
+#include <cmath>
+#include <stdexcept>
+
+using namespace std;
+
+double WasteRecycler::accept_prob(double E_old, double E_new, double kT){
+  if (kT <= 0.0){
+    throw invalid_argument("Temperature has to be positive!");
+  }
+
+  // p_new = exp(-beta*E_new)/(exp(-beta*E_old) + exp(-beta*E_new)),
+  // evaluated such that the exponential never overflows
+  double x = (E_new - E_old)/kT;
+  if (x > 0.0){
+    double w = exp(-x);
+    return w/(1.0 + w);
+  }
+  return 1.0/(1.0 + exp(x));
+}
+
+bool WasteRecycler::accept(double E_old_in, double E_new_in, double kT, double rand_num){
+  E_old = E_old_in;
+  E_new = E_new_in;
+  p_new = accept_prob(E_old, E_new, kT);
+  return rand_num < p_new;
+}
+
+void WasteRecycler::record(double E_old_in, double E_new_in, double p_new_in){
+  if ((p_new_in < 0.0) || (p_new_in > 1.0)){
+    throw invalid_argument("The selection probability has to be in [0, 1]!");
+  }
+  E_old = E_old_in;
+  E_new = E_new_in;
+  p_new = p_new_in;
+}
+
+double WasteRecycler::energy() const{
+  return (1.0 - p_new)*E_old + p_new*E_new;
+}
+
+double WasteRecycler::energy_sq() const{
+  return (1.0 - p_new)*E_old*E_old + p_new*E_new*E_new;
+}
+
+PyObject* WasteRecycler::singlet_averages(PyObject *singlets_old, PyObject *singlets_new) const{
+  PyObject *old_arr = PyArray_FROM_OTF(singlets_old, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY);
+  PyObject *new_arr = PyArray_FROM_OTF(singlets_new, NPY_DOUBLE, NPY_ARRAY_IN_ARRAY);
+
+  if ((old_arr == nullptr) || (new_arr == nullptr)){
+    Py_XDECREF(old_arr);
+    Py_XDECREF(new_arr);
+    throw invalid_argument("Singlets has to be convertible to numpy arrays!");
+  }
+
+  npy_intp n = PyArray_SIZE(reinterpret_cast<PyArrayObject*>(old_arr));
+  if (n != PyArray_SIZE(reinterpret_cast<PyArrayObject*>(new_arr))){
+    Py_DECREF(old_arr);
+    Py_DECREF(new_arr);
+    throw invalid_argument("The old and new singlets must have the same length!");
+  }
+
+  const double *s_old = static_cast<double*>(PyArray_DATA(reinterpret_cast<PyArrayObject*>(old_arr)));
+  const double *s_new = static_cast<double*>(PyArray_DATA(reinterpret_cast<PyArrayObject*>(new_arr)));
+
+  npy_intp dims[1] = {n};
+  PyObject *avg = PyArray_SimpleNew(1, dims, NPY_DOUBLE);
+  PyObject *avg_sq = PyArray_SimpleNew(1, dims, NPY_DOUBLE);
+  PyObject *avg_eng = PyArray_SimpleNew(1, dims, NPY_DOUBLE);
+  double *avg_ptr = static_cast<double*>(PyArray_DATA(reinterpret_cast<PyArrayObject*>(avg)));
+  double *avg_sq_ptr = static_cast<double*>(PyArray_DATA(reinterpret_cast<PyArrayObject*>(avg_sq)));
+  double *avg_eng_ptr = static_cast<double*>(PyArray_DATA(reinterpret_cast<PyArrayObject*>(avg_eng)));
+
+  double p_old = 1.0 - p_new;
+  for (npy_intp i=0;i<n;i++){
+    avg_ptr[i] = p_old*s_old[i] + p_new*s_new[i];
+    avg_sq_ptr[i] = p_old*s_old[i]*s_old[i] + p_new*s_new[i]*s_new[i];
+    avg_eng_ptr[i] = p_old*s_old[i]*E_old + p_new*s_new[i]*E_new;
+  }
+  Py_DECREF(old_arr);
+  Py_DECREF(new_arr);
+
+  // PyTuple_Pack increases the reference count
+  PyObject *res = PyTuple_Pack(3, avg, avg_sq, avg_eng);
+  Py_DECREF(avg);
+  Py_DECREF(avg_sq);
+  Py_DECREF(avg_eng);
+  return res;
+}
@@ -0,0 +1,110 @@
+#include "wl_schedules.hpp"
+#include <stdexcept>
+#include <iostream>
+
+using namespace std;
+
+bool FlatHistogramSchedule::update( double &f, const ConvergenceInfo &info )
+{
+  if ( !info.flat ) return false;
+
+  if ( use_inverse_time && (info.previous_stage_time >= 0.0) && (info.stage_time > info.previous_stage_time) )
+  {
+    if ( !inverse_time_activated )
+    {
+      cout << "Convergence time increased. Activating inverse time scheme\n";
+      inv_time_factor = info.mc_time*f;
+    }
+    inverse_time_activated = true;
+  }
+
+  if ( inverse_time_activated )
+  {
+    f = inv_time_factor/info.mc_time;
+  }
+  else
+  {
+    f /= 2.0;
+  }
+  return true;
+}
+
+vector<double> FlatHistogramSchedule::get_state() const
+{
+  vector<double> state;
+  state.push_back( inverse_time_activated );
+  state.push_back( inv_time_factor );
+  return state;
+}
+
+void FlatHistogramSchedule::set_state( const vector<double> &state )
+{
+  if ( state.size() != 2 )
+  {
+    throw invalid_argument( "The state of the flat histogram schedule has to have two entries!" );
+  }
+  inverse_time_activated = state[0] > 0.5;
+  inv_time_factor = state[1];
+}
+
+bool InverseTimeSchedule::update( double &f, const ConvergenceInfo &info )
+{
+  if ( inverse_time_activated )
+  {
+    f = 1.0/info.mc_time;
+    return false;
+  }
+
+  if ( !info.flat ) return false;
+
+  f /= 2.0;
+  if ( f < 1.0/info.mc_time )
+  {
+    cout << "Switching to the 1/t schedule\n";
+    inverse_time_activated = true;
+    f = 1.0/info.mc_time;
+  }
+  return true;
+}
+
+vector<double> InverseTimeSchedule::get_state() const
+{
+  return vector<double>( 1, inverse_time_activated );
+}
+
+void InverseTimeSchedule::set_state( const vector<double> &state )
+{
+  if ( state.size() != 1 )
+  {
+    throw invalid_argument( "The state of the inverse time schedule has to have one entry!" );
+  }
+  inverse_time_activated = state[0] > 0.5;
+}
+
+SAMCSchedule::SAMCSchedule( double gain, double t0 ): gain(gain), t0(t0)
+{
+  if ( (gain <= 0.0) || (t0 <= 0.0) )
+  {
+    throw invalid_argument( "The gain and t0 of the SAMC schedule has to be positive!" );
+  }
+}
+
+bool SAMCSchedule::update( double &f, const ConvergenceInfo &info )
+{
+  if ( info.mc_time > t0 )
+  {
+    f = gain*t0/info.mc_time;
+  }
+  else
+  {
+    f = gain;
+  }
+  return false;
+}
+
+bool TunnellingSchedule::update( double &f, const ConvergenceInfo &info )
+{
+  if ( info.round_trips < round_trips_per_walker*info.num_walkers ) return false;
+  f /= 2.0;
+  return true;
+}
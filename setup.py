@@ -25,7 +25,9 @@ ce_updater_sources = ["ce_updater.cpp", "cf_history_tracker.cpp",
                       "eshelby_tensor.cpp", "eshelby_sphere.cpp",
                       "eshelby_cylinder.cpp", "init_numpy_api.cpp",
                       "symbols_with_numbers.cpp", "basis_function.cpp",
-                      "mat4D.cpp", "khacaturyan.cpp"]
+                      "mat4D.cpp", "khacaturyan.cpp", "waste_recycler.cpp",
+                      "wl_schedules.cpp", "wang_landau_2d.cpp",
+                      "rng.cpp"]
 
 ce_updater_sources = [src_folder+"/"+srcfile for srcfile in ce_updater_sources]
 ce_updater_sources.append("cemc/cpp_ext/cemc_cpp_code.pyx")
@@ -18,6 +18,10 @@ import test_nucl_free_energy
 import test_phase_boundary_tracker
 import test_sgc_mc
 import test_strain_energy
+import test_strain_energy_bias
+import test_eshelby_table
+import test_khachaturyan
+import test_shape_optimizer
 import test_transition_path
 import test_wang_landau_init
 import test_damage_spreading_mc
@@ -27,6 +31,17 @@ import test_adaptive_bias_potential
 import test_isotropic_strain_energy
 import test_binary_phase_diag
 import test_diffraction_updater
+import test_waste_recycler
+import test_histogram_reweighting
+import test_sgc_thermodynamic_integration
+import test_vcsgc
+import test_wl_histogram
+import test_wang_landau_2d
+import test_wl_analyzer
+import test_wl_db_storage
+import test_rng
+import test_transition_path_io
+import test_umbrella_windows
 
 try:
     os.mkdir("data")
@@ -56,6 +71,10 @@ suite.addTests(loader.loadTestsFromModule(test_nucl_free_energy))
 suite.addTests(loader.loadTestsFromModule(test_phase_boundary_tracker))
 suite.addTests(loader.loadTestsFromModule(test_sgc_mc))
 suite.addTests(loader.loadTestsFromModule(test_strain_energy))
+suite.addTests(loader.loadTestsFromModule(test_strain_energy_bias))
+suite.addTests(loader.loadTestsFromModule(test_eshelby_table))
+suite.addTests(loader.loadTestsFromModule(test_khachaturyan))
+suite.addTests(loader.loadTestsFromModule(test_shape_optimizer))
 suite.addTests(loader.loadTestsFromModule(test_transition_path))
 suite.addTests(loader.loadTestsFromModule(test_wang_landau_init))
 suite.addTests(loader.loadTestsFromModule(test_damage_spreading_mc))
@@ -65,6 +84,17 @@ suite.addTests(loader.loadTestsFromModule(test_adaptive_bias_potential))
 suite.addTest(loader.loadTestsFromModule(test_isotropic_strain_energy))
 suite.addTest(loader.loadTestsFromModule(test_binary_phase_diag))
 suite.addTest(loader.loadTestsFromModule(test_diffraction_updater))
+suite.addTest(loader.loadTestsFromModule(test_waste_recycler))
+suite.addTest(loader.loadTestsFromModule(test_histogram_reweighting))
+suite.addTest(loader.loadTestsFromModule(test_sgc_thermodynamic_integration))
+suite.addTest(loader.loadTestsFromModule(test_vcsgc))
+suite.addTest(loader.loadTestsFromModule(test_wl_histogram))
+suite.addTest(loader.loadTestsFromModule(test_wang_landau_2d))
+suite.addTest(loader.loadTestsFromModule(test_wl_analyzer))
+suite.addTest(loader.loadTestsFromModule(test_wl_db_storage))
+suite.addTest(loader.loadTestsFromModule(test_rng))
+suite.addTest(loader.loadTestsFromModule(test_transition_path_io))
+suite.addTest(loader.loadTestsFromModule(test_umbrella_windows))
 
 runner = TimeLoggingTestRunner()
 result = runner.run(suite)
@@ -3,6 +3,8 @@ import numpy as np
 
 try:
     from cemc.mcmc.diffraction_observer import DiffractionUpdater
+    from cemc.mcmc.diffraction_observer import reciprocal_lattice_points
+    from cemc.mcmc.diffraction_observer import reciprocal_shell
     from ase.build import bulk
     from ase.geometry import get_layers
     available = True
@@ -73,6 +75,53 @@ class TestDiffractionUpdater(unittest.TestCase):
         # Now value should be back to 1/2
         self.assertAlmostEqual(np.abs(updater.value), 0.5)
 
+    def test_multiple_k_vectors(self):
+        if not available:
+            self.skipTest(reason)
+
+        atoms = bulk("Al", crystalstructure="sc", a=5.0)
+        atoms *= (4, 4, 4)
+        k_vectors = reciprocal_lattice_points(atoms.get_cell(), 0.8)
+
+        # Vectors with length 2*pi/20*sqrt(n) for n = 1, 2, 3, 4, 5, 6
+        self.assertEqual(len(k_vectors), 6 + 12 + 8 + 6 + 24 + 24)
+        shell = reciprocal_shell(atoms.get_cell(), [2.0*np.pi/20.0, 0, 0])
+        self.assertEqual(len(shell), 6)
+
+        rng = np.random.RandomState(0)
+        symbols = ["Al", "Mg"]
+        for atom in atoms:
+            atom.symbol = symbols[rng.randint(0, 2)]
+
+        updater = DiffractionUpdater(atoms=atoms, k_vector=k_vectors,
+                                     active_symbols=["Mg"],
+                                     all_symbols=symbols)
+        for _ in range(50):
+            indx = rng.randint(0, len(atoms))
+            old_symb = atoms[indx].symbol
+            new_symb = symbols[rng.randint(0, 2)]
+            atoms[indx].symbol = new_symb
+            updater.update([(indx, old_symb, new_symb)])
+
+        current = [atom.symbol for atom in atoms]
+        self.assertTrue(np.allclose(updater.value,
+                                    updater.calculate_from_scratch(current)))
+
+        # The amplitudes agree with the ones traced one by one
+        for k in k_vectors[:5]:
+            single = DiffractionUpdater(atoms=atoms, k_vector=k,
+                                        active_symbols=["Mg"],
+                                        all_symbols=symbols)
+            value = np.sum([np.exp(1j*atom.position.dot(k))
+                            for atom in atoms if atom.symbol == "Mg"])
+            self.assertAlmostEqual(single.value, value/len(atoms))
+
+        # Undo restores all amplitudes
+        before = updater.value
+        updater.update([(0, atoms[0].symbol, "Al"), (1, atoms[1].symbol, "Mg")])
+        updater.undo()
+        self.assertTrue(np.allclose(updater.value, before))
+
 if __name__ == "__main__":
     from cemc import TimeLoggingTestRunner
     unittest.main(testRunner=TimeLoggingTestRunner)
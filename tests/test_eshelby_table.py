@@ -0,0 +1,73 @@
+"""Unittest for the tabulated Eshelby tensor."""
+import os
+try:
+    import unittest
+    import numpy as np
+    from cemc_cpp_code import PyEshelbyTensor
+    from cemc.tools import EshelbyTable, StrainEnergy
+    PyEshelbyTensor(3.0, 2.0, 1.0, 0.3)
+    available = True
+    reason = ""
+except ImportError as exc:
+    reason = str(exc)
+    available = False
+
+fname = "test_eshelby_table.h5"
+
+
+class TestEshelbyTable(unittest.TestCase):
+    """Compare the interpolated tensors with the exact ones."""
+
+    def tearDown(self):
+        if os.path.exists(fname):
+            os.remove(fname)
+
+    def test_interpolation(self):
+        if not available:
+            self.skipTest(reason)
+        table = EshelbyTable(poisson=0.27, min_ratio=0.05, num_points=40)
+        aspects = [[3.0, 1.2, 0.25], [6.0, 5.0, 4.0], [6.0, 6.0, 2.0],
+                   [6.0, 4.0, 4.0], [2.0, 2.0, 2.0]]
+        interpolated = table.batch(aspects)
+        for aspect, S in zip(aspects, interpolated):
+            exact = table.exact(aspect)
+            self.assertTrue(np.allclose(S, exact, atol=2E-3))
+
+        # Ellipsoids outside the table are calculated exactly
+        aspect = [100.0, 1.0, 0.5]
+        self.assertTrue(np.allclose(table(aspect), table.exact(aspect)))
+
+        with self.assertRaises(ValueError):
+            table([1.0, 2.0, 3.0])
+
+    def test_save_load(self):
+        if not available:
+            self.skipTest(reason)
+        table = EshelbyTable(poisson=0.3, min_ratio=0.1, num_points=5)
+        table.save(fname)
+        loaded = EshelbyTable.load(fname)
+        self.assertAlmostEqual(loaded.poisson, 0.3)
+        self.assertTrue(np.allclose(loaded.table, table.table))
+
+    def test_strain_energy_with_table(self):
+        if not available:
+            self.skipTest(reason)
+        table = EshelbyTable(poisson=0.3, min_ratio=0.05, num_points=40)
+        misfit = [0.05, 0.04, 0.03, 0.03, 0.02, 0.01]
+        C = np.diag([1.0, 1.0, 1.0, 0.5, 0.5, 0.5]) + 0.3
+        exact = StrainEnergy(aspect=[3.0, 2.0, 1.0], misfit=misfit,
+                             poisson=0.3)
+        tab = StrainEnergy(aspect=[3.0, 2.0, 1.0], misfit=misfit,
+                           poisson=0.3, eshelby_table=table)
+        E1 = exact.strain_energy(C_matrix=C, scale_factor=2.0)
+        E2 = tab.strain_energy(C_matrix=C, scale_factor=2.0)
+        self.assertAlmostEqual(E1, E2, delta=1E-3*abs(E1))
+
+        with self.assertRaises(ValueError):
+            StrainEnergy(aspect=[3.0, 2.0, 1.0], poisson=0.2,
+                         eshelby_table=table)
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+from ase.units import kB
+
+try:
+    from scipy.special import gammaln
+    from cemc.tools import ReweightingHistogram, WHAM, FerrenbergSwendsen
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+
+class TestHistogramReweighting(unittest.TestCase):
+    # Independent two level systems. Energy eps*n with degeneracy N!/(n!(N-n)!)
+    N = 100
+    eps = 0.01
+
+    def exact(self, T):
+        n = np.arange(self.N+1)
+        log_g = gammaln(self.N+1) - gammaln(n+1) - gammaln(self.N-n+1)
+        E = self.eps*n
+        log_w = log_g - E/(kB*T)
+        w = np.exp(log_w - np.max(log_w))
+        w /= np.sum(w)
+        mean = w.dot(E)
+        cv = (w.dot(E**2) - mean**2)/(kB*T**2)
+        return mean, cv, w
+
+    def sampled_histogram(self, T, num_samples=50000):
+        n = np.arange(self.N+1)
+        _, _, w = self.exact(T)
+        samples = np.random.choice(n, size=num_samples, p=w)
+        hist = ReweightingHistogram(T, bin_width=self.eps/2.0, n_singlets=1)
+        for s in samples:
+            singl = np.array([float(s)/self.N])
+            hist.add(self.eps*s + 1E-8, singl)
+        return hist
+
+    def test_single_histogram(self):
+        if not available:
+            self.skipTest(reason)
+        hist = self.sampled_histogram(600.0)
+        fs = FerrenbergSwendsen(hist)
+        res = fs.get_thermodynamic([580.0, 620.0])
+        for i, T in enumerate([580.0, 620.0]):
+            mean, cv, _ = self.exact(T)
+            self.assertAlmostEqual(res["energy"][i], mean, delta=0.01*mean)
+            self.assertAlmostEqual(res["heat_capacity"][i], cv, delta=0.05*cv)
+
+    def test_multiple_histograms(self):
+        if not available:
+            self.skipTest(reason)
+        hists = [self.sampled_histogram(T) for T in [400.0, 600.0, 900.0]]
+        wham = WHAM(hists)
+        temps = [450.0, 750.0]
+        res = wham.get_thermodynamic(temps)
+        for i, T in enumerate(temps):
+            mean, cv, w = self.exact(T)
+            singl = w.dot(np.arange(self.N+1)/float(self.N))
+            self.assertAlmostEqual(res["energy"][i], mean, delta=0.01*mean)
+            self.assertAlmostEqual(res["heat_capacity"][i], cv, delta=0.05*cv)
+            self.assertAlmostEqual(res["singlets"][i, 0], singl, delta=0.01)
+
+    def test_merge_and_dict(self):
+        if not available:
+            self.skipTest(reason)
+        hist = self.sampled_histogram(600.0, num_samples=1000)
+        copy = ReweightingHistogram.fromdict(hist.todict())
+        copy += hist
+        self.assertEqual(copy.num_samples, 2*hist.num_samples)
+
+        other = ReweightingHistogram(700.0, bin_width=hist.bin_width,
+                                     n_singlets=1)
+        with self.assertRaises(ValueError):
+            copy += other
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+try:
+    from cemc.tools.khachaturyan import Khachaturyan, OrientationScan
+    from cemc.tools import rot_matrix, rotate_tensor, rotate_rank4_tensor
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+C_al = np.array([[0.62639459, 0.41086487, 0.41086487, 0, 0, 0],
+                 [0.41086487, 0.62639459, 0.41086487, 0, 0, 0],
+                 [0.41086487, 0.41086487, 0.62639459, 0, 0, 0],
+                 [0, 0, 0, 0.42750351, 0, 0],
+                 [0, 0, 0, 0, 0.42750351, 0],
+                 [0, 0, 0, 0, 0, 0.42750351]])
+
+
+def direct_sum(khach, voxels):
+    """Strain energy evaluated with B(k) in every k-point except k = 0."""
+    ft = np.abs(np.fft.fftn(voxels))**2/voxels.size
+    freqs = [np.fft.fftfreq(n) for n in voxels.shape]
+    K = np.array(np.meshgrid(*freqs, indexing="ij")).reshape(3, -1).T
+    length = np.sqrt(np.sum(K**2, axis=1))
+    mask = length > 0.0
+    nhat = K[mask, :]/length[mask, np.newaxis]
+    integral = np.sum(ft.ravel()[mask]*khach.b_function(nhat))
+    diff = khach.misfit_strain - khach.uniform_strain
+    energy = 0.5*np.einsum("ijkl,ij,kl", khach.C, diff, diff)
+    return energy - 0.5*integral/np.sum(voxels)
+
+
+def ellipsoid_voxels(n=16, axes=(6.0, 3.0, 2.0)):
+    x = np.arange(n) - n/2
+    X, Y, Z = np.meshgrid(x, x, x, indexing="ij")
+    r = (X/axes[0])**2 + (Y/axes[1])**2 + (Z/axes[2])**2
+    return (r <= 1.0).astype(np.float64)
+
+
+class TestKhachaturyan(unittest.TestCase):
+    def test_orientation_scan(self):
+        if not available:
+            self.skipTest(reason)
+        misfit = np.diag([0.05, 0.02, 0.01])
+        khach = Khachaturyan(elastic_tensor=C_al, misfit_strain=misfit)
+        voxels = ellipsoid_voxels()
+        scan = OrientationScan(khach, voxels, num_theta=181, num_phi=360)
+
+        for seq in [[("y", 0), ("z", 0)], [("y", -30), ("z", -45)],
+                    [("y", -90), ("z", -10)]]:
+            matrix = rot_matrix(seq)
+            rotated = Khachaturyan(
+                elastic_tensor=C_al, misfit_strain=rotate_tensor(misfit, matrix))
+            rotated.C = rotate_rank4_tensor(khach.C.copy(), matrix)
+            exact = direct_sum(rotated, voxels)
+            self.assertAlmostEqual(scan.strain_energy(matrix), exact,
+                                   delta=1E-3*abs(exact))
+
+        # The worker processes give the same energies as the serial scan
+        matrices = [rot_matrix([("y", -30), ("z", angle)])
+                    for angle in [0, 20, 40]]
+        serial = scan.strain_energies(matrices)
+        parallel = scan.strain_energies(matrices, num_processes=2)
+        self.assertTrue(np.allclose(serial, parallel))
+
+    def test_b_function(self):
+        if not available:
+            self.skipTest(reason)
+        misfit = np.diag([0.05, 0.02, 0.01])
+        khach = Khachaturyan(elastic_tensor=C_al, misfit_strain=misfit)
+        nhat = np.array([[1.0, 0.0, 0.0], [0.0, 0.6, 0.8]])
+        eff = khach.effective_stress()
+        for n, value in zip(nhat, khach.b_function(nhat)):
+            G = khach.zeroth_order_green_function(n)
+            expect = eff.dot(n).dot(G).dot(eff.dot(n))
+            self.assertAlmostEqual(value, expect)
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
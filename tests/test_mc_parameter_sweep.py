@@ -13,6 +13,14 @@ except Exception as exc:
 
 
 db_name = "test_sgc.db"
+
+
+def count_mg(mc):
+    """Additional data stored by the parallel sweep. Module level such
+    that it can be pickled and sent to the workers."""
+    return {"num_mg": mc.atoms.get_chemical_symbols().count("Mg")}
+
+
 class TestMCParameterSweep( unittest.TestCase ):
     def get_cebulk(self):
         conc = Concentration(basis_elements=[["Al","Mg"]])
@@ -31,6 +39,8 @@ class TestMCParameterSweep( unittest.TestCase ):
             self.skipTest( "ASE version does not have CE" )
             return
 
+        import os
+        outfile = "test_mc_parameter_sweep_sgc.h5"
         no_throw = True
         msg = ""
         try:
@@ -50,13 +60,108 @@ class TestMCParameterSweep( unittest.TestCase ):
             equil_params = {
                 "confidence_level":1E-8
             }
-            explorer = MCParameterSweep(parameters, mc, nsteps=20, equil_params=equil_params)
-            explorer.run()
+            explorer = MCParameterSweep(parameters, mc, nsteps=20, equil_params=equil_params,
+                                        outfile=outfile)
+            res = explorer.run()
+            self.assertEqual(len(res), len(parameters))
         except Exception as exc:
             msg = str(exc)
             no_throw = False
+        finally:
+            if os.path.exists(outfile):
+                os.remove(outfile)
         self.assertTrue(no_throw, msg)
 
+    def test_parallel(self):
+        if not has_ase_with_ce:
+            self.skipTest( "ASE version does not have CE" )
+            return
+
+        import os
+        import h5py as h5
+        import numpy as np
+        outfile = "test_mc_parameter_sweep_parallel.h5"
+        atoms = self.get_cebulk()
+        mc = SGCMonteCarlo(atoms, 600.0, symbols=["Al", "Mg"])
+        parameters = [
+            {
+                "temperature":10000.0,
+                "chemical_potential":{"c1_0":-1.072}
+            },
+            {
+                "temperature":9000.0,
+                "chemical_potential":{"c1_0":-1.072}
+            },
+            {
+                "temperature":8000.0,
+                "chemical_potential":{"c1_0":-1.072}
+            }
+        ]
+        equil_params = {
+            "confidence_level":1E-8
+        }
+        try:
+            explorer = MCParameterSweep(parameters, mc, nsteps=20,
+                                        equil_params=equil_params,
+                                        outfile=outfile, num_processes=2,
+                                        data_getter=count_mg)
+            res = explorer.run()
+            self.assertEqual(len(res), len(parameters))
+            self.assertTrue(all("num_mg" in data for data in res))
+
+            # Every point is stored once, in the order the workers finished
+            with h5.File(outfile, 'r') as hf:
+                temps = np.array(hf["temperature"])
+                self.assertEqual(len(np.array(hf["num_mg"])), len(parameters))
+            self.assertTrue(np.allclose(sorted(temps),
+                                        sorted(p["temperature"] for p in parameters)))
+
+            # The workers use copies, the object in this process is unchanged
+            self.assertAlmostEqual(mc.T, 600.0)
+        finally:
+            if os.path.exists(outfile):
+                os.remove(outfile)
+
+    def test_restart(self):
+        if not has_ase_with_ce:
+            self.skipTest( "ASE version does not have CE" )
+            return
+
+        import os
+        outfile = "test_mc_parameter_sweep_restart.h5"
+        atoms = self.get_cebulk()
+        mc = SGCMonteCarlo(atoms, 600.0, symbols=["Al", "Mg"])
+        parameters = [
+            {
+                "temperature":10000.0,
+                "chemical_potential":{"c1_0":-1.072}
+            },
+            {
+                "temperature":9000.0,
+                "chemical_potential":{"c1_0":-1.072}
+            }
+        ]
+        equil_params = {
+            "confidence_level":1E-8
+        }
+        try:
+            explorer = MCParameterSweep(parameters[:1], mc, nsteps=20,
+                                        equil_params=equil_params,
+                                        outfile=outfile)
+            res = explorer.run()
+            self.assertEqual(len(res), 1)
+
+            # The first point is already in the file and should be skipped
+            explorer = MCParameterSweep(parameters, mc, nsteps=20,
+                                        equil_params=equil_params,
+                                        outfile=outfile)
+            res = explorer.run()
+            self.assertEqual(len(res), 1)
+            self.assertAlmostEqual(res[0]["temperature"], 9000.0)
+        finally:
+            if os.path.exists(outfile):
+                os.remove(outfile)
+
 if __name__ == "__main__":
     from cemc import TimeLoggingTestRunner
     unittest.main(testRunner=TimeLoggingTestRunner)
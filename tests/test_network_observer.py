@@ -1,5 +1,6 @@
 import unittest
 import os
+import numpy as np
 try:
     from cemc.mcmc import NetworkObserver
     from cemc import CE
@@ -89,6 +90,73 @@ class TestNetworkObs( unittest.TestCase ):
             no_throw = False
         self.assertTrue( no_throw, msg=msg )
 
+    def test_incremental_update(self):
+        if not available:
+            self.skipTest("ASE version does not have CE!")
+
+        msg = ""
+        no_throw = True
+        try:
+            db_name = "test_db_network_incremental.db"
+            conc = Concentration(basis_elements=[["Al","Mg"]])
+            ceBulk = CEBulk(
+                crystalstructure="fcc", a=4.05, size=[4, 4, 4],
+                concentration=conc, db_name=db_name, max_cluster_size=2,
+                max_cluster_dia=4.5)
+            ceBulk.reconfigure_settings()
+            cf = CorrFunction(ceBulk)
+            atoms = ceBulk.atoms.copy()
+            cf = cf.get_cf(atoms)
+            eci = {key: 0.001 for key in cf.keys()}
+            calc = CE(atoms, ceBulk, eci=eci)
+            net_name = get_example_network_name(ceBulk)
+            obs = NetworkObserver(calc=calc, cluster_name=[net_name],
+                                  element=["Mg"])
+            obs.collect_statistics = False
+
+            # Insert and remove single solute atoms and verify that the
+            # clusters match the ones found from scratch
+            rng = np.random.RandomState(0)
+            symbols = [atom.symbol for atom in atoms]
+            for step in range(300):
+                indx = rng.randint(0, len(atoms))
+                old_symb = symbols[indx]
+                new_symb = "Mg" if old_symb == "Al" else "Al"
+                symbols[indx] = new_symb
+                change = (indx, old_symb, new_symb)
+                calc.update_cf(change)
+                calc.clear_history()
+                obs([change])
+                if step % 30 == 0:
+                    tracker = obs.fast_cluster_tracker
+                    stat = tracker.get_cluster_statistics_python()
+                    n_roots = tracker.num_root_nodes()
+                    largest = tracker.largest_cluster_size()
+                    self.assertTrue(tracker.has_minimal_connectivity())
+                    obs.retrieve_clusters_from_scratch()
+                    stat_ref = tracker.get_cluster_statistics_python()
+                    self.assertEqual(sorted(stat["cluster_sizes"]),
+                                     sorted(stat_ref["cluster_sizes"]))
+                    self.assertEqual(n_roots, tracker.num_root_nodes())
+                    self.assertEqual(largest, tracker.largest_cluster_size())
+
+                    # The window check should not alter the clusters
+                    if largest < 2:
+                        largest = 0
+                    self.assertTrue(obs.move_in_size_window([change],
+                                                            0, len(atoms)))
+                    self.assertEqual(sorted(stat_ref["cluster_sizes"]),
+                                     sorted(tracker.get_cluster_statistics_python()["cluster_sizes"]))
+                    self.assertFalse(obs.move_in_size_window([], largest+1,
+                                                             largest+2))
+                    self.assertTrue(obs.move_in_size_window([], largest,
+                                                            largest+1))
+            os.remove(db_name)
+        except Exception as exc:
+            msg = "{}: {}".format(type(exc).__name__, str(exc))
+            no_throw = False
+        self.assertTrue(no_throw, msg=msg)
+
     # def test_fast_network_update(self):
     #     if not available:
     #         self.skipTest("ASE version does not have CE!")
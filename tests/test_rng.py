@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+
+try:
+    from cemc_cpp_code import PyRandomGenerator
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+
+class TestRandomGenerator(unittest.TestCase):
+    def test_reproducible(self):
+        if not available:
+            self.skipTest(reason)
+        rng1 = PyRandomGenerator(42)
+        rng2 = PyRandomGenerator(42)
+        self.assertEqual(rng1.uniform(size=100), rng2.uniform(size=100))
+
+        rng3 = PyRandomGenerator(43)
+        self.assertNotEqual(rng1.uniform(size=100), rng3.uniform(size=100))
+
+    def test_streams(self):
+        if not available:
+            self.skipTest(reason)
+        first = PyRandomGenerator(42, stream=0)
+        second = PyRandomGenerator(42, stream=1)
+        x = np.array(first.uniform(size=10000))
+        y = np.array(second.uniform(size=10000))
+        self.assertFalse(np.allclose(x, y))
+        self.assertLess(abs(np.corrcoef(x, y)[0, 1]), 0.05)
+
+        # Jumping the first stream gives the second
+        first = PyRandomGenerator(42, stream=0)
+        first.jump()
+        self.assertEqual(first.uniform(size=10), y[:10].tolist())
+
+    def test_distribution(self):
+        if not available:
+            self.skipTest(reason)
+        rng = PyRandomGenerator(0)
+        x = np.array(rng.uniform(size=100000))
+        self.assertTrue(np.all(x >= 0.0) and np.all(x < 1.0))
+        self.assertAlmostEqual(np.mean(x), 0.5, places=2)
+
+        counts = np.bincount(rng.randint(7, size=70000), minlength=7)
+        self.assertEqual(len(counts), 7)
+        self.assertTrue(np.all(np.abs(counts - 10000) < 500))
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
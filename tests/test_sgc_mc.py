@@ -190,6 +190,22 @@ class TestSGCMC(unittest.TestCase):
             msg = str(exc)
         self.assertTrue(no_trow, msg=msg)
 
+    def test_recycle_rejected_before_calculation(self):
+        if not has_ase_with_ce:
+            self.skipTest("ASE version does not have CE")
+        ceBulk, atoms = self.init_bulk_crystal()
+        symbs = ["Al", "Mg", "Si"]
+        atoms.get_calculator().set_symbols(
+            [symbs[i % 3] for i in range(len(atoms))])
+        mc = Montecarlo(atoms, 600.0, recycle_waste=True)
+
+        # Reject all moves before the energy is calculated, as a size
+        # window constraint would do
+        mc._rejected_before_calculation = lambda system_changes: True
+        mc.waste_recycler.record(0.0, 1.0, 1.0)
+        mc._mc_step()
+        self.assertAlmostEqual(mc.waste_recycler.energy(), mc.current_energy)
+        self.assertAlmostEqual(mc.waste_recycler.last_accept_prob(), 0.0)
 
     def __del__(self):
         if (os.path.isfile(db_name)):
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+
+try:
+    from cemc.tools.sgc_thermodynamic_integration import curvature
+    from cemc.tools.sgc_thermodynamic_integration import next_step_size
+    from cemc.tools.sgc_thermodynamic_integration import cumulative_trapezoid
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+
+class TestSGCThermodynamicIntegration(unittest.TestCase):
+    @unittest.skipIf(not available, reason)
+    def test_curvature(self):
+        x = np.array([0.0, 0.5, 2.0])
+        y = 3.0*x**2 + x
+        deriv, std = curvature(x, y)
+        self.assertAlmostEqual(deriv[0], 6.0)
+        self.assertAlmostEqual(std[0], 0.0)
+
+    @unittest.skipIf(not available, reason)
+    def test_step_size(self):
+        x = [0.0, 1.0, 2.0]
+        y = np.array([[0.0], [1.0], [4.0]])
+        y_std = np.zeros_like(y)
+
+        # Curvature 2 --> h^3*2/12 = tol
+        tol = 1E-3
+        step = next_step_size(x, y, y_std, tol, 1.0, 1E-6, 10.0)
+        self.assertAlmostEqual(step, (6.0*tol)**(1.0/3.0))
+
+        # Linear function: step should grow by max_growth
+        y_lin = np.array([[0.0], [1.0], [2.0]])
+        step = next_step_size(x, y_lin, y_std, tol, 1.0, 1E-6, 10.0,
+                              max_growth=2.0)
+        self.assertAlmostEqual(step, 2.0)
+
+        # Noisy data: curvature is not significant
+        y_std = np.ones_like(y)
+        step = next_step_size(x, y, y_std, tol, 1.0, 1E-6, 10.0)
+        self.assertAlmostEqual(step, 2.0)
+
+        # Limits are respected
+        step = next_step_size(x, 1E6*y, np.zeros_like(y), tol, 1.0, 0.1,
+                              10.0)
+        self.assertAlmostEqual(step, 0.1)
+
+    @unittest.skipIf(not available, reason)
+    def test_cumulative_trapezoid(self):
+        x = np.linspace(0.0, 1.0, 101)
+        integral = cumulative_trapezoid(2.0*x, x)
+        self.assertTrue(np.allclose(integral, x**2))
+
+
+if __name__ == "__main__":
+    unittest.main()
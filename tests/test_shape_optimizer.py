@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+try:
+    from cemc.tools.khachaturyan import Khachaturyan
+    from cemc.tools.shape_optimizer import VoxelShapeOptimizer
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+C_al = np.array([[0.62639459, 0.41086487, 0.41086487, 0, 0, 0],
+                 [0.41086487, 0.62639459, 0.41086487, 0, 0, 0],
+                 [0.41086487, 0.41086487, 0.62639459, 0, 0, 0],
+                 [0, 0, 0, 0.42750351, 0, 0],
+                 [0, 0, 0, 0, 0.42750351, 0],
+                 [0, 0, 0, 0, 0, 0.42750351]])
+
+
+def direct_energy(khach, voxels):
+    """Total strain energy evaluated with a full FFT."""
+    ft = np.abs(np.fft.fftn(voxels))**2/voxels.size
+    freqs = [np.fft.fftfreq(n) for n in voxels.shape]
+    K = np.array(np.meshgrid(*freqs, indexing="ij")).reshape(3, -1).T
+    length = np.sqrt(np.sum(K**2, axis=1))
+    mask = length > 0.0
+    nhat = K[mask, :]/length[mask, np.newaxis]
+    integral = np.sum(ft.ravel()[mask]*khach.b_function(nhat))
+    diff = khach.misfit_strain - khach.uniform_strain
+    energy = 0.5*np.einsum("ijkl,ij,kl", khach.C, diff, diff)
+    return energy*np.sum(voxels) - 0.5*integral
+
+
+def cube_voxels(n=12, size=4):
+    voxels = np.zeros((n, n, n))
+    start = (n - size)//2
+    voxels[start:start+size, start:start+size, start:start+size] = 1
+    return voxels
+
+
+class TestShapeOptimizer(unittest.TestCase):
+    def test_incremental_energy(self):
+        if not available:
+            self.skipTest(reason)
+        np.random.seed(0)
+        khach = Khachaturyan(elastic_tensor=C_al,
+                             misfit_strain=np.diag([0.05, 0.01, -0.02]))
+        for conserve in [True, False]:
+            opt = VoxelShapeOptimizer(khach, cube_voxels(), kT=1E-4,
+                                      interface_energy=1E-4,
+                                      conserve_volume=conserve, batch_size=8,
+                                      resync_every=100000)
+            for _ in range(20):
+                proposals = opt._propose()
+                sites, deltas, d_energy = proposals
+                before = direct_energy(khach, opt.voxels) + \
+                    opt.interface_energy*opt.interface_area()
+                opt._apply(sites[0], deltas[0])
+                after = direct_energy(khach, opt.voxels) + \
+                    opt.interface_energy*opt.interface_area()
+                self.assertAlmostEqual(d_energy[0], after - before)
+                self.assertAlmostEqual(opt.strain_energy(),
+                                       direct_energy(khach, opt.voxels))
+
+            # The incremental updates agree with a full recalculation
+            ft = opt.ft.copy()
+            potential = opt.potential.copy()
+            neighbours = opt.num_inside_neighbours.copy()
+            opt.resync()
+            self.assertTrue(np.allclose(ft, opt.ft))
+            self.assertTrue(np.allclose(potential, opt.potential))
+            self.assertTrue(np.array_equal(neighbours,
+                                           opt.num_inside_neighbours))
+
+    def test_energy_decreases(self):
+        if not available:
+            self.skipTest(reason)
+        np.random.seed(1)
+        khach = Khachaturyan(elastic_tensor=C_al,
+                             misfit_strain=np.diag([0.05, 0.0, 0.0]))
+        opt = VoxelShapeOptimizer(khach, cube_voxels(), kT=0.0,
+                                  interface_energy=1E-5)
+        volume = opt.volume
+        initial = opt.energy()
+        energies = opt.run(num_steps=200)
+        self.assertEqual(opt.volume, volume)
+        self.assertLess(energies[-1], initial)
+        self.assertTrue(np.all(np.diff(energies) <= 1E-12))
+
+    def test_invalid_voxels(self):
+        if not available:
+            self.skipTest(reason)
+        khach = Khachaturyan(elastic_tensor=C_al, misfit_strain=np.eye(3))
+        with self.assertRaises(ValueError):
+            VoxelShapeOptimizer(khach, np.ones((4, 4)))
+
+
+if __name__ == "__main__":
+    unittest.main()
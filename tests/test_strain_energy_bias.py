@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+try:
+    from cemc.mcmc.strain_energy_bias import EnergyDensityCache
+    from cemc.mcmc.strain_energy_bias import rotation_vector, rotation_matrix
+    from cemc.tools import rot_matrix
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+
+def model_energy_density(axes, rot):
+    """Smooth function with the same invariances as the strain energy."""
+    axes = np.array(axes)/np.max(axes)
+    return np.sum(axes**2*rot[2, :]**2) + 0.5*np.sum(axes*rot[0, :]**2)
+
+
+class TestStrainEnergyBias(unittest.TestCase):
+    def test_rotation_vector(self):
+        if not available:
+            self.skipTest(reason)
+        rot = rot_matrix([("x", 20), ("z", -35), ("y", 10)])
+        vec = rotation_vector(rot)
+        self.assertTrue(np.allclose(rotation_matrix(vec), rot))
+
+        # Flipping the sign of the axes gives the same vector
+        self.assertTrue(np.allclose(rotation_vector(-rot), vec))
+        flipped = rot*np.array([1, -1, -1])
+        self.assertTrue(np.allclose(rotation_vector(flipped), vec))
+        self.assertTrue(np.allclose(rotation_vector(np.eye(3)), 0.0))
+
+    def test_interpolation(self):
+        if not available:
+            self.skipTest(reason)
+        cache = EnergyDensityCache(model_energy_density, aspect_step=0.02,
+                                   angle_step=0.02)
+        rng = np.random.RandomState(0)
+        axes = np.array([3.0, 2.0, 1.5])
+        rot = rot_matrix([("x", 20), ("z", -35)])
+        for _ in range(20):
+            new_axes = axes + 0.01*rng.randn(3)
+            new_axes = np.sort(new_axes)[::-1]
+            exact = model_energy_density(new_axes, rot)
+            self.assertAlmostEqual(cache(new_axes, rot), exact, delta=1E-3)
+
+        # The energy density is independent of the size
+        num_exact = cache.num_exact
+        self.assertAlmostEqual(cache(2.0*axes, rot), cache(axes, rot))
+        self.assertEqual(cache.num_exact, num_exact)
+        self.assertLessEqual(cache.num_exact, len(cache.table))
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
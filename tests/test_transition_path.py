@@ -49,11 +49,71 @@ class TestTransitionPath(unittest.TestCase):
 
             relaxer = TransitionPathRelaxer(nuc_mc=mc)
             relaxer.generate_paths(initial_path="tests/test_data/example_path.json", n_paths=1, max_attempts=2, outfile="data/tse_ensemble.json")
+            stat = relaxer.acceptance_statistics()
+            n_trials = sum(entry["trials"] for entry in stat.values())
+            self.assertLessEqual(n_trials, 2)
         except Exception as exc:
                 msg = str(exc)
                 no_throw = False
         self.assertTrue(no_throw, msg=msg)
 
+    def test_parallel_shooting(self):
+        if not available:
+            self.skipTest("Transition path test skipped because: "+available_reason)
+        import os
+        import shutil
+        import numpy as np
+        from cemc.mcmc import transition_path_io as tpio
+
+        ceBulk, calc = get_small_BC_with_ce_calc()
+        chem_pot = {"c1_0": -1.065}
+        sampler = NucleationSampler(size_window_width=10,
+            chemical_potential=chem_pot, max_cluster_size=150,
+            merge_strategy="normalize_overlap", max_one_cluster=False)
+        network_name = get_example_network_name(ceBulk)
+        mc = SGCNucleation(calc.atoms, 200, nucleation_sampler=sampler,
+            network_name=[network_name], network_element=["Mg"],
+            symbols=["Al", "Mg"], chem_pot=chem_pot, allow_solutes=True)
+
+        # relax_path writes the relaxed path next to the initial path
+        fname = "parallel_example_path.json"
+        shutil.copy("tests/test_data/example_path.json", fname)
+        n_moves = 4
+        relaxer = TransitionPathRelaxer(nuc_mc=mc, num_processes=2)
+        try:
+            relaxer.relax_path(initial_path=fname, n_shooting_moves=n_moves)
+            self.assertIsNone(relaxer.pool)
+
+            # Every move is one evaluated trial. Trials after an accepted
+            # one in the same batch are discarded
+            stat = relaxer.acceptance_statistics()
+            n_trials = sum(entry["trials"] for entry in stat.values())
+            n_accepted = sum(entry["accepted"] for entry in stat.values())
+            n_discarded = sum(entry["discarded"] for entry in stat.values())
+            self.assertEqual(n_trials, n_moves)
+            self.assertLessEqual(n_discarded, n_accepted)
+            for entry in stat.values():
+                self.assertLessEqual(entry["accepted"], entry["trials"])
+                if entry["trials"] > 0:
+                    self.assertAlmostEqual(
+                        entry["acceptance_rate"],
+                        float(entry["accepted"])/entry["trials"])
+
+            # The stored path is the path held by the relaxer
+            path = relaxer.init_path
+            self.assertEqual(len(path["energy"]), len(path["symbols"]))
+            relaxed = tpio.load_path("parallel_example_path_relaxed.json",
+                                     species=path["species"])
+            self.assertTrue(np.allclose(relaxed["energy"], path["energy"]))
+            for state, ref in zip(relaxed["symbols"], path["symbols"]):
+                self.assertTrue(np.array_equal(state, ref))
+        finally:
+            for name in [fname, "parallel_example_path_relaxed.json",
+                         "relaxed_path.traj"]:
+                if os.path.exists(name):
+                    os.remove(name)
+
+
 if __name__ == "__main__":
     from cemc import TimeLoggingTestRunner
     unittest.main(testRunner=TimeLoggingTestRunner)
@@ -0,0 +1,95 @@
+import unittest
+import os
+import json
+import numpy as np
+try:
+    import h5py
+    from cemc.mcmc import transition_path_io as tpio
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+fname = "test_transition_path_io.h5"
+
+
+def random_path(n_slices=23, n_sites=200, seed=0):
+    rng = np.random.RandomState(seed)
+    state = rng.randint(0, 3, size=n_sites).astype(np.uint8)
+    states = [state.copy()]
+    for _ in range(n_slices-1):
+        state = state.copy()
+        sites = rng.randint(0, n_sites, size=5)
+        state[sites] = rng.randint(0, 3, size=5)
+        states.append(state)
+    return {"symbols": states, "species": ["Al", "Mg", "Si"],
+            "energy": rng.rand(n_slices).tolist(),
+            "min_size_product": 10, "max_size_reactant": 5}
+
+
+class TestTransitionPathIO(unittest.TestCase):
+    def tearDown(self):
+        if os.path.exists(fname):
+            os.remove(fname)
+
+    def test_symbol_conversion(self):
+        if not available:
+            self.skipTest(reason)
+        symbs = ["Al", "Mg", "Mg", "Si"]
+        species = ["Al", "Mg", "Si"]
+        encoded = tpio.symbols2uint(symbs, species)
+        self.assertEqual(encoded.dtype, np.uint8)
+        self.assertEqual(tpio.uint2symbols(encoded, species), symbs)
+        with self.assertRaises(ValueError):
+            tpio.symbols2uint(["Cu"], species)
+
+    def test_random_access(self):
+        if not available:
+            self.skipTest(reason)
+        path = random_path()
+        tpio.save_paths(fname, [path], keyframe_every=4, append=False)
+        with tpio.PathReader(fname) as reader:
+            self.assertEqual(len(reader), len(path["symbols"]))
+            for i in [0, 3, 4, 5, 17, 22, -1]:
+                self.assertTrue(np.array_equal(reader[i], path["symbols"][i]))
+            self.assertEqual(reader.symbols(2),
+                             tpio.uint2symbols(path["symbols"][2],
+                                               path["species"]))
+
+        loaded = tpio.load_path(fname)
+        self.assertEqual(loaded["species"], path["species"])
+        self.assertEqual(loaded["min_size_product"], 10)
+        self.assertTrue(np.allclose(loaded["energy"], path["energy"]))
+        for s1, s2 in zip(loaded["symbols"], path["symbols"]):
+            self.assertTrue(np.array_equal(s1, s2))
+
+    def test_append(self):
+        if not available:
+            self.skipTest(reason)
+        tpio.save_paths(fname, [random_path(seed=1)], append=False)
+        path = random_path(seed=2)
+        tpio.save_paths(fname, [path], append=True)
+        self.assertEqual(tpio.num_paths(fname), 2)
+        loaded = tpio.load_path(fname, path=1)
+        self.assertTrue(np.array_equal(loaded["symbols"][-1],
+                                       path["symbols"][-1]))
+
+    def test_json_conversion(self):
+        if not available:
+            self.skipTest(reason)
+        path = random_path(n_slices=3, n_sites=10)
+        data = tpio.path_to_json(path)
+        json.dumps(data)
+        converted = tpio.path_from_json(data, species=path["species"])
+        for s1, s2 in zip(converted["symbols"], path["symbols"]):
+            self.assertTrue(np.array_equal(s1, s2))
+
+        legacy = tpio.load_path("tests/test_data/example_path.json")
+        self.assertEqual(legacy["species"], ["Al", "Mg"])
+        self.assertEqual(len(legacy["symbols"]), 3)
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
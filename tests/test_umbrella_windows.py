@@ -0,0 +1,235 @@
+import unittest
+import os
+import numpy as np
+try:
+    import h5py
+    from cemc.mcmc import umbrella_windows as uw
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+try:
+    from cemc.mcmc import NucleationSampler, SGCNucleation
+    from helper_functions import get_small_BC_with_ce_calc
+    from helper_functions import get_example_network_name
+    has_ce = True
+    ce_reason = ""
+except Exception as exc:
+    has_ce = False
+    ce_reason = str(exc)
+
+prefix = "test_umbrella_windows"
+data_file = prefix + "_merged.h5"
+
+
+def double_well(num_bins):
+    x = np.linspace(-1.5, 1.5, num_bins)
+    return 2.0*(x**2 - 1.0)**2
+
+
+def window_histograms(free_energy, coverage, num_samples, seed=0):
+    """Sample histograms from the exact distribution in each window."""
+    rng = np.random.RandomState(seed)
+    num_bins = len(free_energy)
+    hist = np.zeros((len(coverage), num_bins))
+    log_bias = np.zeros((len(coverage), num_bins)) - np.inf
+    for i, (start, stop) in enumerate(coverage):
+        prob = np.exp(-free_energy[start:stop])
+        prob /= np.sum(prob)
+        hist[i, start:stop] = rng.multinomial(num_samples, prob)
+        log_bias[i, start:stop] = 0.0
+    return hist, log_bias
+
+
+def same_shape(free_energy, exact, tol):
+    """Compare free energy curves after aligning the mean."""
+    diff = free_energy - exact
+    return np.max(np.abs(diff - np.mean(diff))) < tol
+
+
+def coverage_of(n_windows, n_bins):
+    return [(i*n_bins, (i+1)*n_bins+1) for i in range(n_windows)]
+
+
+class RandomWalkSampler(object):
+    """
+    Minimal sampler for run_windows_in_parallel. Each window is a random
+    walk on its bins. Module level such that the workers can unpickle it
+    """
+    def __init__(self, coverage):
+        self.coverage = coverage
+        self.logger = None
+        self.flush_log = None
+        self.windows_run = []
+
+    def _init_loggers(self):
+        pass
+
+    def log(self, msg):
+        pass
+
+    def _run_window(self, window, nsteps):
+        start, stop = self.coverage[window]
+        fname = uw.window_file_name(prefix, window)
+        recorder = uw.WindowRecorder(fname, stop - start, start)
+        indx = 0
+        for _ in range(nsteps):
+            indx = min(max(indx + np.random.choice([-1, 1]), 0),
+                       stop - start - 1)
+            recorder.add(indx)
+        recorder.flush()
+        self.windows_run.append(window)
+
+
+class TestUmbrellaWindows(unittest.TestCase):
+    def tearDown(self):
+        for i in range(4):
+            for pre in [prefix, prefix + "_merged"]:
+                fname = uw.window_file_name(pre, i) if available else ""
+                if os.path.exists(fname):
+                    os.remove(fname)
+        if os.path.exists(data_file):
+            os.remove(data_file)
+
+    def test_wham_recovers_free_energy(self):
+        if not available:
+            self.skipTest(reason)
+        coverage = coverage_of(4, 10)
+        exact = double_well(41)
+        hist, log_bias = window_histograms(exact, coverage, 200000)
+        free_energy, _ = uw.wham(hist, log_bias)
+        self.assertEqual(free_energy[0], 0.0)
+        self.assertTrue(same_shape(free_energy, exact, 0.05))
+
+    def test_unvisited_bins(self):
+        if not available:
+            self.skipTest(reason)
+        coverage = coverage_of(2, 5)
+        hist, log_bias = window_histograms(np.zeros(11), coverage, 1000)
+        hist[1, 8] = 0
+        free_energy, _ = uw.wham(hist, log_bias)
+        self.assertTrue(np.isnan(free_energy[8]))
+        self.assertEqual(free_energy[0], 0.0)
+
+    def test_statistical_inefficiency(self):
+        if not available:
+            self.skipTest(reason)
+        rng = np.random.RandomState(1)
+        phi = 0.8
+        series = np.zeros(200000)
+        for i in range(1, len(series)):
+            series[i] = phi*series[i-1] + rng.randn()
+        g = uw.statistical_inefficiency(series)
+        self.assertAlmostEqual(g, (1.0 + phi)/(1.0 - phi), delta=1.0)
+        self.assertAlmostEqual(
+            uw.statistical_inefficiency(rng.randn(10000)), 1.0, delta=0.2)
+
+    def test_merge_window_files(self):
+        if not available:
+            self.skipTest(reason)
+        coverage = coverage_of(4, 10)
+        exact = double_well(41)
+        hist, _ = window_histograms(exact, coverage, 50000)
+        for i, (start, stop) in enumerate(coverage):
+            fname = uw.window_file_name(prefix, i)
+            recorder = uw.WindowRecorder(fname, stop - start, start)
+            recorder.counts += hist[i, start:stop]
+            recorder.flush()
+
+            # A new recorder continues from the counts in the file
+            recorder = uw.WindowRecorder(fname, stop - start, start)
+            self.assertTrue(np.allclose(recorder.counts, hist[i, start:stop]))
+
+        res = uw.merge_window_files(prefix, coverage, 41, n_bootstrap=10)
+        self.assertTrue(same_shape(res["free_energy"], exact, 0.1))
+        self.assertEqual(res["free_energy_std"][0], 0.0)
+        self.assertTrue(np.all(res["free_energy_std"][1:] > 0.0))
+        self.assertTrue(np.allclose(res["histogram"], np.sum(hist, axis=0)))
+
+    def test_recorder_series_is_bounded(self):
+        if not available:
+            self.skipTest(reason)
+        fname = uw.window_file_name(prefix + "_bounded", 0)
+        recorder = uw.WindowRecorder(fname, 10, 0, flush_every=1E6,
+                                     max_series=100)
+        rng = np.random.RandomState(0)
+        for indx in rng.randint(0, 10, size=1050):
+            recorder.add(indx)
+        self.assertLess(len(recorder.series), 100)
+        recorder.flush()
+        data = uw.load_window_file(fname)
+        self.assertEqual(data["num_samples"], 1050)
+        self.assertAlmostEqual(data["stat_ineff"], 1.0, delta=0.5)
+        os.remove(fname)
+
+
+    def test_run_windows_in_parallel(self):
+        if not available:
+            self.skipTest(reason)
+        coverage = coverage_of(2, 5)
+        num_bins = coverage[-1][1]
+        sampler = RandomWalkSampler(coverage)
+        num_merges = []
+
+        def merge():
+            res = uw.merge_window_files(prefix, coverage, num_bins,
+                                        n_bootstrap=0)
+            uw.write_datasets(data_file, {
+                "free_energy": res["free_energy"],
+                "window_histograms": res["window_histograms"],
+                "num_samples": res["num_samples"]})
+            num_merges.append(1)
+
+        nsteps = 500
+        uw.run_windows_in_parallel(sampler, [0, 1], nsteps, 2, merge,
+                                   merge_every=1E6, mc_obj=sampler)
+
+        # The windows ran on copies of the sampler in the workers
+        self.assertEqual(sampler.windows_run, [])
+        self.assertEqual(len(num_merges), 1)
+        for i, (start, stop) in enumerate(coverage):
+            data = uw.load_window_file(uw.window_file_name(prefix, i))
+            self.assertIsNotNone(data)
+            self.assertEqual(data["offset"], start)
+            self.assertEqual(np.sum(data["hist"]), nsteps)
+
+        with h5py.File(data_file, "r") as hfile:
+            num_samples = np.array(hfile["num_samples"])
+            window_hist = np.array(hfile["window_histograms"])
+            free_energy = np.array(hfile["free_energy"])
+        self.assertTrue(np.array_equal(num_samples, [nsteps, nsteps]))
+        for i, (start, stop) in enumerate(coverage):
+            self.assertEqual(np.sum(window_hist[i, start:stop]), nsteps)
+        self.assertEqual(len(free_energy), num_bins)
+
+    def test_parallel_nucleation_windows(self):
+        if not available:
+            self.skipTest(reason)
+        if not has_ce:
+            self.skipTest(ce_reason)
+        ceBulk, calc = get_small_BC_with_ce_calc()
+        chem_pot = {"c1_0": -1.065}
+        sampler = NucleationSampler(size_window_width=5,
+            chemical_potential=chem_pot, max_cluster_size=10,
+            merge_strategy="normalize_overlap", max_one_cluster=False)
+        network_name = get_example_network_name(ceBulk)
+        mc = SGCNucleation(calc.atoms, 200, nucleation_sampler=sampler,
+            network_name=[network_name], network_element=["Mg"],
+            symbols=["Al", "Mg"], chem_pot=chem_pot, allow_solutes=True)
+
+        nsteps = 20
+        mc.run(nsteps=nsteps, num_processes=2, data_file=data_file)
+        self.assertEqual(sampler.n_windows, 2)
+        for i in range(sampler.n_windows):
+            fname = uw.window_file_name(prefix + "_merged", i)
+            self.assertTrue(os.path.exists(fname))
+        with h5py.File(data_file, "r") as hfile:
+            num_samples = np.array(hfile["num_samples"])
+            self.assertIn("beta_gibbs", hfile)
+        self.assertTrue(np.array_equal(num_samples, [nsteps, nsteps]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+
+try:
+    from ase.clease.settings_bulk import CEBulk
+    from ase.clease import Concentration
+    from cemc.mcmc import VarianceConstrainedSGC
+    from cemc import CE
+    from helper_functions import get_max_cluster_dia_name
+    has_ase_with_ce = True
+except Exception as exc:
+    print(str(exc))
+    has_ase_with_ce = False
+
+ecis = {
+    "c1_0": -0.1
+}
+
+db_name = "test_vcsgc.db"
+
+
+class TestVarianceConstrainedSGC(unittest.TestCase):
+    def init_bulk_crystal(self):
+        max_dia_name = get_max_cluster_dia_name()
+        size_arg = {max_dia_name: 4.05}
+        conc = Concentration(basis_elements=[["Al", "Mg"]])
+        ceBulk = CEBulk(crystalstructure="fcc", a=4.05, size=[3, 3, 3],
+                        concentration=conc, db_name=db_name,
+                        max_cluster_size=2, **size_arg)
+        ceBulk.reconfigure_settings()
+        atoms = ceBulk.atoms.copy()
+        CE(atoms, ceBulk, ecis)
+        return atoms
+
+    def test_target_composition(self):
+        if not has_ase_with_ce:
+            self.skipTest("ASE version does not have CE")
+            return
+
+        atoms = self.init_bulk_crystal()
+        mc = VarianceConstrainedSGC(atoms, 600.0, symbols=["Al", "Mg"],
+                                    kappa=50.0)
+        target = {"c1_0": 0.2}
+        mc.runMC(steps=2000, target_singlets=target,
+                 chem_potential={"c1_0": 0.0})
+        thermo = mc.get_thermodynamic()
+
+        # With a stiff penalty the singlet stays close to the target
+        self.assertAlmostEqual(thermo["singlet_c1_0"], 0.2, places=1)
+        self.assertTrue("avg_mu_c1_0" in thermo.keys())
+        self.assertTrue("std_avg_mu_c1_0" in thermo.keys())
+        expected_mu = 2.0*50.0*(0.2 - thermo["singlet_c1_0"])
+        self.assertAlmostEqual(thermo["avg_mu_c1_0"], expected_mu)
+
+    def test_missing_target(self):
+        if not has_ase_with_ce:
+            self.skipTest("ASE version does not have CE")
+            return
+
+        atoms = self.init_bulk_crystal()
+        mc = VarianceConstrainedSGC(atoms, 600.0, symbols=["Al", "Mg"])
+        with self.assertRaises(ValueError):
+            mc.runMC(steps=10)
+
+    def tearDown(self):
+        try:
+            os.remove(db_name)
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
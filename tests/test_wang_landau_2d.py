@@ -0,0 +1,104 @@
+import unittest
+import numpy as np
+from ase.build import bulk
+from ase.units import kB
+try:
+    from scipy.special import gammaln
+    from cemc.wanglandau import WangLandau2D
+    available = True
+    reason = ""
+except Exception as exc:
+    available = False
+    reason = str(exc)
+
+try:
+    from ase.clease import CEBulk, Concentration, CorrFunction
+    from cemc import CE
+    from cemc.wanglandau.wang_landau_2d import has_fast_wl_sampler
+    has_CE = has_fast_wl_sampler
+except Exception as exc:
+    has_CE = False
+
+
+class TestWangLandau2D(unittest.TestCase):
+    # Independent sites where each solute atom costs eps
+    eps = 0.01
+
+    def get_wl(self):
+        atoms = bulk("Al", a=4.05)*(2, 2, 2)
+        n = len(atoms)
+        wl = WangLandau2D(atoms, "Al", "Mg", Emin=-0.5*self.eps,
+                          Emax=(n+0.5)*self.eps, n_energy_bins=n+1)
+
+        # Exact DOS. The solute count fixes the energy
+        logdos = np.zeros((n+1, n+1))
+        for i in range(n+1):
+            logdos[i, i] = 5.0 + i
+            wl.known_bins[i, i] = 1
+        wl.logdos = logdos
+        wl.normalize()
+        return wl
+
+    def test_normalize(self):
+        if not available:
+            self.skipTest(reason)
+        wl = self.get_wl()
+        n = wl.n_sites
+        N = np.arange(n+1)
+        expected = gammaln(n+1) - gammaln(N+1) - gammaln(n-N+1)
+        self.assertTrue(np.allclose(np.diag(wl.logdos), expected))
+
+    def test_reweighting(self):
+        if not available:
+            self.skipTest(reason)
+        wl = self.get_wl()
+        n = wl.n_sites
+        for T in [100.0, 1000.0]:
+            for mu in [-0.02, 0.0, 0.02]:
+                x = -(self.eps - mu)/(kB*T)
+                expected = -kB*T*np.log(1.0 + np.exp(x))
+                self.assertAlmostEqual(wl.sgc_free_energy(T, mu), expected)
+
+                conc = np.exp(x)/(1.0 + np.exp(x))
+                self.assertAlmostEqual(wl.average_concentration(T, mu), conc)
+
+                analyzer = wl.sgc_analyzer(mu)
+                analyzer.normalize_dos_by_infinite_temp_limit()
+                F = analyzer.free_energy(T)
+                self.assertTrue(np.isfinite(F))
+
+            N = np.arange(n+1)
+            log_configs = gammaln(n+1) - gammaln(N+1) - gammaln(n-N+1)
+            expected = (self.eps*N - kB*T*log_configs)/n
+            self.assertTrue(np.allclose(wl.canonical_free_energy(T), expected))
+
+    def test_native_sampler(self):
+        if not available or not has_CE:
+            self.skipTest("ASE version does not have CE")
+        import os
+        db_name = "test_wl2d.db"
+        try:
+            conc = Concentration(basis_elements=[["Al", "Mg"]])
+            bc = CEBulk(crystalstructure="fcc", a=4.05, size=[3, 3, 3],
+                        concentration=conc, db_name=db_name,
+                        max_cluster_size=2, max_cluster_dia=4.5)
+            bc.reconfigure_settings()
+            cf = CorrFunction(bc).get_cf(bc.atoms)
+            eci = {key: 0.001 for key in cf.keys()}
+            atoms = bc.atoms.copy()
+            CE(atoms, bc, eci)
+            E = atoms.get_potential_energy()
+            wl = WangLandau2D(atoms, "Al", "Mg", Emin=E-10.0, Emax=E+10.0,
+                              n_energy_bins=50, seed=0)
+            wl.run(maxsteps=10000, f0=1.0, fmin=0.5)
+            self.assertTrue(np.any(wl.known_bins))
+            F = wl.canonical_free_energy(1000.0)
+            self.assertTrue(np.any(np.isfinite(F)))
+        finally:
+            if os.path.exists(db_name):
+                os.remove(db_name)
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
@@ -1,5 +1,6 @@
 import unittest
 import os
+import numpy as np
 from ase.build import bulk
 try:
     from ase.clease import CEBulk
@@ -71,6 +72,178 @@ class TestInitWLSim(unittest.TestCase):
         simulator = WangLandau(atoms, wl_db_name, runID, fmin=1.8)
         simulator.run_fast_sampler(mode="adaptive_windows", maxsteps=100)
 
+    def test_replica_exchange(self):
+        if not has_CE:
+            self.skipTest("ASE version does not have CE")
+
+        eci = get_eci()
+        initializer = WangLandauInit(wl_db_name)
+        T = [1000, 10]
+        comp = {"Al": 0.5, "Mg": 0.5}
+        try:
+            initializer.insert_atoms(
+                bc_kwargs, size=[5, 5, 5],
+                T=T, n_steps_per_temp=10, eci=eci, composition=comp)
+        except AtomExistsError:
+            pass
+        initializer.prepare_wang_landau_run([("id", "=", "1")])
+        atoms = initializer.get_atoms(1, eci)
+        db_manager = WangLandauDBManager(wl_db_name)
+        runID = db_manager.get_next_non_converged_uid(1)
+        if runID == -1:
+            raise ValueError("No new Wang Landau simulation in the database!")
+        simulator = WangLandau(atoms, wl_db_name, runID, fmin=1.8)
+        simulator.run_fast_sampler(mode="replica_exchange", maxsteps=1000,
+                                   num_windows=2, window_overlap=0.75,
+                                   exchange_every=10)
+
+        # The windows update f through the schedule
+        simulator = WangLandau(atoms, wl_db_name, runID, fmin=1.8)
+        simulator.run_fast_sampler(mode="replica_exchange", maxsteps=4000,
+                                   num_windows=2, window_overlap=0.75,
+                                   exchange_every=10, schedule="samc",
+                                   schedule_params={"gain": 0.5, "t0": 1.0})
+        self.assertLessEqual(simulator.f, 0.5)
+
+    def test_seeded_replica_exchange(self):
+        if not has_CE:
+            self.skipTest("ASE version does not have CE")
+
+        eci = get_eci()
+        initializer = WangLandauInit(wl_db_name)
+        T = [1000, 10]
+        comp = {"Al": 0.5, "Mg": 0.5}
+        try:
+            initializer.insert_atoms(
+                bc_kwargs, size=[5, 5, 5],
+                T=T, n_steps_per_temp=10, eci=eci, composition=comp)
+        except AtomExistsError:
+            pass
+        initializer.prepare_wang_landau_run([("id", "=", "1")])
+        db_manager = WangLandauDBManager(wl_db_name)
+        runID = db_manager.get_next_non_converged_uid(1)
+        if runID == -1:
+            raise ValueError("No new Wang Landau simulation in the database!")
+
+        logdos = []
+        for _ in range(2):
+            atoms = initializer.get_atoms(1, eci)
+            simulator = WangLandau(atoms, wl_db_name, runID, fmin=1.8)
+            simulator.run_fast_sampler(mode="replica_exchange", maxsteps=1000,
+                                       num_windows=2, window_overlap=0.75,
+                                       exchange_every=10, seed=42)
+            logdos.append(simulator.histogram.logdos.copy())
+        self.assertTrue(np.array_equal(logdos[0], logdos[1]))
+
+    def test_schedules(self):
+        if not has_CE:
+            self.skipTest("ASE version does not have CE")
+
+        eci = get_eci()
+        initializer = WangLandauInit(wl_db_name)
+        T = [1000, 10]
+        comp = {"Al": 0.5, "Mg": 0.5}
+        try:
+            initializer.insert_atoms(
+                bc_kwargs, size=[5, 5, 5],
+                T=T, n_steps_per_temp=10, eci=eci, composition=comp)
+        except AtomExistsError:
+            pass
+        initializer.prepare_wang_landau_run([("id", "=", "1")])
+        atoms = initializer.get_atoms(1, eci)
+        db_manager = WangLandauDBManager(wl_db_name)
+        runID = db_manager.get_next_non_converged_uid(1)
+        if runID == -1:
+            raise ValueError("No new Wang Landau simulation in the database!")
+        simulator = WangLandau(atoms, wl_db_name, runID, fmin=1.8)
+        logfile = "wl_convergence_log.csv"
+        for schedule in ["inverse_time", "samc", "tunnelling"]:
+            simulator.run_fast_sampler(maxsteps=1000, schedule=schedule,
+                                       convergence_log=logfile)
+        os.remove(logfile)
+
+        with self.assertRaises(ValueError):
+            simulator.run_fast_sampler(maxsteps=1000, schedule="unknown")
+
+    def test_checkpoint(self):
+        if not has_CE:
+            self.skipTest("ASE version does not have CE")
+
+        eci = get_eci()
+        initializer = WangLandauInit(wl_db_name)
+        T = [1000, 10]
+        comp = {"Al": 0.5, "Mg": 0.5}
+        try:
+            initializer.insert_atoms(
+                bc_kwargs, size=[5, 5, 5],
+                T=T, n_steps_per_temp=10, eci=eci, composition=comp)
+        except AtomExistsError:
+            pass
+        initializer.prepare_wang_landau_run([("id", "=", "1")])
+        atoms = initializer.get_atoms(1, eci)
+        db_manager = WangLandauDBManager(wl_db_name)
+        runID = db_manager.get_next_non_converged_uid(1)
+        if runID == -1:
+            raise ValueError("No new Wang Landau simulation in the database!")
+        simulator = WangLandau(atoms, wl_db_name, runID, fmin=1.8)
+        checkpoint = "wl_checkpoint.bin"
+        simulator.run_fast_sampler(maxsteps=1000, checkpoint=checkpoint)
+        self.assertTrue(os.path.exists(checkpoint))
+        logdos = simulator.histogram.logdos.copy()
+        n_iter = simulator.iter
+
+        # Restart from the checkpoint with a new sampler
+        simulator.run_fast_sampler(maxsteps=1000, checkpoint=checkpoint)
+        self.assertGreater(simulator.iter, n_iter)
+        known = simulator.histogram.known_state == 1
+        self.assertTrue(np.all(simulator.histogram.logdos[known] >= logdos[known]))
+        os.remove(checkpoint)
+
+    def test_fast_sgc_sampler(self):
+        if not has_CE:
+            self.skipTest("ASE version does not have CE")
+        from ase.db import connect
+
+        eci = get_eci()
+        initializer = WangLandauInit(wl_db_name)
+        T = [1000, 10]
+        comp = {"Al": 0.5, "Mg": 0.5}
+        try:
+            initializer.insert_atoms(
+                bc_kwargs, size=[5, 5, 5],
+                T=T, n_steps_per_temp=10, eci=eci, composition=comp)
+        except AtomExistsError:
+            pass
+        initializer.prepare_wang_landau_run([("id", "=", "1")])
+        atoms = initializer.get_atoms(1, eci)
+
+        # The chemical potentials are read from the atoms row
+        db = connect(wl_db_name)
+        db.update(1, data={"elements": ["Al", "Mg"],
+                           "chemical_potentials": [0.0, 0.01]})
+        db_manager = WangLandauDBManager(wl_db_name)
+        runID = db_manager.get_next_non_converged_uid(1)
+        if runID == -1:
+            raise ValueError("No new Wang Landau simulation in the database!")
+        simulator = WangLandau(atoms, wl_db_name, runID, fmin=1.8,
+                               site_types=[0 for _ in range(len(atoms))],
+                               site_elements=[["Al", "Mg"]],
+                               ensemble="semi-grand-canonical")
+        sampler = simulator.run_fast_sampler(maxsteps=5000)
+
+        # Most flips are rejected. The walkers still have to be in the
+        # state given by their symbols
+        bc = atoms.get_calculator().BC
+        cf_calc = CorrFunction(bc)
+        for walker in range(sampler.num_walkers):
+            walker_atoms = atoms.copy()
+            walker_atoms.set_chemical_symbols(
+                sampler.get_walker_symbols(walker))
+            cf = cf_calc.get_cf(walker_atoms)
+            energy = len(walker_atoms)*sum(eci[k]*cf[k] for k in eci.keys())
+            self.assertAlmostEqual(sampler.get_walker_ce_energy(walker),
+                                   energy)
+
 if __name__ == "__main__":
     from cemc import TimeLoggingTestRunner
     unittest.main(testRunner=TimeLoggingTestRunner)
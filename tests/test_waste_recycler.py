@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+
+try:
+    from cemc_cpp_code import PyWasteRecycler
+    from cemc.mcmc.util import waste_recycled_average
+    from cemc.mcmc.util import waste_recycled_accept_prob
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+
+class TestWasteRecycler(unittest.TestCase):
+    def test_against_numpy(self):
+        if not available:
+            self.skipTest(reason)
+
+        T = 400.0
+        energies = np.array([-2.1, -2.07])
+        recycler = PyWasteRecycler()
+        recycler.accept(energies[0], energies[1], T, 0.5)
+
+        p = waste_recycled_accept_prob(energies, T)
+        self.assertAlmostEqual(recycler.last_accept_prob(), p[1])
+
+        E = waste_recycled_average(energies, energies, T)
+        E_sq = waste_recycled_average(energies**2, energies, T)
+        self.assertAlmostEqual(recycler.energy(), E)
+        self.assertAlmostEqual(recycler.energy_sq(), E_sq)
+
+        singl_old = np.array([0.1, -0.3])
+        singl_new = np.array([0.2, -0.1])
+        avg, avg_sq, avg_eng = recycler.singlet_averages(singl_old, singl_new)
+        for i in range(len(singl_old)):
+            singl = np.array([singl_old[i], singl_new[i]])
+            self.assertAlmostEqual(
+                avg[i], waste_recycled_average(singl, energies, T))
+            self.assertAlmostEqual(
+                avg_sq[i], waste_recycled_average(singl**2, energies, T))
+            self.assertAlmostEqual(
+                avg_eng[i],
+                waste_recycled_average(singl*energies, energies, T))
+
+    def test_no_overflow(self):
+        if not available:
+            self.skipTest(reason)
+        recycler = PyWasteRecycler()
+        self.assertAlmostEqual(recycler.accept_prob(0.0, 1E6, 1.0), 0.0)
+        self.assertAlmostEqual(recycler.accept_prob(1E6, 0.0, 1.0), 1.0)
+
+    def test_boltzmann_constant(self):
+        if not available:
+            self.skipTest(reason)
+        from ase.units import kB
+        recycler = PyWasteRecycler()
+        T = 300.0
+        dE = 0.05
+        w = np.exp(-dE/(kB*T))
+        self.assertAlmostEqual(recycler.accept_prob(0.0, dE, T), w/(1.0 + w),
+                               places=12)
+
+    def test_record(self):
+        if not available:
+            self.skipTest(reason)
+        recycler = PyWasteRecycler()
+
+        # Forced acceptance
+        recycler.record(-1.0, -2.0, 1.0)
+        self.assertAlmostEqual(recycler.energy(), -2.0)
+        self.assertAlmostEqual(recycler.energy_sq(), 4.0)
+
+        # Rejected before the energy was calculated
+        recycler.record(-1.0, -1.0, 0.0)
+        self.assertAlmostEqual(recycler.energy(), -1.0)
+        self.assertAlmostEqual(recycler.last_accept_prob(), 0.0)
+
+        with self.assertRaises(ValueError):
+            recycler.record(0.0, 0.0, 1.5)
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from ase.units import kB
+try:
+    from scipy.special import gammaln
+    from cemc.wanglandau.wl_analyzer import WangLandauSGCAnalyzer
+    available = True
+    reason = ""
+except Exception as exc:
+    available = False
+    reason = str(exc)
+
+
+class TestWLAnalyzer(unittest.TestCase):
+    # Independent two level systems. Energy eps*n with degeneracy N!/(n!(N-n)!)
+    N = 100
+    eps = 0.01
+
+    def get_analyzer(self):
+        n = np.arange(self.N+1)
+        logdos = gammaln(self.N+1) - gammaln(n+1) - gammaln(self.N-n+1)
+        return WangLandauSGCAnalyzer(self.eps*n, None, np.zeros(self.N),
+                                     logdos=logdos)
+
+    def test_batch_matches_scalar(self):
+        if not available:
+            self.skipTest(reason)
+        analyzer = self.get_analyzer()
+        temps = np.array([50.0, 200.0, 1000.0, 5000.0])
+        res = analyzer.thermodynamic_quantities(temps)
+        for i, T in enumerate(temps):
+            x = np.exp(-self.eps/(kB*T))
+            F = -kB*T*np.log(1.0 + x)
+            U = self.eps*x/(1.0 + x)
+            Cv = (self.eps**2)*x/(kB*T**2*(1.0 + x)**2)
+            self.assertAlmostEqual(res["free_energy"][i], F)
+            self.assertAlmostEqual(res["internal_energy"][i], U)
+            self.assertAlmostEqual(res["heat_capacity"][i]/Cv, 1.0)
+            self.assertAlmostEqual(analyzer.free_energy(T), F)
+            self.assertAlmostEqual(analyzer.internal_energy(T), U)
+            self.assertAlmostEqual(analyzer.entropy(T), (U-F)/T)
+
+        self.assertTrue(np.allclose(analyzer.free_energy(temps),
+                                    res["free_energy"]))
+
+    def test_large_logdos(self):
+        if not available:
+            self.skipTest(reason)
+        # exp(ln g) overflows, and the Boltzmann factor underflows at low T
+        n = np.arange(self.N+1)
+        E = -10.0*n
+        logdos = 2000.0 + n
+        analyzer = WangLandauSGCAnalyzer(E, None, np.zeros(self.N),
+                                         logdos=logdos)
+        res = analyzer.thermodynamic_quantities([1.0, 10.0, 1E6])
+        for key, value in res.items():
+            self.assertTrue(np.all(np.isfinite(value)), msg=key)
+        self.assertAlmostEqual(res["internal_energy"][0], -10.0)
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)
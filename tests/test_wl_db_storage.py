@@ -0,0 +1,85 @@
+import unittest
+import os
+import io
+import logging
+import numpy as np
+try:
+    from cemc.wanglandau import wltools
+    from cemc.wanglandau.histogram import Histogram
+    from cemc.wanglandau.wang_landau_db_manager import WangLandauDBManager
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+db_name = "test_wl_db_storage.db"
+
+
+class TestWLDBStorage(unittest.TestCase):
+    def tearDown(self):
+        if available:
+            wltools.close_connections()
+        for fname in [db_name, db_name+"-wal", db_name+"-shm"]:
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def test_array_round_trip(self):
+        if not available:
+            self.skipTest(reason)
+        for arr in [np.arange(10, dtype=np.int32), np.linspace(0.0, 1.0, 7),
+                    np.array([0, 1, 1], dtype=np.uint8), np.zeros(0)]:
+            converted = wltools.convert_array(wltools.adapt_array(arr))
+            self.assertEqual(converted.dtype, arr.dtype)
+            self.assertTrue(np.array_equal(converted, arr))
+
+    def test_legacy_blob(self):
+        if not available:
+            self.skipTest(reason)
+        arr = np.linspace(-1.0, 1.0, 5)
+        out = io.BytesIO()
+        np.save(out, arr)
+        self.assertTrue(np.allclose(wltools.convert_array(out.getvalue()), arr))
+
+    def test_pooled_connection(self):
+        if not available:
+            self.skipTest(reason)
+        conn = wltools.get_connection(db_name)
+        self.assertIs(wltools.get_connection(db_name), conn)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+        wltools.close_connections(db_name)
+        self.assertIsNot(wltools.get_connection(db_name), conn)
+
+    def test_insert_and_histogram(self):
+        if not available:
+            self.skipTest(reason)
+        manager = WangLandauDBManager(db_name)
+        manager.insert_many([1, 2, 3], Nbins=20)
+        manager.insert_many([2, 4], Nbins=20)
+        cur = wltools.get_connection(db_name).cursor()
+        cur.execute("SELECT uid, atomID FROM simulations")
+        entries = sorted(cur.fetchall())
+        self.assertEqual(entries, [(0, 1), (1, 2), (2, 3), (3, 4)])
+        self.assertEqual(manager.get_new_id(), 4)
+        self.assertTrue(manager.exists_in_db(4))
+        self.assertFalse(manager.exists_in_db(5))
+
+        logger = logging.getLogger(__name__)
+        hist = Histogram(20, -1.0, 1.0, logger)
+        hist.histogram[3] = 5
+        hist.logdos[3] = 2.0
+        hist.known_state[3] = 1
+        hist.save(db_name, 2)
+
+        loaded = Histogram(20, 0.0, 1.0, logger)
+        loaded.load(db_name, 2)
+        self.assertAlmostEqual(loaded.Emin, -1.0)
+        self.assertTrue(np.array_equal(loaded.histogram, hist.histogram))
+        self.assertTrue(np.allclose(loaded.logdos, hist.logdos))
+        self.assertTrue(np.array_equal(loaded.known_state, hist.known_state))
+
+
+if __name__ == "__main__":
+    unittest.main()
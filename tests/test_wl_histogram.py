@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+try:
+    from scipy import interpolate
+    from cemc.wanglandau.histogram import Histogram, interp_extrapolate
+    available = True
+    reason = ""
+except ImportError as exc:
+    available = False
+    reason = str(exc)
+
+
+class TestWLHistogram(unittest.TestCase):
+    def test_growth_variance(self):
+        if not available:
+            self.skipTest(reason)
+        Nbins = 50
+        hist = Histogram(Nbins, -1.0, 1.0, None)
+        expected = np.zeros(Nbins)
+        np.random.seed(0)
+        for selected_bin in np.random.randint(0, Nbins, size=1000):
+            hist.update(selected_bin, 1.0)
+            expected += Nbins**(-2)
+            expected[selected_bin] += (1.0 - 2.0/Nbins)
+        self.assertTrue(np.allclose(hist.growth_variance, expected))
+
+        hist.clear()
+        self.assertTrue(np.allclose(hist.growth_variance, 0.0))
+
+    def test_redistribute(self):
+        if not available:
+            self.skipTest(reason)
+        Nbins = 50
+        hist = Histogram(Nbins, -1.0, 1.0, None)
+        np.random.seed(1)
+        for selected_bin in np.random.randint(0, Nbins, size=1000):
+            hist.update(selected_bin, 1.0)
+
+        old_E = np.linspace(hist.Emin, hist.Emax, Nbins)
+        new_E = np.linspace(-1.5, 0.5 + 1E-8, Nbins)
+        interp = interpolate.interp1d(old_E, hist.growth_variance,
+                                      bounds_error=False,
+                                      fill_value="extrapolate")
+        expected_var = interp(new_E)
+        interp = interpolate.interp1d(old_E, hist.histogram,
+                                      bounds_error=False, fill_value=0)
+        expected_hist = interp(new_E)
+        expected_hist *= np.sum(hist.histogram)/np.sum(expected_hist)
+
+        hist.redistribute_hist(-1.5, 0.5)
+        self.assertTrue(np.allclose(hist.growth_variance, expected_var))
+        self.assertTrue(np.array_equal(hist.histogram,
+                                       np.floor(expected_hist).astype(np.int32)))
+        self.assertTrue(np.all(hist.logdos[hist.histogram == 0] == 0.0))
+
+    def test_extrapolate(self):
+        if not available:
+            self.skipTest(reason)
+        xp = np.array([0.0, 1.0, 2.0])
+        fp = np.array([1.0, 3.0, 4.0])
+        x = np.array([-1.0, 0.5, 3.0])
+        self.assertTrue(np.allclose(interp_extrapolate(x, xp, fp),
+                                    [-1.0, 2.0, 5.0]))
+
+
+if __name__ == "__main__":
+    from cemc import TimeLoggingTestRunner
+    unittest.main(testRunner=TimeLoggingTestRunner)